@@ -0,0 +1,9 @@
+# ==============================================================================
+# BENCHMARK CÁC BƯỚC XỬ LÝ CỦA DỰ ÁN (không cần Neo4j / Gemini / file docx thật)
+# ==============================================================================
+# Dữ liệu giả lập hình dạng Dược điển ở 1×, 10×, 100× bộ 815 hoạt chất (fixtures.py);
+# đồ thị trong bộ nhớ thay Neo4j, backend replay thay Gemini.
+#
+#   python -m benchmarks                          # chạy tất cả, ghi benchmarks/results/<máy>.jsonl
+#   python -m benchmarks --only two_hop --scales 1 10
+#   python -m benchmarks --list
@@ -0,0 +1,57 @@
+import os
+import re
+import sys
+import argparse
+
+# Chạy được cả `python -m benchmarks` lẫn `python benchmarks/__main__.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import runner
+# Import để đăng ký các benchmark
+from benchmarks import bench_preprocessing, bench_experiments  # noqa: F401
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark các bước xử lý")
+    parser.add_argument("--only", help="Regex lọc theo tên (nhóm/tên)")
+    parser.add_argument("--scales", nargs="+", type=int, help="Cỡ dữ liệu (mặc định 1 10 100)")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần đo tối đa mỗi cỡ")
+    parser.add_argument("--max-time", type=float, default=10.0, help="Giây tối đa mỗi cỡ (ít nhất 1 lần)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Chậm hơn lần trước quá tỉ lệ này = hồi quy")
+    parser.add_argument("--scaling-limit", type=float, default=2.0,
+                        help="Thời gian / hoạt chất tăng quá số lần này so với cỡ nhỏ nhất = siêu tuyến tính")
+    parser.add_argument("--results", help="File kết quả (mặc định benchmarks/results/<máy>.jsonl)")
+    parser.add_argument("--no-save", action="store_true", help="Không ghi kết quả")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Thoát mã 1 khi có hồi quy")
+    parser.add_argument("--list", action="store_true")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    selected = [b for b in runner.BENCHMARKS
+                if not args.only or re.search(args.only, f"{b.group}/{b.name}")]
+    if args.list:
+        for b in selected:
+            print(f"{b.group + '/' + b.name:<44} cỡ {', '.join(f'{s}×' for s in b.scales)}")
+        return 0
+
+    path = args.results or runner.results_path()
+    history = runner.load_history(path)
+    records = []
+    for record in runner.run_benchmarks(selected, args.scales, args.repeat, args.max_time):
+        runner.check(records + [record], history, args.threshold, args.scaling_limit)
+        records.append(record)
+        print(runner.format_record(record), flush=True)
+
+    if not args.no_save:
+        runner.save_results(records, path)
+        print(f"\n🎉 Đã ghi kết quả vào: {path}")
+    regressions = [r for r in records if r.get("regression") or r.get("superlinear")]
+    if regressions:
+        print(f"⚠️ {len(regressions)} benchmark hồi quy / siêu tuyến tính")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
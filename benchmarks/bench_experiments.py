@@ -0,0 +1,75 @@
+import random
+
+from benchmarks import fixtures
+from benchmarks.runner import benchmark, ensure_paths
+
+# ==============================================================================
+# THỰC NGHIỆM: truy vấn KG trong bộ nhớ (thay Neo4j) và chấm điểm câu trả lời
+# ==============================================================================
+ensure_paths()
+
+
+def _clear_caches():
+    """Mỗi lần đo bắt đầu nguội: bỏ cache tách từ / stem / WordNet của lần trước."""
+    from experiments import scoring, metrics
+    scoring._tokenize_cached.cache_clear()
+    metrics.stem.cache_clear()
+    metrics.synonyms.cache_clear()
+
+
+@benchmark("experiments")
+def memory_graph_query(scale, tmp):
+    """200 truy vấn Cypher kiểu RAG sinh ra (tra tên, CONTAINS, 2-hop) trên MemoryGraph."""
+    from preprocessing.kgraph.memory_graph import MemoryGraph
+    rows = fixtures.drug_rows(scale)
+    graph = MemoryGraph.from_csv(fixtures.write_csv(rows, tmp))
+    rng = random.Random(0)
+    names = [row["Ten_Hoat_Chat"] for row in rng.sample(rows, 200)]
+    templates = (
+        "MATCH (h:HOẠT_CHẤT {{tên_hoạt_chất: '{name}'}}) RETURN h.tên_latin, h.công_thức_hóa_học",
+        "MATCH (h:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN) WHERE h.tên_hoạt_chất = '{name}' "
+        "RETURN t.định_lượng",
+        "MATCH (h:HOẠT_CHẤT)-[:THUỘC_NHÓM]->(l:LOẠI_THUỐC) WHERE toLower(h.tên_hoạt_chất) "
+        "CONTAINS toLower('{short}') RETURN h.tên_hoạt_chất, l.tên_loại LIMIT 5",
+        "MATCH (h:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(:TIÊU_CHUẨN)-[:CÓ_MỤC]->(m:MỤC) "
+        "WHERE h.tên_hoạt_chất = '{name}' AND m.nhãn = 'PH' RETURN m.nội_dung",
+    )
+    queries = [templates[i % len(templates)].format(name=name, short=name.split()[-1])
+               for i, name in enumerate(names)]
+    return lambda: [graph.query(q) for q in queries]
+
+
+@benchmark("experiments")
+def rouge_l(scale, tmp):
+    """ROUGE-L tự cài (tách từ tiếng Việt + LCS bit-parallel) trên các cặp dài như log thật."""
+    from experiments.metrics import tokenize_vi, rouge_l
+    pairs = fixtures.answer_pairs(scale)
+    return lambda: [rouge_l(tokenize_vi(ref), tokenize_vi(cand)) for ref, cand in pairs]
+
+
+@benchmark("experiments", scales=(1, 10))
+def meteor(scale, tmp):
+    """METEOR tự cài (khớp chính xác / stem / WordNet), cache stem + WordNet nguội mỗi lần đo."""
+    from experiments.metrics import tokenize_vi, meteor
+    from experiments.metrics import _wordnet
+    _wordnet()  # nạp WordNet trước, không tính vào thời gian đo
+    pairs = [(tokenize_vi(ref), tokenize_vi(cand)) for ref, cand in fixtures.answer_pairs(scale)]
+
+    def run():
+        _clear_caches()
+        return [meteor(ref, cand) for ref, cand in pairs]
+    return run
+
+
+@benchmark("experiments", scales=(1, 10))
+def score_batch(scale, tmp):
+    """scoring.score_batch (BLEU + ROUGE-L + METEOR, profile shared) trong một tiến trình."""
+    from experiments.scoring import score_batch
+    from experiments.metrics import _wordnet
+    _wordnet()
+    pairs = fixtures.answer_pairs(scale)
+
+    def run():
+        _clear_caches()
+        return score_batch(pairs, "shared", workers=1)
+    return run
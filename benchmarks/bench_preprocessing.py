@@ -0,0 +1,117 @@
+import os
+import json
+
+from benchmarks import fixtures
+from benchmarks.runner import benchmark, ensure_paths
+
+# ==============================================================================
+# TIỀN XỬ LÝ: docx -> CSV -> KG, triples -> câu hỏi 1-hop / 2-hop -> gộp đáp án
+# ==============================================================================
+ensure_paths()
+
+
+@benchmark("preprocessing")
+def parse_drug_text(scale, tmp):
+    """convert_docx_to_csv: tách thuốc + định tuyến tiêu đề (phần parse_docx_to_df sau khi đọc docx)."""
+    from preprocessing.kgraph.convert_docx_to_csv import parse_drug_text
+    text = fixtures.docx_text(fixtures.drug_rows(scale))
+    return lambda: parse_drug_text(text)
+
+
+@benchmark("preprocessing")
+def row_records(scale, tmp):
+    """create_KG.process_row phần chuyển đổi: dòng CSV -> node (regex số liệu, công thức, tách mục)."""
+    from preprocessing.kgraph.kg_records import row_records
+    rows = fixtures.drug_rows(scale)
+    return lambda: [row_records(row) for row in rows]
+
+
+@benchmark("preprocessing")
+def kg_load_memory(scale, tmp):
+    """Nạp KG từ CSV vào MemoryGraph (thay cho MERGE vào Neo4j của create_KG.process_row)."""
+    from preprocessing.kgraph.memory_graph import MemoryGraph
+    path = fixtures.write_csv(fixtures.drug_rows(scale), tmp)
+    return lambda: MemoryGraph.from_csv(path)
+
+
+@benchmark("preprocessing")
+def kg_snapshot_load(scale, tmp):
+    """MemoryGraph từ snapshot nhị phân (kg_snapshot.py) thay vì parse lại CSV."""
+    from preprocessing.kgraph.memory_graph import MemoryGraph
+    from preprocessing.kgraph.kg_snapshot import write_snapshot
+    path = os.path.join(tmp, "kg.snapshot")
+    write_snapshot(MemoryGraph.from_csv(fixtures.write_csv(fixtures.drug_rows(scale), tmp)), path)
+    return lambda: MemoryGraph.from_snapshot(path)
+
+
+@benchmark("preprocessing", scales=(1, 10))
+def create_list_of_dicts(scale, tmp):
+    """create_triple.create_list_of_dicts trên DataFrame (cần pandas)."""
+    import pandas as pd
+    from preprocessing.benchmark.create_triple import create_list_of_dicts
+    df = pd.DataFrame(fixtures.drug_rows(scale), columns=fixtures.COLUMNS)
+    return lambda: create_list_of_dicts(df)
+
+
+# 100× sinh ~6 triệu cặp (vài GB) -> chỉ đo tới 10×
+@benchmark("preprocessing", scales=(1, 10))
+def two_hop_pairs(scale, tmp):
+    """create_question_2hop.build_pairs: ghép mọi cặp quan hệ của từng hoạt chất + tạo câu hỏi mẫu."""
+    from create_question_2hop import build_pairs
+    data = fixtures.triples(fixtures.drug_rows(scale))
+    # build_pairs đổi tên quan hệ tại chỗ -> mỗi lần chạy dùng bản sao nông của từng triple
+    return lambda: build_pairs([dict(item) for item in data])
+
+
+@benchmark("preprocessing")
+def process_questions(scale, tmp):
+    """create_multi_answer.QuestionProcessor: đọc JSON, bỏ trùng, gộp đáp án theo thực thể + quan hệ."""
+    from create_multi_answer import QuestionProcessor
+    path = fixtures.write_json(fixtures.generated_questions(fixtures.drug_rows(scale)), tmp, "questions.json")
+    return lambda: QuestionProcessor(path, path).process_questions()
+
+
+@benchmark("preprocessing", scales=(1, 10))
+def near_duplicates(scale, tmp):
+    """create_multi_answer: MinHash + LSH tìm câu gần trùng (shingle, chữ ký, dải, kiểm lại Jaccard)."""
+    from near_duplicates import find_near_duplicates
+    questions = fixtures.generated_questions(fixtures.drug_rows(scale))
+    return lambda: find_near_duplicates(questions)
+
+
+@benchmark("preprocessing", scales=(1,))
+def question_generation_replay(scale, tmp):
+    """
+    create_question_2hop.process_item (prompt -> LLM -> tách JSON) với Gemini thay bằng
+    backend replay: đo phần xử lý của pipeline, không tính thời gian mạng.
+    """
+    import create_question_2hop
+    from preprocessing import llm
+    from preprocessing.llm_backend import Cassette, ReplayBackend, prompt_key
+
+    items = create_question_2hop.build_pairs(fixtures.triples(fixtures.drug_rows(scale)))[:2000]
+    # Ghi cassette: prompt thật của get_prompt -> câu hỏi đã "viết lại"
+    prompts = {}
+    llm._backend = _Capture(prompts)
+    for item in items:
+        create_question_2hop.get_prompt(item["question"])
+    path = os.path.join(tmp, "cassette.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for prompt, question in prompts.items():
+            f.write(json.dumps({"prompt_key": prompt_key(prompt),
+                                "text": json.dumps({"question": question}, ensure_ascii=False)},
+                               ensure_ascii=False) + "\n")
+    llm._backend = ReplayBackend(Cassette(path))
+    return lambda: [create_question_2hop.process_item(dict(item)) for item in items]
+
+
+class _Capture:
+    """Backend giả chỉ ghi lại prompt (để dựng cassette cho replay)."""
+
+    def __init__(self, prompts):
+        self.prompts = prompts
+
+    def complete(self, prompt):
+        question = prompt[prompt.find("[") + 1:prompt.rfind("]")][:120]
+        self.prompts[prompt] = f"Câu hỏi viết lại về [{question}]?"
+        return {"text": "{}"}
@@ -0,0 +1,183 @@
+import os
+import json
+import random
+
+# ==============================================================================
+# DỮ LIỆU GIẢ LẬP CÓ HÌNH DẠNG DƯỢC ĐIỂN (không cần docx / CSV / Neo4j / Gemini)
+# ==============================================================================
+# scale=1 ~ đúng kích thước bộ thật (815 hoạt chất, data_midterm.csv), scale=10, 100 để đo
+# khả năng mở rộng. Cùng (scale, seed) -> cùng dữ liệu, kết quả đo so sánh được giữa các lần.
+# Văn bản mô phỏng các đặc điểm mà bộ tách / regex phải xử lý: nhãn phụ [PH] / [NƯỚC],
+# số kiểu Dược điển (dấu phẩy thập phân, khoảng "từ ... đến ..."), công thức hóa học, tên Latin.
+
+CORPUS_SIZE = 815
+COLUMNS = [
+    "Ten_Hoat_Chat", "Ten_Latin", "Cong_Thuc_Hoa_Hoc", "Mo_Ta_Chung",
+    "Tinh_Chat", "Dinh_Tinh", "Dinh_Luong", "Bao_Quan",
+    "Loai_Thuoc", "Ham_Luong_Yeu_Cau", "Tap_Chat_Va_Do_Tinh_Khiet",
+    "Do_Hoa_Tan",
+]
+# Cột -> tiêu đề mục trong docx (convert_docx_to_csv.headers_routing)
+DOCX_HEADERS = {
+    "Tinh_Chat": "TÍNH CHẤT", "Dinh_Tinh": "ĐỊNH TÍNH", "Dinh_Luong": "ĐỊNH LƯỢNG", "Bao_Quan": "BẢO QUẢN",
+    "Loai_Thuoc": "LOẠI THUỐC", "Ham_Luong_Yeu_Cau": "HÀM LƯỢNG", "Tap_Chat_Va_Do_Tinh_Khiet": "TẠP CHẤT",
+    "Do_Hoa_Tan": "ĐỘ HÒA TAN",
+}
+MISSING = "không có thông tin"
+
+WORDS = ("dung dịch", "mẫu thử", "chất đối chiếu", "phổ hấp thụ", "hồng ngoại", "sắc ký", "lớp mỏng",
+         "pha động", "methanol", "ethanol", "nước", "acid", "hydroclorid", "kết tủa", "màu", "trắng",
+         "vàng nhạt", "tan", "khó tan", "dễ tan", "trong", "cloroform", "ether", "đun nóng", "lọc",
+         "thêm", "lắc", "để yên", "bước sóng", "nm", "đo", "chuẩn độ", "natri hydroxyd", "0,1 M",
+         "chỉ thị", "phenolphthalein", "điểm kết thúc", "tương đương", "mg", "ml", "phụ lục")
+SUBSECTIONS = (("PH", "pH của dung dịch 5 % từ {a} đến {b}."),
+               ("NƯỚC", "Không được quá {a} % (Phụ lục 10.3)."),
+               ("MẤT KHỐI LƯỢNG", "Không được quá {a} % (1,000 g; 105 °C)."),
+               ("TRO", "Tro sulfat không được quá {a} %."),
+               ("GÓC QUAY", "Góc quay cực riêng từ -{b}° đến -{a}°."))
+CATEGORIES = ("Kháng sinh", "Giảm đau, hạ sốt", "Chống viêm không steroid", "Thuốc kháng histamin",
+              "Thuốc lợi tiểu", "Vitamin", "Thuốc chống đông", "Thuốc chẹn beta", "Thuốc an thần")
+LATIN_ROOTS = ("Acetylcystein", "Amoxicillin", "Paracetamol", "Cefalexin", "Metformin", "Ibuprofen", "Diclofenac",
+               "Clorpheniramin", "Furosemid", "Atenolol")
+STORAGE = ("Trong bao bì kín, tránh ánh sáng.", "Đựng trong lọ nút kín, để nơi khô mát.",
+           "Bảo quản ở nhiệt độ không quá 25 °C, tránh ẩm.")
+
+
+def _number(rng, lo, hi, digits=1):
+    return f"{rng.uniform(lo, hi):.{digits}f}".replace(".", ",")
+
+
+def _sentence(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def _paragraph(rng, sentences=(2, 6), words=(6, 18)):
+    return " ".join(_sentence(rng, rng.randint(*words)) for _ in range(rng.randint(*sentences)))
+
+
+def _formula(rng):
+    formula = f"C{rng.randint(5, 40)}H{rng.randint(4, 60)}N{rng.randint(1, 6)}O{rng.randint(1, 9)}"
+    if rng.random() < 0.2:
+        formula += rng.choice((".HCl", ".H2O", ".1/2H2O", "S", "Cl"))
+    return formula
+
+
+def drug_rows(scale=1, seed=0):
+    """CORPUS_SIZE * scale dòng giống data_midterm.csv (dict theo COLUMNS)."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(int(CORPUS_SIZE * scale)):
+        name = f"HOẠT CHẤT {i:06d} {rng.choice(('NATRI', 'KALI', 'HYDROCLORID', 'ACETAT', ''))}".strip()
+        subsections = rng.sample(SUBSECTIONS, rng.randint(1, 4))
+        tap_chat = " ".join(f"[{label}]: " + text.format(a=_number(rng, 0.1, 9), b=_number(rng, 10, 60))
+                            for label, text in subsections)
+        row = {
+            "Ten_Hoat_Chat": name,
+            "Ten_Latin": " ".join(filter(None, (rng.choice(LATIN_ROOTS) + "um",
+                                                rng.choice(("natricum", "hydrochloridum", "")), str(i)))),
+            "Cong_Thuc_Hoa_Hoc": _formula(rng) if rng.random() < 0.85 else MISSING,
+            "Mo_Ta_Chung": _paragraph(rng),
+            "Tinh_Chat": f"Bột kết tinh {rng.choice(('trắng', 'vàng nhạt'))}. {_paragraph(rng, (1, 3))} "
+                         f"Nhiệt độ nóng chảy: khoảng {rng.randint(80, 260)} °C.",
+            "Dinh_Tinh": _paragraph(rng, (4, 12)),
+            "Dinh_Luong": _paragraph(rng, (3, 8)),
+            "Bao_Quan": rng.choice(STORAGE),
+            "Loai_Thuoc": rng.choice(CATEGORIES) if rng.random() < 0.9 else MISSING,
+            "Ham_Luong_Yeu_Cau": f"Chứa từ {_number(rng, 97, 99)} % đến {_number(rng, 100, 102)} % "
+                                 f"{name.lower()}, tính theo chế phẩm đã làm khô.",
+            "Tap_Chat_Va_Do_Tinh_Khiet": tap_chat + " " + _paragraph(rng, (0, 4)),
+            "Do_Hoa_Tan": _paragraph(rng, (1, 2)) if rng.random() < 0.4 else MISSING,
+        }
+        rows.append(row)
+    return rows
+
+
+def docx_text(rows):
+    """Toàn văn như khi nối các đoạn của file docx (đầu vào của parse_drug_text)."""
+    lines = []
+    for i, row in enumerate(rows, 1):
+        lines.append(f"{i // 100 + 1}.{i}. {row['Ten_Hoat_Chat'].title()}")
+        lines.append(row["Ten_Latin"])
+        if row["Cong_Thuc_Hoa_Hoc"] != MISSING:
+            lines.append(f"{row['Cong_Thuc_Hoa_Hoc']}   P.t.l: {i % 500 + 100},{i % 10}")
+        lines.append(row["Mo_Ta_Chung"])
+        for column, header in DOCX_HEADERS.items():
+            value = row[column]
+            if value == MISSING:
+                continue
+            if column == "Tap_Chat_Va_Do_Tinh_Khiet":
+                # Chỉ tiêu phụ nằm trên dòng riêng, bộ đọc gắn lại nhãn [PH]: ...
+                lines.append(header)
+                for part in value.split("["):
+                    if part.strip():
+                        label, _, content = part.partition("]:")
+                        lines.append(f"{label} {content.strip()}" if content else part.strip())
+            else:
+                lines.append(header)
+                lines.append(value)
+        if i % 7 == 0:
+            lines.append("(Hình 1.2: Phổ hồng ngoại)")
+    return "\n".join(lines)
+
+
+def triples(rows):
+    """Giống create_triple.create_list_of_dicts nhưng không cần pandas (đầu vào của 2-hop)."""
+    result = []
+    for row in rows:
+        for column in COLUMNS[1:]:
+            value = str(row[column]).strip().replace("[", "").replace("]", "").replace('"', "").replace("'", "")
+            if value and value.lower() not in ("nan", MISSING):
+                result.append({"header": row["Ten_Hoat_Chat"], "relation": column, "tail": value, "answer": value})
+    return result
+
+
+def generated_questions(rows, seed=0, duplicate_rate=0.15, variant_rate=0.1):
+    """
+    Câu hỏi như đầu ra của create_question_1hop / 2hop (đầu vào của QuestionProcessor):
+    có bản sao y hệt và câu cùng thực thể + quan hệ nhưng khác đáp án để gộp.
+    """
+    rng = random.Random(seed)
+    questions = []
+    for row in rows:
+        for column in ("Ten_Latin", "Cong_Thuc_Hoa_Hoc", "Tinh_Chat", "Bao_Quan", "Loai_Thuoc"):
+            if row[column] == MISSING:
+                continue
+            item = {"question": f"Thông tin {column.lower()} của hoạt chất [{row['Ten_Hoat_Chat']}] là gì?",
+                    "question_type": column.lower(), "relation": column, "answer": row[column]}
+            questions.append(item)
+            if rng.random() < duplicate_rate:
+                questions.append(dict(item))
+            if rng.random() < variant_rate:
+                questions.append({**item, "answer": _sentence(rng, 8)})
+    rng.shuffle(questions)
+    return questions
+
+
+def write_json(data, directory, name):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path
+
+
+def write_csv(rows, directory, name="data_midterm.csv"):
+    import csv
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def answer_pairs(scale=1, seed=0, per_drug=0.5):
+    """(đáp án chuẩn, câu trả lời) dài như log thật để đo chấm điểm."""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(int(CORPUS_SIZE * scale * per_drug)):
+        reference = _paragraph(rng, (1, 6))
+        # Câu trả lời giữ lại một phần đáp án + diễn giải thêm
+        words = reference.split()
+        kept = " ".join(w for w in words if rng.random() < 0.6)
+        pairs.append((reference, f"{kept} {_paragraph(rng, (1, 10))}"))
+    return pairs
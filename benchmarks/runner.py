@@ -0,0 +1,170 @@
+import gc
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import platform
+import subprocess
+
+from benchmarks.fixtures import CORPUS_SIZE
+
+# ==============================================================================
+# ĐĂNG KÝ / ĐO / LƯU KẾT QUẢ BENCHMARK
+# ==============================================================================
+# Mỗi benchmark là một hàm setup(scale, tmp) -> hàm chạy (không tham số); chỉ hàm chạy được
+# đo. Mỗi cỡ dữ liệu chạy lặp tới `repeat` lần hoặc hết `max_time` giây (ít nhất 1 lần), lấy
+# min / trung vị. Kết quả ghi thêm vào benchmarks/results/<máy>.jsonl (commit cùng code để
+# theo dõi theo thời gian) và được so với lần chạy trước cùng máy:
+#   - chậm hơn trung vị lần trước quá `threshold` -> hồi quy
+#   - thời gian / hoạt chất ở scale k lớn hơn `scaling_limit` lần ở scale nhỏ nhất -> siêu tuyến tính
+# Thiếu thư viện (pandas, nltk...) -> bỏ qua benchmark đó, không dừng cả bộ.
+
+SCALES = (1, 10, 100)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+BENCHMARKS = []
+
+
+class Benchmark:
+    def __init__(self, name, group, setup, scales):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.scales = scales
+
+
+def benchmark(group, scales=SCALES):
+    """@benchmark("preprocessing", scales=(1, 10)) trên hàm setup(scale, tmp) -> callable."""
+    def register(setup):
+        BENCHMARKS.append(Benchmark(setup.__name__, group, setup, tuple(scales)))
+        return setup
+    return register
+
+
+def measure(run, repeat=5, max_time=10.0):
+    """Thời gian (giây) của từng lần chạy, tắt gc trong lúc đo như timeit."""
+    times = []
+    budget_start = time.perf_counter()
+    while len(times) < repeat:
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+        if time.perf_counter() - budget_start > max_time:
+            break
+    return times
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(selected, scales=None, repeat=5, max_time=10.0):
+    """Sinh từng bản ghi kết quả (dict) ngay khi đo xong."""
+    meta = {"commit": _git_commit(), "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(), "machine": socket.gethostname()}
+    for bench in selected:
+        for scale in bench.scales:
+            if scales and scale not in scales:
+                continue
+            record = {"benchmark": bench.name, "group": bench.group, "scale": scale,
+                      "items": CORPUS_SIZE * scale, **meta}
+            with tempfile.TemporaryDirectory(prefix="vmkg_bench_") as tmp:
+                try:
+                    run = bench.setup(scale, tmp)
+                except ImportError as e:
+                    yield {**record, "status": f"bỏ qua: thiếu {e.name or e}"}
+                    continue
+                times = measure(run, repeat, max_time)
+            times.sort()
+            median = times[len(times) // 2]
+            yield {**record, "status": "ok", "runs": len(times), "min_s": times[0], "median_s": median,
+                   "per_item_us": median / record["items"] * 1e6}
+
+
+# ------------------------------------------------------------------------------
+# Lưu / so sánh
+# ------------------------------------------------------------------------------
+def results_path(machine=None):
+    return os.path.join(RESULTS_DIR, f"{machine or socket.gethostname()}.jsonl")
+
+
+def load_history(path):
+    """{(benchmark, scale): bản ghi "ok" gần nhất}."""
+    history = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("status") == "ok":
+                        history[(record["benchmark"], record["scale"])] = record
+    return history
+
+
+def save_results(records, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            if record["status"] == "ok":
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def check(records, history, threshold=0.2, scaling_limit=2.0):
+    """Gắn "previous_s", "change", "regression", "superlinear" vào các bản ghi đã đo."""
+    smallest = {}
+    for record in records:
+        if record["status"] != "ok":
+            continue
+        previous = history.get((record["benchmark"], record["scale"]))
+        if previous:
+            record["previous_s"] = previous["median_s"]
+            record["change"] = record["median_s"] / previous["median_s"] - 1
+            record["regression"] = record["change"] > threshold
+        base = smallest.setdefault(record["benchmark"], record)
+        if base is not record:
+            record["scaling"] = record["per_item_us"] / base["per_item_us"]
+            record["superlinear"] = record["scaling"] > scaling_limit
+    return records
+
+
+def _fmt_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def format_record(record):
+    head = f"{record['group'] + '/' + record['benchmark']:<42} {record['scale']:>4}×"
+    if record["status"] != "ok":
+        return f"{head}  {record['status']}"
+    line = (f"{head}  {_fmt_time(record['median_s']):>10} (min {_fmt_time(record['min_s'])}, "
+            f"{record['runs']} lần)  {record['per_item_us']:>9.1f} µs/hoạt chất")
+    if "change" in record:
+        line += f"  {record['change']:+.0%} so với lần trước" + (" ⚠️ HỒI QUY" if record["regression"] else "")
+    if record.get("superlinear"):
+        line += f"  ⚠️ siêu tuyến tính (x{record['scaling']:.1f} / hoạt chất)"
+    return line
+
+
+def ensure_paths():
+    """Các script preprocessing/benchmark import `utils` như module cấp cao nhất."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for path in (root, os.path.join(root, "preprocessing", "benchmark")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
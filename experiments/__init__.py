@@ -0,0 +1,13 @@
+# ==============================================================================
+# GÓI THỰC NGHIỆM: RAG (KG + Gemini) VÀ ZERO-SHOT
+# ==============================================================================
+# Import gói này KHÔNG kết nối Neo4j, không gọi Gemini, không tải dữ liệu NLTK.
+# Client / chain chỉ được khởi tạo khi cần (experiments.rag.get_chain(), ...).
+#
+# Dòng lệnh:
+#   python -m experiments eval  --mode rag|zero-shot [--hops 1-hop 2-hop] [--max-questions N]
+#   python -m experiments ask   "câu hỏi" [--mode rag|zero-shot]
+#   python -m experiments score logs/gemini_log.json logs/gemini_zero_shot_1-hop.json [--metrics rouge meteor]
+#   python -m experiments parity logs/gemini_log.json logs/gemini_zero_shot_1-hop.json [--limit N]
+#   python -m experiments runs ingest|list|compare ...
+#   python -m experiments serve [--port 8000] [--workers 4] [--queue-size 64] [--timeout 60]
@@ -0,0 +1,241 @@
+import os
+import sys
+import time
+import argparse
+
+# Chạy được cả `python -m experiments` lẫn `python experiments/__main__.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from experiments import config
+
+# ==============================================================================
+# DÒNG LỆNH: eval / ask / score / report / parity / runs / serve
+# ==============================================================================
+# Chỉ import argparse + config ở đây để --help chạy tức thì; module nặng được
+# import bên trong từng lệnh.
+
+
+def cmd_eval(args):
+    early_stop = None
+    if args.adaptive:
+        early_stop = {"metric": args.ci_metric, "target_width": args.ci_width, "confidence": args.confidence,
+                      "min_samples": args.min_samples}
+    options = {"hops": args.hops, "max_questions": args.max_questions, "sampling": args.sampling,
+               "seed": args.seed, "early_stop": early_stop}
+    from preprocessing.profiling import stage
+    with stage(f"experiments:{args.mode}"):
+        if args.mode == "rag":
+            from experiments import rag
+            rag.run_benchmark(**options)
+        else:
+            from experiments import zero_shot
+            zero_shot.run_benchmark(**options)
+
+
+def answer(question, mode, on_token=None):
+    """Trả về (câu trả lời, danh sách span). on_token: nhận câu trả lời dạng stream."""
+    from experiments.spans import SpanRecorder
+
+    if mode == "rag":
+        from experiments import rag
+        result = rag.ask(question, on_token=on_token)
+        if result["cypher"]:
+            print(f"\n🔎 Cypher: {result['cypher']}")
+        if result["error"]:
+            print(f"❌ Lỗi chain: {result['error']}")
+        return result["answer"], result["spans"]
+    from experiments import zero_shot
+    spans = SpanRecorder()
+    return zero_shot.ask(question, spans=spans, on_token=on_token), spans.spans
+
+
+def show_answer(question, mode):
+    """In câu trả lời ngay khi từng đoạn về tới, rồi in thời gian tới token đầu / toàn bộ."""
+    print("Bot đáp: ", end="", flush=True)
+    start = time.perf_counter()
+    first = []
+
+    def on_token(text):
+        if not first:
+            first.append((time.perf_counter() - start) * 1000)
+        print(text, end="", flush=True)
+
+    text, _ = answer(question, mode, on_token=on_token)
+    if not first:
+        # Không stream được (lỗi chain / không có kết quả) -> in cả câu
+        print(text, end="")
+    total_ms = (time.perf_counter() - start) * 1000
+    ttft = f"{first[0]:.0f} ms" if first else "-"
+    print(f"\n⏱️ Token đầu tiên: {ttft} | Toàn bộ: {total_ms:.0f} ms")
+
+
+def cmd_ask(args):
+    if args.question:
+        show_answer(args.question, args.mode)
+        return
+    while True:
+        q = input("\nBạn hỏi (gõ 'exit' để thoát): ")
+        if q.lower() in ['exit', 'quit']:
+            break
+        show_answer(q, args.mode)
+
+
+def cmd_score(args):
+    from experiments.rescore import ScoreCache, rescore_log, format_rescore_report, default_report_path
+    from preprocessing.profiling import stage
+
+    if args.out and len(args.logs) > 1:
+        raise RuntimeError("❌ --out chỉ dùng được với một file log")
+    metrics = tuple(args.metrics)
+    cache = ScoreCache(None) if args.no_cache else ScoreCache()
+    config.ensure_output_dirs()
+    for log in args.logs:
+        with stage(f"experiments:score:{os.path.basename(log)}"):
+            result = rescore_log(log, metrics=metrics, profile=args.profile, workers=args.workers, cache=cache)
+        report = format_rescore_report(result, metrics)
+        print(report)
+        out = args.out or default_report_path(log)
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f"🎉 Đã lưu vào: {out}\n")
+
+
+def cmd_report(args):
+    from experiments.report import write_report
+    from preprocessing.profiling import stage
+
+    with stage("experiments:report"):
+        json_path, text_path = write_report(args.logs, args.out, args.baseline, args.confidence)
+    with open(text_path, "r", encoding="utf-8") as f:
+        print(f.read())
+    print(f"🎉 Đã lưu vào: {text_path}, {json_path}")
+
+
+def cmd_parity(args):
+    from functools import partial
+    from experiments.scoring import iter_log_samples, tokenize, resolve_profile
+    from experiments.metrics import parity_report, format_parity_report
+
+    samples = []
+    for log in args.logs:
+        for sample in iter_log_samples(log):
+            profile = resolve_profile(sample["profile"]) if args.profile == "auto" else args.profile
+            samples.append((sample["reference"], sample["candidate"], partial(tokenize, profile=profile)))
+    report = parity_report(samples[:args.limit] if args.limit else samples)
+    print(format_parity_report(report))
+    if report["meteor_mismatch"] or report["lcs_mismatch"]:
+        raise RuntimeError("❌ Metric tự cài KHÔNG khớp thư viện gốc")
+
+
+def cmd_runs(args):
+    from experiments import run_store
+
+    db = run_store.connect()
+    if args.action == "ingest":
+        run_id = run_store.ingest_logs(args.args, run_id=args.run_id, label=args.label, db=db)
+        print(f"🗄️ Đã nạp {', '.join(args.args)} -> {run_id}")
+    elif args.action == "list":
+        for run in run_store.list_runs(db):
+            print(f"{run['run_id']:<28} {run['mode']:<10} {run['samples']:>5} mẫu  {run['created_at']}"
+                  f"{'  ' + run['label'] if run['label'] else ''}")
+    else:
+        if len(args.args) != 2:
+            raise RuntimeError("❌ compare cần đúng hai run_id: <trước> <sau>")
+        print(run_store.format_comparison(*args.args, metric=args.metric, top=args.top, db=db))
+
+
+def cmd_serve(args):
+    from experiments.service import serve
+    serve(host=args.host, port=args.port, workers=args.workers, queue_size=args.queue_size,
+          timeout=args.timeout)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m experiments",
+                                     description="Thực nghiệm RAG (KG + Gemini) và Zero-shot")
+    parser.add_argument("--profile-stages", action="store_true",
+                        help="Đo wall / CPU / cProfile / bộ nhớ từng giai đoạn vào results/profiles "
+                             "(như PROFILE_STAGES=1)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_eval = sub.add_parser("eval", help="Chạy benchmark và ghi results/, logs/")
+    p_eval.add_argument("--mode", choices=["rag", "zero-shot"], default="rag")
+    p_eval.add_argument("--hops", nargs="+", choices=sorted(config.DATASETS), default=["1-hop", "2-hop"])
+    p_eval.add_argument("--max-questions", type=int, default=config.MAX_QUESTIONS,
+                        help="Số câu tối đa (với --adaptive là trần ngân sách)")
+    p_eval.add_argument("--sampling", choices=["stratified", "head"],
+                        help="Cách chọn câu hỏi (mặc định SAMPLING, stratified)")
+    p_eval.add_argument("--seed", type=int, help="Seed chọn mẫu (mặc định SAMPLE_SEED, 42)")
+    p_eval.add_argument("--adaptive", action="store_true",
+                        help="Dừng sớm khi khoảng tin cậy bootstrap của --ci-metric hẹp hơn --ci-width")
+    p_eval.add_argument("--ci-metric", choices=["bleu", "rouge", "meteor"], default="rouge")
+    p_eval.add_argument("--ci-width", type=float, default=0.05)
+    p_eval.add_argument("--confidence", type=float, default=0.95)
+    p_eval.add_argument("--min-samples", type=int, default=30)
+    p_eval.set_defaults(func=cmd_eval)
+
+    p_ask = sub.add_parser("ask", help="Hỏi một câu (bỏ trống để vào chế độ hỏi đáp)")
+    p_ask.add_argument("question", nargs="?")
+    p_ask.add_argument("--mode", choices=["rag", "zero-shot"], default="rag")
+    p_ask.set_defaults(func=cmd_ask)
+
+    p_score = sub.add_parser("score", help="Tính lại điểm từ file log, không gọi LLM / Neo4j")
+    p_score.add_argument("logs", nargs="+", help="logs/*.json hoặc *.jsonl")
+    p_score.add_argument("--out", help="Mặc định results/rescored_<tên log>.txt")
+    p_score.add_argument("--metrics", nargs="+", choices=["bleu", "rouge", "meteor"],
+                         default=["bleu", "rouge", "meteor"])
+    p_score.add_argument("--no-cache", action="store_true", help="Không đọc / ghi data/cache/score_cache.jsonl")
+    p_score.add_argument("--profile", default="auto",
+                         help="shared | rag | zero_shot | auto (theo SCORING_PROFILE, mặc định)")
+    p_score.add_argument("--workers", type=int, help="Số tiến trình chấm (mặc định SCORING_WORKERS / số CPU)")
+    p_score.set_defaults(func=cmd_score)
+
+    p_report = sub.add_parser("report", help="Báo cáo thống kê từ log: CI, theo question_type / relation, "
+                                             "tỉ lệ thất bại, độ trễ; so với baseline")
+    p_report.add_argument("logs", nargs="+", help="Các file log của cùng một lần chạy")
+    p_report.add_argument("--out", help="Tiền tố file ra (mặc định results/<tên log đầu>)")
+    p_report.add_argument("--baseline", help="<tên>.report.json hoặc log của lần chạy trước; "
+                                             "'previous' = báo cáo cũ cùng tên")
+    p_report.add_argument("--confidence", type=float, default=0.95)
+    p_report.set_defaults(func=cmd_report)
+
+    p_parity = sub.add_parser("parity", help="Đối chiếu ROUGE-L / METEOR tự cài với rouge_score / nltk trên log")
+    p_parity.add_argument("logs", nargs="+")
+    p_parity.add_argument("--profile", default="auto")
+    p_parity.add_argument("--limit", type=int)
+    p_parity.set_defaults(func=cmd_parity)
+
+    p_runs = sub.add_parser("runs", help="Kho các lần chạy: ingest LOG... | list | compare A B")
+    p_runs.add_argument("action", choices=["ingest", "list", "compare"])
+    p_runs.add_argument("args", nargs="*", help="ingest: file log; compare: run_id trước, run_id sau")
+    p_runs.add_argument("--run-id")
+    p_runs.add_argument("--label")
+    p_runs.add_argument("--metric", choices=["bleu", "rouge", "meteor"], default="rouge")
+    p_runs.add_argument("--top", type=int, default=10)
+    p_runs.set_defaults(func=cmd_runs)
+
+    p_serve = sub.add_parser("serve", help="Dịch vụ HTTP hỏi đáp (chain giữ nóng, gộp câu hỏi trùng)")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8000)
+    p_serve.add_argument("--workers", type=int, default=4, help="Số câu hỏi xử lý song song")
+    p_serve.add_argument("--queue-size", type=int, default=64, help="Đầy thì trả 503")
+    p_serve.add_argument("--timeout", type=float, default=60.0, help="Giây / request, quá thì trả 504")
+    p_serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile_stages:
+        from preprocessing import profiling
+        profiling.enable()
+    try:
+        args.func(args)
+    except (RuntimeError, FileNotFoundError) as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
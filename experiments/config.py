@@ -0,0 +1,100 @@
+import os
+import json
+from functools import lru_cache
+
+# ==============================================================================
+# CẤU HÌNH DÙNG CHUNG (đọc key.env + biến môi trường khi được gọi lần đầu)
+# ==============================================================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV_PATH = os.path.join(BASE_DIR, "key.env")
+DATA_DIR = os.path.join(BASE_DIR, "data", "benchmark")
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+LOGS_DIR = os.path.join(BASE_DIR, "logs")
+
+DATASETS = {
+    "1-hop": os.path.join(DATA_DIR, "1hop.json"),
+    "2-hop": os.path.join(DATA_DIR, "2hop.json"),
+}
+
+MODEL_NAME = "gemini-2.0-flash"
+MAX_QUESTIONS = 200
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """Đọc key.env một lần, trả về dict cấu hình."""
+    from dotenv import load_dotenv
+    load_dotenv(ENV_PATH)
+    return {
+        "google_api_key": os.getenv("GOOGLE_API_KEY"),
+        "neo4j_uri": os.getenv("URI", "neo4j://127.0.0.1:7687"),
+        "neo4j_user": os.getenv("USER", "neo4j"),
+        "neo4j_password": os.getenv("PASSWORD", "12345678"),
+        # Ngân sách token cho phần ngữ cảnh (kết quả Cypher) đưa vào prompt trả lời
+        "context_token_budget": int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")),
+        # Thu thập kế hoạch truy vấn: off | explain (PROFILE lấy mẫu) | profile (PROFILE mọi câu)
+        "query_plan_mode": os.getenv("QUERY_PLAN_MODE", "off"),
+        "profile_sample": float(os.getenv("PROFILE_SAMPLE", "0.1")),
+        "db_hit_budget": int(os.getenv("DB_HIT_BUDGET", "0")) or None,
+        # Xử lý truy vấn vượt ngân sách: off | reject | regenerate
+        "plan_enforce": os.getenv("PLAN_ENFORCE", "off"),
+        # Đồ thị: neo4j | memory (nạp KG_CSV vào bộ nhớ, không cần server)
+        "graph_backend": os.getenv("GRAPH_BACKEND", "neo4j"),
+        "kg_csv": os.getenv("KG_CSV", os.path.join(BASE_DIR, "data", "data_midterm.csv")),
+        # Snapshot nhị phân của KG (preprocessing/kgraph/kg_snapshot.py), ưu tiên hơn KG_CSV nếu có
+        "kg_snapshot": os.getenv("KG_SNAPSHOT", os.path.join(BASE_DIR, "data", "kg.snapshot")),
+        # Chấm điểm: shared (RAG và zero-shot như nhau) | legacy (cách cũ của từng thực nghiệm) | tên profile
+        "scoring_profile": os.getenv("SCORING_PROFILE", "shared"),
+        "scoring_workers": int(os.getenv("SCORING_WORKERS", "0")) or None,
+        # Chọn câu hỏi: stratified (phân tầng theo question_type / relation) | head (data[:n] như cũ)
+        "sampling": os.getenv("SAMPLING", "stratified"),
+        "sample_seed": int(os.getenv("SAMPLE_SEED", "42")),
+        # Kho các lần chạy (experiments/run_store.py); RUN_STORE= (rỗng) để không nạp tự động
+        "run_store": os.getenv("RUN_STORE", os.path.join(BASE_DIR, "data", "runs.sqlite")),
+    }
+
+
+def require_api_key():
+    api_key = get_settings()["google_api_key"]
+    if not api_key:
+        raise RuntimeError("❌ LỖI: Không tìm thấy GOOGLE_API_KEY (key.env).")
+    return api_key.strip()
+
+
+def get_chat_model():
+    """
+    Chat model langchain theo LLM_BACKEND: gemini (gọi thẳng ChatGoogleGenerativeAI),
+    record / replay (đi qua cassette, xem preprocessing/llm_backend.py).
+    """
+    from preprocessing.llm_backend import make_backend, ChatModelBackend, as_chat_model
+
+    def live():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model=MODEL_NAME, google_api_key=require_api_key(), temperature=0)
+
+    get_settings()  # LLM_BACKEND có thể nằm trong key.env
+    kind = os.getenv("LLM_BACKEND", "gemini")
+    if kind == "gemini":
+        return live()
+    return as_chat_model(make_backend(lambda: ChatModelBackend(live()), kind))
+
+
+def load_json_data(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ Không tìm thấy file: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_dataset(hop, max_questions=MAX_QUESTIONS, sampling=None, seed=None):
+    """max_questions câu của bộ hop, chọn theo SAMPLING / SAMPLE_SEED (xem experiments/sampling.py)."""
+    from experiments.sampling import sample
+    settings = get_settings()
+    return sample(load_json_data(DATASETS[hop]), max_questions, sampling or settings["sampling"],
+                  settings["sample_seed"] if seed is None else seed)
+
+
+def ensure_output_dirs():
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    os.makedirs(LOGS_DIR, exist_ok=True)
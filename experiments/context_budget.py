@@ -0,0 +1,118 @@
+import re
+
+# ==============================================================================
+# GHÉP NGỮ CẢNH THEO NGÂN SÁCH TOKEN (Cypher rows -> QA prompt)
+# ==============================================================================
+# Kết quả Cypher có thể chứa nhiều chuỗi TIÊU_CHUẨN rất dài, lặp lại giữa các dòng.
+# ContextAssembler đếm token cục bộ, bỏ giá trị trùng, xếp hạng dòng / trường theo
+# mức liên quan tới câu hỏi rồi cắt bớt cho vừa ngân sách trước khi gửi cho LLM.
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+SENTENCE_SPLIT = re.compile(r'(?<=[.;:])\s+')
+
+# Từ xuất hiện trong hầu hết câu hỏi, không mang thông tin để xếp hạng
+STOPWORDS = {
+    "của", "là", "gì", "và", "có", "các", "cho", "được", "nào", "như", "thế", "trong",
+    "với", "hoạt", "chất", "dược", "thuốc", "bao", "nhiêu", "hãy", "không", "một",
+}
+
+
+def count_tokens(text):
+    """Ước lượng số token (từ/âm tiết + dấu câu) - đủ sát cho Gemini, không cần gọi API."""
+    if not text:
+        return 0
+    return len(TOKEN_PATTERN.findall(str(text)))
+
+
+def keywords(text):
+    return {t for t in TOKEN_PATTERN.findall(str(text).lower()) if t.isalnum() and t not in STOPWORDS}
+
+
+def relevance(question_terms, text):
+    """Tỉ lệ từ khóa của câu hỏi xuất hiện trong giá trị."""
+    if not question_terms:
+        return 0.0
+    return len(question_terms & keywords(text)) / len(question_terms)
+
+
+def truncate_to_tokens(text, max_tokens, question_terms=None):
+    """Giữ các câu liên quan nhất (theo thứ tự gốc) cho tới khi hết max_tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    sentences = SENTENCE_SPLIT.split(text)
+    ranked = sorted(range(len(sentences)),
+                    key=lambda i: (-relevance(question_terms or set(), sentences[i]), i))
+    kept, used = set(), 0
+    for i in ranked:
+        cost = count_tokens(sentences[i])
+        if used + cost > max_tokens:
+            continue
+        kept.add(i)
+        used += cost
+    if kept:
+        return " ".join(sentences[i] for i in sorted(kept)) + " ..."
+
+    # Không câu nào vừa -> cắt cứng theo token
+    tokens = list(TOKEN_PATTERN.finditer(text))
+    return text[:tokens[max_tokens - 1].end()] + " ..."
+
+
+class ContextAssembler:
+    def __init__(self, token_budget=1500, min_field_tokens=16):
+        self.token_budget = token_budget
+        # Trường ngắn hơn ngưỡng này (tên hoạt chất, công thức...) luôn được giữ nguyên
+        self.min_field_tokens = min_field_tokens
+
+    def assemble(self, question, rows):
+        """
+        Trả về (rows đã cắt gọn, thống kê token).
+        Dòng liên quan hơn được giữ trước; trong mỗi dòng trường liên quan hơn được giữ trước.
+        """
+        rows = [dict(r) for r in rows or []]
+        stats = {
+            "rows_in": len(rows),
+            "tokens_in": sum(count_tokens(v) for r in rows for v in r.values()),
+        }
+        question_terms = keywords(question)
+
+        # 1. Bỏ giá trị lặp lại giữa các dòng (cùng chuỗi định_tính cho nhiều dòng)
+        seen = set()
+        for r in rows:
+            for key, value in list(r.items()):
+                if value is None:
+                    continue
+                text = str(value)
+                if count_tokens(text) > self.min_field_tokens and text in seen:
+                    del r[key]
+                seen.add(text)
+
+        # 2. Xếp hạng dòng theo trường liên quan nhất
+        scored = [(max([relevance(question_terms, v) for v in r.values()] or [0]), i, r)
+                  for i, r in enumerate(rows)]
+        scored.sort(key=lambda x: (-x[0], x[1]))
+
+        # 3. Lấp đầy ngân sách
+        kept_rows, used = [], 0
+        for _, _, r in scored:
+            if used >= self.token_budget:
+                break
+            fields = sorted(r.items(), key=lambda kv: -relevance(question_terms, kv[1]))
+            kept = {}
+            for key, value in fields:
+                cost = count_tokens(value)
+                remaining = self.token_budget - used
+                if cost <= self.min_field_tokens or cost <= remaining:
+                    kept[key] = value
+                    used += cost
+                elif remaining > self.min_field_tokens:
+                    kept[key] = truncate_to_tokens(str(value), remaining, question_terms)
+                    used += count_tokens(kept[key])
+            if kept:
+                # Giữ thứ tự cột như Cypher RETURN
+                kept_rows.append({k: kept[k] for k in r if k in kept})
+
+        stats.update({"rows_kept": len(kept_rows), "tokens_kept": used})
+        return kept_rows, stats
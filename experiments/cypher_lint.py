@@ -0,0 +1,211 @@
+import re
+import difflib
+
+from preprocessing.kgraph.numeric_props import numeric_index_properties, HOAT_CHAT_SPECS, TIEU_CHUAN_SPECS
+
+# ==============================================================================
+# KIỂM TRA TĨNH CYPHER TRƯỚC KHI CHẠY (Static validation / lint)
+# ==============================================================================
+# Bắt lỗi cú pháp, nhãn / quan hệ / thuộc tính không tồn tại và các truy vấn quét
+# toàn bộ đồ thị ngay tại máy, trước khi tốn một vòng Bolt tới Neo4j.
+
+
+def _unit_props(specs):
+    return [f"{name}_đơn_vị" for name, unit, _ in specs if unit]
+
+
+# Schema dự phòng, khớp với những gì create_KG.py ghi vào Neo4j
+STATIC_SCHEMA = {
+    "node_props": {
+        "HOẠT_CHẤT": ["tên_hoạt_chất", "tên_latin", "công_thức_hóa_học", "công_thức_hill", "nguyên_tố",
+                      "công_thức_hill_đầy_đủ", "thành_phần_phụ",
+                      "mô_tả", "tính_chất", "bảo_quản"] + _unit_props(HOAT_CHAT_SPECS),
+        "TIÊU_CHUẨN": ["thuộc_về_hoạt_chất", "hàm_lượng_yêu_cầu", "định_tính", "định_lượng",
+                       "tạp_chất_và_độ_tinh_khiết", "độ_hòa_tan"] + _unit_props(TIEU_CHUAN_SPECS),
+        "LOẠI_THUỐC": ["tên_loại"],
+        "MỤC": ["khóa", "thuộc_về_hoạt_chất", "trường", "nhãn", "thứ_tự", "phần", "nội_dung", "độ_dài"],
+    },
+    "relationships": [
+        {"start": "HOẠT_CHẤT", "type": "THUỘC_NHÓM", "end": "LOẠI_THUỐC"},
+        {"start": "HOẠT_CHẤT", "type": "CÓ_TIÊU_CHUẨN", "end": "TIÊU_CHUẨN"},
+        {"start": "TIÊU_CHUẨN", "type": "CÓ_MỤC", "end": "MỤC"},
+    ],
+}
+for _label, _prop in numeric_index_properties():
+    STATIC_SCHEMA["node_props"][_label].append(_prop)
+
+
+def schema_from_structured(structured_schema):
+    """Chuyển Neo4jGraph.structured_schema sang dạng gọn {node_props, relationships}."""
+    return {
+        "node_props": {label: [p["property"] for p in props]
+                       for label, props in structured_schema.get("node_props", {}).items()},
+        "relationships": [{"start": r["start"], "type": r["type"], "end": r["end"]}
+                          for r in structured_schema.get("relationships", [])],
+    }
+
+
+def merge_schemas(*schemas):
+    """Hợp nhiều schema: thuộc tính số chỉ có ở một vài node vẫn được coi là hợp lệ."""
+    node_props, relationships = {}, []
+    for schema in schemas:
+        for label, props in schema.get("node_props", {}).items():
+            merged = node_props.setdefault(label, [])
+            merged.extend(p for p in props if p not in merged)
+        for rel in schema.get("relationships", []):
+            if rel not in relationships:
+                relationships.append(rel)
+    return {"node_props": node_props, "relationships": relationships}
+
+
+def load_schema(graph=None):
+    """
+    Lấy schema từ graph.structured_schema (đã nạp từ snapshot, xem schema_cache.py).
+    Kết quả luôn được hợp với STATIC_SCHEMA.
+    """
+    structured = getattr(graph, "structured_schema", None) if graph is not None else None
+    if not structured or not structured.get("node_props"):
+        return STATIC_SCHEMA
+    return merge_schemas(STATIC_SCHEMA, schema_from_structured(structured))
+
+
+# ------------------------------------------------------------------------------
+# Phân tích
+# ------------------------------------------------------------------------------
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+WRITE_CLAUSE = re.compile(r'\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b', re.IGNORECASE)
+NODE_PATTERN = re.compile(r'\(\s*(\w*)\s*((?::\s*\w+\s*)*)(\{[^}]*\})?\s*\)')
+REL_PATTERN = re.compile(r'\[\s*(\w*)\s*(?::\s*([\w|:]+))?[^\]]*\]')
+PROPERTY_ACCESS = re.compile(r'\b([^\W\d]\w*)\.(\w+)\b')
+MAP_KEYS = re.compile(r'(\w+)\s*:')
+# Chuỗi ký tự đứng trước để "//" nằm trong chuỗi (ví dụ URL) không bị coi là chú thích
+LINE_COMMENT = re.compile(rf"({STRING_LITERAL.pattern})|//[^\n]*")
+
+
+def strip_strings(query):
+    """Thay chuỗi ký tự bằng '' để regex không bắt nhầm nội dung trong chuỗi."""
+    return STRING_LITERAL.sub("''", query)
+
+
+def strip_line_comments(query):
+    """Bỏ chú thích // ... tới cuối dòng, giữ nguyên chuỗi ký tự."""
+    return LINE_COMMENT.sub(lambda m: m.group(1) or "", query)
+
+
+def _check_balance(query):
+    pairs = {")": "(", "]": "[", "}": "{"}
+    stack = []
+    for ch in query:
+        if ch in "([{":
+            stack.append(ch)
+        elif ch in pairs:
+            if not stack or stack[-1] != pairs[ch]:
+                return f"Dấu '{ch}' không khớp"
+            stack.pop()
+    if stack:
+        return f"Thiếu dấu đóng cho '{stack[-1]}'"
+    return None
+
+
+def _suggest(name, candidates):
+    close = difflib.get_close_matches(name, candidates, n=1)
+    return f" (có phải '{close[0]}'?)" if close else ""
+
+
+def lint_cypher(query, schema=STATIC_SCHEMA):
+    """
+    Trả về {"errors": [...], "warnings": [...]}.
+    errors: truy vấn chắc chắn sai -> không nên gửi tới Neo4j.
+    warnings: truy vấn chạy được nhưng tốn kém (quét toàn bộ, thiếu LIMIT).
+    """
+    errors, warnings = [], []
+    if not query or not query.strip():
+        return {"errors": ["Truy vấn rỗng"], "warnings": []}
+
+    text = query.replace("`", "")
+    # Bỏ các chuỗi đã đóng rồi mới tìm dấu nháy còn sót: "4,4'-diamino" không phải chuỗi hở
+    if re.search(r"['\"]", STRING_LITERAL.sub("", text)):
+        errors.append("Chuỗi ký tự chưa đóng dấu nháy")
+    bare = strip_strings(text)
+
+    balance = _check_balance(bare)
+    if balance:
+        errors.append(balance)
+    if not re.search(r'\bMATCH\b', bare, re.IGNORECASE):
+        errors.append("Thiếu mệnh đề MATCH")
+    if not re.search(r'\bRETURN\b', bare, re.IGNORECASE):
+        errors.append("Thiếu mệnh đề RETURN")
+    write = WRITE_CLAUSE.search(bare)
+    if write:
+        errors.append(f"Không cho phép lệnh ghi '{write.group(1).upper()}' (chỉ đọc)")
+
+    node_props = schema.get("node_props", {})
+    rel_types = {r["type"] for r in schema.get("relationships", [])}
+    variables = {}
+
+    # Nhãn node + thuộc tính trong map {...}
+    for var, labels, props_map in NODE_PATTERN.findall(bare):
+        labels = [l.strip() for l in labels.split(":") if l.strip()]
+        for label in labels:
+            if label not in node_props:
+                errors.append(f"Nhãn không tồn tại: {label}{_suggest(label, list(node_props))}")
+        if var:
+            if labels:
+                variables.setdefault(var, labels[0])
+            else:
+                variables.setdefault(var, None)
+        if not labels and not var:
+            continue
+        if not labels and var and variables.get(var) is None:
+            warnings.append(f"Node ({var}) không có nhãn -> quét toàn bộ đồ thị")
+        if props_map and labels and labels[0] in node_props:
+            for key in MAP_KEYS.findall(props_map):
+                if key not in node_props[labels[0]]:
+                    errors.append(f"Thuộc tính không tồn tại: {labels[0]}.{key}"
+                                  f"{_suggest(key, node_props[labels[0]])}")
+
+    # Kiểu quan hệ
+    for var, types in REL_PATTERN.findall(bare):
+        if var:
+            variables.setdefault(var, None)
+        for rel_type in filter(None, re.split(r'[|:]', types or "")):
+            if rel_type not in rel_types:
+                errors.append(f"Quan hệ không tồn tại: {rel_type}{_suggest(rel_type, list(rel_types))}")
+
+    # Biến được khai báo qua WITH ... AS x / UNWIND ... AS x
+    for alias in re.findall(r'\bAS\s+(\w+)', bare, re.IGNORECASE):
+        variables.setdefault(alias, None)
+
+    # Truy cập thuộc tính var.prop
+    for var, prop in PROPERTY_ACCESS.findall(bare):
+        if var not in variables:
+            errors.append(f"Biến chưa khai báo: {var}")
+            continue
+        label = variables[var]
+        if label in node_props and prop not in node_props[label]:
+            errors.append(f"Thuộc tính không tồn tại: {label}.{prop}{_suggest(prop, node_props[label])}")
+
+    # Hiệu năng
+    has_where = re.search(r'\bWHERE\b', bare, re.IGNORECASE) or "{" in bare
+    if not has_where:
+        warnings.append("Không có điều kiện lọc (WHERE) -> quét toàn bộ nhãn")
+    if not re.search(r'\bLIMIT\b', bare, re.IGNORECASE):
+        warnings.append("Thiếu LIMIT")
+
+    # Bỏ lỗi trùng lặp, giữ thứ tự
+    return {"errors": list(dict.fromkeys(errors)), "warnings": list(dict.fromkeys(warnings))}
+
+
+def ensure_limit(query, limit):
+    """
+    Thêm LIMIT vào cuối truy vấn đọc nếu chưa có (không áp dụng cho UNION).
+    Chú thích // cuối truy vấn được bỏ trước, nếu không LIMIT sẽ nằm trong chú thích.
+    """
+    bare = strip_strings(strip_line_comments(query))
+    if re.search(r'\b(LIMIT|UNION)\b', bare, re.IGNORECASE):
+        return query
+    return f"{strip_line_comments(query).rstrip().rstrip(';').rstrip()} LIMIT {int(limit)}"
+
+
+def format_errors(errors):
+    return "; ".join(errors)
@@ -0,0 +1,297 @@
+import os
+import re
+import json
+import math
+import hashlib
+from collections import Counter
+
+from langchain_core.example_selectors.base import BaseExampleSelector
+
+from preprocessing.kgraph.formula import hill_key, parent_formula, formula_hint
+from experiments.context_budget import count_tokens
+
+# ==============================================================================
+# NGÂN HÀNG VÍ DỤ FEW-SHOT + BỘ CHỌN VÍ DỤ THEO ĐỘ TƯƠNG ĐỒNG
+# ==============================================================================
+# Thay vì gửi mọi ví dụ trong mỗi lần gọi, ta dựng sẵn một ngân hàng ví dụ phủ
+# mọi quan hệ 1-hop / 2-hop (theo relation_dict của create_question_1hop/2hop),
+# vector hóa bằng TF-IDF n-gram ký tự và chỉ chọn top-k ví dụ gần câu hỏi nhất.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_PATH = os.path.join(BASE_DIR, "data", "cache", "few_shot_index.json")
+
+# ------------------------------------------------------------------------------
+# 1. Ánh xạ quan hệ -> vị trí thuộc tính trong đồ thị
+# ------------------------------------------------------------------------------
+# relation: (alias node, đoạn MATCH cần thêm, thuộc tính)
+RELATION_TARGETS = {
+    "tên_latin": ("n", "", "tên_latin"),
+    "công_thức_hóa_học": ("n", "", "công_thức_hóa_học"),
+    "mô_tả_chung": ("n", "", "mô_tả"),
+    "tính_chất": ("n", "", "tính_chất"),
+    "bảo_quản": ("n", "", "bảo_quản"),
+    "loại_thuốc": ("l", "-[:THUỘC_NHÓM]->(l:LOẠI_THUỐC)", "tên_loại"),
+    "định_tính": ("t", "-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN)", "định_tính"),
+    "định_lượng": ("t", "-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN)", "định_lượng"),
+    "hàm_lượng_yêu_cầu": ("t", "-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN)", "hàm_lượng_yêu_cầu"),
+    "tạp_chất_và_độ_tinh_khiết": ("t", "-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN)", "tạp_chất_và_độ_tinh_khiết"),
+    "độ_hòa_tan": ("t", "-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN)", "độ_hòa_tan"),
+}
+
+# Giá trị mẫu: (chuỗi trong ngoặc [], từ khóa xé nhỏ cho trường văn bản dài)
+DRUG = "ABACAVIR SULFAT"
+SAMPLE_VALUES = {
+    "tên_latin": ("Abacaviri sulfas", None),
+    "công_thức_hóa_học": ("C14H18N6O.1/2H2SO4", None),
+    "mô_tả_chung": ("dẫn chất purin, muối sulfat của abacavir", ["purin", "sulfat"]),
+    "tính_chất": ("bột trắng, tan trong nước, không tan trong ethanol", ["bột", "trắng", "nước", "ethanol"]),
+    "bảo_quản": ("trong bao bì kín, tránh ánh sáng", ["bao bì kín", "ánh sáng"]),
+    "loại_thuốc": ("Thuốc kháng virus", None),
+    "độ_hòa_tan": ("tan trong nước, khó tan trong methanol", ["nước", "methanol"]),
+}
+
+# Mẫu câu hỏi lấy từ create_question_1hop.py / create_question_2hop.py
+DRUG_TO_X = {
+    "tên_latin": "Tên Latin của hoạt chất [{}] là gì?",
+    "công_thức_hóa_học": "Công thức hóa học của [{}] được viết như thế nào?",
+    "mô_tả_chung": "Mô tả chung về hoạt chất [{}]?",
+    "tính_chất": "Tính chất vật lý và hóa học của [{}] như thế nào?",
+    "định_tính": "Các phương pháp định tính của [{}] là gì?",
+    "định_lượng": "Cách tiến hành định lượng cho [{}]?",
+    "bảo_quản": "Yêu cầu bảo quản đối với hoạt chất [{}] như thế nào?",
+    "loại_thuốc": "Hoạt chất [{}] thuộc nhóm hoặc loại thuốc nào?",
+    "hàm_lượng_yêu_cầu": "Hàm lượng yêu cầu của chế phẩm [{}] là bao nhiêu?",
+    "tạp_chất_và_độ_tinh_khiết": "Tiêu chuẩn về tạp chất và độ tinh khiết của [{}]?",
+    "độ_hòa_tan": "Độ hòa tan của [{}] trong các dung môi?",
+}
+
+X_TO_DRUG = {
+    "tên_latin": "Hoạt chất nào có tên Latin là [{}]?",
+    "công_thức_hóa_học": "Chất nào được xác định bởi công thức hóa học [{}]?",
+    "loại_thuốc": "Kể tên một loại thuốc thuộc nhóm [{}]?",
+    "bảo_quản": "Hoạt chất nào yêu cầu điều kiện bảo quản là [{}]?",
+    "tính_chất": "Dựa vào tính chất [{}], đây là hoạt chất gì?",
+    "độ_hòa_tan": "Chất nào có đặc tính hòa tan là [{}]?",
+    "mô_tả_chung": "Thông tin [{}] thuộc về hoạt chất nào?",
+}
+
+TWO_HOP = {
+    ("công_thức_hóa_học", "bảo_quản"): "Hoạt chất có công thức hóa học là [{}] yêu cầu điều kiện bảo quản như thế nào?",
+    ("tên_latin", "loại_thuốc"): "Thuốc có tên Latin [{}] thuộc nhóm dược lý nào?",
+    ("công_thức_hóa_học", "định_lượng"): "Phương pháp định lượng dành cho dược chất có công thức [{}] là gì?",
+    ("tên_latin", "tính_chất"): "Mô tả các tính chất vật lý của hoạt chất có tên Latin là [{}]?",
+    ("công_thức_hóa_học", "loại_thuốc"): "Dược chất mang công thức [{}] được phân vào loại thuốc nào?",
+    ("tên_latin", "độ_hòa_tan"): "Độ hòa tan của hoạt chất có tên Latin [{}] được quy định như thế nào?",
+    ("tính_chất", "định_tính"): "Với dược chất có tính chất [{}], quy trình định tính cụ thể là gì?",
+    ("mô_tả_chung", "bảo_quản"): "Dựa trên mô tả [{}], thuốc này cần được bảo quản ra sao?",
+    ("loại_thuốc", "công_thức_hóa_học"): "Loại thuốc [{}] thường có hoạt chất với công thức hóa học là gì?",
+}
+
+# Ví dụ viết tay cho các mẫu đặc biệt (thuộc tính số, node MỤC, xé nhỏ từ khóa)
+HAND_EXAMPLES = [
+    {
+        "question": "Công thức hóa học của Aspirin là gì?",
+        "query": "MATCH (n:HOẠT_CHẤT) WHERE toLower(n.tên_hoạt_chất) CONTAINS toLower('ASPIRIN') RETURN n.tên_hoạt_chất, n.công_thức_hóa_học",
+    },
+    {
+        "question": "Dược chất có tính chất [bột trắng, tan trong nước, không tan trong ethanol] có định tính là gì?",
+        "query": "MATCH (n:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN) WHERE toLower(n.tính_chất) CONTAINS 'bột' AND toLower(n.tính_chất) CONTAINS 'trắng' AND toLower(n.tính_chất) CONTAINS 'nước' AND toLower(n.tính_chất) CONTAINS 'ethanol' RETURN n.tên_hoạt_chất, t.định_tính",
+    },
+    {
+        "question": "Quy trình định tính cho dược chất có đặc tính [tnc ~143°C, dễ tan trong nước và ethanol]?",
+        "query": "MATCH (n:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN) WHERE n.nhiệt_độ_nóng_chảy_max >= 141 AND n.nhiệt_độ_nóng_chảy_min <= 145 AND toLower(n.tính_chất) CONTAINS 'nước' AND toLower(n.tính_chất) CONTAINS 'ethanol' RETURN n.tên_hoạt_chất, t.định_tính",
+    },
+    {
+        "question": "Hoạt chất nào có góc quay cực riêng [từ -58,0° đến -54,0°]?",
+        "query": "MATCH (n:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(t:TIÊU_CHUẨN) WHERE t.góc_quay_cực_riêng_min >= -58.0 AND t.góc_quay_cực_riêng_max <= -54.0 RETURN n.tên_hoạt_chất, t.góc_quay_cực_riêng_min, t.góc_quay_cực_riêng_max",
+    },
+    {
+        "question": "Yêu cầu về pH và nước của [ABACAVIR SULFAT] là gì?",
+        "query": "MATCH (n:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(:TIÊU_CHUẨN)-[:CÓ_MỤC]->(m:MỤC) WHERE toLower(n.tên_hoạt_chất) CONTAINS toLower('ABACAVIR SULFAT') AND m.nhãn IN ['PH', 'NƯỚC'] RETURN n.tên_hoạt_chất, m.nhãn, m.nội_dung ORDER BY m.thứ_tự",
+    },
+    {
+        "question": "Tìm hoạt chất là [tinh thể không màu, khó tan trong nước] và thuộc loại thuốc gì?",
+        "query": "MATCH (n:HOẠT_CHẤT)-[:THUỘC_NHÓM]->(l:LOẠI_THUỐC) WHERE toLower(n.tính_chất) CONTAINS 'tinh thể' AND toLower(n.tính_chất) CONTAINS 'không màu' AND toLower(n.tính_chất) CONTAINS 'khó tan' RETURN n.tên_hoạt_chất, l.tên_loại",
+    },
+    {
+        "question": "Xác định hoạt chất có tính chất [bột kết tinh trắng, đa hình, độ tan thấp]?",
+        "query": "MATCH (n:HOẠT_CHẤT) WHERE toLower(n.tính_chất) CONTAINS 'bột' AND toLower(n.tính_chất) CONTAINS 'trắng' AND toLower(n.tính_chất) CONTAINS 'đa hình' RETURN n.tên_hoạt_chất, n.tên_latin, n.công_thức_hóa_học",
+    },
+]
+
+
+def _match_clause(relations):
+    """MATCH đủ các nhánh cần cho danh sách quan hệ (mỗi nhánh một lần)."""
+    branches = []
+    for rel in relations:
+        _, branch, _ = RELATION_TARGETS[rel]
+        if branch and branch not in branches:
+            branches.append(branch)
+    if not branches:
+        return "MATCH (n:HOẠT_CHẤT)"
+    return "MATCH " + ", ".join(f"(n:HOẠT_CHẤT){b}" for b in branches)
+
+
+def _filter(rel):
+    """Điều kiện WHERE cho giá trị mẫu của một quan hệ."""
+    alias, _, prop = RELATION_TARGETS[rel]
+    value, shredded = SAMPLE_VALUES[rel]
+    if rel == "công_thức_hóa_học":
+        return f"(n.công_thức_hill = '{hill_key(value)}' OR n.công_thức_hóa_học CONTAINS '{parent_formula(value)}')"
+    if shredded:
+        return " AND ".join(f"toLower({alias}.{prop}) CONTAINS '{k}'" for k in shredded)
+    return f"toLower({alias}.{prop}) CONTAINS toLower('{value}')"
+
+
+def _with_hill_hint(question, rel):
+    """Giống RAG_gemini: câu hỏi có công thức được gắn thêm khóa Hill."""
+    if rel != "công_thức_hóa_học":
+        return question
+    value, _ = SAMPLE_VALUES[rel]
+    return f"{question} {formula_hint(value)}"
+
+
+def build_examples():
+    """Sinh toàn bộ ngân hàng ví dụ: viết tay + 1-hop hai chiều + 2-hop."""
+    examples = list(HAND_EXAMPLES)
+
+    name_filter = f"toLower(n.tên_hoạt_chất) CONTAINS toLower('{DRUG}')"
+    for rel, template in DRUG_TO_X.items():
+        alias, _, prop = RELATION_TARGETS[rel]
+        examples.append({
+            "question": template.format(DRUG),
+            "query": f"{_match_clause([rel])} WHERE {name_filter} RETURN n.tên_hoạt_chất, {alias}.{prop}",
+        })
+
+    for rel, template in X_TO_DRUG.items():
+        examples.append({
+            "question": _with_hill_hint(template.format(SAMPLE_VALUES[rel][0]), rel),
+            "query": f"{_match_clause([rel])} WHERE {_filter(rel)} RETURN n.tên_hoạt_chất",
+        })
+
+    for (rel1, rel2), template in TWO_HOP.items():
+        alias, _, prop = RELATION_TARGETS[rel2]
+        examples.append({
+            "question": _with_hill_hint(template.format(SAMPLE_VALUES[rel1][0]), rel1),
+            "query": f"{_match_clause([rel1, rel2])} WHERE {_filter(rel1)} RETURN n.tên_hoạt_chất, {alias}.{prop}",
+        })
+    return examples
+
+
+# ------------------------------------------------------------------------------
+# 2. TF-IDF n-gram ký tự (thuần Python, lưu được ra JSON)
+# ------------------------------------------------------------------------------
+NGRAM_RANGE = (3, 5)
+
+
+def normalize_question(text):
+    """Bỏ nội dung thực thể trong [] để so khớp theo dạng câu hỏi, không theo tên thuốc."""
+    text = re.sub(r'\[[^\]]*\]', ' [] ', text.lower())
+    text = re.sub(r'\(khóa hill[^)]*\)', ' khóa hill ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def char_ngrams(text, ngram_range=NGRAM_RANGE):
+    """N-gram ký tự trong từng từ (giống analyzer='char_wb' của scikit-learn)."""
+    grams = Counter()
+    low, high = ngram_range
+    for word in normalize_question(text).split():
+        word = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(len(word) - n + 1):
+                grams[word[i:i + n]] += 1
+    return grams
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {k: v / norm for k, v in vector.items()} if norm else vector
+
+
+class TfidfIndex:
+    def __init__(self, idf=None, vectors=None):
+        self.idf = idf or {}
+        self.vectors = vectors or []
+
+    @classmethod
+    def fit(cls, texts):
+        counts = [char_ngrams(t) for t in texts]
+        df = Counter(g for c in counts for g in c)
+        n = len(texts)
+        idf = {g: math.log((1 + n) / (1 + d)) + 1 for g, d in df.items()}
+        index = cls(idf)
+        index.vectors = [index._weigh(c) for c in counts]
+        return index
+
+    def _weigh(self, grams):
+        return _normalize({g: tf * self.idf[g] for g, tf in grams.items() if g in self.idf})
+
+    def transform(self, text):
+        return self._weigh(char_ngrams(text))
+
+    def similarities(self, text):
+        query = self.transform(text)
+        return [sum(w * vec.get(g, 0.0) for g, w in query.items()) for vec in self.vectors]
+
+
+# ------------------------------------------------------------------------------
+# 3. Bộ chọn ví dụ cho FewShotPromptTemplate
+# ------------------------------------------------------------------------------
+class SimilarExampleSelector(BaseExampleSelector):
+    def __init__(self, examples, index, k=4, max_tokens=600):
+        self.examples = examples
+        self.index = index
+        self.k = k
+        # Ngân sách token cho phần ví dụ trong prompt sinh Cypher
+        self.max_tokens = max_tokens
+
+    def add_example(self, example):
+        self.examples.append(example)
+        self.index = TfidfIndex.fit([e["question"] for e in self.examples])
+
+    def select_examples(self, input_variables):
+        scores = self.index.similarities(input_variables["question"])
+        ranked = sorted(range(len(self.examples)), key=lambda i: -scores[i])
+        selected, used = [], 0
+        for i in ranked:
+            example = self.examples[i]
+            cost = count_tokens(example["question"]) + count_tokens(example["query"])
+            if used + cost > self.max_tokens:
+                continue
+            selected.append(example)
+            used += cost
+            if len(selected) >= self.k:
+                break
+        return selected
+
+
+def _fingerprint(examples):
+    payload = json.dumps({"examples": examples, "ngram_range": NGRAM_RANGE}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_example_selector(path=INDEX_PATH, k=4, max_tokens=600):
+    """
+    Nạp chỉ mục đã tính sẵn từ đĩa; chỉ dựng lại (và lưu) khi ngân hàng ví dụ thay đổi.
+    """
+    examples = build_examples()
+    fingerprint = _fingerprint(examples)
+
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("fingerprint") == fingerprint:
+            index = TfidfIndex(cached["idf"], cached["vectors"])
+            return SimilarExampleSelector(examples, index, k=k, max_tokens=max_tokens)
+
+    index = TfidfIndex.fit([e["question"] for e in examples])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "idf": index.idf, "vectors": index.vectors}, f, ensure_ascii=False)
+    return SimilarExampleSelector(examples, index, k=k, max_tokens=max_tokens)
+
+
+if __name__ == "__main__":
+    # Tính trước chỉ mục: python -m experiments.example_bank
+    selector = load_example_selector()
+    print(f"✅ Đã lưu chỉ mục {len(selector.examples)} ví dụ tại: {INDEX_PATH}")
@@ -0,0 +1,180 @@
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_community.chains.graph_qa.cypher import GraphCypherQAChain, extract_cypher
+from langchain_core.callbacks import CallbackManagerForChainRun
+
+from experiments.cypher_lint import lint_cypher, ensure_limit, format_errors
+from experiments.query_plan import describe_plan_problem
+from experiments.spans import SpanRecorder, make_token_handler, with_handler, result_bytes
+
+# ==============================================================================
+# GRAPH CYPHER QA CHAIN CÓ CÁC BƯỚC TRUNG GIAN TÙY BIẾN
+# ==============================================================================
+# Giữ nguyên luồng của GraphCypherQAChain (sinh Cypher -> chạy Neo4j -> trả lời),
+# nhưng tách từng bước ra để chèn thêm xử lý giữa kết quả Cypher và prompt QA.
+
+# Câu hỏi gửi lại cho LLM khi Cypher không qua được bước kiểm tra tĩnh
+REPAIR_TEMPLATE = """{question}
+
+Truy vấn Cypher trước đó KHÔNG hợp lệ:
+{query}
+Lỗi: {errors}
+Hãy viết lại truy vấn Cypher đúng với cấu trúc cơ sở dữ liệu."""
+
+
+class KGCypherQAChain(GraphCypherQAChain):
+    context_assembler: Optional[Any] = None
+    """ContextAssembler cắt gọn kết quả Cypher theo ngân sách token trước bước QA."""
+    cypher_schema: Optional[Dict[str, Any]] = None
+    """Schema (cypher_lint.load_schema) để kiểm tra Cypher trước khi chạy; None = bỏ qua."""
+    max_regenerations: int = 1
+    """Số lần sinh lại Cypher (kèm thông báo lỗi) khi kiểm tra tĩnh thất bại."""
+    plan_profiler: Optional[Any] = None
+    """QueryPlanProfiler: ghi lại EXPLAIN/PROFILE và chặn truy vấn vượt ngân sách db hits."""
+
+    def generate_cypher(self, question, callbacks=None, spans=None):
+        spans = spans or SpanRecorder()
+        with spans.span("cypher_generation") as span:
+            generated_cypher = self.cypher_generation_chain.run(
+                {"question": question, "schema": self.graph_schema},
+                callbacks=with_handler(callbacks, make_token_handler(span)),
+            )
+        # Bỏ ``` bao quanh nếu có
+        generated_cypher = extract_cypher(generated_cypher)
+        if self.cypher_query_corrector:
+            generated_cypher = self.cypher_query_corrector(generated_cypher)
+        return generated_cypher
+
+    def validate_cypher(self, question, generated_cypher, callbacks=None, spans=None):
+        """
+        Kiểm tra tĩnh, sinh lại tối đa max_regenerations lần nếu có lỗi.
+        Trả về (cypher đã thêm LIMIT hoặc None nếu vẫn lỗi, kết quả lint).
+        """
+        spans = spans or SpanRecorder()
+        with spans.span("cypher_lint"):
+            lint = lint_cypher(generated_cypher, self.cypher_schema)
+        attempts = 0
+        while lint["errors"] and attempts < self.max_regenerations:
+            attempts += 1
+            feedback = REPAIR_TEMPLATE.format(
+                question=question, query=generated_cypher, errors=format_errors(lint["errors"])
+            )
+            generated_cypher = self.generate_cypher(feedback, callbacks=callbacks, spans=spans)
+            with spans.span("cypher_lint"):
+                lint = lint_cypher(generated_cypher, self.cypher_schema)
+        lint["regenerations"] = attempts
+        if lint["errors"]:
+            return None, lint
+        # Chain chỉ dùng top_k dòng đầu -> để Neo4j dừng sớm thay vì trả hết rồi cắt
+        return ensure_limit(generated_cypher, self.top_k), lint
+
+    def _run_query(self, query, spans):
+        """Chạy một truy vấn, ghi span "db" (độ trễ, số dòng, số bytes). Trả về (records, plan)."""
+        with spans.span("db") as span:
+            if self.plan_profiler is None:
+                records, plan = self.graph.query(query), None
+            else:
+                records, plan = self.plan_profiler.run(query)
+            span["rows"] = len(records)
+            span["result_bytes"] = result_bytes(records)
+        return records, plan
+
+    def execute_cypher(self, question, generated_cypher, intermediate_steps, callbacks=None, spans=None):
+        """Chạy Cypher (qua plan_profiler nếu bật), trả về tối đa top_k dòng."""
+        spans = spans or SpanRecorder()
+        if not generated_cypher:
+            return []
+        records, plan = self._run_query(generated_cypher, spans)
+        if plan is None:
+            return records[: self.top_k]
+
+        intermediate_steps.append({"query_plan": plan})
+        if plan.get("rejected") and self.plan_profiler.enforce == "regenerate":
+            feedback = REPAIR_TEMPLATE.format(
+                question=question, query=generated_cypher,
+                errors=describe_plan_problem(plan, self.plan_profiler.db_hit_budget),
+            )
+            retry = self.generate_cypher(feedback, callbacks=callbacks, spans=spans)
+            if self.cypher_schema is not None:
+                retry, lint = self.validate_cypher(question, retry, callbacks=callbacks, spans=spans)
+                intermediate_steps.append({"lint": lint})
+            if retry:
+                intermediate_steps.append({"query": retry})
+                records, plan = self._run_query(retry, spans)
+                intermediate_steps.append({"query_plan": plan})
+        return records[: self.top_k]
+
+    def generate_answer(self, question, context, callbacks=None, spans=None, stream_to=None):
+        """
+        Bước QA cuối. stream_to(text) (tùy chọn): nhận từng đoạn câu trả lời ngay khi LLM
+        sinh ra; span "answer_generation" có thêm ttft_ms.
+        """
+        spans = spans or SpanRecorder()
+        with spans.span("answer_generation") as span:
+            callbacks = with_handler(callbacks, make_token_handler(span))
+            if stream_to is None:
+                result = self.qa_chain({"question": question, "context": context}, callbacks=callbacks)
+                return result[self.qa_chain.output_key]
+
+            # LLMChain không stream -> gọi thẳng LLM của qa_chain với prompt đã điền
+            prompt = self.qa_chain.prompt.format_prompt(question=question, context=context)
+            start = time.perf_counter()
+            parts = []
+            for chunk in self.qa_chain.llm.stream(prompt, config={"callbacks": callbacks}):
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                if not parts:
+                    span["ttft_ms"] = (time.perf_counter() - start) * 1000
+                parts.append(text)
+                stream_to(text)
+            return "".join(parts)
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
+        callbacks = _run_manager.get_child()
+        question = inputs[self.input_key]
+        intermediate_steps: List = []
+        # Span từng giai đoạn của câu hỏi này (chain dùng chung giữa các câu -> không lưu trên self)
+        spans = SpanRecorder()
+
+        generated_cypher = self.generate_cypher(question, callbacks=callbacks, spans=spans)
+        if self.cypher_schema is not None:
+            generated_cypher, lint = self.validate_cypher(question, generated_cypher,
+                                                          callbacks=callbacks, spans=spans)
+            intermediate_steps.append({"lint": lint})
+            if lint["errors"]:
+                _run_manager.on_text("Invalid Cypher: " + format_errors(lint["errors"]),
+                                     color="red", end="\n", verbose=self.verbose)
+        _run_manager.on_text("Generated Cypher:", end="\n", verbose=self.verbose)
+        _run_manager.on_text(str(generated_cypher), color="green", end="\n", verbose=self.verbose)
+        intermediate_steps.append({"query": generated_cypher})
+
+        context = self.execute_cypher(question, generated_cypher, intermediate_steps,
+                                      callbacks=callbacks, spans=spans)
+
+        if self.return_direct:
+            final_result = context
+        else:
+            if self.context_assembler is not None:
+                with spans.span("context") as span:
+                    context, stats = self.context_assembler.assemble(question, context)
+                    span["context_tokens"] = stats["tokens_kept"]
+                intermediate_steps.append({"context_stats": stats})
+            _run_manager.on_text("Full Context:", end="\n", verbose=self.verbose)
+            _run_manager.on_text(str(context), color="green", end="\n", verbose=self.verbose)
+            intermediate_steps.append({"context": context})
+
+            final_result = self.generate_answer(question, context, callbacks=callbacks, spans=spans,
+                                                stream_to=inputs.get("stream_to"))
+
+        intermediate_steps.append({"spans": spans.spans})
+        chain_result: Dict[str, Any] = {self.output_key: final_result}
+        if self.return_intermediate_steps:
+            chain_result["intermediate_steps"] = intermediate_steps
+        return chain_result
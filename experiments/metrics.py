@@ -0,0 +1,213 @@
+import re
+from functools import lru_cache
+
+# ==============================================================================
+# ROUGE-L VÀ METEOR TỰ CÀI ĐẶT (nhanh, đúng trên câu trả lời dài hàng KB)
+# ==============================================================================
+# - ROUGE-L: độ dài LCS bằng thuật toán bit-parallel (Allison-Dix / Hyyrö), bộ nhớ
+#   O(n) thay vì bảng LCS n*m của gói `rouge` (bị lỗi / tràn bộ nhớ trên văn bản dài).
+# - METEOR: đúng thuật toán nltk.translate.meteor_score (khớp chính xác -> gốc từ
+#   Porter -> đồng nghĩa WordNet, phạt phân mảnh), nhưng khớp bằng chỉ mục vị trí
+#   (O(n + m) thay vì O(n*m) + list.pop) và ghi nhớ kết quả stem / WordNet theo từ.
+# - Tách từ tiếng Việt: giữ âm tiết có dấu, số thập phân (1,5 / 0.2), công thức hóa học.
+# Kiểm tra khớp với thư viện gốc: python -m experiments parity logs/gemini_log.json
+# (hoặc python -m pytest tests/test_metrics_parity.py)
+
+VI_TOKEN = re.compile(r'\d+(?:[.,]\d+)*|\w+(?:[-\'’]\w+)*|[^\w\s]')
+
+
+def tokenize_vi(text):
+    return VI_TOKEN.findall(text.lower())
+
+
+# ------------------------------------------------------------------------------
+# ROUGE-L
+# ------------------------------------------------------------------------------
+def lcs_length(a, b):
+    """Độ dài dãy con chung dài nhất của hai dãy token, bit-parallel trên số nguyên Python."""
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return 0
+    masks = {}
+    for i, token in enumerate(a):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    v = full
+    for token in b:
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+    # Mỗi bit 0 trong v là một phần tử của LCS
+    return len(a) - bin(v).count("1")
+
+
+def rouge_l(ref_tokens, cand_tokens):
+    """F1 của ROUGE-L trên toàn văn (như rouge_score.rougeL)."""
+    if not ref_tokens or not cand_tokens:
+        return 0.0
+    lcs = lcs_length(ref_tokens, cand_tokens)
+    if not lcs:
+        return 0.0
+    precision, recall = lcs / len(cand_tokens), lcs / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+# ------------------------------------------------------------------------------
+# METEOR (tham số như nltk: alpha=0.9, beta=3, gamma=0.5)
+# ------------------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def _wordnet():
+    from nltk.corpus import wordnet
+    from nltk.stem.porter import PorterStemmer
+    from experiments.scoring import ensure_nltk_data
+    ensure_nltk_data(("wordnet",))
+    return wordnet, PorterStemmer()
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    return _wordnet()[1].stem(word)
+
+
+@lru_cache(maxsize=100000)
+def synonyms(word):
+    wordnet = _wordnet()[0]
+    names = {lemma.name() for synset in wordnet.synsets(word) for lemma in synset.lemmas()
+             if "_" not in lemma.name()}
+    names.add(word)
+    return frozenset(names)
+
+
+def _positions(words, indices):
+    """{từ: [vị trí tăng dần]} cho các vị trí còn lại."""
+    positions = {}
+    for j in indices:
+        positions.setdefault(words[j], []).append(j)
+    return positions
+
+
+def _match_stage(hyp_words, ref_words, hyp_left, ref_left, candidates):
+    """
+    Một vòng khớp của nltk: duyệt giả thuyết từ cuối lên, mỗi từ khớp với vị trí tham chiếu
+    LỚN NHẤT còn lại có từ thuộc candidates(từ). Trả về (các cặp khớp, hyp còn lại, ref còn lại).
+    """
+    positions = _positions(ref_words, ref_left)
+    matches, used_ref, hyp_rest = [], set(), []
+    for i in reversed(hyp_left):
+        best_word, best = None, -1
+        for word in candidates(hyp_words[i]):
+            slots = positions.get(word)
+            if slots and slots[-1] > best:
+                best_word, best = word, slots[-1]
+        if best_word is None:
+            hyp_rest.append(i)
+            continue
+        positions[best_word].pop()
+        used_ref.add(best)
+        matches.append((i, best))
+    hyp_rest.reverse()
+    return matches, hyp_rest, [j for j in ref_left if j not in used_ref]
+
+
+def _count_chunks(matches):
+    chunks = 1
+    for (h0, r0), (h1, r1) in zip(matches, matches[1:]):
+        if not (h1 == h0 + 1 and r1 == r0 + 1):
+            chunks += 1
+    return chunks
+
+
+def meteor(ref_tokens, cand_tokens, alpha=0.9, beta=3, gamma=0.5):
+    hyp = [w.lower() for w in cand_tokens]
+    ref = [w.lower() for w in ref_tokens]
+    if not hyp or not ref:
+        return 0.0
+    hyp_left, ref_left = list(range(len(hyp))), list(range(len(ref)))
+
+    exact, hyp_left, ref_left = _match_stage(hyp, ref, hyp_left, ref_left, lambda w: (w,))
+    hyp_stems, ref_stems = {i: stem(hyp[i]) for i in hyp_left}, {j: stem(ref[j]) for j in ref_left}
+    stemmed, hyp_left, ref_left = _match_stage(hyp_stems, ref_stems, hyp_left, ref_left, lambda w: (w,))
+    # nltk chạy vòng đồng nghĩa trên các từ ĐÃ stem còn lại -> giữ nguyên để điểm khớp
+    wordnet_matches, _, _ = _match_stage(hyp_stems, ref_stems, hyp_left, ref_left, synonyms)
+
+    matches = sorted(exact + stemmed + wordnet_matches)
+    if not matches:
+        return 0.0
+    precision, recall = len(matches) / len(hyp), len(matches) / len(ref)
+    fmean = precision * recall / (alpha * precision + (1 - alpha) * recall)
+    penalty = gamma * (_count_chunks(matches) / len(matches)) ** beta
+    return (1 - penalty) * fmean
+
+
+# ------------------------------------------------------------------------------
+# Đối chiếu với thư viện gốc
+# ------------------------------------------------------------------------------
+def _reference_lcs(a, b):
+    """LCS quy hoạch động của rouge_score (bảng n*m) -> chỉ dùng để đối chiếu."""
+    from rouge_score.rouge_scorer import _lcs_table
+    return _lcs_table(a, b)[-1][-1]
+
+
+def parity_report(samples, tolerance=1e-9, max_len=2000):
+    """
+    samples: [(reference, candidate, tokenize)]. So METEOR với nltk.meteor_score, độ dài LCS
+    với rouge_score và ROUGE-L với gói `rouge` (ghi lại các mẫu gói này lỗi, trước đây bị tính 0).
+    Cặp dài hơn max_len token bỏ qua bước đối chiếu LCS (bảng n*m quá lớn).
+    """
+    import time
+    from nltk.translate.meteor_score import meteor_score as nltk_meteor
+    from rouge import Rouge
+
+    rouge = Rouge()
+    report = {"samples": 0, "meteor_mismatch": [], "lcs_mismatch": [], "rouge_package_errors": 0,
+              "lcs_skipped": 0, "time": {"meteor": 0.0, "nltk_meteor": 0.0, "rouge_l": 0.0, "rouge_package": 0.0}}
+    for n, (reference, candidate, tokenize) in enumerate(samples):
+        if not reference or not candidate:
+            continue
+        report["samples"] += 1
+        ref, cand = tokenize(reference), tokenize(candidate)
+
+        start = time.perf_counter()
+        ours = meteor(ref, cand)
+        report["time"]["meteor"] += time.perf_counter() - start
+        start = time.perf_counter()
+        theirs = nltk_meteor([ref], cand)
+        report["time"]["nltk_meteor"] += time.perf_counter() - start
+        if abs(ours - theirs) > tolerance:
+            report["meteor_mismatch"].append((n, ours, theirs))
+
+        start = time.perf_counter()
+        lcs = lcs_length(ref, cand)
+        rouge_l(ref, cand)
+        report["time"]["rouge_l"] += time.perf_counter() - start
+        if len(ref) <= max_len and len(cand) <= max_len:
+            expected = _reference_lcs(ref, cand)
+            if lcs != expected:
+                report["lcs_mismatch"].append((n, lcs, expected))
+        else:
+            report["lcs_skipped"] += 1
+
+        start = time.perf_counter()
+        try:
+            rouge.get_scores(candidate, reference)
+        except Exception:
+            report["rouge_package_errors"] += 1
+        report["time"]["rouge_package"] += time.perf_counter() - start
+    return report
+
+
+def format_parity_report(report):
+    t = report["time"]
+    lines = [
+        f"ĐỐI CHIẾU METRIC: {report['samples']} mẫu",
+        f"   - METEOR khác nltk      : {len(report['meteor_mismatch'])}"
+        f"   ({t['meteor']:.2f}s so với {t['nltk_meteor']:.2f}s)",
+        f"   - LCS khác rouge_score  : {len(report['lcs_mismatch'])} (bỏ qua {report['lcs_skipped']} cặp quá dài)",
+        f"   - Gói rouge lỗi         : {report['rouge_package_errors']} mẫu"
+        f"   (ROUGE-L tự cài {t['rouge_l']:.2f}s so với {t['rouge_package']:.2f}s)",
+    ]
+    for n, ours, theirs in report["meteor_mismatch"][:10]:
+        lines.append(f"     mẫu {n}: METEOR {ours:.6f} != {theirs:.6f}")
+    for n, ours, theirs in report["lcs_mismatch"][:10]:
+        lines.append(f"     mẫu {n}: LCS {ours} != {theirs}")
+    return "\n".join(lines)
@@ -0,0 +1,171 @@
+import re
+import random
+from collections import defaultdict
+
+# ==============================================================================
+# THU THẬP KẾ HOẠCH TRUY VẤN (EXPLAIN / PROFILE) CHO CYPHER DO LLM SINH RA
+# ==============================================================================
+# EXPLAIN không chạy truy vấn, chỉ trả về kế hoạch + số dòng ước lượng -> dùng cho
+# mọi câu hỏi. PROFILE chạy thật và đếm db hits -> chỉ lấy mẫu một phần câu hỏi,
+# đồng thời dùng luôn kết quả của PROFILE làm ngữ cảnh để không phải chạy hai lần.
+
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan", "DirectedRelationshipTypeScan",
+                  "UndirectedRelationshipTypeScan")
+
+
+def _operator_name(plan):
+    return plan.get("operatorType", "").split("@")[0]
+
+
+def summarize_plan(plan):
+    """Duyệt cây kế hoạch (dict của neo4j driver, tham số toán tử nằm ở "args") -> thông tin gọn để ghi log."""
+    operators = []
+
+    def walk(node, depth):
+        args = node.get("args", {})
+        operators.append({
+            "operator": _operator_name(node),
+            "depth": depth,
+            "estimated_rows": args.get("EstimatedRows"),
+            "db_hits": node.get("dbHits"),
+            "rows": node.get("rows"),
+            "details": args.get("Details"),
+        })
+        for child in node.get("children", []):
+            walk(child, depth + 1)
+
+    walk(plan, 0)
+    names = [op["operator"] for op in operators]
+    db_hits = [op["db_hits"] for op in operators if op["db_hits"] is not None]
+    return {
+        "operators": operators,
+        "estimated_rows": max([op["estimated_rows"] or 0 for op in operators] or [0]),
+        # EXPLAIN không có db hits -> ước lượng bằng tổng số dòng dự kiến qua các toán tử
+        "estimated_cost": sum(op["estimated_rows"] or 0 for op in operators),
+        "db_hits": sum(db_hits) if db_hits else None,
+        "index_used": any("Index" in name for name in names),
+        "label_scan": [name for name in names if name in SCAN_OPERATORS],
+    }
+
+
+class QueryPlanProfiler:
+    def __init__(self, graph, mode="explain", profile_sample=0.1, db_hit_budget=None,
+                 enforce="off", seed=42):
+        """
+        graph        : langchain Neo4jGraph (dùng driver bên trong để lấy summary)
+        mode         : "explain" (mọi câu) | "profile" (mọi câu chạy PROFILE)
+        profile_sample: tỉ lệ câu hỏi được PROFILE khi mode="explain"
+        db_hit_budget: ngưỡng db hits (PROFILE) / chi phí ước lượng (EXPLAIN)
+        enforce      : "off" | "reject" (không chạy) | "regenerate" (yêu cầu LLM viết lại)
+        """
+        self.graph = graph
+        self.mode = mode
+        self.profile_sample = profile_sample
+        self.db_hit_budget = db_hit_budget
+        self.enforce = enforce
+        self.rng = random.Random(seed)
+
+    def _session(self):
+        return self.graph._driver.session(database=getattr(self.graph, "_database", None))
+
+    def explain(self, query, params=None):
+        with self._session() as session:
+            summary = session.run("EXPLAIN " + query, params or {}).consume()
+        return summarize_plan(summary.plan)
+
+    def profile(self, query, params=None):
+        """Chạy PROFILE, trả về (records, tóm tắt kế hoạch có db hits thật)."""
+        with self._session() as session:
+            result = session.run("PROFILE " + query, params or {})
+            records = [r.data() for r in result]
+            summary = result.consume()
+        return records, summarize_plan(summary.profile)
+
+    def over_budget(self, plan):
+        if not self.db_hit_budget:
+            return False
+        cost = plan["db_hits"] if plan["db_hits"] is not None else plan["estimated_cost"]
+        return cost > self.db_hit_budget
+
+    def run(self, query, params=None):
+        """
+        Lấy kế hoạch rồi chạy truy vấn. Trả về (records, plan).
+        plan["rejected"] = True khi vượt ngân sách và enforce != "off" (records = []).
+        """
+        plan = self.explain(query, params)
+        plan["mode"] = "explain"
+        if self.enforce != "off" and self.over_budget(plan):
+            plan["rejected"] = True
+            return [], plan
+
+        if self.mode == "profile" or self.rng.random() < self.profile_sample:
+            records, profiled = self.profile(query, params)
+            profiled["mode"] = "profile"
+            if self.enforce != "off" and self.over_budget(profiled):
+                profiled["rejected"] = True
+                return [], profiled
+            return records, profiled
+
+        return self.graph.query(query, params or {}), plan
+
+
+# ------------------------------------------------------------------------------
+# Báo cáo: xếp hạng các "dạng truy vấn" tốn kém nhất
+# ------------------------------------------------------------------------------
+def query_shape(query):
+    """Bỏ giá trị cụ thể (chuỗi, số) để gom các truy vấn cùng dạng."""
+    shape = re.sub(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"", "?", query or "")
+    shape = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?', "#", shape)
+    return re.sub(r'\s+', ' ', shape).strip()
+
+
+def plan_report(entries, top=20):
+    """
+    entries: các dict log có "cypher" và "query_plan".
+    Trả về danh sách dạng truy vấn, sắp xếp theo chi phí trung bình giảm dần.
+    """
+    groups = defaultdict(list)
+    for e in entries:
+        plan = e.get("query_plan")
+        if plan and e.get("cypher"):
+            groups[query_shape(e["cypher"])].append(plan)
+
+    rows = []
+    for shape, plans in groups.items():
+        costs = [p["db_hits"] if p.get("db_hits") is not None else p.get("estimated_cost", 0) for p in plans]
+        rows.append({
+            "shape": shape,
+            "count": len(plans),
+            "mean_cost": sum(costs) / len(costs),
+            "max_cost": max(costs),
+            "profiled": sum(1 for p in plans if p.get("mode") == "profile"),
+            "index_used": sum(1 for p in plans if p.get("index_used")) / len(plans),
+            "label_scan": sorted({s for p in plans for s in p.get("label_scan", [])}),
+            "rejected": sum(1 for p in plans if p.get("rejected")),
+        })
+    rows.sort(key=lambda r: -r["mean_cost"])
+    return rows[:top]
+
+
+def write_plan_report(entries, path, top=20):
+    rows = plan_report(entries, top)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("BÁO CÁO KẾ HOẠCH TRUY VẤN (xếp theo chi phí trung bình)\n")
+        f.write("Chi phí = db hits (PROFILE) hoặc tổng số dòng ước lượng (EXPLAIN)\n")
+        f.write("==================================================\n\n")
+        for i, r in enumerate(rows, 1):
+            f.write(f"{i}. [{r['count']} truy vấn | mean={r['mean_cost']:.0f} | max={r['max_cost']:.0f} | "
+                    f"index={r['index_used']:.0%} | profiled={r['profiled']} | rejected={r['rejected']}]\n")
+            if r["label_scan"]:
+                f.write(f"   Quét: {', '.join(r['label_scan'])}\n")
+            f.write(f"   {r['shape']}\n\n")
+    return rows
+
+
+def describe_plan_problem(plan, budget):
+    """Thông báo gửi lại LLM khi kế hoạch vượt ngân sách (enforce="regenerate")."""
+    cost = plan["db_hits"] if plan.get("db_hits") is not None else plan.get("estimated_cost", 0)
+    message = f"Kế hoạch truy vấn quá tốn kém (chi phí {cost:.0f} > ngân sách {budget})"
+    if plan.get("label_scan"):
+        message += f", phải quét {', '.join(plan['label_scan'])}"
+    return message + ". Hãy lọc bằng thuộc tính có index (tên, khóa Hill, thuộc tính số, nhãn MỤC) và thêm LIMIT."
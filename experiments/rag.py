@@ -0,0 +1,371 @@
+import os
+import json
+import time
+from functools import lru_cache
+
+from experiments import config
+
+# ==============================================================================
+# RAG: KNOWLEDGE GRAPH (NEO4J) + GEMINI
+# ==============================================================================
+# Mọi thư viện nặng (langchain, google-genai, neo4j) và mọi kết nối đều được tạo
+# khi gọi get_graph() / get_chain() lần đầu, không phải khi import module.
+
+# Ví dụ few-shot được chọn động theo câu hỏi từ ngân hàng ví dụ (experiments/example_bank.py),
+# chỉ mục TF-IDF được tính sẵn và lưu tại data/cache/few_shot_index.json
+FEW_SHOT_K = 4
+FEW_SHOT_MAX_TOKENS = 600
+
+# Cập nhật PREFIX với hướng dẫn xé nhỏ từ khóa cực kỳ quan trọng
+PREFIX = """
+Bạn là một chuyên gia về cơ sở dữ liệu đồ thị Neo4j. Nhiệm vụ của bạn là chuyển đổi câu hỏi Tiếng Việt thành truy vấn Cypher chính xác.
+
+Cấu trúc cơ sở dữ liệu:
+1. Node: HOẠT_CHẤT (tên_hoạt_chất, tên_latin, công_thức_hóa_học, công_thức_hill, mô_tả, bảo_quản, tính_chất)
+   - công_thức_hill: khóa Hill của hoạt chất gốc, không tính nước kết tinh / gốc muối (có index), ví dụ 'C9H8O4'
+   - công_thức_hill_đầy_đủ, thành_phần_phụ: khóa Hill cả công thức và các thành phần muối / hydrat (nếu có)
+   - Thuộc tính số (float, có range index): nhiệt_độ_nóng_chảy_min, nhiệt_độ_nóng_chảy_max (°C)
+2. Node: TIÊU_CHUẨN (định_lượng, định_tính, độ_hòa_tan, tạp_chất_và_độ_tinh_khiết, hàm_lượng_yêu_cầu)
+   - Thuộc tính số (float, có range index): nhiệt_độ_nóng_chảy_min/max (°C), góc_quay_cực_riêng_min/max (°),
+     ph_min/max, nước_min/max (%), mất_khối_lượng_do_làm_khô_min/max (%), tro_sulfat_min/max (%)
+   - Quan hệ: (:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(:TIÊU_CHUẨN)
+3. Node: LOẠI_THUỐC (tên_loại)
+   - Quan hệ: (:HOẠT_CHẤT)-[:THUỘC_NHÓM]->(:LOẠI_THUỐC)
+4. Node: MỤC (thuộc_về_hoạt_chất, trường, nhãn, thứ_tự, nội_dung, độ_dài) - từng mục nhỏ của TIÊU_CHUẨN
+   - Quan hệ: (:TIÊU_CHUẨN)-[:CÓ_MỤC]->(:MỤC)
+   - trường: 'định_tính' | 'định_lượng' | 'tạp_chất_và_độ_tinh_khiết'
+   - nhãn: 'CHUNG', 'PH', 'NƯỚC', 'MẤT KHỐI LƯỢNG', 'CẶN', 'TRO', 'KIM LOẠI', 'DUNG MÔI', 'ENDOTOXIN',
+     'TIỆT KHUẨN', 'ĐỘ TRONG', 'TỶ TRỌNG', 'GÓC QUAY', 'ĐỘ NHỚT', 'ĐỘ MỊN'
+
+HƯỚNG DẪN CHIẾN THUẬT QUAN TRỌNG:
+- LUÔN SỬ DỤNG `toLower()`: Để tìm kiếm không phân biệt hoa thường.
+- CÔNG THỨC HÓA HỌC: Nếu câu hỏi có kèm "(Khóa Hill ...: X; công thức gốc: P)", hãy lọc bằng
+  `(n.công_thức_hill = 'X' OR n.công_thức_hóa_học CONTAINS 'P')`: khóa Hill là chính (index), CONTAINS công thức gốc
+  là phương án phụ cho công thức viết khác; KHÔNG CONTAINS nguyên văn cả công thức (có thể bị cắt cụt).
+- CHIẾN THUẬT XÉ NHỎ (KEYWORD SHREDDING): Đối với các mô tả trong ngoặc [ ], TUYỆT ĐỐI KHÔNG sử dụng nguyên văn cả chuỗi dài. Hãy tách thành các từ khóa đơn lẻ và nối bằng `AND`.
+- ƯU TIÊN SỐ LIỆU: Nếu trong mô tả có số (nhiệt độ nóng chảy, điểm chảy, góc quay cực riêng, pH, nước), KHÔNG dùng CONTAINS '143' mà so sánh với thuộc tính số tương ứng.
+  Giá trị xấp xỉ (~143°C, khoảng 143°C): dùng sai số ±2, ví dụ `n.nhiệt_độ_nóng_chảy_max >= 141 AND n.nhiệt_độ_nóng_chảy_min <= 145`.
+  Khoảng giá trị (từ A đến B): dùng `_min >= A AND _max <= B`. Số thập phân viết bằng dấu chấm (-58.0, không phải -58,0).
+- CHỈ TRẢ VỀ PHẦN CẦN THIẾT: Khi hỏi về một chỉ tiêu cụ thể (pH, nước, tro, kim loại nặng, góc quay...), truy vấn node MỤC theo `nhãn` và RETURN m.nội_dung ORDER BY m.thứ_tự, KHÔNG RETURN cả chuỗi tạp_chất_và_độ_tinh_khiết.
+  Khi hỏi về cả một trường (định tính, định lượng...), chỉ RETURN đúng trường đó.
+"""
+
+
+# ==============================================================================
+# 1. KẾT NỐI & CHAIN (khởi tạo lười, dùng lại giữa các lần gọi)
+# ==============================================================================
+@lru_cache(maxsize=None)
+def memory_graph_store():
+    """
+    MemoryGraph kiêm GraphStore của langchain: GraphCypherQAChain kiểm tra isinstance(graph, GraphStore),
+    mà GraphStore là lớp thường (không phải ABC) nên không register được -> kế thừa cả hai.
+    """
+    from langchain_community.graphs.graph_store import GraphStore
+    from preprocessing.kgraph.memory_graph import MemoryGraph
+
+    class MemoryGraphStore(MemoryGraph, GraphStore):
+        pass
+
+    return MemoryGraphStore
+
+
+def load_memory_graph(csv_path):
+    """Đồ thị trong bộ nhớ (preprocessing/kgraph/memory_graph.py) thay cho Neo4j."""
+    graph_class = memory_graph_store()
+    start = time.perf_counter()
+    snapshot = config.get_settings()["kg_snapshot"]
+    if snapshot and os.path.exists(snapshot):
+        graph = graph_class.from_snapshot(snapshot)
+    else:
+        graph = graph_class.from_csv(csv_path)
+    print(f"✅ Đã nạp đồ thị vào bộ nhớ: {len(graph.props)} node, {graph.rel_count} quan hệ "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return graph
+
+
+@lru_cache(maxsize=None)
+def get_graph():
+    settings = config.get_settings()
+    if settings["graph_backend"] == "memory":
+        return load_memory_graph(settings["kg_csv"])
+
+    from langchain_community.graphs import Neo4jGraph
+    from experiments.schema_cache import load_cached_schema
+    # Không introspect schema khi khởi tạo: dùng snapshot data/cache/neo4j_schema.json,
+    # chỉ làm mới (ở luồng nền) khi số node/quan hệ hoặc phiên bản nạp KG thay đổi
+    graph = Neo4jGraph(url=settings["neo4j_uri"], username=settings["neo4j_user"],
+                       password=settings["neo4j_password"], refresh_schema=False)
+    schema_status = load_cached_schema(graph, on_refresh=update_chain_schema)
+    print(f"✅ Đã kết nối Neo4j! (schema: {schema_status})")
+    return graph
+
+
+def build_prompt():
+    from langchain_core.prompts import FewShotPromptTemplate, PromptTemplate
+    from experiments.example_bank import load_example_selector
+
+    example_prompt = PromptTemplate.from_template("User input: {question}\nCypher query: {query}")
+    return FewShotPromptTemplate(
+        example_selector=load_example_selector(k=FEW_SHOT_K, max_tokens=FEW_SHOT_MAX_TOKENS),
+        example_prompt=example_prompt,
+        prefix=PREFIX,
+        suffix="User input: {question}\nCypher query: ",
+        input_variables=["question"],
+    )
+
+
+@lru_cache(maxsize=None)
+def get_chain():
+    from experiments.kg_chain import KGCypherQAChain
+    from experiments.context_budget import ContextAssembler
+    from experiments.cypher_lint import load_schema
+    from experiments.query_plan import QueryPlanProfiler
+
+    settings = config.get_settings()
+    graph = get_graph()
+    # EXPLAIN/PROFILE chỉ có trên Neo4j
+    plan_mode = settings["query_plan_mode"] if settings["graph_backend"] == "neo4j" else "off"
+    return KGCypherQAChain.from_llm(
+        config.get_chat_model(),
+        graph=graph,
+        verbose=True,
+        cypher_prompt=build_prompt(),
+        allow_dangerous_requests=True,
+        context_assembler=ContextAssembler(token_budget=settings["context_token_budget"]),
+        # Kiểm tra Cypher tại máy trước khi gửi tới Neo4j, sai thì sinh lại 1 lần kèm lỗi
+        cypher_schema=load_schema(graph),
+        max_regenerations=1,
+        plan_profiler=None if plan_mode == "off" else QueryPlanProfiler(
+            graph, mode=plan_mode, profile_sample=settings["profile_sample"],
+            db_hit_budget=settings["db_hit_budget"], enforce=settings["plan_enforce"]),
+        return_intermediate_steps=True
+    )
+
+
+def update_chain_schema(g):
+    """Gọi khi schema được làm mới ở luồng nền -> cập nhật schema mà chain đang dùng."""
+    from experiments.cypher_lint import load_schema
+    if get_chain.cache_info().currsize:
+        chain = get_chain()
+        chain.graph_schema = g.get_schema
+        chain.cypher_schema = load_schema(g)
+
+
+# ==============================================================================
+# 2. HỎI ĐÁP MỘT CÂU
+# ==============================================================================
+def ask(question, chain=None, on_token=None):
+    """
+    Trả lời một câu hỏi. Trả về dict {answer, cypher, cypher_lint, query_plan,
+    context_tokens, spans, error}. on_token(text): nhận câu trả lời dạng stream.
+    """
+    from preprocessing.kgraph.formula import annotate_formula_question
+    from preprocessing.llm_backend import CassetteMiss
+    from experiments.spans import SpanRecorder
+
+    chain = chain or get_chain()
+    recorder = SpanRecorder()
+    steps = []
+    # Câu hỏi có công thức được gắn thêm khóa Hill để tra index
+    try:
+        with recorder.span("total"):
+            inputs = {chain.input_key: annotate_formula_question(question)}
+            if on_token is not None:
+                inputs["stream_to"] = on_token
+            response = chain.invoke(inputs)
+        answer = response.get('result', str(response))
+        steps = response.get('intermediate_steps', [])
+        context_stats = next((s["context_stats"] for s in steps if "context_stats" in s), None)
+        lint = next((s["lint"] for s in reversed(steps) if "lint" in s), None)
+        cypher = next((s["query"] for s in reversed(steps) if "query" in s), None)
+        query_plan = next((s["query_plan"] for s in reversed(steps) if "query_plan" in s), None)
+        error = None
+    except CassetteMiss:
+        # Replay thiếu lời gọi trong cassette: dừng hẳn, không chấm như câu trả lời sai
+        raise
+    except Exception as e:
+        answer = "Không tìm thấy trong DB."
+        context_stats, lint, cypher, query_plan = None, None, None, None
+        error = f"{type(e).__name__}: {e}"
+
+    if "I don't know" in str(answer) or not answer:
+        answer = "Không tìm thấy trong DB."
+    spans = next((s["spans"] for s in steps if "spans" in s), []) + recorder.spans
+    return {"answer": answer, "cypher": cypher, "cypher_lint": lint, "query_plan": query_plan,
+            "context_tokens": context_stats, "spans": spans, "error": error}
+
+
+# ==============================================================================
+# 3. HÀM ĐÁNH GIÁ (EVALUATION FUNCTION)
+# ==============================================================================
+def run_evaluation(dataset, label_name, chain=None, stopper=None):
+    """
+    Chạy đánh giá cho một bộ dữ liệu cụ thể.
+    stopper: sampling.EarlyStopper -> dừng khi khoảng tin cậy của metric đủ hẹp.
+    Trả về: (kết quả trung bình dict, danh sách logs chi tiết)
+    """
+    from experiments.scoring import ScoringPool, resolve_profile, average_scores
+    from experiments.sampling import stratum, summarize
+
+    chain = chain or get_chain()
+    print(f"\n🚀 BẮT ĐẦU CHẠY THỬ NGHIỆM: {label_name.upper()} ({len(dataset)} mẫu)")
+
+    failures = {"invalid_cypher": 0, "error": 0}
+    local_logs, strata = [], []
+    # Chấm điểm ở tiến trình nền, không chặn vòng lặp gọi LLM
+    scorer = ScoringPool(resolve_profile("rag"))
+
+    for i, x in enumerate(dataset):
+        print(f"\n🔹 [{label_name}] Câu hỏi {i+1}: {x['question']}")
+        result = ask(x["question"], chain)
+        query_plan, lint, error = result["query_plan"], result["cypher_lint"], result["error"]
+        context_stats = result["context_tokens"]
+
+        if query_plan:
+            cost = query_plan['db_hits'] if query_plan['db_hits'] is not None else query_plan['estimated_cost']
+            print(f"🔎 Plan ({query_plan['mode']}): cost={cost:.0f} | index={query_plan['index_used']}"
+                  f"{' | REJECTED' if query_plan.get('rejected') else ''}")
+
+        # Không nuốt lỗi im lặng: ghi lại Cypher không hợp lệ / lỗi khi chạy
+        if lint and lint["errors"]:
+            failures["invalid_cypher"] += 1
+            print(f"⚠️ Cypher không hợp lệ (đã sinh lại {lint['regenerations']} lần): {'; '.join(lint['errors'])}")
+        if error:
+            failures["error"] += 1
+            print(f"❌ Lỗi chain: {error}")
+
+        if context_stats:
+            print(f"🧮 Ngữ cảnh: {context_stats['tokens_in']} -> {context_stats['tokens_kept']} tokens "
+                  f"({context_stats['rows_in']} -> {context_stats['rows_kept']} dòng)")
+
+        print(f"✅ Trả lời: {result['answer']}")
+
+        reference = x["answer"]
+        candidate = result["answer"]
+        scorer.submit(reference, candidate)
+
+        local_logs.append({
+            "type": label_name,
+            "question": x["question"],
+            "question_type": x.get("question_type"),
+            "relation": x.get("relation"),
+            "answer_ground_truth": reference,
+            "answer_model": candidate,
+            "scores": None,
+            "context_tokens": context_stats,
+            "cypher": result["cypher"],
+            "cypher_lint": lint,
+            "query_plan": query_plan,
+            "spans": result["spans"],
+            "error": error
+        })
+        strata.append(stratum(x))
+
+        if stopper and stopper.should_stop(len(local_logs), scorer.done(), strata):
+            print(f"⏹️ Dừng sớm sau {len(local_logs)}/{len(dataset)} câu: {stopper.describe()}")
+            break
+
+        time.sleep(1) # Delay nhẹ tránh rate limit
+
+    all_scores = scorer.results()
+    for entry, scores in zip(local_logs, all_scores):
+        entry["scores"] = scores
+    avg_results = {**average_scores(all_scores), **failures, "scoring_profile": scorer.profile,
+                   "summary": summarize(all_scores, strata),
+                   "early_stop": stopper.settings() if stopper else None}
+    return avg_results, local_logs
+
+
+# ==============================================================================
+# 4. CHẠY THỰC NGHIỆM VÀ GHI FILE
+# ==============================================================================
+def write_results(path, averages, span_report=None):
+    """averages: {"1-hop": avg dict, "2-hop": avg dict}; span_report: spans.aggregate_spans(...)"""
+    from experiments.spans import format_span_report
+    from experiments.sampling import format_summary
+
+    with open(path, "w", encoding='utf-8') as f:
+        f.write("BÁO CÁO KẾT QUẢ BENCHMARK (PHÂN LOẠI HOP)\n")
+        f.write(f"Thời gian chạy: {time.ctime()}\n")
+        f.write("==================================================\n\n")
+        for i, (hop, avg) in enumerate(averages.items(), 1):
+            if i > 1:
+                f.write("--------------------------------------------------\n\n")
+            f.write(f"{i}. KẾT QUẢ {hop.upper()} (Số mẫu: {avg['count']})\n")
+            f.write(f"   - BLEU Score    : {avg['bleu']:.4f}\n")
+            f.write(f"   - ROUGE-L Score : {avg['rouge']:.4f}\n")
+            f.write(f"   - METEOR Score  : {avg['meteor']:.4f}\n")
+            f.write(f"   - Cypher lỗi    : {avg['invalid_cypher']} | Lỗi chain: {avg['error']}\n")
+            f.write(f"   - Cách chấm     : {avg.get('scoring_profile', 'rag')}\n")
+            if avg.get("early_stop"):
+                stop = avg["early_stop"]
+                f.write(f"   - Dừng sớm      : {'có' if stop['stopped'] else 'không'} "
+                        f"({stop['metric'].upper()}, mục tiêu độ rộng {stop['target_width']:g})\n")
+            if avg.get("summary"):
+                f.write(format_summary(avg["summary"]) + "\n")
+            f.write("\n")
+        if span_report:
+            f.write("--------------------------------------------------\n\n")
+            f.write(format_span_report(span_report) + "\n\n")
+        f.write("==================================================")
+
+
+def run_benchmark(hops=("1-hop", "2-hop"), max_questions=config.MAX_QUESTIONS, sampling=None, seed=None,
+                  early_stop=None):
+    """early_stop: tham số của sampling.EarlyStopper (None -> chạy đủ max_questions câu)."""
+    from experiments.query_plan import write_plan_report
+    from experiments.spans import aggregate_spans
+    from experiments.sampling import EarlyStopper
+    from preprocessing.profiling import stage
+
+    with stage("load_dataset"):
+        datasets = {hop: config.load_dataset(hop, max_questions, sampling, seed) for hop in hops}
+    for hop, data in datasets.items():
+        print(f"✅ {hop}: chạy {len(data)} câu hỏi")
+
+    config.ensure_output_dirs()
+    gemini_results_path = os.path.join(config.RESULTS_DIR, "gemini_results.txt")
+    gemini_log_path = os.path.join(config.LOGS_DIR, "gemini_log.json")
+
+    # --- CHẠY LẦN LƯỢT CÁC BỘ DATA ---
+    averages, full_logs = {}, {}
+    for hop, data in datasets.items():
+        stopper = EarlyStopper(**early_stop) if early_stop else None
+        with stage(f"rag:{hop}"):
+            averages[hop], full_logs[f"{hop.replace('-', '_')}_data"] = run_evaluation(data, hop, stopper=stopper)
+
+    # --- IN KẾT QUẢ RA MÀN HÌNH ---
+    print("\n" + "="*50)
+    print("🏆 TỔNG HỢP KẾT QUẢ BENCHMARK")
+    print("="*50)
+    for hop, avg in averages.items():
+        print(f"🔹 {hop.upper()} ({avg['count']} mẫu):")
+        print(f"   BLEU: {avg['bleu']:.4f} | ROUGE-L: {avg['rouge']:.4f} | METEOR: {avg['meteor']:.4f}")
+        print(f"   Cypher không hợp lệ: {avg['invalid_cypher']} | Lỗi chain: {avg['error']}")
+        _, lo, hi = avg["summary"]["overall"]["rouge"]
+        print(f"   ROUGE-L CI {avg['summary']['confidence']:.0%}: [{lo:.4f}, {hi:.4f}]")
+        print("-" * 50)
+
+    span_report = aggregate_spans([e for logs in full_logs.values() for e in logs], hop_key="type")
+    write_results(gemini_results_path, averages, span_report)
+    print(f"🎉 Đã lưu báo cáo tóm tắt vào: {gemini_results_path}")
+
+    with open(gemini_log_path, "w", encoding='utf-8') as f:
+        json.dump(full_logs, f, ensure_ascii=False, indent=4)
+    print(f"🎉 Đã lưu log chi tiết vào: {gemini_log_path}")
+
+    # --- BÁO CÁO KẾ HOẠCH TRUY VẤN (khi bật QUERY_PLAN_MODE) ---
+    if config.get_settings()["query_plan_mode"] != "off" and config.get_settings()["graph_backend"] == "neo4j":
+        plan_report_path = os.path.join(config.RESULTS_DIR, "query_plan_report.txt")
+        write_plan_report([e for logs in full_logs.values() for e in logs], plan_report_path)
+        print(f"🎉 Đã lưu báo cáo kế hoạch truy vấn vào: {plan_report_path}")
+
+    # --- BÁO CÁO THỐNG KÊ (so với báo cáo của lần chạy trước) ---
+    from experiments.report import write_report
+    with stage("report"):
+        print(f"📊 Báo cáo thống kê: {write_report([gemini_log_path], baseline='previous')[1]}")
+
+    if config.get_settings()["run_store"]:
+        from experiments.run_store import ingest_log
+        print(f"🗄️ Đã nạp vào kho các lần chạy: {ingest_log(gemini_log_path)}")
+    return averages, full_logs
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+
+from experiments import config
+from experiments.scoring import METRICS, iter_log_samples, entry_scores, entry_latency
+from experiments.sampling import bootstrap_ci
+from experiments.spans import percentile, PERCENTILES
+
+# ==============================================================================
+# BÁO CÁO THỐNG KÊ CỦA MỘT LẦN CHẠY (đọc log một lượt, chạy được sau mỗi lần eval)
+# ==============================================================================
+# Theo từng hop: điểm trung bình + khoảng tin cậy bootstrap, tách theo question_type và
+# relation; tỉ lệ thất bại (không tìm thấy trong DB / lỗi / từ chối trả lời); độ trễ
+# p50/p95/p99. Ghi ra JSON (<tên>.report.json) và văn bản (<tên>.report.txt); có baseline
+# (một .report.json khác hoặc log của lần chạy trước) thì ghi thêm phần so sánh.
+#   python -m experiments report logs/gemini_log.json --baseline results/gemini_log.report.json
+
+# Câu trả lời (chữ thường) bắt đầu bằng các chuỗi này được tính là thất bại
+FAILURE_PREFIXES = {
+    "not_found": ("không tìm thấy trong db",),
+    "error": ("lỗi:", "lỗi gemini", "❌"),
+    "refusal": ("tôi không biết", "i don't know", "i am sorry, i cannot answer"),
+}
+REPORT_SUFFIX = ".report.json"
+
+
+def failure_kind(entry, answer):
+    """None nếu câu trả lời hợp lệ, ngược lại một khóa của FAILURE_PREFIXES."""
+    if entry.get("error"):
+        return "error"
+    text = (answer or "").strip().lower()
+    if not text:
+        return "not_found"
+    for kind, prefixes in FAILURE_PREFIXES.items():
+        if text.startswith(prefixes):
+            return kind
+    return None
+
+
+class _Group:
+    """Tích lũy một nhóm câu hỏi: điểm từng câu (cho bootstrap) + số câu thất bại."""
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.values = {m: [] for m in METRICS}
+
+    def add(self, scores, failed):
+        self.count += 1
+        self.failures += failed
+        for m in METRICS:
+            if scores[m] is not None:
+                self.values[m].append(scores[m])
+
+    def summary(self, confidence, resamples, strata=None):
+        row = {"count": self.count, "failure_rate": self.failures / self.count if self.count else 0.0}
+        for m in METRICS:
+            values = self.values[m]
+            if values:
+                mean, lo, hi = bootstrap_ci(values, strata if strata and len(strata) == len(values) else None,
+                                            confidence, resamples)
+                row[m] = {"mean": mean, "lo": lo, "hi": hi}
+        return row
+
+
+def _by_size(groups):
+    return sorted(groups.items(), key=lambda kv: -kv[1].count)
+
+
+def build_report(paths, confidence=0.95, resamples=1000):
+    """Đọc các file log một lượt (từng bản ghi, không nạp cả file) -> dict báo cáo."""
+    from experiments.run_store import question_types, question_hash
+
+    types = None
+    hops = {}
+    for path in paths:
+        for sample in iter_log_samples(path):
+            entry = sample["entry"]
+            question_type, relation = entry.get("question_type"), entry.get("relation")
+            if question_type is None and sample["question"]:
+                # Log cũ chưa ghi question_type -> tra theo câu hỏi trong data/benchmark
+                types = question_types() if types is None else types
+                question_type, relation = types.get(question_hash(sample["question"]), (None, None))
+            hop = hops.setdefault(sample["hop"] or "all", {
+                "overall": _Group(), "question_type": {}, "relation": {}, "strata": [],
+                "failures": {}, "latency": [], "profile": sample["profile"],
+            })
+            kind = failure_kind(entry, sample["candidate"])
+            scores = entry_scores(entry)
+            for group in (hop["overall"], hop["question_type"].setdefault(question_type or "?", _Group()),
+                          hop["relation"].setdefault(relation or "?", _Group())):
+                group.add(scores, kind is not None)
+            if scores["rouge"] is not None:
+                hop["strata"].append(question_type or "?")
+            if kind:
+                hop["failures"][kind] = hop["failures"].get(kind, 0) + 1
+            latency = entry_latency(entry)
+            if latency is not None:
+                hop["latency"].append(latency)
+
+    report = {"sources": [os.path.abspath(p) for p in paths], "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "confidence": confidence, "hops": {}}
+    for name, hop in hops.items():
+        report["hops"][name] = {
+            "profile": hop["profile"],
+            # Khoảng tin cậy tổng: bootstrap phân tầng theo question_type
+            **hop["overall"].summary(confidence, resamples, hop["strata"]),
+            "failures": hop["failures"],
+            "latency_ms": {f"p{p}": percentile(hop["latency"], p) for p in PERCENTILES} if hop["latency"] else None,
+            "question_type": {k: g.summary(confidence, resamples) for k, g in _by_size(hop["question_type"])},
+            "relation": {k: g.summary(confidence, resamples) for k, g in _by_size(hop["relation"])},
+        }
+    return report
+
+
+def load_report(path):
+    """Baseline: file .report.json, hoặc log của lần chạy trước (dựng báo cáo từ log)."""
+    if path.endswith(REPORT_SUFFIX):
+        return config.load_json_data(path)
+    return build_report([path])
+
+
+# ------------------------------------------------------------------------------
+# Định dạng văn bản
+# ------------------------------------------------------------------------------
+NAMES = {"bleu": "BLEU", "rouge": "ROUGE-L", "meteor": "METEOR"}
+
+
+def _fmt_ci(row, m):
+    s = row.get(m)
+    return f"{s['mean']:.4f} [{s['lo']:.4f}, {s['hi']:.4f}]" if s else "-"
+
+
+def _overlaps(a, b):
+    return a["lo"] <= b["hi"] and b["lo"] <= a["hi"]
+
+
+def compare_reports(current, baseline, metric="rouge"):
+    """
+    {hop: {"metrics": {m: {before, after, delta, significant}}, "failure_rate": (trước, sau),
+    "latency_ms": (trước, sau), "question_type": [(tên, n, trước, sau, delta, significant)]}}.
+    significant: hai khoảng tin cậy không giao nhau.
+    """
+    diff = {}
+    for hop, cur in current["hops"].items():
+        base = baseline["hops"].get(hop)
+        if base is None:
+            continue
+        row = {"metrics": {}, "failure_rate": (base["failure_rate"], cur["failure_rate"]),
+               "latency_ms": (base.get("latency_ms"), cur.get("latency_ms")), "question_type": []}
+        for m in METRICS:
+            if m in cur and m in base:
+                row["metrics"][m] = {"before": base[m]["mean"], "after": cur[m]["mean"],
+                                     "delta": cur[m]["mean"] - base[m]["mean"],
+                                     "significant": not _overlaps(cur[m], base[m])}
+        for name, group in cur["question_type"].items():
+            before = base["question_type"].get(name)
+            if before and metric in group and metric in before:
+                row["question_type"].append((name, group["count"], before[metric]["mean"], group[metric]["mean"],
+                                             group[metric]["mean"] - before[metric]["mean"],
+                                             not _overlaps(group[metric], before[metric])))
+        row["question_type"].sort(key=lambda r: r[4])
+        diff[hop] = row
+    return diff
+
+
+def format_report(report, baseline=None, metric="rouge"):
+    lines = [
+        "BÁO CÁO THỐNG KÊ BENCHMARK",
+        f"Thời gian chạy: {report['generated_at']} | Khoảng tin cậy {report['confidence']:.0%} (bootstrap)",
+        "Nguồn: " + ", ".join(os.path.basename(p) for p in report["sources"]),
+        "==================================================",
+        "",
+    ]
+    for i, (hop, row) in enumerate(report["hops"].items(), 1):
+        if i > 1:
+            lines += ["--------------------------------------------------", ""]
+        lines.append(f"{i}. KẾT QUẢ {hop.upper()} (Số mẫu: {row['count']}, chấm theo: {row['profile']})")
+        lines.append(f"   - BLEU Score    : {_fmt_ci(row, 'bleu')}")
+        lines.append(f"   - ROUGE-L Score : {_fmt_ci(row, 'rouge')}")
+        lines.append(f"   - METEOR Score  : {_fmt_ci(row, 'meteor')}")
+        failures = ", ".join(f"{k} {v}" for k, v in sorted(row["failures"].items())) or "không có"
+        lines.append(f"   - Thất bại      : {row['failure_rate']:.1%} ({failures})")
+        if row["latency_ms"]:
+            p = row["latency_ms"]
+            lines.append(f"   - Độ trễ (ms)   : p50 {p['p50']:.0f} | p95 {p['p95']:.0f} | p99 {p['p99']:.0f}")
+        for key, title in (("question_type", "Theo question_type"), ("relation", "Theo relation")):
+            groups = row[key]
+            if len(groups) <= 1 and key == "relation":
+                continue
+            lines.append(f"   - {title} (số câu | thất bại | {NAMES[metric]}):")
+            for name, g in groups.items():
+                lines.append(f"       {name:<38} {g['count']:>4} | {g['failure_rate']:>6.1%} | {_fmt_ci(g, metric)}")
+        lines.append("")
+
+    if baseline is not None:
+        lines += ["==================================================",
+                  "SO VỚI BASELINE: " + ", ".join(os.path.basename(p) for p in baseline["sources"]),
+                  "(* = khoảng tin cậy không giao nhau)", ""]
+        diff = compare_reports(report, baseline, metric)
+        if not diff:
+            lines.append("   (không có hop chung với baseline)")
+        for hop, row in diff.items():
+            lines.append(f"[{hop}]")
+            for m, d in row["metrics"].items():
+                lines.append(f"   - {NAMES[m]:<8}: {d['before']:.4f} -> {d['after']:.4f} "
+                             f"({d['delta']:+.4f}){' *' if d['significant'] else ''}")
+            before, after = row["failure_rate"]
+            lines.append(f"   - Thất bại: {before:.1%} -> {after:.1%}")
+            before, after = row["latency_ms"]
+            if before and after:
+                lines.append(f"   - Độ trễ p50 / p95 (ms): {before['p50']:.0f} / {before['p95']:.0f} -> "
+                             f"{after['p50']:.0f} / {after['p95']:.0f}")
+            for name, n, b, a, delta, significant in row["question_type"]:
+                flag = " ⚠️" if delta < 0 and significant else ""
+                lines.append(f"       {name:<38} {n:>4} | {b:.4f} -> {a:.4f} ({delta:+.4f}){' *' if significant else ''}{flag}")
+        lines.append("")
+    lines.append("==================================================")
+    return "\n".join(lines)
+
+
+def write_report(paths, out=None, baseline=None, confidence=0.95):
+    """
+    Ghi <out>.report.json + <out>.report.txt (mặc định results/<tên log đầu>).
+    baseline="previous": so với báo cáo cũ cùng tên (nếu có) trước khi ghi đè.
+    Trả về (đường dẫn json, đường dẫn txt).
+    """
+    if out is None:
+        out = os.path.join(config.RESULTS_DIR, os.path.splitext(os.path.basename(paths[0]))[0])
+    json_path, text_path = out + REPORT_SUFFIX, out + ".report.txt"
+    if baseline == "previous":
+        baseline = json_path if os.path.exists(json_path) else None
+    baseline_report = load_report(baseline) if baseline else None
+
+    report = build_report(paths, confidence)
+    os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(text_path, "w", encoding="utf-8") as f:
+        f.write(format_report(report, baseline_report) + "\n")
+    return json_path, text_path
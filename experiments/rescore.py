@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+
+from experiments import config
+from experiments.scoring import (METRICS, METRIC_VERSIONS, iter_log_samples, resolve_profile, score_batch)
+
+# ==============================================================================
+# CHẤM LẠI ĐIỂM TỪ LOG CÓ SẴN (không gọi Gemini / Neo4j)
+# ==============================================================================
+# Đọc dần logs/gemini_log.json, logs/gemini_zero_shot_*.json, *.jsonl; chỉ chấm những cặp
+# (đáp án chuẩn, câu trả lời) chưa có trong cache. Khóa cache:
+#   "<metric>@<phiên bản>|<profile>|<hash đáp án chuẩn>|<hash câu trả lời>"
+# Đổi cách tính metric -> tăng METRIC_VERSIONS trong scoring.py, điểm cũ tự bị bỏ qua.
+
+CACHE_PATH = os.path.join(config.BASE_DIR, "data", "cache", "score_cache.jsonl")
+
+
+def text_hash(text):
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(metric, profile, reference, candidate):
+    return f"{metric}@{METRIC_VERSIONS[metric]}|{profile}|{text_hash(reference)}|{text_hash(candidate)}"
+
+
+class ScoreCache:
+    """Cache điểm từng mẫu (JSONL, chỉ ghi thêm)."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.scores = {}
+        self._pending = []
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.scores[entry["k"]] = entry["v"]
+
+    def get(self, key):
+        return self.scores.get(key)
+
+    def put(self, key, value):
+        self.scores[key] = value
+        self._pending.append(key)
+
+    def flush(self):
+        if not self.path or not self._pending:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for key in self._pending:
+                f.write(json.dumps({"k": key, "v": self.scores[key]}) + "\n")
+        self._pending = []
+
+
+def rescore_log(path, metrics=METRICS, profile="auto", workers=None, cache=None):
+    """
+    Chấm lại một log. Trả về {"path", "samples": [...], "by_hop": {hop: [điểm]},
+    "profiles", "hits", "misses", "seconds"}.
+    """
+    cache = cache or ScoreCache(None)
+    start = time.perf_counter()
+    samples, keys, missing = [], [], {}
+    for sample in iter_log_samples(path):
+        sample_profile = resolve_profile(sample["profile"]) if profile == "auto" else profile
+        sample["scoring_profile"] = sample_profile
+        sample_keys = {m: cache_key(m, sample_profile, sample["reference"], sample["candidate"]) for m in metrics}
+        for m, key in sample_keys.items():
+            if cache.get(key) is None:
+                missing.setdefault((sample["reference"], sample["candidate"], sample_profile), set()).add(m)
+        # Log có thể rất lớn -> không giữ lại nguyên bản ghi
+        sample.pop("entry", None)
+        samples.append(sample)
+        keys.append(sample_keys)
+
+    hits = sum(len(k) for k in keys) - sum(len(ms) for ms in missing.values())
+    if missing:
+        # Chấm theo nhóm metric còn thiếu (thường là tất cả hoặc đúng metric vừa đổi phiên bản)
+        groups = {}
+        for item, ms in missing.items():
+            groups.setdefault(tuple(m for m in metrics if m in ms), []).append(item)
+        for group_metrics, items in groups.items():
+            for (reference, candidate, sample_profile), scores in zip(
+                    items, score_batch(items, workers=workers, metrics=group_metrics)):
+                for m, value in scores.items():
+                    cache.put(cache_key(m, sample_profile, reference, candidate), value)
+        cache.flush()
+
+    by_hop = {}
+    for sample, sample_keys in zip(samples, keys):
+        sample["scores"] = {m: cache.get(key) for m, key in sample_keys.items()}
+        by_hop.setdefault(sample["hop"] or "all", []).append(sample["scores"])
+    return {
+        "path": path,
+        "samples": samples,
+        "by_hop": by_hop,
+        "profiles": sorted({s["scoring_profile"] for s in samples}),
+        "hits": hits,
+        "misses": sum(len(ms) for ms in missing.values()),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def format_rescore_report(result, metrics=METRICS):
+    names = {"bleu": "BLEU", "rouge": "ROUGE-L", "meteor": "METEOR"}
+    lines = [
+        f"BÁO CÁO TÍNH LẠI ĐIỂM: {result['path']}",
+        f"Thời gian chạy: {time.ctime()}",
+        f"Cách chấm: {', '.join(result['profiles'])} | Metric: "
+        + ", ".join(f"{names[m]} v{METRIC_VERSIONS[m]}" for m in metrics),
+        f"{len(result['samples'])} mẫu | cache: {result['hits']} có sẵn, {result['misses']} chấm mới | "
+        f"{result['seconds']:.1f}s",
+        "==================================================",
+    ]
+    for hop, score_list in result["by_hop"].items():
+        n = len(score_list)
+        parts = [f"{names[m]}: {sum(s[m] for s in score_list) / n:.4f}" for m in metrics]
+        lines.append(f"🔹 {str(hop).upper()} ({n} mẫu): " + " | ".join(parts))
+    return "\n".join(lines)
+
+
+def default_report_path(log_path):
+    name = os.path.splitext(os.path.basename(log_path))[0]
+    return os.path.join(config.RESULTS_DIR, f"rescored_{name}.txt")
@@ -0,0 +1,224 @@
+import os
+import time
+import sqlite3
+import hashlib
+
+from experiments import config
+
+# ==============================================================================
+# KHO LƯU CÁC LẦN CHẠY (SQLite) ĐỂ SO SÁNH / PHÁT HIỆN HỒI QUY
+# ==============================================================================
+# Mỗi lần chạy benchmark được nạp vào data/runs.sqlite (RUN_STORE): điểm + thời gian
+# của từng câu hỏi, kèm hop, question_type, relation. So sánh hai lần chạy:
+#   python -m experiments runs list
+#   python -m experiments runs compare <run A> <run B> [--metric rouge]
+# Log cũ không có question_type -> tra theo câu hỏi trong data/benchmark/*.json.
+# Benchmark có câu hỏi lặp lại: mỗi mẫu là một dòng, lần xuất hiện thứ k (occurrence) của một câu
+# ở lần chạy A được so với lần xuất hiện thứ k ở lần chạy B.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    mode TEXT,
+    label TEXT,
+    source TEXT,
+    created_at TEXT,
+    samples INTEGER
+);
+CREATE TABLE IF NOT EXISTS records (
+    run_id TEXT NOT NULL,
+    question_hash TEXT NOT NULL,
+    hop TEXT,
+    occurrence INTEGER NOT NULL DEFAULT 0,
+    question_type TEXT,
+    relation TEXT,
+    question TEXT,
+    bleu REAL,
+    rouge REAL,
+    meteor REAL,
+    latency_ms REAL,
+    error TEXT,
+    PRIMARY KEY (run_id, question_hash, hop, occurrence)
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id TEXT NOT NULL,
+    question_hash TEXT NOT NULL,
+    hop TEXT,
+    stage TEXT NOT NULL,
+    latency_ms REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_records_question ON records (question_hash);
+CREATE INDEX IF NOT EXISTS idx_records_hop ON records (hop, run_id);
+CREATE INDEX IF NOT EXISTS idx_records_type ON records (question_type, run_id);
+CREATE INDEX IF NOT EXISTS idx_stages_run ON stages (run_id, stage);
+"""
+
+METRICS = ("bleu", "rouge", "meteor")
+
+
+def question_hash(question):
+    from preprocessing.llm_backend import normalize_question
+    return hashlib.sha1(normalize_question(question).encode("utf-8")).hexdigest()[:16]
+
+
+def connect(path=None):
+    path = path or config.get_settings()["run_store"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    _migrate(db)
+    db.executescript(SCHEMA)
+    return db
+
+
+def _migrate(db):
+    """Kho cũ khóa records theo (run_id, question_hash, hop) -> thêm occurrence vào khóa chính."""
+    columns = [row[1] for row in db.execute("PRAGMA table_info(records)")]
+    if columns and "occurrence" not in columns:
+        with db:
+            db.execute("ALTER TABLE records RENAME TO records_old")
+            db.executescript(SCHEMA)
+            db.execute(f"INSERT INTO records ({', '.join(columns)}) SELECT {', '.join(columns)} FROM records_old")
+            db.execute("DROP TABLE records_old")
+
+
+def question_types():
+    """{question_hash: (question_type, relation)} từ các bộ benchmark có sẵn."""
+    types = {}
+    for path in config.DATASETS.values():
+        if os.path.exists(path):
+            for x in config.load_json_data(path):
+                types[question_hash(x["question"])] = (x.get("question_type"), x.get("relation"))
+    return types
+
+
+def ingest_logs(paths, run_id=None, label=None, db=None):
+    """
+    Nạp các file log (RAG / zero-shot / .jsonl) của CÙNG một lần chạy (vd. zero-shot ghi
+    mỗi hop một file). Nạp lại cùng run_id thì thay thế. Trả về run_id.
+    """
+    from experiments.scoring import iter_log_samples, entry_scores, entry_latency
+    from experiments.spans import per_question_totals
+
+    db = db or connect()
+    types = None
+    records, stages, mode, seen = [], [], None, {}
+    samples = (sample for path in paths for sample in iter_log_samples(path))
+    for sample in samples:
+        entry = sample["entry"]
+        mode = mode or sample["profile"]
+        qhash = question_hash(sample["question"])
+        hop = sample["hop"] or "all"
+        occurrence = seen[qhash, hop] = seen.get((qhash, hop), -1) + 1
+        question_type, relation = entry.get("question_type"), entry.get("relation")
+        if question_type is None:
+            types = question_types() if types is None else types
+            question_type, relation = types.get(qhash, (None, None))
+        scores = entry_scores(entry)
+        records.append((qhash, hop, occurrence, question_type, relation, sample["question"], *(scores[m] for m in METRICS),
+                        entry_latency(entry), entry.get("error")))
+        for stage, t in per_question_totals(entry.get("spans") or []).items():
+            stages.append((qhash, hop, stage, t["latency_ms"], t.get("prompt_tokens"), t.get("completion_tokens")))
+
+    mtime = max(os.path.getmtime(path) for path in paths)
+    run_id = run_id or f"{mode}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(mtime))}"
+    source = ";".join(os.path.abspath(path) for path in paths)
+    with db:
+        db.execute("DELETE FROM records WHERE run_id = ?", (run_id,))
+        db.execute("DELETE FROM stages WHERE run_id = ?", (run_id,))
+        inserted = db.executemany("INSERT INTO records (run_id, question_hash, hop, occurrence, question_type, "
+                                  "relation, question, bleu, rouge, meteor, latency_ms, error) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  [(run_id, *r) for r in records]).rowcount
+        db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                   (run_id, mode, label, source, time.strftime("%Y-%m-%d %H:%M:%S"), inserted))
+        db.executemany("INSERT INTO stages VALUES (?, ?, ?, ?, ?, ?, ?)", [(run_id, *s) for s in stages])
+    return run_id
+
+
+def ingest_log(path, run_id=None, label=None, db=None):
+    return ingest_logs([path], run_id, label, db)
+
+
+def list_runs(db=None):
+    db = db or connect()
+    return [dict(r) for r in db.execute("SELECT * FROM runs ORDER BY created_at DESC")]
+
+
+# ------------------------------------------------------------------------------
+# So sánh hai lần chạy
+# ------------------------------------------------------------------------------
+def question_deltas(run_a, run_b, metric="rouge", limit=10, db=None):
+    """Các câu hỏi thay đổi điểm nhiều nhất (b - a), tệ đi trước; bỏ câu thiếu điểm ở một trong hai lần."""
+    if metric not in METRICS:
+        raise ValueError(metric)
+    db = db or connect()
+    rows = db.execute(f"""
+        SELECT a.question, a.hop, a.question_type, a.{metric} AS before, b.{metric} AS after,
+               b.{metric} - a.{metric} AS delta, b.latency_ms - a.latency_ms AS latency_delta
+        FROM records a JOIN records b
+             ON a.question_hash = b.question_hash AND a.hop = b.hop AND a.occurrence = b.occurrence
+        WHERE a.run_id = ? AND b.run_id = ? AND a.{metric} IS NOT NULL AND b.{metric} IS NOT NULL
+        ORDER BY delta ASC LIMIT ?""", (run_a, run_b, limit))
+    return [dict(r) for r in rows]
+
+
+def type_regressions(run_a, run_b, metric="rouge", db=None):
+    """Điểm trung bình theo (hop, question_type) trên các câu có điểm ở cả hai lần chạy."""
+    if metric not in METRICS:
+        raise ValueError(metric)
+    db = db or connect()
+    rows = db.execute(f"""
+        SELECT a.hop, COALESCE(a.question_type, '?') AS question_type, COUNT(*) AS n,
+               AVG(a.{metric}) AS before, AVG(b.{metric}) AS after, AVG(b.{metric} - a.{metric}) AS delta,
+               SUM(b.{metric} < a.{metric}) AS worse, SUM(b.{metric} > a.{metric}) AS better
+        FROM records a JOIN records b
+             ON a.question_hash = b.question_hash AND a.hop = b.hop AND a.occurrence = b.occurrence
+        WHERE a.run_id = ? AND b.run_id = ? AND a.{metric} IS NOT NULL AND b.{metric} IS NOT NULL
+        GROUP BY a.hop, a.question_type ORDER BY delta ASC""", (run_a, run_b))
+    return [dict(r) for r in rows]
+
+
+def latency_shift(run_a, run_b, db=None):
+    """{stage: {"before": {p50,p95,p99}, "after": {...}}} từ bảng stages."""
+    from experiments.spans import percentile, PERCENTILES
+
+    db = db or connect()
+    shift = {}
+    for label, run_id in (("before", run_a), ("after", run_b)):
+        by_stage = {}
+        for row in db.execute("SELECT stage, latency_ms FROM stages WHERE run_id = ?", (run_id,)):
+            by_stage.setdefault(row["stage"], []).append(row["latency_ms"])
+        if "total" not in by_stage:
+            # Log cũ không có span -> thời gian cả câu hỏi ghi trong records
+            by_stage["total"] = [row[0] for row in db.execute(
+                "SELECT latency_ms FROM records WHERE run_id = ? AND latency_ms IS NOT NULL", (run_id,))]
+        by_stage = {stage: values for stage, values in by_stage.items() if values}
+        for stage, values in by_stage.items():
+            shift.setdefault(stage, {})[label] = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+    return shift
+
+
+def _fmt_percentiles(p):
+    return f"{p['p50']:.0f} / {p['p95']:.0f} / {p['p99']:.0f}" if p else "-"
+
+
+def format_comparison(run_a, run_b, metric="rouge", top=10, db=None):
+    db = db or connect()
+    lines = [f"SO SÁNH {run_a} -> {run_b} ({metric.upper()})", "=" * 50, "Theo question_type (tệ đi trước):"]
+    for r in type_regressions(run_a, run_b, metric, db):
+        flag = " ⚠️" if r["delta"] < 0 else ""
+        lines.append(f"   - [{r['hop']}] {r['question_type']:<35} n={r['n']:<4} {r['before']:.4f} -> "
+                     f"{r['after']:.4f} ({r['delta']:+.4f}, tệ {r['worse']} / tốt {r['better']}){flag}")
+    lines.append(f"\n{top} câu thay đổi nhiều nhất:")
+    for r in question_deltas(run_a, run_b, metric, top, db):
+        lines.append(f"   - {r['delta']:+.4f} [{r['hop']}|{r['question_type']}] {r['question'][:90]}")
+    shift = latency_shift(run_a, run_b, db)
+    if shift:
+        lines.append("\nĐộ trễ theo giai đoạn (ms, p50 / p95 / p99):")
+        for stage, s in shift.items():
+            lines.append(f"   - {stage:<18}: {_fmt_percentiles(s.get('before'))}  ->  "
+                         f"{_fmt_percentiles(s.get('after'))}")
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+import random
+
+from experiments.scoring import METRICS
+from experiments.spans import percentile
+
+# ==============================================================================
+# CHỌN MẪU PHÂN TẦNG + DỪNG SỚM THEO KHOẢNG TIN CẬY (bootstrap)
+# ==============================================================================
+# data[:200] của 1hop.json / 2hop.json bị lệch: file xếp theo thuốc và question_type nên
+# 200 câu đầu gần như chỉ có một loại câu hỏi. Thay vào đó:
+# - stratified: xáo trộn (theo seed) trong từng tầng question_type / relation rồi trộn các
+#   tầng xen kẽ, sao cho MỌI đoạn đầu của danh sách đều giữ đúng tỉ lệ các tầng.
+# - Dừng sớm: chạy dần theo thứ tự trên, cứ check_every câu tính khoảng tin cậy bootstrap
+#   (lấy mẫu lại trong từng tầng) của metric; đủ hẹp (<= target_width) thì dừng.
+# SAMPLING=head giữ cách cũ (data[:n]) để so sánh với các lần chạy trước.
+
+SAMPLING_METHODS = ("stratified", "head")
+
+
+def stratum(x):
+    """Tầng của một câu hỏi (hoặc một bản ghi log): question_type[/relation]."""
+    parts = [x.get("question_type") or "?"]
+    if x.get("relation") not in (None, "", "unknown"):
+        parts.append(x["relation"])
+    return "/".join(parts)
+
+
+def stratified_order(data, seed=42):
+    """
+    Toàn bộ data theo thứ tự phân tầng: phần tử thứ k của tầng h (đã xáo trộn) nằm ở vị trí
+    (k + u) / N_h, u ngẫu nhiên trong [0, 1) -> đoạn đầu n câu có ~ n * N_h / N câu của tầng h.
+    """
+    rng = random.Random(seed)
+    groups = {}
+    for x in data:
+        groups.setdefault(stratum(x), []).append(x)
+    keyed = []
+    for name in sorted(groups):
+        items = groups[name]
+        rng.shuffle(items)
+        keyed.extend(((k + rng.random()) / len(items), x) for k, x in enumerate(items))
+    keyed.sort(key=lambda t: t[0])
+    return [x for _, x in keyed]
+
+
+def sample(data, max_questions, method="stratified", seed=42):
+    if method not in SAMPLING_METHODS:
+        raise ValueError(f"❌ SAMPLING không hợp lệ: {method} (stratified | head)")
+    if method == "head":
+        return data[:max_questions]
+    return stratified_order(data, seed)[:max_questions]
+
+
+# ------------------------------------------------------------------------------
+# Khoảng tin cậy
+# ------------------------------------------------------------------------------
+def bootstrap_ci(values, strata=None, confidence=0.95, resamples=1000, seed=0):
+    """
+    (trung bình, cận dưới, cận trên) của giá trị trung bình. Có strata -> bootstrap phân tầng:
+    lấy mẫu lại trong từng tầng, giữ nguyên số câu mỗi tầng (đúng với cách chọn mẫu ở trên).
+    """
+    if not values:
+        return 0.0, 0.0, 0.0
+    groups = {}
+    for value, name in zip(values, strata or [None] * len(values)):
+        groups.setdefault(name, []).append(value)
+    groups = list(groups.values())
+    n = len(values)
+    rng = random.Random(seed)
+    means = []
+    for _ in range(resamples):
+        total = 0.0
+        for group in groups:
+            size = len(group)
+            total += sum(group[int(rng.random() * size)] for _ in range(size))
+        means.append(total / n)
+    alpha = (1 - confidence) / 2 * 100
+    return sum(values) / n, percentile(means, alpha), percentile(means, 100 - alpha)
+
+
+class EarlyStopper:
+    """
+    Quyết định dừng sớm một lần chạy:
+        stopper = EarlyStopper("rouge", target_width=0.05)
+        if stopper.should_stop(submitted, scored, strata): break
+    scored: {chỉ số câu: dict điểm} của các câu đã chấm xong (chấm nền có thể chậm hơn).
+    """
+
+    def __init__(self, metric="rouge", target_width=0.05, confidence=0.95, min_samples=30,
+                 check_every=10, resamples=500, seed=0):
+        if metric not in METRICS:
+            raise ValueError(metric)
+        self.metric = metric
+        self.target_width = target_width
+        self.confidence = confidence
+        self.min_samples = min_samples
+        self.check_every = check_every
+        self.resamples = resamples
+        self.seed = seed
+        self.last = None  # (n, trung bình, cận dưới, cận trên) của lần kiểm tra gần nhất
+        self.stopped = False
+
+    def should_stop(self, submitted, scored, strata):
+        if submitted < self.min_samples or submitted % self.check_every:
+            return False
+        indices = sorted(scored)
+        if len(indices) < self.min_samples:
+            return False
+        mean, lo, hi = bootstrap_ci([scored[i][self.metric] for i in indices], [strata[i] for i in indices],
+                                    self.confidence, self.resamples, self.seed)
+        self.last = (len(indices), mean, lo, hi)
+        self.stopped = hi - lo <= self.target_width
+        return self.stopped
+
+    def describe(self):
+        if self.last is None:
+            return "chưa kiểm tra"
+        n, mean, lo, hi = self.last
+        return (f"{self.metric.upper()} = {mean:.4f} [{lo:.4f}, {hi:.4f}] (rộng {hi - lo:.4f}, "
+                f"mục tiêu {self.target_width:g}, {n} câu)")
+
+    def settings(self):
+        return {"metric": self.metric, "target_width": self.target_width, "confidence": self.confidence,
+                "min_samples": self.min_samples, "check_every": self.check_every, "stopped": self.stopped}
+
+
+# ------------------------------------------------------------------------------
+# Báo cáo
+# ------------------------------------------------------------------------------
+def summarize(score_list, strata, confidence=0.95, resamples=1000, seed=0, metrics=METRICS):
+    """
+    {"count", "confidence", "overall": {metric: (mean, lo, hi)},
+     "strata": {tầng: {"count", metric: mean}}} -- strata[i] là tầng của score_list[i].
+    """
+    overall = {m: bootstrap_ci([s[m] for s in score_list], strata, confidence, resamples, seed)
+               for m in metrics}
+    groups = {}
+    for s, name in zip(score_list, strata):
+        groups.setdefault(name, []).append(s)
+    per_stratum = {
+        name: {"count": len(group), **{m: sum(s[m] for s in group) / len(group) for m in metrics}}
+        for name, group in sorted(groups.items(), key=lambda kv: -len(kv[1]))
+    }
+    return {"count": len(score_list), "confidence": confidence, "overall": overall, "strata": per_stratum}
+
+
+def format_summary(summary, metrics=METRICS, indent="   "):
+    names = {"bleu": "BLEU", "rouge": "ROUGE-L", "meteor": "METEOR"}
+    lines = [f"{indent}- Khoảng tin cậy {summary['confidence']:.0%} (bootstrap phân tầng):"]
+    for m in metrics:
+        mean, lo, hi = summary["overall"][m]
+        lines.append(f"{indent}    {names[m]:<8}: {mean:.4f} [{lo:.4f}, {hi:.4f}]")
+    lines.append(f"{indent}- Theo tầng (số câu | " + " | ".join(names[m] for m in metrics) + "):")
+    for name, s in summary["strata"].items():
+        lines.append(f"{indent}    {name:<38} {s['count']:>4} | " + " | ".join(f"{s[m]:.4f}" for m in metrics))
+    return "\n".join(lines)
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import threading
+
+# ==============================================================================
+# LƯU SNAPSHOT SCHEMA NEO4J RA ĐĨA (thay cho refresh_schema() mỗi lần khởi động)
+# ==============================================================================
+# refresh_schema() chạy các thủ tục introspection (apoc.meta...) -> tốn vài giây trên
+# đồ thị lớn. Ta lưu schema kèm "dấu vân tay" = số node + số quan hệ + phiên bản nạp
+# (create_KG.py ghi vào node KG_META). Còn khớp thì dùng lại ngay; lệch thì vẫn dùng
+# bản cũ để khởi động nhanh và làm mới ở luồng nền.
+# Node KG_META chỉ là metadata của lần nạp -> bị loại khỏi schema gửi cho LLM và khỏi cache.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_PATH = os.path.join(BASE_DIR, "data", "cache", "neo4j_schema.json")
+
+# count(n) / count(r) không điều kiện được Neo4j trả thẳng từ count store -> rất nhanh
+FINGERPRINT_QUERY = """
+CALL { MATCH (n) RETURN count(n) AS nodes }
+CALL { MATCH ()-[r]->() RETURN count(r) AS rels }
+OPTIONAL MATCH (m:KG_META)
+RETURN nodes, rels, m.phiên_bản_nạp AS version
+"""
+META_LABEL = "KG_META"
+
+
+def graph_fingerprint(graph):
+    row = graph.query(FINGERPRINT_QUERY)[0]
+    return f"{row['nodes']}:{row['rels']}:{row.get('version') or 'unknown'}"
+
+
+def strip_meta(graph):
+    """Bỏ nhãn KG_META khỏi graph.structured_schema rồi dựng lại graph.schema (văn bản gửi LLM)."""
+    structured = graph.structured_schema or {}
+    if META_LABEL not in structured.get("node_props", {}):
+        return
+    structured["node_props"] = {label: props for label, props in structured.get("node_props", {}).items()
+                                if label != META_LABEL}
+    structured["relationships"] = [rel for rel in structured.get("relationships", [])
+                                   if META_LABEL not in (rel.get("start"), rel.get("end"))]
+    metadata = structured.get("metadata") or {}
+    if "constraint" in metadata:
+        metadata["constraint"] = [c for c in metadata["constraint"]
+                                  if META_LABEL not in (c.get("labelsOrTypes") or [])]
+    if "index" in metadata:
+        metadata["index"] = [i for i in metadata["index"] if i.get("label") != META_LABEL]
+    graph.structured_schema = structured
+
+    from langchain_community.graphs.neo4j_graph import _format_schema
+    graph.schema = _format_schema(structured, getattr(graph, "_enhanced_schema", False))
+
+
+def _refresh_schema(graph):
+    graph.refresh_schema()
+    strip_meta(graph)
+
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(graph, fingerprint, path=SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": fingerprint,
+            "saved_at": time.time(),
+            "schema": graph.schema,
+            "structured_schema": graph.structured_schema,
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _refresh(graph, fingerprint, path, on_refresh):
+    try:
+        _refresh_schema(graph)
+        write_snapshot(graph, fingerprint, path)
+        if on_refresh:
+            on_refresh(graph)
+        print("✅ Đã làm mới schema Neo4j (nền).")
+    except Exception as e:
+        print(f"⚠️ Lỗi làm mới schema nền: {e}")
+
+
+def load_cached_schema(graph, path=SNAPSHOT_PATH, background=True, on_refresh=None):
+    """
+    Gán graph.schema / graph.structured_schema từ snapshot.
+    Trả về trạng thái: "cached" (khớp), "stale" (lệch, đang làm mới nền) hoặc "refreshed".
+    on_refresh(graph) được gọi sau khi schema mới đã sẵn sàng.
+    """
+    fingerprint = graph_fingerprint(graph)
+    snapshot = read_snapshot(path)
+
+    if snapshot:
+        graph.schema = snapshot["schema"]
+        graph.structured_schema = snapshot["structured_schema"]
+        strip_meta(graph)  # snapshot cũ có thể còn KG_META
+        if snapshot.get("fingerprint") == fingerprint:
+            return "cached"
+        if background:
+            threading.Thread(target=_refresh, args=(graph, fingerprint, path, on_refresh),
+                             daemon=True).start()
+            return "stale"
+
+    # Chưa có snapshot (hoặc không cho chạy nền) -> làm mới đồng bộ
+    _refresh_schema(graph)
+    write_snapshot(graph, fingerprint, path)
+    if on_refresh:
+        on_refresh(graph)
+    return "refreshed"
@@ -0,0 +1,374 @@
+import os
+import json
+from functools import lru_cache
+
+# ==============================================================================
+# TÍNH ĐIỂM BLEU / ROUGE-L / METEOR (nltk chỉ được import khi tính điểm)
+# ==============================================================================
+# BLEU: nltk. ROUGE-L, METEOR: experiments/metrics.py (LCS bit-parallel, METEOR ghi nhớ
+# stem / WordNet, cho kết quả như nltk).
+# Cả hai thực nghiệm chấm bằng cùng một cấu hình (SCORING_PROFILE, mặc định "shared")
+# để điểm RAG và zero-shot so sánh được với nhau:
+#   shared    : tách từ tiếng Việt (metrics.tokenize_vi), BLEU 4-gram, ROUGE-L trên token
+# Hai cấu hình cũ giữ lại để tính lại điểm của các lần chạy trước (SCORING_PROFILE=legacy):
+#   rag       : tách từ bằng str.split, BLEU bigram (0.5, 0.5, 0, 0), ROUGE-L của gói `rouge`
+#   zero_shot : nltk.word_tokenize trên chữ thường, BLEU 4-gram, ROUGE-L của gói `rouge`
+# Gói `rouge` lỗi trên văn bản dài -> dùng ROUGE-L tự cài thay vì tính 0 như trước.
+PROFILES = {
+    "shared": {"tokenizer": "vi", "lower": True, "bleu_weights": (0.25, 0.25, 0.25, 0.25), "rouge": "lcs"},
+    "rag": {"tokenizer": "split", "lower": False, "bleu_weights": (0.5, 0.5, 0, 0), "rouge": "package"},
+    "zero_shot": {"tokenizer": "nltk", "lower": True, "bleu_weights": (0.25, 0.25, 0.25, 0.25),
+                  "rouge": "package"},
+}
+METRICS = ("bleu", "rouge", "meteor")
+# Tăng phiên bản khi đổi cách tính một metric -> điểm đã cache (experiments/rescore.py) tự hết hiệu lực
+METRIC_VERSIONS = {"bleu": 1, "rouge": 2, "meteor": 2}
+EMPTY_SCORES = {"bleu": 0, "rouge": 0, "meteor": 0}
+# Dưới ngưỡng này chấm ngay trong tiến trình hiện tại (khởi động pool + nạp WordNet tốn ~1-2s)
+MIN_PARALLEL_BATCH = 64
+
+NLTK_RESOURCES = {"wordnet": "corpora/wordnet", "punkt": "tokenizers/punkt"}
+
+
+@lru_cache(maxsize=None)
+def ensure_nltk_data(names=("wordnet", "punkt")):
+    """Chỉ tải dữ liệu NLTK khi chưa có (tránh gọi mạng mỗi lần chạy)."""
+    import nltk
+    for name in names:
+        try:
+            nltk.data.find(NLTK_RESOURCES[name])
+        except LookupError:
+            nltk.download(name)
+
+
+def nltk_resources(profiles, metrics=METRICS):
+    """Dữ liệu NLTK cần cho các cấu hình / metric: wordnet cho METEOR, punkt chỉ cho tách từ nltk (zero_shot cũ)."""
+    names = ["wordnet"] if "meteor" in metrics else []
+    if any(PROFILES[profile]["tokenizer"] == "nltk" for profile in profiles):
+        names.append("punkt")
+    return tuple(names)
+
+
+@lru_cache(maxsize=None)
+def _backends():
+    # BLEU của nltk không cần tải dữ liệu
+    from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+    return sentence_bleu, SmoothingFunction().method1
+
+
+@lru_cache(maxsize=None)
+def _rouge_package():
+    from rouge import Rouge
+    return Rouge()
+
+
+def resolve_profile(experiment):
+    """Cấu hình chấm điểm của một thực nghiệm ("rag" | "zero_shot") theo SCORING_PROFILE."""
+    from experiments import config
+    profile = config.get_settings()["scoring_profile"]
+    if profile == "legacy":
+        return experiment
+    if profile not in PROFILES:
+        raise RuntimeError(f"❌ SCORING_PROFILE không hợp lệ: {profile} ({' | '.join(PROFILES)} | legacy)")
+    return profile
+
+
+def tokenize(text, profile="rag"):
+    return list(_tokenize_cached(text, profile))
+
+
+@lru_cache(maxsize=50000)
+def _tokenize_cached(text, profile):
+    # Đáp án chuẩn lặp lại nhiều lần (cùng câu hỏi ở nhiều lần chạy / nhiều cấu hình) -> tách từ một lần
+    config = PROFILES[profile]
+    if config["lower"]:
+        text = text.lower()
+    if config["tokenizer"] == "vi":
+        from experiments.metrics import tokenize_vi
+        return tuple(tokenize_vi(text))
+    if config["tokenizer"] == "nltk":
+        import nltk
+        ensure_nltk_data(("punkt",))
+        return tuple(nltk.word_tokenize(text))
+    return tuple(text.split())
+
+
+def score_answer(reference, candidate, profile="rag", metrics=METRICS):
+    """Trả về {"bleu", "rouge", "meteor"} (hoặc các metric được chọn) cho một cặp (đáp án chuẩn, câu trả lời)."""
+    if not reference or not candidate:
+        return {m: EMPTY_SCORES[m] for m in metrics}
+    from experiments.metrics import meteor
+
+    config = PROFILES[profile]
+    ref_tokens = tokenize(reference, profile)
+    cand_tokens = tokenize(candidate, profile)
+    scores = {}
+    if "bleu" in metrics:
+        sentence_bleu, smoothing = _backends()
+        scores["bleu"] = sentence_bleu([ref_tokens], cand_tokens, weights=config["bleu_weights"],
+                                       smoothing_function=smoothing)
+    if "rouge" in metrics:
+        scores["rouge"] = _rouge(reference, candidate, ref_tokens, cand_tokens, config)
+    if "meteor" in metrics:
+        scores["meteor"] = meteor(ref_tokens, cand_tokens)
+    return scores
+
+
+def _rouge(reference, candidate, ref_tokens, cand_tokens, config):
+    from experiments.metrics import rouge_l
+
+    r_score = None
+    if config["rouge"] == "package":
+        try:
+            if config["lower"]:
+                r_score = _rouge_package().get_scores(candidate.lower(), reference.lower())[0]["rouge-l"]["f"]
+            else:
+                r_score = _rouge_package().get_scores(candidate, reference)[0]["rouge-l"]["f"]
+        except Exception:
+            pass
+    if r_score is None:
+        r_score = rouge_l(ref_tokens, cand_tokens)
+    return r_score
+
+
+# ------------------------------------------------------------------------------
+# Chấm theo lô, song song nhiều tiến trình
+# ------------------------------------------------------------------------------
+def default_workers():
+    from experiments import config
+    return config.get_settings()["scoring_workers"] or os.cpu_count() or 1
+
+
+def _init_worker(profiles, metrics=METRICS):
+    _backends()
+    resources = nltk_resources(profiles, metrics)
+    if resources:
+        ensure_nltk_data(resources)
+
+
+def _process_pool(workers, profiles, metrics=METRICS):
+    """
+    Pool tiến trình khởi động bằng "spawn": fork sau khi client Gemini (grpc) đã chạy có thể treo
+    tiến trình con, còn spawn không kế thừa luồng / khóa của tiến trình cha.
+    Mỗi tiến trình chỉ nạp dữ liệu NLTK mà các cấu hình được chấm cần.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_worker,
+                               initargs=(tuple(profiles), tuple(metrics)),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def _score_chunk(chunk, metrics=METRICS):
+    return [score_answer(reference, candidate, profile, metrics) for reference, candidate, profile in chunk]
+
+
+def _chunks(items, n_chunks):
+    size = max(1, -(-len(items) // n_chunks))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def score_batch(pairs, profile="shared", workers=None, metrics=METRICS):
+    """
+    pairs: [(reference, candidate)] hoặc [(reference, candidate, profile)]. Trả về danh sách điểm
+    cùng thứ tự. Cặp trùng nhau chỉ chấm một lần; lô lớn chia cho một process pool.
+    """
+    from functools import partial
+
+    items = [tuple(p) if len(p) == 3 else (p[0], p[1], profile) for p in pairs]
+    unique = list(dict.fromkeys(items))
+    workers = default_workers() if workers is None else workers
+    if workers <= 1 or len(unique) < MIN_PARALLEL_BATCH:
+        scored = _score_chunk(unique, metrics)
+    else:
+        # Mỗi tiến trình nhận vài khối lớn (ít pickle), đáp án trùng trong khối dùng chung cache tách từ
+        with _process_pool(workers, sorted({item[2] for item in unique}), metrics) as pool:
+            scored = [s for chunk in pool.map(partial(_score_chunk, metrics=metrics), _chunks(unique, workers * 4))
+                      for s in chunk]
+    by_item = dict(zip(unique, scored))
+    return [dict(by_item[item]) for item in items]
+
+
+class ScoringPool:
+    """
+    Chấm điểm nền trong lúc vòng lặp gọi LLM tiếp tục chạy:
+        pool = ScoringPool("shared"); i = pool.submit(ref, cand); ...; scores = pool.results()
+    Pool tiến trình chỉ được tạo ở lần submit đầu tiên; workers <= 1 vẫn chấm ở một tiến trình
+    riêng để vòng lặp gọi LLM không bị chặn.
+    """
+
+    def __init__(self, profile="shared", workers=None):
+        self.profile = profile
+        self.workers = default_workers() if workers is None else workers
+        self._executor = None
+        self._futures = []
+
+    def submit(self, reference, candidate):
+        if self._executor is None:
+            self._executor = _process_pool(self.workers, (self.profile,))
+        future = self._executor.submit(score_answer, reference, candidate, self.profile)
+        self._futures.append(future)
+        return len(self._futures) - 1
+
+    def done(self):
+        """{chỉ số: điểm} của các câu đã chấm xong (không chờ), dùng để dừng sớm."""
+        return {i: f.result() for i, f in enumerate(self._futures) if f.done()}
+
+    def results(self):
+        """Chờ chấm xong, trả về danh sách điểm theo thứ tự submit."""
+        try:
+            return [f.result() for f in self._futures]
+        finally:
+            self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------------------------------------------------------------------
+# Đọc log của hai thực nghiệm về cùng một dạng
+# ------------------------------------------------------------------------------
+class _JsonStream:
+    """Đọc dần một file JSON lớn: lấy từng phần tử của mảng mà không nạp cả file."""
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Ký tự khác khoảng trắng tiếp theo ("" nếu hết file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        c = self.peek()
+        if c not in chars:
+            raise ValueError(f"JSON không hợp lệ: cần {chars!r}, gặp {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Số bị cắt ở cuối buffer ("1." | "5e3") -> chỉ nhận khi theo sau là dấu phân cách
+                if self.eof or (end < len(self.buf) and self.buf[end] in " \t\r\n,]}:"):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def array_items(self):
+        """Gọi sau khi đã đọc "[", sinh từng phần tử."""
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_json_records(path):
+    """
+    Sinh (nhóm, bản ghi) từ log: .jsonl (mỗi dòng một bản ghi), .json dạng [...] hoặc
+    {"nhóm": [...], ...}. Đọc tuần tự, không nạp cả file vào bộ nhớ.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield None, json.loads(line)
+            return
+        stream = _JsonStream(f)
+        if stream.expect("[{") == "[":
+            for record in stream.array_items():
+                yield None, record
+            return
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if stream.peek() == "[":
+                stream.pos += 1
+                for record in stream.array_items():
+                    yield key, record
+            else:
+                yield key, stream.value()
+            if stream.expect(",}") == "}":
+                return
+
+
+def iter_log_samples(path):
+    """
+    Log RAG   : {"1_hop_data": [...], "2_hop_data": [...]} (answer_ground_truth / answer_model)
+    Log zero-shot: [...] (ground_truth / model_answer / hop_type)
+    Log .jsonl: mỗi dòng một bản ghi theo một trong hai dạng trên
+    Sinh ra dict {hop, question, reference, candidate, profile, entry}.
+    """
+    for _, entry in iter_json_records(path):
+        if not isinstance(entry, dict):
+            continue
+        if "answer_model" in entry:
+            yield {"hop": entry.get("type"), "question": entry.get("question"),
+                   "reference": entry.get("answer_ground_truth", ""),
+                   "candidate": entry.get("answer_model", ""), "profile": "rag", "entry": entry}
+        else:
+            yield {"hop": entry.get("hop_type"), "question": entry.get("question"),
+                   "reference": entry.get("ground_truth", ""),
+                   "candidate": entry.get("model_answer", ""), "profile": "zero_shot", "entry": entry}
+
+
+def entry_scores(entry):
+    """{metric: điểm hoặc None} của một bản ghi log (RAG: "scores", zero-shot: "BLEU"...)."""
+    if isinstance(entry.get("scores"), dict):
+        return {m: entry["scores"].get(m) for m in METRICS}
+    return {m: entry.get(m.upper()) for m in METRICS}
+
+
+def entry_latency(entry):
+    """Thời gian cả câu hỏi (ms): span "total" nếu có, không thì trường "time" (giây) của zero-shot."""
+    for span in entry.get("spans") or []:
+        if span.get("stage") == "total":
+            return span.get("latency_ms")
+    return entry["time"] * 1000 if entry.get("time") is not None else None
+
+
+def average_scores(score_list):
+    n = len(score_list)
+    if not n:
+        return {"bleu": 0, "rouge": 0, "meteor": 0, "count": 0}
+    return {
+        "bleu": sum(s["bleu"] for s in score_list) / n,
+        "rouge": sum(s["rouge"] for s in score_list) / n,
+        "meteor": sum(s["meteor"] for s in score_list) / n,
+        "count": n,
+    }
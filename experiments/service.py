@@ -0,0 +1,320 @@
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# ==============================================================================
+# DỊCH VỤ HỎI ĐÁP (HTTP, asyncio + aiohttp)
+# ==============================================================================
+# Chain RAG (đồ thị Neo4j + chat model) được dựng MỘT lần lúc khởi động và giữ
+# nóng; mỗi request chỉ còn chi phí sinh Cypher / truy vấn / sinh câu trả lời.
+#
+#   POST /ask      {"question": "...", "mode": "rag" | "zero-shot"}
+#   POST /ask/stream  như /ask, trả NDJSON: {"token": ...} từng đoạn rồi dòng kết quả cuối
+#   GET  /health   trạng thái sẵn sàng + ping đồ thị
+#   GET  /metrics  bộ đếm, độ sâu hàng đợi, latency p50/p95/p99
+#
+# - Gộp request: các câu hỏi giống nhau (sau chuẩn hóa) đang chạy dùng chung một kết quả.
+# - Hàng đợi có giới hạn: đầy -> 503 + Retry-After (back-pressure), không xếp vô hạn.
+# - Timeout từng request -> 504; việc đang chạy vẫn tiếp tục cho các request đã gộp.
+# chain.invoke là đồng bộ nên chạy trong thread pool kích thước = số worker.
+
+MODES = ("rag", "zero-shot")
+LATENCY_WINDOW = 1000
+
+
+class Overloaded(Exception):
+    """Hàng đợi đầy."""
+
+
+class QAService:
+    def __init__(self, workers=4, queue_size=64, timeout=60.0):
+        self.workers = workers
+        self.timeout = timeout
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qa")
+        self.inflight = {}  # khóa câu hỏi -> Future
+        self.ready = False
+        self.error = None  # lỗi khởi động (dựng chain thất bại)
+        self.started_at = time.time()
+        self.counters = {"requests": 0, "coalesced": 0, "rejected": 0, "timeouts": 0,
+                         "errors": 0, "completed": 0, "streams": 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.ttfts = deque(maxlen=LATENCY_WINDOW)
+        self.active_streams = 0
+        self._tasks = []
+
+    # --- vòng đời ---
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            await loop.run_in_executor(self.executor, self._warm_up)
+        except Exception as e:
+            # Không để lỗi nằm im trong task nền: /health báo "failed" thay vì "warming" mãi
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"❌ Khởi động chain thất bại: {self.error}")
+            return
+        self.ready = True
+        print(f"✅ Chain đã sẵn sàng ({time.perf_counter() - start:.1f}s), {self.workers} worker")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    @staticmethod
+    def _warm_up():
+        # Đồ thị (driver Neo4j + schema) và chat model được cache trong rag.get_chain()
+        from experiments import rag
+        rag.get_chain()
+
+    # --- xử lý ---
+    @staticmethod
+    def _answer(question, mode, on_token=None):
+        if mode == "rag":
+            from experiments import rag
+            return rag.ask(question, on_token=on_token)
+        from experiments import zero_shot
+        return {"answer": zero_shot.ask(question, on_token=on_token)}
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, question, mode, future = await self.queue.get()
+            try:
+                result = await loop.run_in_executor(self.executor, self._answer, question, mode)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.inflight.pop(key, None)
+                self.queue.task_done()
+
+    async def ask(self, question, mode="rag"):
+        from preprocessing.llm_backend import question_key
+
+        self.counters["requests"] += 1
+        key = question_key(mode, question)
+        future = self.inflight.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            try:
+                self.queue.put_nowait((key, question, mode, future))
+            except asyncio.QueueFull:
+                self.counters["rejected"] += 1
+                raise Overloaded()
+            self.inflight[key] = future
+
+        start = time.perf_counter()
+        try:
+            # shield: hết giờ ở request này không hủy kết quả của request đã gộp
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        self.counters["completed"] += 1
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        return result
+
+    async def stream(self, question, mode="rag"):
+        """
+        Sinh ("token", text) ngay khi LLM trả về, cuối cùng ("result", dict kết quả).
+        Không gộp (mỗi client cần luồng riêng) nhưng vẫn tính vào sức chứa hàng đợi;
+        timeout áp dụng cho khoảng chờ giữa hai đoạn liên tiếp.
+        """
+        if self.queue.qsize() + self.active_streams >= self.queue.maxsize:
+            self.counters["rejected"] += 1
+            raise Overloaded()
+        self.counters["requests"] += 1
+        self.counters["streams"] += 1
+        self.active_streams += 1
+        loop = asyncio.get_running_loop()
+        tokens = asyncio.Queue()
+        done = object()
+
+        def run():
+            try:
+                return self._answer(question, mode,
+                                    on_token=lambda t: loop.call_soon_threadsafe(tokens.put_nowait, t))
+            finally:
+                loop.call_soon_threadsafe(tokens.put_nowait, done)
+
+        start = time.perf_counter()
+        first = True
+        try:
+            future = loop.run_in_executor(self.executor, run)
+            while True:
+                try:
+                    text = await asyncio.wait_for(tokens.get(), self.timeout)
+                except asyncio.TimeoutError:
+                    self.counters["timeouts"] += 1
+                    raise
+                if text is done:
+                    break
+                if first:
+                    self.ttfts.append((time.perf_counter() - start) * 1000)
+                    first = False
+                yield "token", text
+            try:
+                result = await future
+            except Exception:
+                self.counters["errors"] += 1
+                raise
+        finally:
+            self.active_streams -= 1
+        self.counters["completed"] += 1
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        yield "result", result
+
+    # --- quan sát ---
+    def health(self):
+        status = {"status": "ok" if self.ready else "failed" if self.error else "warming",
+                  "queue": self.queue.qsize(), "inflight": len(self.inflight)}
+        if self.error:
+            status["error"] = self.error
+        if self.ready:
+            from experiments import rag
+            try:
+                rag.get_graph().query("RETURN 1 AS ok")
+            except Exception as e:
+                status.update(status="degraded", graph_error=f"{type(e).__name__}: {e}")
+        return status
+
+    def metrics(self):
+        from experiments.spans import percentile
+
+        latencies = list(self.latencies)
+        return {
+            **self.counters,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "inflight": len(self.inflight),
+            "active_streams": self.active_streams,
+            "latency_ms": {f"p{p}": round(percentile(latencies, p), 1) for p in (50, 95, 99)},
+            "ttft_ms": {f"p{p}": round(percentile(list(self.ttfts), p), 1) for p in (50, 95, 99)},
+        }
+
+
+# ==============================================================================
+# HTTP
+# ==============================================================================
+def create_app(service):
+    from aiohttp import web
+
+    async def parse_request(request):
+        """-> (question, mode, None) hoặc (None, None, response lỗi)"""
+        try:
+            body = await request.json()
+        except ValueError:
+            return None, None, web.json_response({"error": "Body phải là JSON"}, status=400)
+        if not isinstance(body, dict):
+            return None, None, web.json_response({"error": "Body phải là object JSON"}, status=400)
+        question = (body.get("question") or "").strip()
+        mode = body.get("mode", "rag")
+        if not question or mode not in MODES:
+            return None, None, web.json_response({"error": "Cần 'question' và mode thuộc rag | zero-shot"},
+                                                 status=400)
+        if service.error:
+            return None, None, web.json_response({"error": f"Dịch vụ khởi động lỗi: {service.error}"},
+                                                 status=503)
+        if not service.ready:
+            return None, None, web.json_response({"error": "Dịch vụ đang khởi động"}, status=503,
+                                                 headers={"Retry-After": "5"})
+        return question, mode, None
+
+    async def handle_ask(request):
+        question, mode, error = await parse_request(request)
+        if error is not None:
+            return error
+        try:
+            result = await service.ask(question, mode)
+        except Overloaded:
+            return web.json_response({"error": "Hàng đợi đầy"}, status=503, headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            return web.json_response({"error": f"Quá {service.timeout:g}s"}, status=504)
+        except Exception as e:
+            return web.json_response({"error": f"{type(e).__name__}: {e}"}, status=500)
+        return web.json_response({"question": question, "mode": mode, **result},
+                                 dumps=_dumps)
+
+    async def handle_stream(request):
+        question, mode, error = await parse_request(request)
+        if error is not None:
+            return error
+        events = service.stream(question, mode)
+        try:
+            # Lấy sự kiện đầu trước khi gửi header -> quá tải vẫn trả được 503
+            first = await events.__anext__()
+        except Overloaded:
+            return web.json_response({"error": "Hàng đợi đầy"}, status=503, headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            return web.json_response({"error": f"Quá {service.timeout:g}s"}, status=504)
+        except Exception as e:
+            return web.json_response({"error": f"{type(e).__name__}: {e}"}, status=500)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8"})
+        await response.prepare(request)
+
+        async def send(kind, value):
+            line = {"token": value} if kind == "token" else {"question": question, "mode": mode, **value}
+            await response.write((_dumps(line) + "\n").encode("utf-8"))
+
+        try:
+            await send(*first)
+            async for kind, value in events:
+                await send(kind, value)
+        except asyncio.TimeoutError:
+            await response.write((_dumps({"error": f"Quá {service.timeout:g}s"}) + "\n").encode("utf-8"))
+        except Exception as e:
+            await response.write((_dumps({"error": f"{type(e).__name__}: {e}"}) + "\n").encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def handle_health(request):
+        loop = asyncio.get_running_loop()
+        status = await loop.run_in_executor(None, service.health)
+        return web.json_response(status, status=200 if status["status"] == "ok" else 503)
+
+    async def handle_metrics(request):
+        return web.json_response(service.metrics())
+
+    async def on_startup(app):
+        # Khởi động nền: /health trả "warming" trong lúc dựng chain, "failed" nếu lỗi
+        app["warm_up"] = asyncio.create_task(service.start())
+
+    async def on_cleanup(app):
+        await service.stop()
+
+    app = web.Application()
+    app.router.add_post("/ask", handle_ask)
+    app.router.add_post("/ask/stream", handle_stream)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def _dumps(obj):
+    import json
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+def serve(host="127.0.0.1", port=8000, workers=4, queue_size=64, timeout=60.0):
+    from aiohttp import web
+
+    service = QAService(workers=workers, queue_size=queue_size, timeout=timeout)
+    print(f"🚀 Dịch vụ hỏi đáp: http://{host}:{port} (POST /ask, GET /health, GET /metrics)")
+    web.run_app(create_app(service), host=host, port=port, print=None)
@@ -0,0 +1,175 @@
+import json
+import time
+from contextlib import contextmanager
+
+# ==============================================================================
+# ĐO THỜI GIAN / TOKEN THEO TỪNG GIAI ĐOẠN (spans)
+# ==============================================================================
+# Mỗi câu hỏi có một SpanRecorder riêng; mỗi giai đoạn (sinh Cypher, lint, Neo4j,
+# ghép ngữ cảnh, sinh câu trả lời) là một span {stage, latency_ms, ...}. Danh sách
+# span được ghi vào log từng câu và gộp thành p50/p95/p99 trong file kết quả.
+# prompt_tokens/completion_tokens là token của lời gọi LLM; context_tokens là số token
+# ngữ cảnh giữ lại sau khi ghép (ngân sách ngữ cảnh) -> báo cáo riêng, không cộng lẫn.
+
+STAGES = ("cypher_generation", "cypher_lint", "db", "context", "answer_generation", "generation", "total")
+PERCENTILES = (50, 95, 99)
+SUM_KEYS = ("prompt_tokens", "completion_tokens", "context_tokens", "rows", "result_bytes")
+
+
+class SpanRecorder:
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """with recorder.span("db") as s: ...; s["rows"] = 3"""
+        record = {"stage": stage, **attrs}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["latency_ms"] = (time.perf_counter() - start) * 1000
+            self.spans.append(record)
+
+
+def result_bytes(records):
+    return len(json.dumps(records, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def usage_from_message(message):
+    """Lấy (prompt_tokens, completion_tokens) từ AIMessage.usage_metadata (nếu có)."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens"), usage.get("output_tokens")
+
+
+def usage_from_llm_result(response):
+    """Lấy (prompt_tokens, completion_tokens) từ LLMResult của callback on_llm_end."""
+    prompt_tokens = completion_tokens = None
+    for generations in response.generations:
+        for generation in generations:
+            p, c = usage_from_message(getattr(generation, "message", None))
+            if p is not None:
+                prompt_tokens = (prompt_tokens or 0) + p
+            if c is not None:
+                completion_tokens = (completion_tokens or 0) + c
+    if prompt_tokens is None and response.llm_output:
+        usage = response.llm_output.get("token_usage") or response.llm_output.get("usage_metadata") or {}
+        prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens"))
+        completion_tokens = usage.get("completion_tokens", usage.get("output_tokens"))
+    return prompt_tokens, completion_tokens
+
+
+def make_token_handler(record):
+    """Callback langchain ghi số token của lời gọi LLM vào span `record`."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenUsageHandler(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs):
+            prompt_tokens, completion_tokens = usage_from_llm_result(response)
+            if prompt_tokens is not None:
+                record["prompt_tokens"] = record.get("prompt_tokens", 0) + prompt_tokens
+            if completion_tokens is not None:
+                record["completion_tokens"] = record.get("completion_tokens", 0) + completion_tokens
+
+    return TokenUsageHandler()
+
+
+def with_handler(callbacks, handler):
+    """Thêm handler vào callbacks (None, list hoặc CallbackManager) mà không sửa bản gốc."""
+    if callbacks is None:
+        return [handler]
+    if isinstance(callbacks, list):
+        return callbacks + [handler]
+    manager = callbacks.copy()
+    manager.add_handler(handler, inherit=True)
+    return manager
+
+
+# ------------------------------------------------------------------------------
+# Gộp: p50 / p95 / p99 theo giai đoạn và loại hop
+# ------------------------------------------------------------------------------
+def percentile(values, p):
+    """Percentile nội suy tuyến tính (giống numpy.percentile mặc định)."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def per_question_totals(spans):
+    """Cộng các span cùng giai đoạn trong một câu hỏi (vd. sinh Cypher lại 2 lần)."""
+    totals = {}
+    for s in spans:
+        t = totals.setdefault(s["stage"], {"latency_ms": 0.0, "calls": 0})
+        t["latency_ms"] += s.get("latency_ms", 0)
+        t["calls"] += 1
+        for key in SUM_KEYS:
+            if s.get(key) is not None:
+                t[key] = t.get(key, 0) + s[key]
+        if s.get("ttft_ms") is not None and "ttft_ms" not in t:
+            t["ttft_ms"] = s["ttft_ms"]
+    return totals
+
+
+def aggregate_spans(logs, hop_key="type"):
+    """
+    logs: các dict log có "spans". Trả về {hop: {stage: {"count", "latency_ms": {p50,p95,p99},
+    "prompt_tokens", "completion_tokens", "context_tokens", "rows", "result_bytes" (trung bình), "retries",
+    "ttft_ms": {p50,p95,p99} nếu câu trả lời được stream}}}.
+    """
+    grouped = {}
+    for entry in logs:
+        if not entry.get("spans"):
+            continue
+        hop = entry.get(hop_key) or "all"
+        for stage, t in per_question_totals(entry["spans"]).items():
+            grouped.setdefault(hop, {}).setdefault(stage, []).append(t)
+
+    report = {}
+    for hop, stages in grouped.items():
+        report[hop] = {}
+        for stage in sorted(stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            totals = stages[stage]
+            latencies = [t["latency_ms"] for t in totals]
+            row = {
+                "count": len(totals),
+                "latency_ms": {f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+                # Số lần gọi vượt quá 1 lần / câu = số lần thử lại / sinh lại
+                "retries": sum(t["calls"] - 1 for t in totals),
+            }
+            for key in SUM_KEYS:
+                values = [t[key] for t in totals if key in t]
+                if values:
+                    row[key] = sum(values) / len(values)
+            ttfts = [t["ttft_ms"] for t in totals if "ttft_ms" in t]
+            if ttfts:
+                row["ttft_ms"] = {f"p{p}": percentile(ttfts, p) for p in PERCENTILES}
+            report[hop][stage] = row
+    return report
+
+
+def format_span_report(report):
+    lines = ["ĐỘ TRỄ THEO GIAI ĐOẠN (ms) | p50 / p95 / p99 | token vào/ra, token ngữ cảnh, dòng, bytes trung bình"]
+    for hop, stages in report.items():
+        lines.append(f"[{hop}]")
+        for stage, row in stages.items():
+            lat = row["latency_ms"]
+            extra = []
+            if "prompt_tokens" in row or "completion_tokens" in row:
+                extra.append(f"tokens={row.get('prompt_tokens', 0):.0f}/{row.get('completion_tokens', 0):.0f}")
+            if "context_tokens" in row:
+                extra.append(f"context_tokens={row['context_tokens']:.0f}")
+            if "rows" in row:
+                extra.append(f"rows={row['rows']:.1f}")
+            if "result_bytes" in row:
+                extra.append(f"bytes={row['result_bytes']:.0f}")
+            if "ttft_ms" in row:
+                extra.append(f"ttft p50/p95={row['ttft_ms']['p50']:.0f}/{row['ttft_ms']['p95']:.0f}")
+            if row["retries"]:
+                extra.append(f"retries={row['retries']}")
+            lines.append(f"   - {stage:<18}: {lat['p50']:8.1f} / {lat['p95']:8.1f} / {lat['p99']:8.1f}"
+                         f"   (n={row['count']}{', ' + ', '.join(extra) if extra else ''})")
+    return "\n".join(lines)
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import warnings
+from functools import lru_cache, partial
+
+from experiments import config
+
+# ==============================================================================
+# ZERO-SHOT: HỎI THẲNG GEMINI, KHÔNG DÙNG KNOWLEDGE GRAPH
+# ==============================================================================
+
+PROMPT_TEMPLATE = """
+        Bạn là một dược sĩ lâm sàng và chuyên gia về Dược điển Việt Nam.
+        Hãy trả lời câu hỏi sau một cách chính xác, ngắn gọn và dựa trên kiến thức chuyên môn y dược.
+
+        - Trả lời thẳng vào vấn đề.
+        - Giữ độ chính xác cao về tên thuốc và công thức hóa học.
+
+        Câu hỏi: {question}
+        """
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    # temperature=0 để đánh giá tính chính xác; LLM_BACKEND=record|replay để ghi / phát lại
+    return config.get_chat_model()
+
+
+def get_gemini(text, span=None, on_token=None):
+    from experiments.spans import usage_from_message
+
+    if on_token is not None:
+        return stream_gemini(text, on_token, span)
+    # Trích xuất nội dung từ AIMessage object
+    response = get_llm().invoke([text])
+    if span is not None:
+        span["prompt_tokens"], span["completion_tokens"] = usage_from_message(response)
+    return response.content
+
+
+def stream_gemini(text, on_token, span=None):
+    """Gọi on_token(text) cho từng đoạn câu trả lời; span có thêm ttft_ms."""
+    from experiments.spans import usage_from_message
+
+    start = time.perf_counter()
+    parts = []
+    for chunk in get_llm().stream([text]):
+        if span is not None and getattr(chunk, "usage_metadata", None):
+            span["prompt_tokens"], span["completion_tokens"] = usage_from_message(chunk)
+        if not chunk.content:
+            continue
+        if not parts and span is not None:
+            span["ttft_ms"] = (time.perf_counter() - start) * 1000
+        parts.append(chunk.content)
+        on_token(chunk.content)
+    return "".join(parts)
+
+
+def call_model_with_retry(model_func, prompt, spans=None):
+    """
+    Mỗi lần thử là một span "generation" (số span > 1 = số lần thử lại).
+    Khi stream, token đầu đã gửi đi (span có "ttft_ms") thì không thử lại: gọi lại sẽ stream
+    câu trả lời thêm một lần nữa sau phần đã gửi -> ném lỗi cho bên nhận.
+    """
+    from experiments.spans import SpanRecorder
+
+    spans = spans or SpanRecorder()
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            with spans.span("generation", attempt=attempt) as span:
+                return model_func(prompt, span)
+        except Exception as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            if span.get("ttft_ms") is not None:
+                raise
+            print(f"Lỗi: {e}. Đang thử lại lần {attempt+1}...")
+            time.sleep(2)
+    return ""
+
+
+def ask(question, spans=None, on_token=None):
+    model_func = get_gemini if on_token is None else partial(get_gemini, on_token=on_token)
+    return call_model_with_retry(model_func, PROMPT_TEMPLATE.format(question=question), spans)
+
+
+# ============================
+# HÀM CHẠY EVALUATION
+# ============================
+def run_zero_shot(dataset_name, data, stopper=None):
+    """stopper: sampling.EarlyStopper -> dừng khi khoảng tin cậy của metric đủ hẹp."""
+    from tqdm import tqdm
+    from experiments.scoring import ScoringPool, resolve_profile
+    from experiments.sampling import stratum, summarize, format_summary
+    from experiments.spans import SpanRecorder, aggregate_spans, format_span_report
+
+    # Tắt cảnh báo
+    warnings.filterwarnings("ignore")
+    print(f"\n🚀 Bắt đầu Zero-shot {dataset_name} ({len(data)} câu hỏi)")
+
+    scores = {"BLEU": [], "ROUGE": [], "METEOR": []}
+    logs, strata = [], []
+    inference_times = []
+    # Chấm điểm ở tiến trình nền, không chặn vòng lặp gọi LLM
+    scorer = ScoringPool(resolve_profile("zero_shot"))
+
+    for x in tqdm(data, desc=f"{dataset_name}"):
+        spans = SpanRecorder()
+        start_time = time.time()
+        with spans.span("total"):
+            gemini_result = ask(x["question"], spans)
+        end_time = time.time()
+
+        inference_times.append(end_time - start_time)
+
+        reference = x["answer"]
+        scorer.submit(reference, gemini_result)
+
+        logs.append({
+            "hop_type": dataset_name,
+            "question": x["question"],
+            "question_type": x.get("question_type"),
+            "relation": x.get("relation"),
+            "ground_truth": reference,
+            "model_answer": gemini_result,
+            "time": end_time - start_time,
+            "spans": spans.spans
+        })
+        strata.append(stratum(x))
+
+        if stopper and stopper.should_stop(len(logs), scorer.done(), strata):
+            print(f"\n⏹️ Dừng sớm sau {len(logs)}/{len(data)} câu: {stopper.describe()}")
+            break
+
+    all_scores = scorer.results()
+    for entry, s in zip(logs, all_scores):
+        scores["BLEU"].append(s["bleu"])
+        scores["ROUGE"].append(s["rouge"])
+        scores["METEOR"].append(s["meteor"])
+        entry.update({"BLEU": s["bleu"], "ROUGE": s["rouge"], "METEOR": s["meteor"]})
+
+    # ============================
+    # GHI KẾT QUẢ
+    # ============================
+    avg_time = sum(inference_times) / len(inference_times) if inference_times else 0
+
+    config.ensure_output_dirs()
+    result_path = os.path.join(config.RESULTS_DIR, f"gemini_zero_shot_{dataset_name}.txt")
+    log_path = os.path.join(config.LOGS_DIR, f"gemini_zero_shot_{dataset_name}.json")
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        f.write(f"{dataset_name} Zero-shot Results\n")
+        f.write(f"Average inference time: {avg_time:.2f} seconds\n")
+        f.write(f"Scoring profile: {scorer.profile}\n")
+        if stopper:
+            f.write(f"Early stop: {stopper.describe() if stopper.stopped else 'no'} ({len(logs)}/{len(data)})\n")
+        f.write("\n")
+        for metric, values in scores.items():
+            f.write(f"{metric}: {sum(values)/len(values) if values else 0:.4f}\n")
+        f.write("\n" + format_summary(summarize(all_scores, strata), indent="") + "\n")
+        f.write("\n" + format_span_report(aggregate_spans(logs, hop_key="hop_type")) + "\n")
+
+    with open(log_path, "w", encoding="utf-8") as f:
+        json.dump(logs, f, ensure_ascii=False, indent=4)
+
+    print(f"✅ Hoàn thành {dataset_name} | Avg time: {avg_time:.2f}s")
+    print(f"📄 Results: {result_path}")
+    print(f"🧾 Logs: {log_path}")
+    return scores, logs
+
+
+def run_benchmark(hops=("1-hop", "2-hop"), max_questions=config.MAX_QUESTIONS, sampling=None, seed=None,
+                  early_stop=None):
+    """early_stop: tham số của sampling.EarlyStopper (None -> chạy đủ max_questions câu)."""
+    from experiments.sampling import EarlyStopper
+    from preprocessing.profiling import stage
+
+    results = {}
+    for hop in hops:
+        try:
+            data = config.load_dataset(hop, max_questions, sampling, seed)
+        except FileNotFoundError as e:
+            print(e)
+            continue
+        with stage(f"zero_shot:{hop}"):
+            results[hop] = run_zero_shot(hop, data, EarlyStopper(**early_stop) if early_stop else None)
+
+    if not results:
+        return results
+    log_paths = [os.path.join(config.LOGS_DIR, f"gemini_zero_shot_{hop}.json") for hop in results]
+
+    # Báo cáo thống kê gộp các hop, so với báo cáo của lần chạy trước
+    from experiments.report import write_report
+    out = os.path.join(config.RESULTS_DIR, "gemini_zero_shot")
+    with stage("report"):
+        print(f"📊 Báo cáo thống kê: {write_report(log_paths, out, baseline='previous')[1]}")
+
+    if config.get_settings()["run_store"]:
+        from experiments.run_store import ingest_logs
+        print(f"🗄️ Đã nạp vào kho các lần chạy: {ingest_logs(log_paths)}")
+    return results
@@ -1,10 +1,16 @@
-from utils import read_json, save_json
+import os
+import sys
 import re
-from collections import defaultdict
-from sklearn.metrics import jaccard_score
-from sklearn.preprocessing import MultiLabelBinarizer
+import time
+import argparse
 import warnings
-import os
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from utils import read_json, save_json
+from near_duplicates import find_near_duplicates
+from preprocessing.profiling import stage
 
 warnings.filterwarnings("ignore")
 
@@ -94,20 +100,83 @@ class QuestionProcessor:
         print(f"--- Đã lưu {len(self.merged_data)} câu hỏi vào: {self.output_file}")
 
 
+def merge_near_duplicates(filenames, threshold=0.8, answer_threshold=0.8, report_filename=None):
+    """
+    Gộp câu hỏi gần trùng (diễn đạt lại, lệch dấu câu trong []) trên tất cả các file cùng lúc
+    bằng MinHash + LSH: giữ câu xuất hiện sớm nhất (file đứng trước), xóa các câu còn lại khỏi file
+    của chúng và ghi báo cáo những gì đã gộp.
+    """
+    start = time.time()
+    files = [f for f in filenames if os.path.exists(f)]
+    data = {f: read_json(f) or [] for f in files}
+    items = [(f, i, item) for f in files for i, item in enumerate(data[f])]
+
+    groups, stats = find_near_duplicates([item for _, _, item in items], threshold, answer_threshold)
+
+    def describe(index):
+        f, _, item = items[index]
+        return {"file": os.path.basename(f), "question": item.get("question"),
+                "question_type": item.get("question_type"), "answer": item.get("answer")}
+
+    removed = {f: set() for f in files}
+    report_groups = []
+    for kept, merged in groups:
+        for index, _, _ in merged:
+            f, i, _ = items[index]
+            removed[f].add(i)
+        report_groups.append({
+            "kept": describe(kept),
+            "merged": [{**describe(index), "question_similarity": round(q_sim, 4),
+                        "answer_similarity": round(a_sim, 4)} for index, q_sim, a_sim in merged],
+        })
+
+    summary = {}
+    for f in files:
+        kept_items = [item for i, item in enumerate(data[f]) if i not in removed[f]]
+        summary[os.path.basename(f)] = {"before": len(data[f]), "after": len(kept_items)}
+        if removed[f]:
+            save_json(kept_items, f)
+
+    report = {"threshold": threshold, "answer_threshold": answer_threshold, **stats,
+              "seconds": round(time.time() - start, 3), "files": summary, "groups": report_groups}
+    if report_filename:
+        save_json(report, report_filename)
+    print(f"--- Gộp {stats['merged']} câu gần trùng ({stats['candidate_pairs']} cặp ứng viên, "
+          f"{stats['bands']} dải x {stats['rows']} hàng, {report['seconds']}s)")
+    for name, counts in summary.items():
+        print(f"    {name}: {counts['before']} -> {counts['after']}")
+    if report_filename:
+        print(f"--- Báo cáo gộp: {report_filename}")
+    return report
+
+
 def main(input_filename):
     if os.path.exists(input_filename):
         print(f"Đang xử lý gộp câu trả lời cho: {input_filename}")
         processor = QuestionProcessor(input_filename, input_filename)
-        processor.process_questions()
-        processor.save_processed_questions()
+        with stage(f"create_multi_answer:{os.path.basename(input_filename)}"):
+            processor.process_questions()
+            processor.save_processed_questions()
     else:
         print(f"Lỗi: Không tìm thấy file {input_filename}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bỏ trùng, gộp đáp án và gộp câu hỏi gần trùng giữa 1-hop / 2-hop")
+    parser.add_argument("--threshold", type=float, default=0.8,
+                        help="Jaccard tối thiểu giữa hai câu hỏi (khuôn câu + nội dung trong []) để gộp")
+    parser.add_argument("--answer-threshold", type=float, default=0.8,
+                        help="Jaccard tối thiểu giữa hai đáp án (đáp án khác nhau thì không gộp)")
+    parser.add_argument("--no-near-dup", action="store_true", help="Chỉ bỏ trùng hoàn toàn như trước")
+    parser.add_argument("--report", default='../../data/benchmark/dedup_report.json')
+    args = parser.parse_args()
+
     # KIỂM TRA LẠI: Tên file của bạn có dấu gạch dưới hay không?
     file_1hop = '../../data/benchmark/1hop.json' 
     file_2hop = '../../data/benchmark/2hop.json'
     
     main(file_1hop)
     main(file_2hop)
+    if not args.no_near_dup:
+        with stage("create_multi_answer:near_duplicates"):
+            merge_near_duplicates([file_1hop, file_2hop], args.threshold, args.answer_threshold, args.report)
     print("Hoàn tất quy trình hậu xử lý dữ liệu!")
\ No newline at end of file
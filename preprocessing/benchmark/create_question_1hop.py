@@ -5,6 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'
 
 from utils import read_json, save_json
 from preprocessing.llm import get_GPT
+from preprocessing.profiling import stage
 import warnings
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -205,13 +206,15 @@ if __name__ == "__main__":
         '../../data/benchmark/triples.json', 
         '../../data/benchmark/1hop_drug_to_X.json'
     )
-    generator1.run_processing()
+    with stage("create_question_1hop:drug_to_X"):
+        generator1.run_processing()
 
     generator2 = Question_X_to_hoatchat(
         '../../data/benchmark/triples.json', 
         '../../data/benchmark/1hop_X_to_drug.json'
     )
-    generator2.run_processing()
+    with stage("create_question_1hop:X_to_drug"):
+        generator2.run_processing()
 
     merge_json_files(
         '../../data/benchmark/1hop_drug_to_X.json', 
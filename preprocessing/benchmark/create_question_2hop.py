@@ -3,7 +3,6 @@ import os
 import warnings
 from collections import defaultdict
 from itertools import combinations
-from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 
@@ -11,10 +10,22 @@ import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from utils import read_json, save_json
-from preprocessing.llm import get_GPT
+from preprocessing.profiling import profiled
 
 warnings.filterwarnings("ignore")
 
+RELATION_DICT = {
+    "Ten_Latin": "tên_latin",
+    "Cong_Thuc_Hoa_Hoc": "công_thức_hóa_học",
+    "Mo_Ta_Chung": "mô_tả_chung",
+    "Tinh_Chat": "tính_chất",
+    "Dinh_Tinh": "định_tính",
+    "Dinh_Luong": "định_lượng",
+    "Bao_Quan": "bảo_quản",
+    "Loai_Thuoc": "loại_thuốc",
+    "Do_Hoa_Tan": "độ_hòa_tan"
+}
+
 def process_data(data, relation_dict):
     for item in data:
         if item['relation'] in relation_dict:
@@ -47,6 +58,9 @@ def create_question(i):
     return "NULL"
 
 def get_prompt(text):
+    # Import khi cần: ghép cặp / tạo câu hỏi mẫu không cần Gemini
+    from preprocessing.llm import get_GPT
+
     # Đã chuyển toàn bộ chỉ thị sang tiếng Việt để AI trả lời tiếng Việt
     prompt = f"""Bạn là một chuyên gia về dược phẩm và kiểm nghiệm thuốc.
             Hãy tạo một câu hỏi tiếng Việt tự nhiên, chuyên sâu dựa trên bản thảo thô sau: [{text}].
@@ -80,20 +94,8 @@ def process_item(i):
         return None
     return i
 
-def main(input_filename, output_filename):
-    relation_dict = {
-        "Ten_Latin": "tên_latin",
-        "Cong_Thuc_Hoa_Hoc": "công_thức_hóa_học",
-        "Mo_Ta_Chung": "mô_tả_chung",
-        "Tinh_Chat": "tính_chất",
-        "Dinh_Tinh": "định_tính",
-        "Dinh_Luong": "định_lượng",
-        "Bao_Quan": "bảo_quản",
-        "Loai_Thuoc": "loại_thuốc",
-        "Do_Hoa_Tan": "độ_hòa_tan"
-    }
-
-    json_data = read_json(input_filename)
+def build_pairs(json_data, relation_dict=RELATION_DICT):
+    """Triples -> các câu hỏi 2-hop mẫu (chưa qua LLM): ghép mọi cặp quan hệ của cùng hoạt chất."""
     processed_data = process_data(json_data, relation_dict)
 
     grouped_data = defaultdict(list)
@@ -129,6 +131,13 @@ def main(input_filename, output_filename):
             "question_type": f"{i['relation_1']}_to_{i['relation_2']}",
             "answer": i['tail_2'],
         })
+    return data_to_gpt
+
+@profiled("create_question_2hop")
+def main(input_filename, output_filename):
+    from tqdm import tqdm
+
+    data_to_gpt = build_pairs(read_json(input_filename))
 
     save_data = []
     with ThreadPoolExecutor(max_workers=10) as executor:
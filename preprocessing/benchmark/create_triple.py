@@ -1,7 +1,12 @@
-import pandas as pd
+import os
+import sys
 import json
+import pandas as pd
 import numpy as np
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from preprocessing.profiling import stage
+
 def create_list_of_dicts(df):
     result = []
     for _, row in df.iterrows():
@@ -27,16 +32,18 @@ def create_list_of_dicts(df):
                 })
     return result
 
-# Đổi tên file CSV đầu vào của bạn tại đây
-df = pd.read_csv("../../data/data_midterm.csv") 
+if __name__ == "__main__":
+    # Đổi tên file CSV đầu vào của bạn tại đây
+    df = pd.read_csv("../../data/data_midterm.csv") 
 
-# Tạo danh sách triples
-list_of_dicts = create_list_of_dicts(df)
+    # Tạo danh sách triples
+    with stage("create_triple"):
+        list_of_dicts = create_list_of_dicts(df)
 
-# Lưu vào đúng đường dẫn mà file create_question_1hop.py sẽ đọc
-output_file = '../../data/benchmark/triples.json'
+    # Lưu vào đúng đường dẫn mà file create_question_1hop.py sẽ đọc
+    output_file = '../../data/benchmark/triples.json'
 
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(list_of_dicts, f, ensure_ascii=False, indent=4)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(list_of_dicts, f, ensure_ascii=False, indent=4)
 
-print(f"Đã tạo xong file triples tại: {output_file}")
\ No newline at end of file
+    print(f"Đã tạo xong file triples tại: {output_file}")
\ No newline at end of file
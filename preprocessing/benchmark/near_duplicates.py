@@ -0,0 +1,156 @@
+import re
+import zlib
+import random
+import unicodedata
+from array import array
+
+# ==============================================================================
+# TÌM CÂU HỎI GẦN TRÙNG BẰNG MINHASH + LSH (không so từng cặp O(n²))
+# ==============================================================================
+# Mỗi câu hỏi -> tập shingle: bigram từ của khuôn câu (nội dung trong [] thay bằng "[]") và
+# 4-gram ký tự của nội dung trong ngoặc. Hai câu diễn đạt lại cùng một ý ("Với dược chất có công
+# thức [X], ..." / "Đối với dược chất có công thức [X], ...") hoặc chỉ lệch dấu câu / khoảng trắng
+# trong ngoặc có Jaccard cao.
+#
+# MinHash: chữ ký NUM_PERM giá trị, P(chữ ký trùng ở một vị trí) = Jaccard. LSH chia chữ ký thành
+# b dải x r hàng, hai câu thành cặp ứng viên khi trùng trọn một dải: P = 1 - (1 - J^r)^b. (b, r)
+# chọn theo ngưỡng để ít bỏ sót; mọi cặp ứng viên được kiểm lại bằng Jaccard chính xác và đáp án
+# phải gần giống nhau (tránh gộp "[Paracetamol]" với "[Paracetamol natri]" khi đáp án khác).
+
+NUM_PERM = 64
+MERSENNE = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+CHAR_NGRAM = 4
+MAX_BUCKET_COMPARE = 64  # dải có quá nhiều câu (khuôn rất phổ biến) chỉ so với các câu gần đó
+MISSING = "không có thông tin"
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFC", str(text)).lower()
+    text = re.sub(r"[^\w\s\[\]]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def question_shingles(question):
+    """Tập shingle (chuỗi) của câu hỏi: khuôn câu + nội dung trong ngoặc."""
+    text = normalize(question)
+    brackets = re.findall(r"\[(.*?)\]", text)
+    template = re.sub(r"\[.*?\]", " [] ", text).split()
+    shingles = {f"w:{a} {b}" for a, b in zip(template, template[1:])} or {f"w:{w}" for w in template}
+    for content in brackets:
+        content = f" {content.strip()} "
+        if len(content) <= CHAR_NGRAM:
+            shingles.add(f"c:{content}")
+        shingles.update(f"c:{content[i:i + CHAR_NGRAM]}" for i in range(len(content) - CHAR_NGRAM + 1))
+    return shingles
+
+
+def answer_tokens(answer):
+    text = normalize(answer)
+    return set() if text in ("", MISSING) else set(text.split())
+
+
+def jaccard(set1, set2):
+    if not set1 and not set2:
+        return 1.0
+    if not set1 or not set2:
+        return 0.0
+    return len(set1 & set2) / len(set1 | set2)
+
+
+class MinHasher:
+    """
+    Họ hoán vị (a*h + b) mod (2^61 - 1) trên crc32 của shingle; cùng seed -> cùng chữ ký.
+    Shingle lặp lại rất nhiều giữa các câu (khuôn câu, tên hoạt chất) nên vector NUM_PERM giá trị
+    của mỗi shingle được tính một lần (array 'Q', ~0,5 KB) và chữ ký là min theo từng vị trí.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.perms = [(rng.randrange(1, MERSENNE), rng.randrange(0, MERSENNE)) for _ in range(num_perm)]
+        self._vectors = {}
+
+    def _vector(self, shingle):
+        vector = self._vectors.get(shingle)
+        if vector is None:
+            h = zlib.crc32(shingle.encode("utf-8"))
+            vector = self._vectors[shingle] = array("Q", [((a * h + b) % MERSENNE) & MAX_HASH
+                                                          for a, b in self.perms])
+        return vector
+
+    def signature(self, shingles):
+        if not shingles:
+            return (MAX_HASH,) * self.num_perm
+        return tuple(map(min, zip(*[self._vector(s) for s in shingles])))
+
+
+def lsh_params(threshold, num_perm=NUM_PERM, fp_weight=0.2, fn_weight=0.8, steps=200):
+    """
+    (dải, hàng) với dải * hàng <= num_perm, cực tiểu trọng số diện tích dương tính giả / âm tính
+    giả quanh ngưỡng. Mặc định nặng về tránh bỏ sót vì cặp ứng viên luôn được kiểm lại.
+    """
+    def probability(s, b, r):
+        return 1 - (1 - s ** r) ** b
+
+    best, best_error = (1, num_perm), float("inf")
+    for b in range(1, num_perm + 1):
+        for r in range(1, num_perm // b + 1):
+            fp = sum(probability(threshold * (i + 0.5) / steps, b, r) for i in range(steps)) * threshold / steps
+            width = 1 - threshold
+            fn = sum(1 - probability(threshold + width * (i + 0.5) / steps, b, r)
+                     for i in range(steps)) * width / steps
+            error = fp_weight * fp + fn_weight * fn
+            if error < best_error:
+                best, best_error = (b, r), error
+    return best
+
+
+def find_near_duplicates(items, threshold=0.8, answer_threshold=0.8, num_perm=NUM_PERM, seed=1):
+    """
+    items: danh sách dict có "question", "answer". Trả về (nhóm, thống kê):
+    nhóm = [(chỉ số giữ lại, [(chỉ số bị gộp, jaccard câu hỏi, jaccard đáp án), ...]), ...]; mọi câu bị gộp
+    đạt cả hai ngưỡng so với câu giữ lại của nhóm.
+    """
+    hasher = MinHasher(num_perm, seed)
+    bands, rows = lsh_params(threshold, num_perm)
+    shingles = [question_shingles(item.get("question", "")) for item in items]
+    answers = [answer_tokens(item.get("answer", "")) for item in items]
+
+    buckets = {}
+    for i, sets in enumerate(shingles):
+        signature = hasher.signature(sets)
+        for band in range(bands):
+            key = (band, signature[band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(i)
+
+    # Cặp ứng viên đạt cả hai ngưỡng: {j: [(i, jaccard câu hỏi, jaccard đáp án)]} với i < j
+    checked, neighbours = set(), {}
+    for members in buckets.values():
+        for pos in range(1, len(members)):
+            j = members[pos]
+            for i in members[max(0, pos - MAX_BUCKET_COMPARE):pos]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                q_sim = jaccard(shingles[i], shingles[j])
+                if q_sim < threshold:
+                    continue
+                a_sim = jaccard(answers[i], answers[j])
+                if a_sim >= answer_threshold:
+                    neighbours.setdefault(j, []).append((i, q_sim, a_sim))
+
+    # Không gộp bắc cầu: câu j chỉ vào nhóm của câu giữ lại i khi chính cặp (i, j) đạt cả hai ngưỡng
+    # (A≈C, B≈C nhưng A≉B -> C vào nhóm A, B vẫn được giữ). Duyệt theo thứ tự -> câu giữ lại là câu
+    # sớm nhất; nhiều nhóm phù hợp thì chọn nhóm giống nhất.
+    groups, merged_into = {}, {}
+    for j in range(len(items)):
+        matches = [m for m in neighbours.get(j, []) if m[0] not in merged_into]
+        if matches:
+            i, q_sim, a_sim = max(matches, key=lambda m: (m[1], m[2], -m[0]))
+            merged_into[j] = i
+            groups.setdefault(i, []).append((j, q_sim, a_sim))
+    stats = {"items": len(items), "bands": bands, "rows": rows, "num_perm": num_perm,
+             "buckets": len(buckets), "candidate_pairs": len(checked),
+             "merged": len(merged_into)}
+    return sorted(groups.items()), stats
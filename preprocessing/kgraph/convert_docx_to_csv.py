@@ -1,7 +1,9 @@
-import docx
-import pandas as pd
 import re
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from preprocessing.profiling import stage
 
 # --- 1. CÁC HÀM XỬ LÝ TEXT ---
 
@@ -22,7 +24,8 @@ def clean_text(text):
 def extract_chemical_formula(text):
     if not text: return ""
     text = normalize_chemistry_text(text)
-    match = re.search(r'\bC\d+H\d+[A-Z0-9\(\)\.]*(\.[\d\/]*H\d*[A-Z0-9]*)?(\.[\d\/]*[A-Z][a-z]?[A-Z0-9]*)?\b', text)
+    # Cho phép chữ thường (Na, Cl) và hệ số phân số (".1/2H2O") để không bị cắt cụt thành "C14H18N6O2.1"
+    match = re.search(r'\bC\d+H\d+[A-Za-z0-9\(\)\.\/]*(\.[\d\/]*H\d*[A-Z0-9]*)?(\.[\d\/]*[A-Z][a-z]?[A-Z0-9]*)?\b', text)
     if match:
         formula = match.group(0)
         if len(formula) > 3 and any(c.isdigit() for c in formula):
@@ -39,6 +42,10 @@ def is_image_line(text):
 # --- 2. HÀM ĐỌC DOCX ---
 
 def parse_docx_to_df(docx_path):
+    # docx / pandas chỉ cần khi đọc file thật (parse_drug_text dùng được không cần chúng)
+    import docx
+    import pandas as pd
+
     filename = os.path.basename(docx_path)
     print(f"--> Đang đọc file: {filename}")
     
@@ -49,12 +56,18 @@ def parse_docx_to_df(docx_path):
     doc = docx.Document(docx_path)
     full_text = "\n".join([p.text for p in doc.paragraphs])
     
-    # Logic tách thuốc (Hybrid)
     if '</break>' in full_text:
         print("    [Info] Chế độ tách: Thẻ </break>")
-        raw_drugs = full_text.split('</break>')
     else:
         print("    [Info] Chế độ tách: Regex số thứ tự")
+    return pd.DataFrame(parse_drug_text(full_text))
+
+def parse_drug_text(full_text):
+    """Toàn văn Dược điển (nối các đoạn của docx) -> danh sách dict, mỗi thuốc một dict."""
+    # Logic tách thuốc (Hybrid)
+    if '</break>' in full_text:
+        raw_drugs = full_text.split('</break>')
+    else:
         raw_drugs = re.split(r'\n(?=\d+\.\d+\.)', full_text)
 
     data = []
@@ -169,15 +182,18 @@ def parse_docx_to_df(docx_path):
 
         data.append(current_drug)
     
-    return pd.DataFrame(data)
+    return data
 
 # --- 3. HÀM GỘP FILE ---
 
 def merge_all_files(list_docx_files, output_csv):
+    import pandas as pd
+
     all_data = []
     
     for file_path in list_docx_files:
-        data_from_file = parse_single_docx(file_path) # Đổi tên gọi hàm cho khớp
+        with stage(f"parse:{os.path.basename(file_path)}"):
+            data_from_file = parse_single_docx(file_path) # Đổi tên gọi hàm cho khớp
         all_data.extend(data_from_file.to_dict('records'))
         
     df = pd.DataFrame(all_data)
@@ -238,4 +254,5 @@ if __name__ == "__main__":
         print(f"LỖI: Vẫn không tìm thấy thư mục: {data_folder}")
         print("Hãy đảm bảo thư mục 'data' nằm cùng cấp với thư mục 'preprocessing'.")
     else:
-        merge_all_files(files, output)
\ No newline at end of file
+        with stage("convert_docx_to_csv"):
+            merge_all_files(files, output)
\ No newline at end of file
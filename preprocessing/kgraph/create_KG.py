@@ -1,7 +1,14 @@
 from py2neo import Graph, Node, Relationship
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import math
+import os
+import sys
+import time
+
+# Thêm thư mục gốc vào sys.path để dùng chung module trong preprocessing.kgraph
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from preprocessing.kgraph.kg_records import row_records, index_statements
+from preprocessing.profiling import stage
 
 # ==========================================
 # 1. CẤU HÌNH & KẾT NỐI
@@ -13,7 +20,7 @@ try:
     print("✅ Đã kết nối Neo4j thành công!")
 except Exception as e:
     print(f"❌ Lỗi kết nối Neo4j: {e}")
-    exit()
+    sys.exit(1)
 
 def clear_graph():
     """Xóa toàn bộ dữ liệu cũ trong Database"""
@@ -22,132 +29,135 @@ def clear_graph():
     graph.run(query)
     print("✅ Đã xóa sạch Graph!")
 
+def create_indexes():
+    """Tạo RANGE INDEX cho các thuộc tính số (tnc, góc quay, pH, nước...) và khóa công thức"""
+    print("⏳ Đang tạo range index cho thuộc tính số...")
+    for statement in index_statements():
+        graph.run(statement)
+    print("✅ Đã tạo index!")
+
+def stamp_load_version(csv_path, rows):
+    """
+    Ghi phiên bản nạp vào node KG_META. experiments/schema_cache.py dùng giá trị này
+    (cùng số node / quan hệ) làm dấu vân tay để biết snapshot schema còn hợp lệ không.
+    """
+    version = time.strftime("%Y%m%d%H%M%S")
+    graph.run(
+        "MERGE (m:KG_META {id: 'kg'}) "
+        "SET m.phiên_bản_nạp = $version, m.nguồn = $source, m.số_dòng = $rows",
+        version=version, source=csv_path, rows=rows,
+    )
+    return version
+
 # ==========================================
 # 2. XỬ LÝ DỮ LIỆU
 # ==========================================
-def clean_text(text):
-    """Làm sạch dữ liệu: Xử lý nan/null/không có thông tin"""
-    if pd.isna(text) or text is None:
-        return None
-    text = str(text).strip()
-    if text.lower() in ['không có thông tin', 'nan', '']:
-        return None
-    return text
-
 def process_row(row):
-    """Hàm xử lý từng dòng trong CSV"""
+    """Hàm xử lý từng dòng trong CSV (chuyển đổi ở kg_records.row_records, ở đây chỉ MERGE)"""
     try:
-        # 1. Lấy thông tin cơ bản của HOẠT CHẤT
-        ten_hoat_chat = clean_text(row.get('Ten_Hoat_Chat'))
-        
+        records = row_records(row)
         # Nếu không có tên hoạt chất thì bỏ qua dòng này
-        if not ten_hoat_chat:
+        if not records:
             return
+        ten_hoat_chat = records["HOẠT_CHẤT"]["tên_hoạt_chất"]
 
-        ten_latin = clean_text(row.get('Ten_Latin'))
-        cong_thuc = clean_text(row.get('Cong_Thuc_Hoa_Hoc'))
-        mo_ta = clean_text(row.get('Mo_Ta_Chung'))
-        tinh_chat = clean_text(row.get('Tinh_Chat'))
-        bao_quan = clean_text(row.get('Bao_Quan'))
-        
-        # 2. Tạo Node HOẠT_CHẤT
-        hoat_chat_node = Node("HOẠT_CHẤT", 
-                              tên_hoạt_chất=ten_hoat_chat,
-                              tên_latin=ten_latin,
-                              công_thức_hóa_học=cong_thuc,
-                              mô_tả=mo_ta,
-                              tính_chất=tinh_chat,
-                              bảo_quản=bao_quan)
+        # 1. Tạo Node HOẠT_CHẤT (kèm thuộc tính số: nhiệt_độ_nóng_chảy_min/max...)
+        hoat_chat_node = Node("HOẠT_CHẤT", **records["HOẠT_CHẤT"])
         graph.merge(hoat_chat_node, "HOẠT_CHẤT", "tên_hoạt_chất")
 
-        # 3. Xử lý LOẠI THUỐC (Tạo node riêng để dễ truy vấn nhóm thuốc)
-        loai_thuoc = clean_text(row.get('Loai_Thuoc'))
-        if loai_thuoc:
-            # Tách nếu có nhiều loại (ví dụ ngăn cách bởi dấu phẩy, tuỳ dữ liệu)
-            # Ở đây giả sử mỗi dòng là 1 chuỗi mô tả loại thuốc
-            category_node = Node("LOẠI_THUỐC", tên_loại=loai_thuoc)
+        # 2. Xử lý LOẠI THUỐC (Tạo node riêng để dễ truy vấn nhóm thuốc)
+        if records["LOẠI_THUỐC"]:
+            category_node = Node("LOẠI_THUỐC", **records["LOẠI_THUỐC"])
             graph.merge(category_node, "LOẠI_THUỐC", "tên_loại")
-            
+
             # Tạo quan hệ: Hoạt chất -> Thuộc nhóm -> Loại thuốc
             rel_cat = Relationship(hoat_chat_node, "THUỘC_NHÓM", category_node)
             graph.merge(rel_cat)
 
-        # 4. Xử lý THÔNG TIN KIỂM NGHIỆM/TIÊU CHUẨN
+        # 3. Xử lý THÔNG TIN KIỂM NGHIỆM/TIÊU CHUẨN
         # Gom các trường kỹ thuật dài vào 1 node TIÊU_CHUẨN để Node chính đỡ nặng
-        dinh_tinh = clean_text(row.get('Dinh_Tinh'))
-        dinh_luong = clean_text(row.get('Dinh_Luong'))
-        ham_luong = clean_text(row.get('Ham_Luong_Yeu_Cau'))
-        tap_chat = clean_text(row.get('Tap_Chat_Va_Do_Tinh_Khiet'))
-        do_hoa_tan = clean_text(row.get('Do_Hoa_Tan'))
-
-        # Chỉ tạo node tiêu chuẩn nếu có ít nhất 1 thông tin
-        if any([dinh_tinh, dinh_luong, ham_luong, tap_chat, do_hoa_tan]):
-            tieu_chuan_node = Node("TIÊU_CHUẨN",
-                                   thuộc_về_hoạt_chất=ten_hoat_chat, # Key để merge
-                                   hàm_lượng_yêu_cầu=ham_luong,
-                                   định_tính=dinh_tinh,
-                                   định_lượng=dinh_luong,
-                                   tạp_chất_và_độ_tinh_khiết=tap_chat,
-                                   độ_hòa_tan=do_hoa_tan)
+        if records["TIÊU_CHUẨN"]:
+            tieu_chuan_node = Node("TIÊU_CHUẨN", **records["TIÊU_CHUẨN"])
             graph.merge(tieu_chuan_node, "TIÊU_CHUẨN", "thuộc_về_hoạt_chất")
-            
+
             # Tạo quan hệ: Hoạt chất -> Có tiêu chuẩn -> Tiêu chuẩn
             rel_std = Relationship(hoat_chat_node, "CÓ_TIÊU_CHUẨN", tieu_chuan_node)
             graph.merge(rel_std)
 
+            # 4. Các trường dài đã tách thành node MỤC theo nhãn phụ ([PH], [NƯỚC]...)
+            if records["MỤC"]:
+                graph.run(
+                    "MATCH (t:TIÊU_CHUẨN {thuộc_về_hoạt_chất: $ten}) "
+                    "UNWIND $rows AS r "
+                    "MERGE (m:MỤC {khóa: r.khóa}) SET m += r "
+                    "MERGE (t)-[:CÓ_MỤC]->(m)",
+                    ten=ten_hoat_chat, rows=records["MỤC"])
+
     except Exception as e:
         print(f"⚠️ Lỗi xử lý dòng {row.get('Ten_Hoat_Chat', 'Unknown')}: {e}")
+        raise
 
 # ==========================================
 # 3. CHẠY CHƯƠNG TRÌNH
 # ==========================================
 if __name__ == "__main__":
-    # 1. Xóa dữ liệu cũ
-    clear_graph()
+    with stage("create_KG"):
+        # 1. Xóa dữ liệu cũ
+        clear_graph()
+        create_indexes()
 
-    # 2. Đọc file CSV
-    # LƯU Ý: Thay đổi đường dẫn file CSV nếu cần
-    csv_path = r'..\..\data\data_midterm.csv'  
+        # 2. Đọc file CSV
+        # LƯU Ý: Thay đổi đường dẫn file CSV nếu cần
+        csv_path = os.path.join('..', '..', 'data', 'data_midterm.csv')
     
-    try:
-        print(f"⏳ Đang đọc file CSV từ: {csv_path}")
-        df = pd.read_csv(csv_path, encoding='utf-8')
+        try:
+            print(f"⏳ Đang đọc file CSV từ: {csv_path}")
+            df = pd.read_csv(csv_path, encoding='utf-8')
         
-        # Kiểm tra xem các cột có đúng tên không
-        expected_columns = ['Ten_Hoat_Chat', 'Ten_Latin', 'Cong_Thuc_Hoa_Hoc', 
-                            'Mo_Ta_Chung', 'Tinh_Chat', 'Dinh_Tinh', 'Dinh_Luong', 
-                            'Bao_Quan', 'Loai_Thuoc', 'Ham_Luong_Yeu_Cau', 
-                            'Tap_Chat_Va_Do_Tinh_Khiet', 'Do_Hoa_Tan']
+            # Kiểm tra xem các cột có đúng tên không
+            expected_columns = ['Ten_Hoat_Chat', 'Ten_Latin', 'Cong_Thuc_Hoa_Hoc', 
+                                'Mo_Ta_Chung', 'Tinh_Chat', 'Dinh_Tinh', 'Dinh_Luong', 
+                                'Bao_Quan', 'Loai_Thuoc', 'Ham_Luong_Yeu_Cau', 
+                                'Tap_Chat_Va_Do_Tinh_Khiet', 'Do_Hoa_Tan']
         
-        # In ra các cột thực tế để debug nếu lỗi
-        # print("Columns in CSV:", df.columns.tolist())
+            # In ra các cột thực tế để debug nếu lỗi
+            # print("Columns in CSV:", df.columns.tolist())
 
-        print(f"📂 Tìm thấy {len(df)} dòng dữ liệu.")
+            print(f"📂 Tìm thấy {len(df)} dòng dữ liệu.")
         
-        # 3. Chạy import song song
-        # Giảm số worker xuống 1 nếu máy yếu hoặc gặp lỗi Lock Database
-        num_workers = 4 
-        print("🚀 Bắt đầu nạp dữ liệu vào Neo4j...")
+            # 3. Chạy import song song
+            # Giảm số worker xuống 1 nếu máy yếu hoặc gặp lỗi Lock Database
+            num_workers = 4 
+            print("🚀 Bắt đầu nạp dữ liệu vào Neo4j...")
         
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            futures = [executor.submit(process_row, row) for index, row in df.iterrows()]
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(process_row, row) for index, row in df.iterrows()]
             
-            # Thanh tiến trình đơn giản
-            count = 0
-            total = len(df)
-            for future in as_completed(futures):
-                count += 1
-                if count % 10 == 0:
-                    print(f"   ...Đã xử lý {count}/{total} dòng")
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"❌ Lỗi thread: {e}")
-
-        print("✅ HOÀN THÀNH NẠP DỮ LIỆU!")
-
-    except FileNotFoundError:
-        print(f"❌ Không tìm thấy file CSV tại: {csv_path}")
-        print("👉 Hãy chắc chắn bạn đã lưu file dữ liệu mới và sửa đường dẫn trong code.")
-    except Exception as e:
-        print(f"❌ Lỗi không mong muốn: {e}")
\ No newline at end of file
+                # Thanh tiến trình đơn giản
+                count = 0
+                failed = 0
+                total = len(df)
+                for future in as_completed(futures):
+                    count += 1
+                    if count % 10 == 0:
+                        print(f"   ...Đã xử lý {count}/{total} dòng")
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed += 1
+                        print(f"❌ Lỗi thread: {e}")
+
+            # Nạp thiếu dòng thì không ghi phiên bản nạp và thoát mã khác 0 -> pipeline không coi là xong
+            if failed:
+                print(f"❌ {failed}/{total} dòng nạp lỗi, dữ liệu trong Neo4j chưa đầy đủ.")
+                sys.exit(1)
+            version = stamp_load_version(csv_path, total)
+            print(f"✅ HOÀN THÀNH NẠP DỮ LIỆU! (phiên bản nạp: {version})")
+
+        except FileNotFoundError:
+            print(f"❌ Không tìm thấy file CSV tại: {csv_path}")
+            print("👉 Hãy chắc chắn bạn đã lưu file dữ liệu mới và sửa đường dẫn trong code.")
+            sys.exit(1)
+        except Exception as e:
+            print(f"❌ Lỗi không mong muốn: {e}")
+            sys.exit(1)
\ No newline at end of file
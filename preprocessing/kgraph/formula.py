@@ -0,0 +1,271 @@
+import re
+from fractions import Fraction
+from math import gcd
+
+# ==========================================
+# CHUẨN HÓA CÔNG THỨC HÓA HỌC (Hill notation)
+# ==========================================
+# Công thức trong Dược điển có nhiều cách viết: "C9H8O4", "(C14H18N6O)2.H2SO4",
+# "C14H18N6O.1/2H2SO4", "C16H19N3O4S.3H2O"... Module này phân tích công thức
+# thành số nguyên tử của từng nguyên tố rồi sinh khóa Hill chuẩn (C, H trước,
+# các nguyên tố khác theo ABC) để tra cứu bằng index thay vì CONTAINS.
+# Khóa được lưu (công_thức_hill) là của hoạt chất gốc, không tính nước kết tinh / gốc muối: câu hỏi
+# benchmark giữ công thức bị cắt cụt ('C14H18N6O2.1', 'C13H21NO3)2.H2SO4') còn CSV có công thức đầy đủ.
+
+SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+
+# Dấu phân cách thành phần muối / hydrat
+COMPONENT_SEPARATOR = re.compile(r'\s*[.·•,+]\s*')
+# Hệ số đầu thành phần: "3H2O", "1/2H2O", "½H2O" (đã đổi thành 1/2)
+LEADING_MULTIPLIER = re.compile(r'^(\d+(?:/\d+)?)\s*(?=[A-Z(\[])')
+TOKEN = re.compile(r'([A-Z][a-z]?)|(\d+(?:/\d+)?)|([(\[])|([)\]])')
+
+
+class FormulaError(ValueError):
+    """Công thức không phân tích được."""
+
+
+def _parse_group(text):
+    """Phân tích một thành phần (không có dấu chấm) thành dict {nguyên tố: Fraction}."""
+    stack = [{}]
+    pos = 0
+    last = None  # ("element", nguyên tố) hoặc ("group", dict) vừa đọc, để nhân hệ số đứng sau
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if not match:
+            raise FormulaError(f"Ký tự không hợp lệ '{text[pos]}' trong '{text}'")
+        element, number, opening, closing = match.groups()
+        pos = match.end()
+
+        if element:
+            stack[-1][element] = stack[-1].get(element, 0) + 1
+            last = ("element", element)
+        elif number:
+            count = Fraction(number)
+            if last is None:
+                raise FormulaError(f"Số '{number}' đứng sai vị trí trong '{text}'")
+            if last[0] == "element":
+                stack[-1][last[1]] += count - 1
+            else:
+                for el, n in last[1].items():
+                    stack[-1][el] = stack[-1].get(el, 0) + n * (count - 1)
+            last = None
+        elif opening:
+            stack.append({})
+            last = None
+        elif closing:
+            if len(stack) == 1:
+                raise FormulaError(f"Thừa dấu đóng ngoặc trong '{text}'")
+            group = stack.pop()
+            for el, n in group.items():
+                stack[-1][el] = stack[-1].get(el, 0) + n
+            last = ("group", group)
+
+    if len(stack) != 1:
+        raise FormulaError(f"Thiếu dấu đóng ngoặc trong '{text}'")
+    return {el: Fraction(n) for el, n in stack[0].items() if n}
+
+
+def _balance(part):
+    """Công thức bị cắt cụt mất một dấu ngoặc ('C13H21NO3)2', '(C16H9N4Na3O9S2') -> bổ sung lại."""
+    missing = part.count(")") - part.count("(")
+    if missing > 0:
+        return "(" * missing + part
+    return part + ")" * -missing
+
+
+def _components(formula):
+    """[(hệ số, chuỗi thành phần)] theo thứ tự; bỏ thành phần chỉ có số (bị cắt cụt như 'C14H18N6O2.1')."""
+    if not formula:
+        raise FormulaError("Công thức rỗng")
+    text = str(formula).translate(SUBSCRIPTS).replace("½", "1/2").replace(" ", "")
+
+    components = []
+    for part in COMPONENT_SEPARATOR.split(text):
+        if not part or re.fullmatch(r'[\d/]+', part):
+            continue
+        multiplier = Fraction(1)
+        lead = LEADING_MULTIPLIER.match(part)
+        if lead:
+            multiplier = Fraction(lead.group(1))
+            part = part[lead.end():]
+        components.append((multiplier, _balance(part)))
+    return components
+
+
+def parse_formula(formula):
+    """
+    Phân tích công thức (kể cả muối, hydrat: '.1/2H2O', '.3H2O') thành
+    danh sách thành phần [(hệ số, {nguyên tố: số nguyên tử}), ...].
+    Thành phần chỉ có số (công thức bị cắt cụt như 'C14H18N6O2.1') được bỏ qua.
+    """
+    components = []
+    for multiplier, part in _components(formula):
+        counts = _parse_group(part)
+        if counts:
+            components.append((multiplier, counts))
+
+    if not components:
+        raise FormulaError(f"Không tìm thấy nguyên tố trong '{formula}'")
+    return components
+
+
+def element_counts(formula):
+    """Tổng số nguyên tử mỗi nguyên tố, quy về số nguyên nhỏ nhất khi có hệ số phân số."""
+    total = {}
+    for multiplier, counts in parse_formula(formula):
+        for el, n in counts.items():
+            total[el] = total.get(el, 0) + multiplier * n
+
+    # "C14H18N6O.1/2H2SO4" và "(C14H18N6O)2.H2SO4" phải cho cùng một khóa
+    scale = 1
+    for n in total.values():
+        denominator = Fraction(n).denominator
+        scale = scale * denominator // gcd(scale, denominator)
+    return {el: int(n * scale) for el, n in total.items()}
+
+
+def parent_formula(formula):
+    """
+    Công thức của hoạt chất gốc: thành phần đầu tiên, bỏ hệ số và nước kết tinh / gốc muối đi sau;
+    '(X)2' (muối hai phân tử) -> 'X'. Ví dụ 'C14H18N6O2.1/2H2O', 'C14H18N6O2.1' -> 'C14H18N6O2'.
+    """
+    for _, part in _components(formula):
+        group = re.fullmatch(r'\(([A-Za-z0-9]+)\)\d*', part)
+        part = group.group(1) if group else part
+        if _parse_group(part):
+            return part
+    raise FormulaError(f"Không tìm thấy nguyên tố trong '{formula}'")
+
+
+def parent_counts(formula):
+    return {el: int(n) for el, n in _parse_group(parent_formula(formula)).items()}
+
+
+def secondary_components(formula):
+    """Nước kết tinh / gốc muối đi sau hoạt chất gốc, ví dụ ['1/2H2O'], ['H2SO4', '2H2O']."""
+    components = parse_formula(formula)
+    return [f"{multiplier if multiplier != 1 else ''}{format_hill(counts)}" for multiplier, counts in components[1:]]
+
+
+def hill_order(elements):
+    """Thứ tự Hill: có C thì C, H đứng đầu, còn lại theo bảng chữ cái."""
+    elements = sorted(elements)
+    if "C" in elements:
+        head = ["C"] + (["H"] if "H" in elements else [])
+        return head + [el for el in elements if el not in head]
+    return elements
+
+
+def format_hill(counts):
+    return "".join(f"{el}{counts[el] if counts[el] != 1 else ''}" for el in hill_order(counts))
+
+
+def hill_key(formula):
+    """
+    Khóa Hill của hoạt chất gốc (lưu ở công_thức_hill, có index), None nếu không phân tích được.
+    Hydrat / muối và công thức bị cắt cụt của cùng hoạt chất cho cùng một khóa.
+    """
+    try:
+        return format_hill(parent_counts(formula))
+    except FormulaError:
+        return None
+
+
+def full_hill_key(formula):
+    """Khóa Hill của cả công thức (kể cả nước kết tinh / gốc muối, quy về số nguyên)."""
+    try:
+        return format_hill(element_counts(formula))
+    except FormulaError:
+        return None
+
+
+def formula_properties(formula):
+    """
+    Thuộc tính lưu trên node HOẠT_CHẤT: khóa Hill của hoạt chất gốc (có index), danh sách nguyên tố
+    của nó, khóa Hill cả công thức và các thành phần muối / hydrat (nếu có).
+    """
+    key = hill_key(formula) if formula else None
+    if not key:
+        return {}
+    properties = {
+        "công_thức_hill": key,
+        "nguyên_tố": hill_order(parent_counts(formula)),
+    }
+    secondary = secondary_components(formula)
+    if secondary:
+        properties["công_thức_hill_đầy_đủ"] = full_hill_key(formula)
+        properties["thành_phần_phụ"] = secondary
+    return properties
+
+
+def is_sub_formula(query_counts, counts):
+    """Công thức truy vấn nằm trọn trong công thức của thuốc (đủ nguyên tố, đủ số lượng)."""
+    return all(counts.get(el, 0) >= n for el, n in query_counts.items())
+
+
+# ==========================================
+# API TRA CỨU
+# ==========================================
+def _run_query(graph, query, params):
+    """Chạy Cypher trên langchain Neo4jGraph (.query) hoặc py2neo Graph (.run)."""
+    if hasattr(graph, "query"):
+        return graph.query(query, params)
+    return graph.run(query, **params).data()
+
+
+def find_by_formula(graph, formula, mode="exact", limit=20):
+    """
+    Tra cứu hoạt chất theo công thức.
+    - mode="exact": so khớp khóa Hill (index seek trên công_thức_hill).
+    - mode="sub"  : thuốc có chứa công thức truy vấn (lọc theo nguyên_tố rồi so số lượng).
+    """
+    key = hill_key(formula)
+    if not key:
+        return []
+
+    if mode == "exact":
+        query = (
+            "MATCH (n:HOẠT_CHẤT) WHERE n.công_thức_hill = $key "
+            "RETURN n.tên_hoạt_chất AS tên_hoạt_chất, n.công_thức_hóa_học AS công_thức_hóa_học, "
+            "n.công_thức_hill AS công_thức_hill LIMIT $limit"
+        )
+        return _run_query(graph, query, {"key": key, "limit": limit})
+
+    if mode != "sub":
+        raise ValueError(f"mode không hợp lệ: {mode}")
+
+    query_counts = parent_counts(formula)
+    query = (
+        "MATCH (n:HOẠT_CHẤT) WHERE n.công_thức_hill IS NOT NULL "
+        "AND all(e IN $elements WHERE e IN n.nguyên_tố) "
+        "RETURN n.tên_hoạt_chất AS tên_hoạt_chất, n.công_thức_hóa_học AS công_thức_hóa_học, "
+        "n.công_thức_hill AS công_thức_hill"
+    )
+    rows = _run_query(graph, query, {"elements": list(query_counts)})
+    matches = [r for r in rows if is_sub_formula(query_counts, parent_counts(r["công_thức_hill"]))]
+    return matches[:limit]
+
+
+# Công thức trong câu hỏi, ví dụ "[C14H18N6O2.1]" hoặc "công thức C9H8O4"
+QUESTION_FORMULA = re.compile(r'\(?\b[A-Z][a-z]?\d*(?:[A-Z(][A-Za-z0-9()]*)?(?:\s*[.·]\s*[\d/]*[A-Za-z0-9()]+)*')
+
+
+def annotate_formula_question(question):
+    """
+    Thêm gợi ý khóa Hill (của hoạt chất gốc) và công thức gốc vào câu hỏi có công thức hóa học để
+    Cypher dùng `n.công_thức_hill = '...'` (index seek), CONTAINS công thức gốc chỉ là phương án phụ.
+    """
+    for candidate in QUESTION_FORMULA.findall(question.translate(SUBSCRIPTS)):
+        # Chỉ coi là công thức khi có C và H kèm số (tránh bắt nhầm tên viết hoa)
+        if not re.search(r'C\d*H\d', candidate):
+            continue
+        key = hill_key(candidate)
+        if key:
+            return f"{question} {formula_hint(candidate.strip())}"
+    return question
+
+
+def formula_hint(formula):
+    """'(Khóa Hill của công thức X: K; công thức gốc: P)' gắn sau câu hỏi (RAG và ngân hàng ví dụ)."""
+    return f"(Khóa Hill của công thức {formula}: {hill_key(formula)}; công thức gốc: {parent_formula(formula)})"
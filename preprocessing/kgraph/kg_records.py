@@ -0,0 +1,118 @@
+import csv
+import math
+
+from preprocessing.kgraph.numeric_props import (extract_numeric_properties, numeric_index_properties,
+                                                HOAT_CHAT_SPECS, TIEU_CHUAN_SPECS)
+from preprocessing.kgraph.formula import formula_properties
+from preprocessing.kgraph.sections import section_records, SECTION_FIELDS
+
+# ==========================================
+# DÒNG CSV -> CÁC NODE CỦA KNOWLEDGE GRAPH
+# ==========================================
+# Phần chuyển đổi thuần (không đụng tới Neo4j), dùng chung cho create_KG.py
+# (nạp vào Neo4j) và memory_graph.py (đồ thị trong bộ nhớ).
+
+# Thuộc tính dùng làm khóa MERGE của từng nhãn
+NODE_KEYS = {
+    "HOẠT_CHẤT": "tên_hoạt_chất",
+    "LOẠI_THUỐC": "tên_loại",
+    "TIÊU_CHUẨN": "thuộc_về_hoạt_chất",
+    "MỤC": "khóa",
+}
+
+# (nhãn đầu, quan hệ, nhãn cuối)
+RELATIONSHIPS = [
+    ("HOẠT_CHẤT", "THUỘC_NHÓM", "LOẠI_THUỐC"),
+    ("HOẠT_CHẤT", "CÓ_TIÊU_CHUẨN", "TIÊU_CHUẨN"),
+    ("TIÊU_CHUẨN", "CÓ_MỤC", "MỤC"),
+]
+
+
+def index_statements():
+    """Các lệnh tạo index của KG trên Neo4j (create_KG.py và nạp từ snapshot dùng chung)."""
+    statements = [f"CREATE RANGE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+                  for label, prop in numeric_index_properties()]
+    # Khóa Hill của công thức hóa học -> tra cứu công thức bằng index seek
+    statements.append("CREATE RANGE INDEX IF NOT EXISTS FOR (n:HOẠT_CHẤT) ON (n.công_thức_hill)")
+    # Node MỤC: merge theo khóa, lọc theo hoạt chất + nhãn khi truy xuất
+    statements.append("CREATE RANGE INDEX IF NOT EXISTS FOR (m:MỤC) ON (m.khóa)")
+    statements.append("CREATE RANGE INDEX IF NOT EXISTS FOR (m:MỤC) ON (m.thuộc_về_hoạt_chất, m.nhãn)")
+    return statements
+
+
+def clean_text(text):
+    """Làm sạch dữ liệu: Xử lý nan/null/không có thông tin"""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return None
+    text = str(text).strip()
+    if text.lower() in ['không có thông tin', 'nan', '']:
+        return None
+    return text
+
+
+def row_records(row):
+    """
+    Một dòng CSV -> {"HOẠT_CHẤT": props, "LOẠI_THUỐC": props | None,
+    "TIÊU_CHUẨN": props | None, "MỤC": [props, ...]} hoặc None nếu không có tên hoạt chất.
+    """
+    ten_hoat_chat = clean_text(row.get('Ten_Hoat_Chat'))
+    if not ten_hoat_chat:
+        return None
+
+    tinh_chat = clean_text(row.get('Tinh_Chat'))
+    cong_thuc = clean_text(row.get('Cong_Thuc_Hoa_Hoc'))
+    hoat_chat = {
+        "tên_hoạt_chất": ten_hoat_chat,
+        "tên_latin": clean_text(row.get('Ten_Latin')),
+        "công_thức_hóa_học": cong_thuc,
+        "mô_tả": clean_text(row.get('Mo_Ta_Chung')),
+        "tính_chất": tinh_chat,
+        "bảo_quản": clean_text(row.get('Bao_Quan')),
+        # Thuộc tính số: nhiệt_độ_nóng_chảy_min/max...
+        **extract_numeric_properties(tinh_chat, HOAT_CHAT_SPECS),
+        **formula_properties(cong_thuc),
+    }
+
+    loai_thuoc = clean_text(row.get('Loai_Thuoc'))
+
+    dinh_tinh = clean_text(row.get('Dinh_Tinh'))
+    dinh_luong = clean_text(row.get('Dinh_Luong'))
+    ham_luong = clean_text(row.get('Ham_Luong_Yeu_Cau'))
+    tap_chat = clean_text(row.get('Tap_Chat_Va_Do_Tinh_Khiet'))
+    do_hoa_tan = clean_text(row.get('Do_Hoa_Tan'))
+
+    tieu_chuan, sections = None, []
+    # Chỉ tạo node tiêu chuẩn nếu có ít nhất 1 thông tin
+    if any([dinh_tinh, dinh_luong, ham_luong, tap_chat, do_hoa_tan]):
+        # Số liệu kiểm nghiệm (góc quay, pH, nước, tro...) nằm rải rác ở định tính và tạp chất
+        numeric_text = " ".join(t for t in [dinh_tinh, tap_chat] if t)
+        tieu_chuan = {
+            "thuộc_về_hoạt_chất": ten_hoat_chat,
+            "hàm_lượng_yêu_cầu": ham_luong,
+            "định_tính": dinh_tinh,
+            "định_lượng": dinh_luong,
+            "tạp_chất_và_độ_tinh_khiết": tap_chat,
+            "độ_hòa_tan": do_hoa_tan,
+            **extract_numeric_properties(numeric_text, TIEU_CHUAN_SPECS),
+        }
+        # Tách các trường dài thành node MỤC theo nhãn phụ ([PH], [NƯỚC]...)
+        field_texts = {"định_tính": dinh_tinh, "định_lượng": dinh_luong,
+                       "tạp_chất_và_độ_tinh_khiết": tap_chat}
+        for field in SECTION_FIELDS:
+            sections.extend(section_records(ten_hoat_chat, field, field_texts[field]))
+
+    return {
+        "HOẠT_CHẤT": hoat_chat,
+        "LOẠI_THUỐC": {"tên_loại": loai_thuoc} if loai_thuoc else None,
+        "TIÊU_CHUẨN": tieu_chuan,
+        "MỤC": sections,
+    }
+
+
+def iter_csv_records(csv_path):
+    """Đọc data_midterm.csv bằng module csv (không cần pandas), sinh row_records từng dòng."""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            records = row_records(row)
+            if records:
+                yield records
@@ -0,0 +1,427 @@
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from preprocessing.kgraph.kg_records import NODE_KEYS, index_statements
+
+# ==========================================
+# SNAPSHOT NHỊ PHÂN CỦA KNOWLEDGE GRAPH
+# ==========================================
+# Một file duy nhất, có phiên bản, chứa toàn bộ node / quan hệ / thuộc tính và các
+# index dẫn xuất (tên chuẩn hóa, khóa Hill...). Mọi chuỗi được "intern" vào một bảng
+# chung (tên nhãn, tên thuộc tính, LOẠI_THUỐC lặp lại... chỉ lưu một lần). Các bảng
+# đều là bản ghi kích thước cố định -> mmap rồi đọc ngẫu nhiên, không cần parse cả file.
+#
+# Bố cục (little-endian):
+#   header  : MAGIC, version u16, số section u16, rồi (offset u64, length u64) mỗi section
+#   strings : string_offsets u32[n+1] + string_blob (UTF-8)
+#   nodes   : (label u32, prop_start u32, prop_count u32)
+#   props   : (key u32, tag u8, 3 byte đệm, payload 8 byte)
+#   lists   : u32 id chuỗi (giá trị list[str], vd. nguyên_tố)
+#   out/in  : CSR: index u32[n_nodes+1] + edges (type u32, node u32)
+#   indexes : index_dir (name u32, start u32, count u32) + entries (value u32, node u32) sắp theo value
+#   meta    : JSON (nguồn, thời gian tạo, số lượng)
+
+MAGIC = b"VMKG"
+VERSION = 1
+SECTIONS = ("string_offsets", "string_blob", "nodes", "props", "lists", "out_index", "out_edges",
+            "in_index", "in_edges", "index_dir", "index_entries", "meta")
+HEADER = struct.Struct("<4sHH")
+SECTION_ENTRY = struct.Struct("<QQ")
+U32 = struct.Struct("<I")
+NODE = struct.Struct("<III")
+PROP = struct.Struct("<IB3x8s")
+EDGE = struct.Struct("<II")
+INDEX_DIR = struct.Struct("<III")
+INDEX_ENTRY = struct.Struct("<II")
+
+TAG_NULL, TAG_STR, TAG_INT, TAG_FLOAT, TAG_BOOL, TAG_LIST = range(6)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SNAPSHOT = os.path.join(BASE_DIR, "data", "kg.snapshot")
+
+
+def normalize_key(text):
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+# Index dẫn xuất: (tên, nhãn, thuộc tính, có chuẩn hóa không)
+DERIVED_INDEXES = [
+    ("HOẠT_CHẤT.tên_hoạt_chất", "HOẠT_CHẤT", "tên_hoạt_chất", True),
+    ("HOẠT_CHẤT.tên_latin", "HOẠT_CHẤT", "tên_latin", True),
+    ("HOẠT_CHẤT.công_thức_hill", "HOẠT_CHẤT", "công_thức_hill", False),
+    ("LOẠI_THUỐC.tên_loại", "LOẠI_THUỐC", "tên_loại", True),
+    ("TIÊU_CHUẨN.thuộc_về_hoạt_chất", "TIÊU_CHUẨN", "thuộc_về_hoạt_chất", True),
+    ("MỤC.khóa", "MỤC", "khóa", False),
+]
+
+
+class SnapshotError(ValueError):
+    """File không phải snapshot KG hoặc khác phiên bản."""
+
+
+# ------------------------------------------------------------------------------
+# Ghi
+# ------------------------------------------------------------------------------
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, text):
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return sid
+
+    def encode(self):
+        offsets, blob, pos = [], bytearray(), 0
+        for text in self.strings:
+            offsets.append(pos)
+            data = text.encode("utf-8")
+            blob += data
+            pos += len(data)
+        offsets.append(pos)
+        return b"".join(U32.pack(o) for o in offsets), bytes(blob)
+
+
+def _encode_value(value, strings, list_items):
+    if value is None:
+        return TAG_NULL, b"\0" * 8
+    if isinstance(value, bool):
+        return TAG_BOOL, struct.pack("<Q", int(value))
+    if isinstance(value, int):
+        return TAG_INT, struct.pack("<q", value)
+    if isinstance(value, float):
+        return TAG_FLOAT, struct.pack("<d", value)
+    if isinstance(value, str):
+        return TAG_STR, struct.pack("<I4x", strings.intern(value))
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+        start = len(list_items)
+        list_items.extend(strings.intern(v) for v in value)
+        return TAG_LIST, struct.pack("<II", start, len(value))
+    raise SnapshotError(f"Kiểu thuộc tính chưa hỗ trợ: {type(value).__name__}")
+
+
+def _csr(n_nodes, adjacency, strings):
+    index, edges = [0], []
+    for node_id in range(n_nodes):
+        for rel_type, targets in adjacency.get(node_id, {}).items():
+            type_id = strings.intern(rel_type)
+            edges.extend(EDGE.pack(type_id, t) for t in targets)
+        index.append(len(edges))
+    return b"".join(U32.pack(i) for i in index), b"".join(edges)
+
+
+def write_snapshot(graph, path=DEFAULT_SNAPSHOT, source=None):
+    """graph: MemoryGraph. Trả về dict meta đã ghi."""
+    strings = _StringTable()
+    nodes, props, list_items = [], [], []
+    for node_id, node_props in enumerate(graph.props):
+        label_id = strings.intern(graph.labels[node_id][0])
+        start = len(props)
+        for key in node_props:  # giữ thứ tự chèn -> schema trong prompt không đổi
+            tag, payload = _encode_value(node_props[key], strings, list_items)
+            props.append(PROP.pack(strings.intern(key), tag, payload))
+        nodes.append(NODE.pack(label_id, start, len(props) - start))
+
+    out_index, out_edges = _csr(len(graph.props), graph.out_edges, strings)
+    in_index, in_edges = _csr(len(graph.props), graph.in_edges, strings)
+
+    index_dir, index_entries = [], []
+    for name, label, prop, normalized in DERIVED_INDEXES:
+        entries = []
+        for node_id in graph.by_label.get(label, []):
+            value = graph.props[node_id].get(prop)
+            if isinstance(value, str):
+                entries.append((normalize_key(value) if normalized else value, node_id))
+        entries.sort()
+        index_dir.append(INDEX_DIR.pack(strings.intern(name), len(index_entries), len(entries)))
+        index_entries.extend(INDEX_ENTRY.pack(strings.intern(v), node_id) for v, node_id in entries)
+
+    meta = {
+        "version": VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": source,
+        "nodes": len(graph.props),
+        "relationships": graph.rel_count,
+        "strings": len(strings.strings),
+        "indexes": [name for name, *_ in DERIVED_INDEXES],
+    }
+    string_offsets, string_blob = strings.encode()
+    sections = {
+        "string_offsets": string_offsets,
+        "string_blob": string_blob,
+        "nodes": b"".join(nodes),
+        "props": b"".join(props),
+        "lists": b"".join(U32.pack(i) for i in list_items),
+        "out_index": out_index,
+        "out_edges": out_edges,
+        "in_index": in_index,
+        "in_edges": in_edges,
+        "index_dir": b"".join(index_dir),
+        "index_entries": b"".join(index_entries),
+        "meta": json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+    }
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    header_size = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * header_size)
+        table = []
+        for name in SECTIONS:
+            # Căn 8 byte để struct.unpack_from trên mmap luôn đọc đúng biên
+            f.write(b"\0" * (-f.tell() % 8))
+            table.append((f.tell(), len(sections[name])))
+            f.write(sections[name])
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(SECTIONS)))
+        for offset, length in table:
+            f.write(SECTION_ENTRY.pack(offset, length))
+    os.replace(tmp_path, path)
+    meta["bytes"] = os.path.getsize(path)
+    return meta
+
+
+# ------------------------------------------------------------------------------
+# Đọc (mmap, truy cập ngẫu nhiên)
+# ------------------------------------------------------------------------------
+class KGSnapshot:
+    def __init__(self, path=DEFAULT_SNAPSHOT):
+        self.path = path
+        self._file = open(path, "rb")
+        self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_sections = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} không phải snapshot KG")
+        if version != VERSION:
+            raise SnapshotError(f"Snapshot phiên bản {version}, cần phiên bản {VERSION}")
+        self.sections = {}
+        for i, name in enumerate(SECTIONS[:n_sections]):
+            self.sections[name] = SECTION_ENTRY.unpack_from(self.buf, HEADER.size + i * SECTION_ENTRY.size)
+        self.n_strings = self.sections["string_offsets"][1] // U32.size - 1
+        self.n_nodes = self.sections["nodes"][1] // NODE.size
+        self.meta = json.loads(self._raw("meta").decode("utf-8"))
+        self._string_cache = {}
+        self._indexes = {}
+        for i in range(self.sections["index_dir"][1] // INDEX_DIR.size):
+            name_id, start, count = INDEX_DIR.unpack_from(self.buf, self.sections["index_dir"][0] + i * INDEX_DIR.size)
+            self._indexes[self.string(name_id)] = (start, count)
+
+    def close(self):
+        self.buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _raw(self, section):
+        offset, length = self.sections[section]
+        return self.buf[offset:offset + length]
+
+    def _u32(self, section, i):
+        return U32.unpack_from(self.buf, self.sections[section][0] + i * U32.size)[0]
+
+    def string(self, sid):
+        text = self._string_cache.get(sid)
+        if text is None:
+            start, end = self._u32("string_offsets", sid), self._u32("string_offsets", sid + 1)
+            base = self.sections["string_blob"][0]
+            text = self._string_cache[sid] = self.buf[base + start:base + end].decode("utf-8")
+        return text
+
+    def _value(self, tag, payload):
+        if tag == TAG_STR:
+            return self.string(struct.unpack_from("<I", payload)[0])
+        if tag == TAG_INT:
+            return struct.unpack("<q", payload)[0]
+        if tag == TAG_FLOAT:
+            return struct.unpack("<d", payload)[0]
+        if tag == TAG_BOOL:
+            return bool(struct.unpack("<Q", payload)[0])
+        if tag == TAG_LIST:
+            start, count = struct.unpack("<II", payload)
+            return [self.string(self._u32("lists", start + i)) for i in range(count)]
+        return None
+
+    def node(self, node_id):
+        """-> (nhãn, dict thuộc tính)"""
+        label_id, start, count = NODE.unpack_from(self.buf, self.sections["nodes"][0] + node_id * NODE.size)
+        base = self.sections["props"][0]
+        props = {}
+        for i in range(start, start + count):
+            key_id, tag, payload = PROP.unpack_from(self.buf, base + i * PROP.size)
+            props[self.string(key_id)] = self._value(tag, payload)
+        return self.string(label_id), props
+
+    def iter_nodes(self):
+        for node_id in range(self.n_nodes):
+            yield (node_id,) + self.node(node_id)
+
+    def edges(self, node_id, direction="out"):
+        """-> [(loại quan hệ, node id)]"""
+        lo, hi = self._u32(f"{direction}_index", node_id), self._u32(f"{direction}_index", node_id + 1)
+        base = self.sections[f"{direction}_edges"][0]
+        return [(self.string(t), target) for t, target in
+                (EDGE.unpack_from(self.buf, base + i * EDGE.size) for i in range(lo, hi))]
+
+    def iter_relationships(self):
+        for node_id in range(self.n_nodes):
+            for rel_type, target in self.edges(node_id, "out"):
+                yield node_id, rel_type, target
+
+    def lookup(self, index_name, value):
+        """Tìm nhị phân trên index dẫn xuất (đã chuẩn hóa nếu index chuẩn hóa)."""
+        start, count = self._indexes[index_name]
+        if any(name == index_name and normalized for name, _, _, normalized in DERIVED_INDEXES):
+            value = normalize_key(value)
+        base = self.sections["index_entries"][0]
+
+        def entry(i):
+            return INDEX_ENTRY.unpack_from(self.buf, base + (start + i) * INDEX_ENTRY.size)
+
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(entry(mid)[0]) < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < count:
+            value_id, node_id = entry(lo)
+            if self.string(value_id) != value:
+                break
+            found.append(node_id)
+            lo += 1
+        return found
+
+
+# ------------------------------------------------------------------------------
+# Neo4j: xuất từ Neo4j / nạp hàng loạt vào Neo4j (py2neo)
+# ------------------------------------------------------------------------------
+def connect_neo4j():
+    from py2neo import Graph
+    return Graph(os.getenv("URI", "neo4j://127.0.0.1:7687"),
+                 auth=(os.getenv("USER", "neo4j"), os.getenv("PASSWORD", "12345678")))
+
+
+def memory_graph_from_neo4j(neo4j):
+    from preprocessing.kgraph.memory_graph import MemoryGraph
+
+    graph = MemoryGraph()
+    ids = {}
+    for row in neo4j.run("MATCH (n) WHERE NOT n:KG_META "
+                         "RETURN elementId(n) AS id, labels(n)[0] AS label, properties(n) AS props").data():
+        ids[row["id"]] = graph.merge_node(row["label"], row["props"])
+    for row in neo4j.run("MATCH (a)-[r]->(b) RETURN elementId(a) AS s, type(r) AS t, elementId(b) AS e").data():
+        if row["s"] in ids and row["e"] in ids:
+            graph.merge_relationship(ids[row["s"]], row["t"], ids[row["e"]])
+    graph.refresh_schema()
+    return graph
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_load_neo4j(snapshot, neo4j, batch_size=5000, clear=True):
+    """
+    Nạp snapshot vào Neo4j bằng UNWIND theo lô. clear=True: xóa dữ liệu cũ rồi CREATE.
+    clear=False: MERGE node theo NODE_KEYS (cập nhật thuộc tính, bỏ giá trị None) và MERGE
+    quan hệ -> nạp lại không nhân đôi node / quan hệ đã có.
+    Trả về số (node, quan hệ) đã nạp.
+    """
+    if clear:
+        neo4j.run("MATCH (n) DETACH DELETE n")
+    for statement in index_statements():
+        neo4j.run(statement)
+
+    by_label = {}
+    for node_id, label, props in snapshot.iter_nodes():
+        props = {k: v for k, v in props.items() if v is not None}
+        by_label.setdefault(label, []).append({"sid": node_id, "props": props,
+                                               "key": props.get(NODE_KEYS.get(label))})
+    element_ids = {}
+    for label, rows in by_label.items():
+        key = NODE_KEYS.get(label)
+        if clear or key is None:
+            write = f"CREATE (n:`{label}`) SET n = r.props"
+        else:
+            write = f"MERGE (n:`{label}` {{`{key}`: r.key}}) SET n += r.props"
+        for batch in _batches(rows, batch_size):
+            for row in neo4j.run(f"UNWIND $rows AS r {write} "
+                                 "RETURN r.sid AS sid, elementId(n) AS eid", rows=batch).data():
+                element_ids[row["sid"]] = row["eid"]
+
+    by_type = {}
+    for start, rel_type, end in snapshot.iter_relationships():
+        by_type.setdefault(rel_type, []).append({"s": element_ids[start], "e": element_ids[end]})
+    write = "CREATE" if clear else "MERGE"
+    for rel_type, rows in by_type.items():
+        for batch in _batches(rows, batch_size):
+            neo4j.run(f"UNWIND $rows AS r MATCH (a) WHERE elementId(a) = r.s "
+                      f"MATCH (b) WHERE elementId(b) = r.e {write} (a)-[:`{rel_type}`]->(b)", rows=batch)
+
+    # Phiên bản nạp (dấu vân tay cho experiments/schema_cache.py)
+    neo4j.run("MERGE (m:KG_META {id: 'kg'}) SET m.phiên_bản_nạp = $version, m.nguồn = $source",
+              version=f"snapshot-{snapshot.meta['created_at']}", source=snapshot.path)
+    return len(element_ids), sum(len(rows) for rows in by_type.values())
+
+
+# ------------------------------------------------------------------------------
+# Dòng lệnh
+# ------------------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Xuất / nạp snapshot nhị phân của KG")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="CSV (mặc định) hoặc Neo4j -> snapshot")
+    p_export.add_argument("--csv", default=os.path.join(BASE_DIR, "data", "data_midterm.csv"))
+    p_export.add_argument("--from-neo4j", action="store_true")
+    p_export.add_argument("--out", default=DEFAULT_SNAPSHOT)
+
+    p_load = sub.add_parser("load-neo4j", help="Nạp hàng loạt snapshot vào Neo4j (xóa dữ liệu cũ)")
+    p_load.add_argument("--snapshot", default=DEFAULT_SNAPSHOT)
+    p_load.add_argument("--batch-size", type=int, default=5000)
+    p_load.add_argument("--keep", action="store_true", help="Không xóa dữ liệu cũ (MERGE theo khóa của nhãn)")
+
+    p_info = sub.add_parser("info", help="In thông tin snapshot")
+    p_info.add_argument("--snapshot", default=DEFAULT_SNAPSHOT)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "export":
+        if args.from_neo4j:
+            graph, source = memory_graph_from_neo4j(connect_neo4j()), "neo4j"
+        else:
+            from preprocessing.kgraph.memory_graph import MemoryGraph
+            graph, source = MemoryGraph.from_csv(args.csv), args.csv
+        meta = write_snapshot(graph, args.out, source=source)
+        print(f"✅ Đã ghi {args.out}: {meta['nodes']} node, {meta['relationships']} quan hệ, "
+              f"{meta['strings']} chuỗi, {meta['bytes'] / 1024:.0f} KB")
+    elif args.command == "load-neo4j":
+        with KGSnapshot(args.snapshot) as snapshot:
+            nodes, rels = bulk_load_neo4j(snapshot, connect_neo4j(), args.batch_size, clear=not args.keep)
+        print(f"✅ Đã nạp {nodes} node, {rels} quan hệ vào Neo4j")
+    else:
+        with KGSnapshot(args.snapshot) as snapshot:
+            print(json.dumps(snapshot.meta, ensure_ascii=False, indent=2))
+    print(f"⏱️ {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
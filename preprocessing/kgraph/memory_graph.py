@@ -0,0 +1,928 @@
+import re
+from collections import defaultdict
+
+from preprocessing.kgraph.kg_records import NODE_KEYS, RELATIONSHIPS, iter_csv_records
+
+# ==========================================
+# ĐỒ THỊ TRONG BỘ NHỚ (không cần Neo4j)
+# ==========================================
+# Nạp data_midterm.csv (qua kg_records.row_records, giống hệt create_KG.py) vào
+# danh sách kề + index băm theo thuộc tính, và chạy tập con Cypher mà prompt RAG
+# sinh ra: MATCH theo đường đi (1-2 hop) hoặc RETURN đơn lẻ, WHERE với =, <>, <, >, CONTAINS,
+# STARTS/ENDS WITH, IN, IS NULL, AND/OR/NOT, toLower(); RETURN [DISTINCT] kèm AS,
+# count/collect/min/max/sum/avg; ORDER BY, SKIP, LIMIT.
+# Giao diện giống Neo4jGraph: query(cypher, params) -> list[dict], schema, structured_schema.
+# Chỉ đọc: dữ liệu nạp qua from_csv / from_snapshot, không có add_graph_documents (chain hỏi đáp
+# không ghi vào đồ thị); Cypher ghi (CREATE, MERGE, SET...) bị từ chối bằng UnsupportedCypher.
+
+
+class UnsupportedCypher(ValueError):
+    """Truy vấn dùng cú pháp nằm ngoài tập con được hỗ trợ."""
+
+
+# ------------------------------------------------------------------------------
+# 1. Tách token
+# ------------------------------------------------------------------------------
+TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<str>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<num>\d+\.\d+|\d+)
+  | (?P<param>\$\w+)
+  | (?P<name>`[^`]+`|[^\W\d]\w*)
+  | (?P<op><>|<=|>=|->|<-|!=|=~|[=<>\-+*/%(){}\[\]:,.|;])
+""", re.VERBOSE)
+
+KEYWORDS = {"MATCH", "OPTIONAL", "WHERE", "RETURN", "DISTINCT", "AS", "ORDER", "BY", "ASC", "ASCENDING",
+            "DESC", "DESCENDING", "SKIP", "LIMIT", "AND", "OR", "XOR", "NOT", "IN", "CONTAINS", "STARTS",
+            "ENDS", "WITH", "IS", "NULL", "TRUE", "FALSE", "UNION", "UNWIND", "CALL", "CREATE", "MERGE",
+            "DELETE", "DETACH", "SET", "REMOVE"}
+
+
+def _unescape(text):
+    escapes = {"n": "\n", "t": "\t", "r": "\r"}
+    return re.sub(r'\\(.)', lambda m: escapes.get(m.group(1), m.group(1)), text)
+
+
+def tokenize(query):
+    tokens, pos = [], 0
+    while pos < len(query):
+        m = TOKEN.match(query, pos)
+        if not m:
+            raise UnsupportedCypher(f"Ký tự không hợp lệ tại vị trí {pos}: {query[pos:pos + 20]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        text = m.group()
+        if kind == "str":
+            tokens.append(("str", _unescape(text[1:-1]), m.start(), m.end()))
+        elif kind == "num":
+            tokens.append(("num", float(text) if "." in text else int(text), m.start(), m.end()))
+        elif kind == "param":
+            tokens.append(("param", text[1:], m.start(), m.end()))
+        elif kind == "name":
+            if text.startswith("`"):
+                tokens.append(("name", text[1:-1], m.start(), m.end()))
+            elif text.upper() in KEYWORDS:
+                tokens.append(("kw", text.upper(), m.start(), m.end()))
+            else:
+                tokens.append(("name", text, m.start(), m.end()))
+        else:
+            tokens.append(("op", text, m.start(), m.end()))
+    tokens.append(("eof", None, len(query), len(query)))
+    return tokens
+
+
+# ------------------------------------------------------------------------------
+# 2. Phân tích cú pháp -> cây biểu thức dạng tuple
+# ------------------------------------------------------------------------------
+AGGREGATES = {"count", "collect", "min", "max", "sum", "avg"}
+COMPARISONS = {"=", "<>", "!=", "<", "<=", ">", ">="}
+
+
+class Parser:
+    def __init__(self, query):
+        self.query = query
+        self.tokens = tokenize(query)
+        self.i = 0
+        self.anon = 0
+
+    # --- tiện ích ---
+    def peek(self, offset=0):
+        return self.tokens[self.i + offset]
+
+    def at(self, kind, value=None, offset=0):
+        tok = self.peek(offset)
+        return tok[0] == kind and (value is None or tok[1] == value)
+
+    def take(self, kind=None, value=None):
+        tok = self.peek()
+        if (kind and tok[0] != kind) or (value is not None and tok[1] != value):
+            raise UnsupportedCypher(f"Cần '{value or kind}' nhưng gặp {tok[1]!r} (vị trí {tok[2]})")
+        self.i += 1
+        return tok
+
+    def accept(self, kind, value=None):
+        if self.at(kind, value):
+            return self.take()
+        return None
+
+    # --- truy vấn ---
+    def parse(self):
+        patterns = []
+        # RETURN không có MATCH (vd. "RETURN 1 AS ok" để kiểm tra kết nối) -> một dòng rỗng
+        if not self.at("kw", "MATCH") and not self.at("kw", "RETURN"):
+            raise UnsupportedCypher("Chỉ hỗ trợ truy vấn bắt đầu bằng MATCH hoặc RETURN")
+        where = None
+        while self.accept("kw", "MATCH"):
+            patterns.append(self.parse_pattern())
+            while self.accept("op", ","):
+                patterns.append(self.parse_pattern())
+            if self.accept("kw", "WHERE"):
+                cond = self.parse_expr()
+                where = cond if where is None else ("and", where, cond)
+        if not self.at("kw", "RETURN"):
+            raise UnsupportedCypher(f"Mệnh đề chưa hỗ trợ: {self.peek()[1]!r}")
+        self.take("kw", "RETURN")
+        distinct = bool(self.accept("kw", "DISTINCT"))
+        returns = [self.parse_return_item()]
+        while self.accept("op", ","):
+            returns.append(self.parse_return_item())
+
+        order = []
+        if self.accept("kw", "ORDER"):
+            self.take("kw", "BY")
+            while True:
+                start = self.peek()[2]
+                expr = self.parse_expr()
+                text = self.query[start:self.tokens[self.i - 1][3]].strip()
+                desc = False
+                if self.accept("kw", "DESC") or self.accept("kw", "DESCENDING"):
+                    desc = True
+                else:
+                    self.accept("kw", "ASC") or self.accept("kw", "ASCENDING")
+                order.append((expr, text, desc))
+                if not self.accept("op", ","):
+                    break
+        skip = self.parse_expr() if self.accept("kw", "SKIP") else None
+        limit = self.parse_expr() if self.accept("kw", "LIMIT") else None
+        self.accept("op", ";")
+        if not self.at("eof"):
+            raise UnsupportedCypher(f"Mệnh đề chưa hỗ trợ: {self.peek()[1]!r}")
+        return {"patterns": patterns, "where": where, "returns": returns, "distinct": distinct,
+                "order": order, "skip": skip, "limit": limit}
+
+    def parse_return_item(self):
+        start = self.peek()[2]
+        expr = self.parse_expr()
+        text = self.query[start:self.tokens[self.i - 1][3]].strip()
+        if self.accept("kw", "AS"):
+            text = self.take("name")[1]
+        return expr, text
+
+    # --- mẫu đường đi ---
+    def parse_node(self):
+        self.take("op", "(")
+        var = self.take("name")[1] if self.at("name") else None
+        labels = []
+        while self.accept("op", ":"):
+            labels.append(self.take("name")[1])
+        props = self.parse_map() if self.at("op", "{") else {}
+        self.take("op", ")")
+        if var is None:
+            self.anon += 1
+            var = f"_anon{self.anon}"
+        return {"var": var, "labels": labels, "props": props}
+
+    def parse_rel(self):
+        """-[r:T]->  <-[:T]-  -[:T|U]-  --"""
+        incoming = bool(self.accept("op", "<-"))
+        if not incoming:
+            self.take("op", "-")
+        var, types = None, []
+        if self.accept("op", "["):
+            var = self.take("name")[1] if self.at("name") else None
+            if self.accept("op", ":"):
+                types.append(self.take("name")[1])
+                while self.accept("op", "|"):
+                    self.accept("op", ":")
+                    types.append(self.take("name")[1])
+            if self.at("op", "*"):
+                raise UnsupportedCypher("Chưa hỗ trợ quan hệ độ dài biến (*)")
+            self.take("op", "]")
+        outgoing = bool(self.accept("op", "->"))
+        if not outgoing:
+            self.take("op", "-")
+        if incoming and outgoing:
+            raise UnsupportedCypher("Quan hệ không thể có hai chiều <-->")
+        direction = "in" if incoming else "out" if outgoing else "both"
+        return {"var": var, "types": types, "direction": direction}
+
+    def parse_pattern(self):
+        if self.at("name") and self.at("op", "=", 1):
+            raise UnsupportedCypher("Chưa hỗ trợ biến đường đi (p = ...)")
+        nodes, rels = [self.parse_node()], []
+        while self.at("op", "-") or self.at("op", "<-"):
+            rels.append(self.parse_rel())
+            nodes.append(self.parse_node())
+        return {"nodes": nodes, "rels": rels}
+
+    def parse_map(self):
+        self.take("op", "{")
+        props = {}
+        if not self.at("op", "}"):
+            while True:
+                key = self.take("name")[1]
+                self.take("op", ":")
+                props[key] = self.parse_expr()
+                if not self.accept("op", ","):
+                    break
+        self.take("op", "}")
+        return props
+
+    # --- biểu thức (độ ưu tiên: OR < XOR < AND < NOT < so sánh < cộng < nhân < đơn) ---
+    def parse_expr(self):
+        left = self.parse_xor()
+        while self.accept("kw", "OR"):
+            left = ("or", left, self.parse_xor())
+        return left
+
+    def parse_xor(self):
+        left = self.parse_and()
+        while self.accept("kw", "XOR"):
+            left = ("xor", left, self.parse_and())
+        return left
+
+    def parse_and(self):
+        left = self.parse_not()
+        while self.accept("kw", "AND"):
+            left = ("and", left, self.parse_not())
+        return left
+
+    def parse_not(self):
+        if self.accept("kw", "NOT"):
+            return ("not", self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_additive()
+        while True:
+            if self.at("op") and self.peek()[1] in COMPARISONS:
+                op = self.take()[1]
+                left = ("cmp", "<>" if op == "!=" else op, left, self.parse_additive())
+            elif self.at("op", "<-"):
+                # "a <-1" : tách thành "<" và số âm
+                self.take()
+                left = ("cmp", "<", left, ("neg", self.parse_additive()))
+            elif self.accept("kw", "CONTAINS"):
+                left = ("contains", left, self.parse_additive())
+            elif self.at("kw", "STARTS"):
+                self.take(); self.take("kw", "WITH")
+                left = ("starts", left, self.parse_additive())
+            elif self.at("kw", "ENDS"):
+                self.take(); self.take("kw", "WITH")
+                left = ("ends", left, self.parse_additive())
+            elif self.accept("kw", "IN"):
+                left = ("in", left, self.parse_additive())
+            elif self.accept("op", "=~"):
+                left = ("regex", left, self.parse_additive())
+            elif self.accept("kw", "IS"):
+                negate = bool(self.accept("kw", "NOT"))
+                self.take("kw", "NULL")
+                left = ("isnull", left, negate)
+            else:
+                return left
+
+    def parse_additive(self):
+        left = self.parse_multiplicative()
+        while self.at("op", "+") or self.at("op", "-"):
+            op = self.take()[1]
+            left = ("arith", op, left, self.parse_multiplicative())
+        return left
+
+    def parse_multiplicative(self):
+        left = self.parse_unary()
+        while self.at("op", "*") or self.at("op", "/") or self.at("op", "%"):
+            op = self.take()[1]
+            left = ("arith", op, left, self.parse_unary())
+        return left
+
+    def parse_unary(self):
+        if self.accept("op", "-"):
+            return ("neg", self.parse_unary())
+        if self.accept("op", "+"):
+            return self.parse_unary()
+        return self.parse_postfix()
+
+    def parse_postfix(self):
+        expr = self.parse_atom()
+        while self.at("op", ".") and self.peek(1)[0] in ("name", "kw"):
+            self.take()
+            tok = self.take()
+            # thuộc tính trùng từ khóa (n.count...) -> lấy nguyên văn
+            expr = ("prop", expr, tok[1] if tok[0] == "name" else self.query[tok[2]:tok[3]])
+        return expr
+
+    def parse_atom(self):
+        tok = self.peek()
+        kind, value = tok[0], tok[1]
+        if kind in ("str", "num"):
+            self.take()
+            return ("lit", value)
+        if kind == "param":
+            self.take()
+            return ("param", value)
+        if kind == "kw" and value in ("TRUE", "FALSE", "NULL"):
+            self.take()
+            return ("lit", {"TRUE": True, "FALSE": False, "NULL": None}[value])
+        if self.accept("op", "("):
+            expr = self.parse_expr()
+            self.take("op", ")")
+            return expr
+        if self.accept("op", "["):
+            items = []
+            if not self.at("op", "]"):
+                items.append(self.parse_expr())
+                while self.accept("op", ","):
+                    items.append(self.parse_expr())
+            self.take("op", "]")
+            return ("list", items)
+        if kind == "name":
+            self.take()
+            if self.accept("op", "("):
+                name = value.lower()
+                distinct = bool(self.accept("kw", "DISTINCT"))
+                args = []
+                if self.accept("op", "*"):
+                    args.append(("star",))
+                elif not self.at("op", ")"):
+                    args.append(self.parse_expr())
+                    while self.accept("op", ","):
+                        args.append(self.parse_expr())
+                self.take("op", ")")
+                if name in AGGREGATES:
+                    return ("agg", name, args[0] if args else ("star",), distinct)
+                if name not in FUNCTIONS:
+                    raise UnsupportedCypher(f"Chưa hỗ trợ hàm {value}()")
+                return ("func", name, args)
+            return ("var", value)
+        raise UnsupportedCypher(f"Biểu thức không hợp lệ tại {value!r} (vị trí {tok[2]})")
+
+
+# ------------------------------------------------------------------------------
+# 3. Tính giá trị biểu thức (logic ba trị của Cypher: None = null)
+# ------------------------------------------------------------------------------
+def _string_fn(fn):
+    return lambda x: fn(x) if isinstance(x, str) else None
+
+
+def _to_number(cast):
+    def convert(x):
+        try:
+            return cast(x) if x is not None else None
+        except (TypeError, ValueError):
+            return None
+    return convert
+
+
+FUNCTIONS = {
+    "tolower": _string_fn(str.lower),
+    "toupper": _string_fn(str.upper),
+    "trim": _string_fn(str.strip),
+    "ltrim": _string_fn(str.lstrip),
+    "rtrim": _string_fn(str.rstrip),
+    "tostring": lambda x: None if x is None else str(x),
+    "tointeger": _to_number(lambda x: int(float(x))),
+    "tofloat": _to_number(float),
+    "size": lambda x: None if x is None else len(x),
+    "coalesce": lambda *xs: next((x for x in xs if x is not None), None),
+    "abs": lambda x: None if x is None else abs(x),
+    "labels": lambda x: list(x.labels) if isinstance(x, NodeRef) else None,
+}
+
+
+class NodeRef:
+    """Node gắn vào một biến khi duyệt (trả về dict thuộc tính khi RETURN n)."""
+    __slots__ = ("id", "labels", "props")
+
+    def __init__(self, node_id, labels, props):
+        self.id = node_id
+        self.labels = labels
+        self.props = props
+
+
+def _comparable(a, b):
+    numbers = (int, float)
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b)
+    return (isinstance(a, numbers) and isinstance(b, numbers)) or type(a) is type(b)
+
+
+def _compare(op, a, b):
+    if a is None or b is None:
+        return None
+    if op == "=":
+        return a == b if _comparable(a, b) else False
+    if op == "<>":
+        return a != b if _comparable(a, b) else True
+    if not _comparable(a, b):
+        return None
+    return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[op]
+
+
+def _and(a, b):
+    if a is False or b is False:
+        return False
+    if a is None or b is None:
+        return None
+    return True
+
+
+def _or(a, b):
+    if a is True or b is True:
+        return True
+    if a is None or b is None:
+        return None
+    return False
+
+
+def evaluate(expr, row, params):
+    kind = expr[0]
+    if kind == "lit":
+        return expr[1]
+    if kind == "param":
+        if expr[1] not in params:
+            raise UnsupportedCypher(f"Thiếu tham số ${expr[1]}")
+        return params[expr[1]]
+    if kind == "var":
+        if expr[1] not in row:
+            raise UnsupportedCypher(f"Biến chưa khai báo: {expr[1]}")
+        return row[expr[1]]
+    if kind == "prop":
+        target = evaluate(expr[1], row, params)
+        if isinstance(target, NodeRef):
+            return target.props.get(expr[2])
+        if isinstance(target, dict):
+            return target.get(expr[2])
+        return None
+    if kind == "list":
+        return [evaluate(e, row, params) for e in expr[1]]
+    if kind == "func":
+        return FUNCTIONS[expr[1]](*[evaluate(a, row, params) for a in expr[2]])
+    if kind == "and":
+        left = evaluate(expr[1], row, params)
+        if left is False:
+            return False
+        return _and(left, evaluate(expr[2], row, params))
+    if kind == "or":
+        left = evaluate(expr[1], row, params)
+        if left is True:
+            return True
+        return _or(left, evaluate(expr[2], row, params))
+    if kind == "xor":
+        a, b = evaluate(expr[1], row, params), evaluate(expr[2], row, params)
+        return None if a is None or b is None else a != b
+    if kind == "not":
+        value = evaluate(expr[1], row, params)
+        return None if value is None else not value
+    if kind == "cmp":
+        return _compare(expr[1], evaluate(expr[2], row, params), evaluate(expr[3], row, params))
+    if kind in ("contains", "starts", "ends", "regex"):
+        a, b = evaluate(expr[1], row, params), evaluate(expr[2], row, params)
+        if not isinstance(a, str) or not isinstance(b, str):
+            return None
+        if kind == "contains":
+            return b in a
+        if kind == "starts":
+            return a.startswith(b)
+        if kind == "ends":
+            return a.endswith(b)
+        return re.fullmatch(b, a) is not None
+    if kind == "in":
+        value, items = evaluate(expr[1], row, params), evaluate(expr[2], row, params)
+        if items is None:
+            return None
+        if value in items:
+            return True
+        return None if value is None or None in items else False
+    if kind == "isnull":
+        value = evaluate(expr[1], row, params)
+        return (value is not None) if expr[2] else (value is None)
+    if kind == "neg":
+        value = evaluate(expr[1], row, params)
+        return None if value is None else -value
+    if kind == "arith":
+        a, b = evaluate(expr[2], row, params), evaluate(expr[3], row, params)
+        if a is None or b is None:
+            return None
+        op = expr[1]
+        if op == "+":
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        if op == "/":
+            return a // b if isinstance(a, int) and isinstance(b, int) else a / b
+        return a % b
+    if kind == "agg":
+        raise UnsupportedCypher("Hàm gộp chỉ được dùng trong RETURN")
+    raise UnsupportedCypher(f"Biểu thức chưa hỗ trợ: {kind}")
+
+
+def variables_of(expr):
+    """Các biến mà biểu thức tham chiếu tới."""
+    if not isinstance(expr, tuple):
+        return set()
+    if expr[0] == "var":
+        return {expr[1]}
+    found = set()
+    for part in expr[1:]:
+        if isinstance(part, tuple):
+            found |= variables_of(part)
+        elif isinstance(part, list):
+            for item in part:
+                found |= variables_of(item)
+    return found
+
+
+def has_aggregate(expr):
+    if not isinstance(expr, tuple):
+        return False
+    if expr[0] == "agg":
+        return True
+    return any(has_aggregate(p) if isinstance(p, tuple) else
+               any(has_aggregate(i) for i in p) if isinstance(p, list) else False
+               for p in expr[1:])
+
+
+def split_conjuncts(expr):
+    if expr is None:
+        return []
+    if expr[0] == "and":
+        return split_conjuncts(expr[1]) + split_conjuncts(expr[2])
+    return [expr]
+
+
+def to_output(value):
+    """NodeRef -> dict thuộc tính (giống Neo4jGraph.query)."""
+    if isinstance(value, NodeRef):
+        return dict(value.props)
+    if isinstance(value, list):
+        return [to_output(v) for v in value]
+    return value
+
+
+def _sort_key(value):
+    # null xếp cuối khi tăng dần (như Neo4j); khác kiểu thì so theo tên kiểu
+    if value is None:
+        return (2, "", 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, "number", value)
+    if isinstance(value, NodeRef):
+        return (1, "node", value.id)
+    return (1, type(value).__name__, value if not isinstance(value, (list, dict)) else str(value))
+
+
+def _aggregate(name, values, distinct):
+    if name == "count":
+        values = [v for v in values if v is not None]
+    if distinct:
+        seen, unique = set(), []
+        for v in values:
+            key = repr(to_output(v))
+            if key not in seen:
+                seen.add(key)
+                unique.append(v)
+        values = unique
+    if name == "count":
+        return len(values)
+    if name == "collect":
+        return [v for v in values if v is not None]
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    if name == "min":
+        return min(values, key=_sort_key)
+    if name == "max":
+        return max(values, key=_sort_key)
+    if name == "sum":
+        return sum(values)
+    return sum(values) / len(values)
+
+
+# ------------------------------------------------------------------------------
+# 4. Đồ thị
+# ------------------------------------------------------------------------------
+class MemoryGraph:
+    def __init__(self):
+        self.labels = []            # node id -> tuple nhãn
+        self.props = []             # node id -> dict thuộc tính
+        self.by_label = defaultdict(list)
+        self.by_key = {}            # (nhãn, giá trị khóa) -> node id (thay cho MERGE)
+        self.out_edges = defaultdict(lambda: defaultdict(list))   # id -> loại -> [id]
+        self.in_edges = defaultdict(lambda: defaultdict(list))
+        self.rel_count = 0
+        self._edge_set = set()
+        self._indexes = {}          # (nhãn, thuộc tính, lower?) -> {giá trị: [id]}
+        self.schema = ""
+        self.structured_schema = {}
+
+    # --- nạp dữ liệu ---
+    def merge_node(self, label, props):
+        """MERGE theo khóa của nhãn (NODE_KEYS), cập nhật thuộc tính (bỏ giá trị None)."""
+        props = {k: v for k, v in props.items() if v is not None}
+        key = (label, props.get(NODE_KEYS.get(label)))
+        node_id = self.by_key.get(key) if key[1] is not None else None
+        if node_id is None:
+            node_id = len(self.props)
+            self.labels.append((label,))
+            self.props.append(props)
+            self.by_label[label].append(node_id)
+            if key[1] is not None:
+                self.by_key[key] = node_id
+        else:
+            self.props[node_id].update(props)
+        self._indexes.clear()
+        return node_id
+
+    def merge_relationship(self, start, rel_type, end):
+        if (start, rel_type, end) in self._edge_set:
+            return
+        self._edge_set.add((start, rel_type, end))
+        self.out_edges[start][rel_type].append(end)
+        self.in_edges[end][rel_type].append(start)
+        self.rel_count += 1
+
+    def add_records(self, records):
+        """Thêm kết quả kg_records.row_records của một dòng CSV."""
+        hoat_chat = self.merge_node("HOẠT_CHẤT", records["HOẠT_CHẤT"])
+        if records["LOẠI_THUỐC"]:
+            self.merge_relationship(hoat_chat, "THUỘC_NHÓM", self.merge_node("LOẠI_THUỐC", records["LOẠI_THUỐC"]))
+        if records["TIÊU_CHUẨN"]:
+            tieu_chuan = self.merge_node("TIÊU_CHUẨN", records["TIÊU_CHUẨN"])
+            self.merge_relationship(hoat_chat, "CÓ_TIÊU_CHUẨN", tieu_chuan)
+            for section in records["MỤC"]:
+                self.merge_relationship(tieu_chuan, "CÓ_MỤC", self.merge_node("MỤC", section))
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        graph = cls()
+        for records in iter_csv_records(csv_path):
+            graph.add_records(records)
+        graph.refresh_schema()
+        return graph
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """Nạp từ snapshot nhị phân (kg_snapshot.py), không phải parse CSV / regex lại."""
+        from preprocessing.kgraph.kg_snapshot import KGSnapshot
+
+        graph = cls()
+        with KGSnapshot(path) as snapshot:
+            ids = [graph.merge_node(label, props) for _, label, props in snapshot.iter_nodes()]
+            for start, rel_type, end in snapshot.iter_relationships():
+                graph.merge_relationship(ids[start], rel_type, ids[end])
+        graph.refresh_schema()
+        return graph
+
+    # --- index băm theo thuộc tính (tạo khi dùng lần đầu) ---
+    def index(self, label, prop, lower=False):
+        key = (label, prop, lower)
+        if key not in self._indexes:
+            idx = defaultdict(list)
+            for node_id in self.by_label.get(label, []):
+                value = self.props[node_id].get(prop)
+                if value is None:
+                    continue
+                if lower:
+                    if not isinstance(value, str):
+                        continue
+                    value = value.lower()
+                if isinstance(value, (list, dict)):
+                    continue
+                idx[value].append(node_id)
+            self._indexes[key] = idx
+        return self._indexes[key]
+
+    def node_ref(self, node_id):
+        return NodeRef(node_id, self.labels[node_id], self.props[node_id])
+
+    # --- schema (cùng định dạng với Neo4jGraph) ---
+    def refresh_schema(self):
+        type_names = {str: "STRING", int: "INTEGER", float: "FLOAT", bool: "BOOLEAN", list: "LIST"}
+        node_props = {}
+        for label, ids in self.by_label.items():
+            seen = {}
+            for node_id in ids:
+                for prop, value in self.props[node_id].items():
+                    seen.setdefault(prop, type_names.get(type(value), "STRING"))
+            node_props[label] = [{"property": p, "type": t} for p, t in seen.items()]
+        relationships = []
+        for start, rel_type, end in RELATIONSHIPS:
+            if any(self.out_edges[i].get(rel_type) for i in self.by_label.get(start, [])):
+                relationships.append({"start": start, "type": rel_type, "end": end})
+        self.structured_schema = {"node_props": node_props, "rel_props": {},
+                                  "relationships": relationships,
+                                  "metadata": {"constraint": [], "index": []}}
+        node_lines = []
+        for label, props in node_props.items():
+            fields = ", ".join(f"{p['property']}: {p['type']}" for p in props)
+            node_lines.append(f"{label} {{{fields}}}")
+        rel_lines = [f"(:{r['start']})-[:{r['type']}]->(:{r['end']})" for r in relationships]
+        self.schema = "\n".join(["Node properties:"] + node_lines + ["Relationship properties:",
+                                                                     "The relationships:"] + rel_lines)
+
+    @property
+    def get_schema(self):
+        return self.schema
+
+    @property
+    def get_structured_schema(self):
+        return self.structured_schema
+
+    # --- truy vấn ---
+    def query(self, query, params=None):
+        plan = Parser(query).parse()
+        return self._execute(plan, params or {})
+
+    def _candidates(self, node, conjuncts, bound, params):
+        """Tập node khởi đầu cho một biến: dùng index nếu có điều kiện bằng, nếu không quét nhãn."""
+        var = node["var"]
+        if var in bound:
+            return [bound[var].id]
+        label = node["labels"][0] if node["labels"] else None
+        lookups = [(prop, expr, False) for prop, expr in node["props"].items() if not variables_of(expr)]
+        for c in conjuncts:
+            if c[0] != "cmp" or c[1] != "=":
+                continue
+            for left, right in ((c[2], c[3]), (c[3], c[2])):
+                if variables_of(right):
+                    continue
+                if left[0] == "prop" and left[1] == ("var", var):
+                    lookups.append((left[2], right, False))
+                elif (left[0] == "func" and left[1] == "tolower" and len(left[2]) == 1
+                      and left[2][0][0] == "prop" and left[2][0][1] == ("var", var)):
+                    lookups.append((left[2][0][2], right, True))
+        if label is not None:
+            for prop, expr, lower in lookups:
+                value = evaluate(expr, {}, params)
+                if isinstance(value, (list, dict)):
+                    continue
+                return list(self.index(label, prop, lower).get(value, []))
+            return list(self.by_label.get(label, []))
+        return list(range(len(self.props)))
+
+    def _node_matches(self, node_id, node, row, params):
+        if node["labels"] and not all(l in self.labels[node_id] for l in node["labels"]):
+            return False
+        props = self.props[node_id]
+        return all(_compare("=", props.get(k), evaluate(e, row, params)) for k, e in node["props"].items())
+
+    def _neighbours(self, node_id, rel):
+        direction, types = rel["direction"], rel["types"]
+        sources = []
+        if direction in ("out", "both"):
+            sources.append(self.out_edges.get(node_id, {}))
+        if direction in ("in", "both"):
+            sources.append(self.in_edges.get(node_id, {}))
+        for edges in sources:
+            for rel_type, targets in edges.items():
+                if types and rel_type not in types:
+                    continue
+                for target in targets:
+                    yield rel_type, target
+
+    def _plan_steps(self, patterns, conjuncts, params):
+        """
+        Mỗi đường đi bắt đầu từ node có ít ứng viên nhất (index / đã gắn biến), rồi mở rộng
+        hai phía. Trả về danh sách bước ("start", node) | ("expand", từ_biến, rel, node).
+        """
+        steps, bound_vars = [], set()
+        for pattern in patterns:
+            nodes, rels = pattern["nodes"], pattern["rels"]
+            costs = []
+            for i, node in enumerate(nodes):
+                if node["var"] in bound_vars:
+                    costs.append(0)
+                else:
+                    costs.append(len(self._candidates(node, conjuncts, {}, params)))
+            start = min(range(len(nodes)), key=lambda i: costs[i])
+            steps.append(("start", nodes[start]))
+            for i in range(start + 1, len(nodes)):
+                steps.append(("expand", nodes[i - 1]["var"], rels[i - 1], nodes[i]))
+            for i in range(start - 1, -1, -1):
+                rel = dict(rels[i])
+                rel["direction"] = {"out": "in", "in": "out", "both": "both"}[rel["direction"]]
+                steps.append(("expand", nodes[i + 1]["var"], rel, nodes[i]))
+            bound_vars.update(n["var"] for n in nodes)
+        return steps
+
+    def _match(self, steps, conjuncts, params):
+        """Duyệt theo các bước, kiểm tra điều kiện WHERE ngay khi đủ biến."""
+        checks = [(c, variables_of(c)) for c in conjuncts]
+        results = []
+
+        def ready(row, newly):
+            for cond, needed in checks:
+                if newly in needed and needed <= row.keys():
+                    if evaluate(cond, row, params) is not True:
+                        return False
+            return True
+
+        def bind(row, var, value):
+            if var in row:
+                # biến đã gắn (vd. xuất hiện ở hai đường đi) -> phải trùng node
+                return row if isinstance(row[var], NodeRef) and row[var].id == value.id else None
+            new_row = dict(row)
+            new_row[var] = value
+            return new_row if ready(new_row, var) else None
+
+        def walk(i, row):
+            if i == len(steps):
+                results.append(row)
+                return
+            step = steps[i]
+            if step[0] == "start":
+                node = step[1]
+                if node["var"] in row:
+                    walk(i + 1, row)
+                    return
+                for node_id in self._candidates(node, conjuncts, row, params):
+                    if self._node_matches(node_id, node, row, params):
+                        new_row = bind(row, node["var"], self.node_ref(node_id))
+                        if new_row is not None:
+                            walk(i + 1, new_row)
+            else:
+                _, from_var, rel, node = step
+                for rel_type, node_id in self._neighbours(row[from_var].id, rel):
+                    if not self._node_matches(node_id, node, row, params):
+                        continue
+                    new_row = bind(row, node["var"], self.node_ref(node_id))
+                    if new_row is not None and rel["var"]:
+                        new_row = bind(new_row, rel["var"], {"type": rel_type})
+                    if new_row is not None:
+                        walk(i + 1, new_row)
+
+        # Điều kiện không phụ thuộc biến nào (vd. 1 = 1) kiểm tra một lần
+        if all(evaluate(c, {}, params) is True for c, needed in checks if not needed):
+            walk(0, {})
+        return results
+
+    def _execute(self, plan, params):
+        conjuncts = split_conjuncts(plan["where"])
+        rows = self._match(self._plan_steps(plan["patterns"], conjuncts, params), conjuncts, params)
+
+        returns = plan["returns"]
+        names = [name for _, name in returns]
+        aggregated = any(has_aggregate(expr) for expr, _ in returns)
+        if aggregated:
+            projected = self._aggregate_rows(rows, returns, params)
+            bindings = [None] * len(projected)
+        else:
+            projected = [[evaluate(expr, row, params) for expr, _ in returns] for row in rows]
+            bindings = rows
+
+        if plan["distinct"]:
+            seen, unique, unique_bindings = set(), [], []
+            for values, binding in zip(projected, bindings):
+                key = repr([to_output(v) for v in values])
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(values)
+                    unique_bindings.append(binding)
+            projected, bindings = unique, unique_bindings
+
+        if plan["order"]:
+            def sort_value(values, binding, expr, text):
+                if text in names:
+                    return values[names.index(text)]
+                if binding is None:
+                    raise UnsupportedCypher(f"ORDER BY {text} phải là cột của RETURN khi có hàm gộp")
+                return evaluate(expr, binding, params)
+
+            order = list(range(len(projected)))
+            # Sắp ổn định theo từng khóa, từ khóa cuối lên khóa đầu
+            for expr, text, desc in reversed(plan["order"]):
+                order.sort(key=lambda i: _sort_key(sort_value(projected[i], bindings[i], expr, text)),
+                           reverse=desc)
+            projected = [projected[i] for i in order]
+
+        skip = evaluate(plan["skip"], {}, params) if plan["skip"] else 0
+        limit = evaluate(plan["limit"], {}, params) if plan["limit"] is not None else None
+        projected = projected[skip:] if limit is None else projected[skip:skip + limit]
+        return [{name: to_output(value) for name, value in zip(names, values)} for values in projected]
+
+    def _aggregate_rows(self, rows, returns, params):
+        keys = [i for i, (expr, _) in enumerate(returns) if not has_aggregate(expr)]
+        groups = {}
+        for row in rows:
+            key_values = [evaluate(returns[i][0], row, params) for i in keys]
+            group_key = repr([to_output(v) for v in key_values])
+            groups.setdefault(group_key, (key_values, []))[1].append(row)
+        # Không có cột nhóm và không có dòng nào -> vẫn trả 1 dòng (count = 0)
+        if not groups and not keys:
+            groups[""] = ([], [])
+
+        projected = []
+        for key_values, group_rows in groups.values():
+            values, k = [], 0
+            for i, (expr, _) in enumerate(returns):
+                if i in keys:
+                    values.append(key_values[k])
+                    k += 1
+                elif expr[0] == "agg":
+                    _, name, arg, distinct = expr
+                    if arg[0] == "star":
+                        items = [1] * len(group_rows)
+                    else:
+                        items = [evaluate(arg, row, params) for row in group_rows]
+                    values.append(_aggregate(name, items, distinct))
+                else:
+                    raise UnsupportedCypher("Chỉ hỗ trợ hàm gộp ở cấp ngoài cùng của cột RETURN")
+            projected.append(values)
+        return projected
+
+
+def load_memory_graph(csv_path):
+    return MemoryGraph.from_csv(csv_path)
@@ -0,0 +1,130 @@
+import re
+
+# ==========================================
+# TRÍCH XUẤT THUỘC TÍNH SỐ (Typed numeric properties)
+# ==========================================
+# Tách các số liệu định lượng (nhiệt độ nóng chảy, góc quay cực riêng, pH, nước...)
+# ra khỏi văn bản tính_chất / định_tính / tạp_chất thành các thuộc tính có kiểu
+# <tên>_min, <tên>_max, <tên>_đơn_vị để Neo4j dùng RANGE INDEX thay vì CONTAINS.
+
+# Số kiểu Dược điển: dấu phẩy thập phân, có thể có dấu +/- (kể cả dấu trừ unicode)
+NUMBER = r'([+\-−]?\s?\d+(?:[.,]\d+)?)'
+
+# Mỗi chỉ tiêu: (tên thuộc tính, đơn vị, regex từ khóa nhận diện)
+HOAT_CHAT_SPECS = [
+    ("nhiệt_độ_nóng_chảy", "°C", r'nhiệt độ nóng chảy|điểm chảy|\btnc\b|nóng chảy ở|chảy ở'),
+]
+
+TIEU_CHUAN_SPECS = [
+    ("nhiệt_độ_nóng_chảy", "°C", r'nhiệt độ nóng chảy|điểm chảy|\btnc\b'),
+    ("góc_quay_cực_riêng", "°", r'góc quay cực riêng|\[?GÓC QUAY\]?:'),
+    ("ph", "", r'\[PH\]|\bpH\b'),
+    ("nước", "%", r'\[NƯỚC\]|\bnước\s*\(phụ lục 10\.3\):?'),
+    ("mất_khối_lượng_do_làm_khô", "%", r'\[MẤT KHỐI LƯỢNG\]|mất khối lượng do làm khô'),
+    ("tro_sulfat", "%", r'\[TRO\]|tro sulfat'),
+]
+
+# Khoảng tìm giá trị sau từ khóa (ký tự)
+WINDOW = 200
+
+# Các mẫu giá trị, ưu tiên mẫu xuất hiện sớm nhất trong cửa sổ
+UNIT = r'\s?(?:°C|°|%)?'
+VALUE_PATTERNS = [
+    # "từ -58,0° đến -54,0°", "104 °C đến 110 °C", "2,0 – 2,8", "pH 5,0 - 7,0"
+    # Gạch nối ASCII chỉ là dấu khoảng khi có khoảng trắng hai bên, "-58,0" vẫn là số âm
+    ("range", re.compile(r'(?:từ\s*)?' + NUMBER + UNIT + r'(?:\s*(?:đến|–)\s*|\s+-\s+)' + NUMBER + UNIT,
+                         re.IGNORECASE)),
+    # "Không được quá 0,5 %"
+    ("max", re.compile(r'không\s+(?:được\s+)?(?:quá|lớn hơn|vượt quá)\s*' + NUMBER, re.IGNORECASE)),
+    # "Không được nhỏ hơn 98,0 %"
+    ("min", re.compile(r'không\s+(?:được\s+)?(?:nhỏ hơn|dưới|ít hơn|thấp hơn)\s*' + NUMBER, re.IGNORECASE)),
+    # "khoảng 143 °C", "~143°C"
+    ("approx", re.compile(r'(?:khoảng|xấp xỉ|~)\s*' + NUMBER, re.IGNORECASE)),
+]
+# Giá trị đơn lẻ chỉ chấp nhận khi có đơn vị nhiệt độ đi kèm ("tnc 143 °C")
+SINGLE_TEMPERATURE = re.compile(NUMBER + r'\s?°C')
+
+
+def parse_number(raw):
+    """Chuyển chuỗi số kiểu Việt Nam ('-58,0', '+ 21', '0,5') sang float."""
+    if raw is None:
+        return None
+    raw = raw.replace('−', '-').replace(' ', '').replace(',', '.')
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+def find_value(window, unit):
+    """Tìm (min, max) đầu tiên trong một đoạn văn bản ngay sau từ khóa."""
+    best = None
+    for kind, pattern in VALUE_PATTERNS:
+        match = pattern.search(window)
+        if match and (best is None or match.start() < best[1].start()):
+            best = (kind, match)
+
+    if unit == "°C":
+        match = SINGLE_TEMPERATURE.search(window)
+        if match and (best is None or match.start() < best[1].start()):
+            best = ("approx", match)
+
+    if best is None:
+        return None
+
+    kind, match = best
+    if kind == "range":
+        low, high = parse_number(match.group(1)), parse_number(match.group(2))
+        if low is None or high is None:
+            return None
+        return (min(low, high), max(low, high))
+    value = parse_number(match.group(1))
+    if value is None:
+        return None
+    if kind == "max":
+        return (None, value)
+    if kind == "min":
+        return (value, None)
+    return (value, value)
+
+
+def extract_numeric_properties(text, specs):
+    """
+    Trích xuất các thuộc tính số từ văn bản theo danh sách chỉ tiêu.
+    Trả về dict phẳng {<tên>_min, <tên>_max, <tên>_đơn_vị} (bỏ qua giá trị None).
+    """
+    props = {}
+    if not text:
+        return props
+
+    for name, unit, trigger in specs:
+        for trigger_match in re.finditer(trigger, text, re.IGNORECASE):
+            window = text[trigger_match.end(): trigger_match.end() + WINDOW]
+            # Không đọc lấn sang nhãn phụ tiếp theo ("[NƯỚC]: ... [TRO]: ...")
+            next_label = re.search(r'\[[A-ZÀ-Ỹ ]+\]:', window)
+            if next_label:
+                window = window[:next_label.start()]
+
+            value = find_value(window, unit)
+            if value is None:
+                continue
+
+            low, high = value
+            if low is not None:
+                props[f"{name}_min"] = low
+            if high is not None:
+                props[f"{name}_max"] = high
+            if unit:
+                props[f"{name}_đơn_vị"] = unit
+            break
+    return props
+
+
+def numeric_index_properties():
+    """Danh sách (nhãn node, thuộc tính) cần tạo RANGE INDEX."""
+    pairs = []
+    for label, specs in (("HOẠT_CHẤT", HOAT_CHAT_SPECS), ("TIÊU_CHUẨN", TIEU_CHUAN_SPECS)):
+        for name, _, _ in specs:
+            pairs.append((label, f"{name}_min"))
+            pairs.append((label, f"{name}_max"))
+    return pairs
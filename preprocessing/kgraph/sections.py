@@ -0,0 +1,114 @@
+import re
+
+# ==========================================
+# TÁCH MỤC (SECTION/CHUNK) CHO NODE TIÊU_CHUẨN
+# ==========================================
+# convert_docx_to_csv.py gom các chỉ tiêu phụ vào chung một cột với nhãn
+# "[PH]: ...", "[NƯỚC]: ...". Module này tách lại các trường dài thành từng mục
+# theo nhãn, rồi chia nhỏ mục quá dài, để truy vấn chỉ lấy đúng phần cần thiết.
+
+# Các trường của TIÊU_CHUẨN được tách mục (thuộc tính node -> tên trường)
+SECTION_FIELDS = ["định_tính", "định_lượng", "tạp_chất_và_độ_tinh_khiết"]
+
+# Nhãn cho phần nội dung đứng trước nhãn phụ đầu tiên
+MAIN_LABEL = "CHUNG"
+
+# Độ dài tối đa (ký tự) của một chunk
+MAX_CHUNK_CHARS = 800
+
+LABEL_PATTERN = re.compile(r'\[([A-ZÀ-Ỹ ]+)\]:')
+SENTENCE_END = re.compile(r'(?<=[.;])\s+')
+
+
+def split_sections(text):
+    """Tách văn bản theo nhãn phụ -> [(nhãn, nội dung), ...] theo đúng thứ tự xuất hiện."""
+    if not text:
+        return []
+
+    sections = []
+    label, start = MAIN_LABEL, 0
+    for match in LABEL_PATTERN.finditer(text):
+        content = text[start:match.start()].strip()
+        if content:
+            sections.append((label, content))
+        label, start = match.group(1).strip(), match.end()
+
+    content = text[start:].strip()
+    if content:
+        sections.append((label, content))
+    return sections
+
+
+def chunk_text(text, max_chars=MAX_CHUNK_CHARS):
+    """Chia đoạn dài thành các chunk <= max_chars, ưu tiên cắt ở cuối câu."""
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks, current = [], ""
+    for sentence in SENTENCE_END.split(text):
+        # Câu đơn lẻ dài hơn giới hạn -> cắt cứng
+        while len(sentence) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def section_records(ten_hoat_chat, field, text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Sinh danh sách thuộc tính node MỤC cho một trường của TIÊU_CHUẨN.
+    thứ_tự đánh số liên tục trong trường, phần đánh số chunk trong cùng một nhãn.
+    """
+    records = []
+    for label, content in split_sections(text):
+        for part, chunk in enumerate(chunk_text(content, max_chars)):
+            order = len(records)
+            records.append({
+                "khóa": f"{ten_hoat_chat}|{field}|{order}",
+                "thuộc_về_hoạt_chất": ten_hoat_chat,
+                "trường": field,
+                "nhãn": label,
+                "thứ_tự": order,
+                "phần": part,
+                "nội_dung": chunk,
+                "độ_dài": len(chunk),
+            })
+    return records
+
+
+# ==========================================
+# API TRUY XUẤT
+# ==========================================
+SECTIONS_QUERY = """
+MATCH (n:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(:TIÊU_CHUẨN)-[:CÓ_MỤC]->(m:MỤC)
+WHERE toLower(n.tên_hoạt_chất) CONTAINS toLower($ten)
+  AND ($field IS NULL OR m.trường = $field)
+  AND ($labels IS NULL OR m.nhãn IN $labels)
+RETURN n.tên_hoạt_chất AS tên_hoạt_chất, m.trường AS trường, m.nhãn AS nhãn,
+       m.thứ_tự AS thứ_tự, m.nội_dung AS nội_dung
+ORDER BY tên_hoạt_chất, trường, thứ_tự
+"""
+
+
+def get_sections(graph, ten_hoat_chat, field=None, labels=None):
+    """
+    Lấy các mục của một hoạt chất, chỉ trả về trường / nhãn được yêu cầu
+    (ví dụ labels=["PH", "NƯỚC"]) thay vì toàn bộ chuỗi tạp_chất_và_độ_tinh_khiết.
+    """
+    params = {
+        "ten": ten_hoat_chat,
+        "field": field,
+        "labels": [label.upper() for label in labels] if labels else None,
+    }
+    if hasattr(graph, "query"):
+        return graph.query(SECTIONS_QUERY, params)
+    return graph.run(SECTIONS_QUERY, **params).data()
@@ -1,7 +1,15 @@
 import os
-import google.generativeai as genai
+import sys
+import time
+import asyncio
+import threading
 from dotenv import load_dotenv
 
+# Thêm thư mục gốc vào sys.path (chạy trực tiếp python preprocessing/llm.py) và import qua package
+# preprocessing: cùng một module llm_backend với experiments -> except CassetteMiss bắt được lỗi từ đây
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from preprocessing.llm_backend import make_backend, GeminiBackend, CassetteMiss
+
 # ========================================================
 # 1. TỰ ĐỘNG CẤU HÌNH (Auto-Config)
 # ========================================================
@@ -24,9 +32,6 @@ if not GOOGLE_API_KEY:
     # Key dự phòng (Fallback) nếu file .env bị lỗi hoặc chưa tạo
     print("⚠️ Cảnh báo: Không đọc được key.env")
 
-# Cấu hình Gemini
-genai.configure(api_key=GOOGLE_API_KEY.strip())
-
 # --- THAY ĐỔI THEO YÊU CẦU: Dùng Model 2.0 Flash ---
 MODEL_NAME = "models/gemini-2.0-flash"
 
@@ -47,13 +52,15 @@ safety_settings = [
   {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
 ]
 
-# Khởi tạo Model
-try:
-    model = genai.GenerativeModel(model_name=MODEL_NAME,
-                                  generation_config=generation_config,
-                                  safety_settings=safety_settings)
-except Exception as e:
-    print(f"❌ Lỗi khởi tạo Model {MODEL_NAME}: {e}")
+# Khởi tạo backend khi gọi lần đầu (gemini | record | replay, xem llm_backend.py)
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = make_backend(lambda: GeminiBackend(MODEL_NAME, GOOGLE_API_KEY,
+                                                      generation_config, safety_settings))
+    return _backend
 
 # ========================================================
 # 3. CÁC HÀM GIAO TIẾP (API Wrappers - Giữ nguyên tên hàm gốc)
@@ -72,25 +79,83 @@ def get_gemini(text):
     """
     try:
         # Gọi API sinh nội dung
-        response = model.generate_content([text])
-        return response.text
+        return get_backend().complete(text)["text"]
+    except CassetteMiss:
+        # Replay thiếu prompt: báo lỗi thật, không trả chuỗi lỗi như thể là câu trả lời
+        raise
+    except Exception as e:
+        return _error_message(e)
+
+
+def _error_message(e):
+    # Xử lý lỗi nếu Google chặn hoặc hết quota
+    err_msg = str(e)
+    if "429" in err_msg or "Quota" in err_msg:
+        return "Lỗi: Hết Quota (Limit Exceeded). Vui lòng thử lại sau."
+    return f"Lỗi Gemini: {err_msg}"
+
+
+def stream_gemini(text, stats=None):
+    """
+    Như get_gemini nhưng sinh từng đoạn văn bản ngay khi Gemini trả về.
+    stats (dict, tùy chọn) được điền ttft_ms, latency_ms, prompt_tokens, completion_tokens.
+    """
+    start = time.perf_counter()
+    try:
+        stream = get_backend().stream(text)
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as done:
+                response = done.value or {}
+                break
+            if stats is not None and "ttft_ms" not in stats:
+                stats["ttft_ms"] = (time.perf_counter() - start) * 1000
+            yield chunk
+        if stats is not None:
+            stats.update({k: response.get(k) for k in ("prompt_tokens", "completion_tokens")})
+    except CassetteMiss:
+        raise
     except Exception as e:
-        # Xử lý lỗi nếu Google chặn hoặc hết quota
-        err_msg = str(e)
-        if "429" in err_msg or "Quota" in err_msg:
-            return "Lỗi: Hết Quota (Limit Exceeded). Vui lòng thử lại sau."
-        return f"Lỗi Gemini: {err_msg}"
+        yield _error_message(e)
+    if stats is not None:
+        stats["latency_ms"] = (time.perf_counter() - start) * 1000
+
+
+async def astream_gemini(text, stats=None):
+    """Bản async của stream_gemini (SDK đồng bộ chạy trong một thread riêng)."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def produce():
+        try:
+            for chunk in stream_gemini(text, stats):
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        chunk = await queue.get()
+        if chunk is done:
+            return
+        yield chunk
 
 # ========================================================
 # 4. CHẠY TEST NHANH
 # ========================================================
 if __name__ == "__main__":
     print(f"--- Đang test llm.py ---")
-    print(f"✅ Model đang dùng: {MODEL_NAME}")
-    print(f"🔑 Key đang dùng: ...{GOOGLE_API_KEY[-5:]}")
+    print(f"✅ Model đang dùng: {MODEL_NAME} (backend: {get_backend().name})")
+    print(f"🔑 Key đang dùng: ...{(GOOGLE_API_KEY or '')[-5:]}")
     
     while True:
         q = input("\nBạn hỏi (gõ 'exit' để thoát): ")
         if q.lower() in ['exit', 'quit']: break
         
-        print("Bot đáp:", get_gemini(q))
\ No newline at end of file
+        print("Bot đáp: ", end="", flush=True)
+        stats = {}
+        for chunk in stream_gemini(q, stats):
+            print(chunk, end="", flush=True)
+        print(f"\n⏱️ Token đầu tiên: {stats.get('ttft_ms', 0):.0f} ms | Toàn bộ: {stats['latency_ms']:.0f} ms")
\ No newline at end of file
@@ -0,0 +1,441 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+
+# ==============================================================================
+# BACKEND LLM CÓ THỂ THAY THẾ: GEMINI / GHI (RECORD) / PHÁT LẠI (REPLAY)
+# ==============================================================================
+# Mọi lời gọi LLM (llm.py, RAG, zero-shot) đi qua backend.complete(prompt), trả về
+# {"text", "prompt_tokens", "completion_tokens", "latency_ms"}.
+# backend.stream(prompt) là generator sinh từng đoạn văn bản, khi kết thúc trả về
+# (StopIteration.value) cùng dict đó kèm "ttft_ms" (thời gian tới đoạn đầu tiên).
+#   gemini : gọi thật
+#   record : gọi thật + ghi (prompt, phản hồi) vào cassette (JSONL, mỗi dòng một lần gọi)
+#   replay : trả phản hồi từ cassette, không cần mạng; có thể giả lập độ trễ và lỗi 429
+#
+# Biến môi trường: LLM_BACKEND=gemini|record|replay, LLM_CASSETTE=<đường dẫn>,
+# LLM_REPLAY_LATENCY=recorded|<giây>, LLM_REPLAY_429_RATE=<0..1>, LLM_REPLAY_SEED=<int>
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CASSETTE = os.path.join(BASE_DIR, "data", "cassettes", "gemini.jsonl")
+
+
+class CassetteMiss(KeyError):
+    """Prompt không có trong cassette (chế độ replay)."""
+
+
+class SimulatedRateLimitError(Exception):
+    """Lỗi 429 giả lập; thông báo chứa "429" như lỗi thật của Gemini."""
+
+
+# ------------------------------------------------------------------------------
+# Khóa tra cứu
+# ------------------------------------------------------------------------------
+# Prompt của RAG chứa ví dụ few-shot / ngữ cảnh thay đổi theo phiên bản code, và log
+# cũ chỉ lưu câu hỏi -> ngoài khóa theo toàn văn prompt, còn tra theo (loại, câu hỏi).
+def _last(marker, end):
+    """Bắt đoạn sau lần xuất hiện CUỐI của marker (prompt few-shot lặp lại marker nhiều lần)."""
+    return re.compile(marker + r'\s*((?:(?!' + marker + r').)+?)\s*' + end + r'\s*$', re.DOTALL)
+
+
+PROMPT_KINDS = [
+    ("cypher", _last("User input:", "Cypher query:")),
+    ("qa", _last("Question:", "Helpful Answer:")),
+    ("zero_shot", _last("Câu hỏi:", "")),
+]
+STREAM_CHUNK = re.compile(r'\s*\S+')
+HILL_NOTE = re.compile(r'\s*\(Khóa Hill của công thức [^)]*\)')
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def normalize_question(question):
+    question = HILL_NOTE.sub("", question or "")
+    return re.sub(r'\s+', ' ', question).strip().lower()
+
+
+def question_key(kind, question):
+    return f"{kind}|{normalize_question(question)}"
+
+
+def prompt_question_key(prompt):
+    for kind, pattern in PROMPT_KINDS:
+        m = pattern.search(prompt)
+        if m:
+            return question_key(kind, m.group(1))
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Cassette
+# ------------------------------------------------------------------------------
+class Cassette:
+    def __init__(self, path=DEFAULT_CASSETTE):
+        self.path = path
+        self.by_prompt = {}
+        self.by_question = {}
+        self.size = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def __len__(self):
+        return self.size
+
+    def _index(self, entry):
+        self.size += 1
+        if entry.get("prompt_key"):
+            self.by_prompt[entry["prompt_key"]] = entry
+        if entry.get("question_key"):
+            self.by_question[entry["question_key"]] = entry
+
+    def lookup(self, prompt):
+        entry = self.by_prompt.get(prompt_key(prompt))
+        if entry is None:
+            qkey = prompt_question_key(prompt)
+            entry = self.by_question.get(qkey) if qkey else None
+        return entry
+
+    def append(self, entry):
+        with self._lock:
+            self._index(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# ------------------------------------------------------------------------------
+# Backend
+# ------------------------------------------------------------------------------
+class GeminiBackend:
+    """Gọi google.generativeai trực tiếp (dùng cho llm.py)."""
+    name = "gemini"
+
+    def __init__(self, model_name, api_key, generation_config=None, safety_settings=None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.generation_config = generation_config
+        self.safety_settings = safety_settings
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=(self.api_key or "").strip())
+            self._model = genai.GenerativeModel(model_name=self.model_name,
+                                                generation_config=self.generation_config,
+                                                safety_settings=self.safety_settings)
+        return self._model
+
+    def complete(self, prompt):
+        start = time.perf_counter()
+        response = self._get_model().generate_content([prompt])
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "text": response.text,
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None),
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def stream(self, prompt):
+        start = time.perf_counter()
+        response = self._get_model().generate_content([prompt], stream=True)
+        parts, ttft_ms = [], None
+        for chunk in response:
+            if not chunk.text:
+                continue
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            parts.append(chunk.text)
+            yield chunk.text
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "text": "".join(parts),
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None),
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "ttft_ms": ttft_ms,
+        }
+
+
+class ChatModelBackend:
+    """Bọc một chat model của langchain (ChatGoogleGenerativeAI...) thành backend."""
+    name = "chat_model"
+
+    def __init__(self, chat_model):
+        self.chat_model = chat_model
+
+    def complete(self, prompt):
+        start = time.perf_counter()
+        message = self.chat_model.invoke([prompt])
+        usage = getattr(message, "usage_metadata", None) or {}
+        return {
+            "text": message.content,
+            "prompt_tokens": usage.get("input_tokens"),
+            "completion_tokens": usage.get("output_tokens"),
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def stream(self, prompt):
+        start = time.perf_counter()
+        parts, ttft_ms, usage = [], None, {}
+        for chunk in self.chat_model.stream([prompt]):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if not chunk.content:
+                continue
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            parts.append(chunk.content)
+            yield chunk.content
+        return {
+            "text": "".join(parts),
+            "prompt_tokens": usage.get("input_tokens"),
+            "completion_tokens": usage.get("output_tokens"),
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "ttft_ms": ttft_ms,
+        }
+
+
+class RecordingBackend:
+    """Gọi backend thật rồi ghi (prompt, phản hồi) vào cassette."""
+    name = "record"
+
+    def __init__(self, inner, cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def _record(self, prompt, response):
+        self.cassette.append({
+            "prompt_key": prompt_key(prompt),
+            "question_key": prompt_question_key(prompt),
+            "prompt": prompt,
+            **response,
+            "recorded_at": time.time(),
+        })
+        return response
+
+    def complete(self, prompt):
+        return self._record(prompt, self.inner.complete(prompt))
+
+    def stream(self, prompt):
+        response = yield from self.inner.stream(prompt)
+        return self._record(prompt, response)
+
+
+class ReplayBackend:
+    """
+    Phát lại từ cassette.
+    latency       : None (trả ngay) | "recorded" (ngủ đúng độ trễ đã ghi) | số giây cố định
+    rate_limit_rate: xác suất ném SimulatedRateLimitError (429) cho mỗi lời gọi
+    """
+    name = "replay"
+
+    def __init__(self, cassette, latency=None, rate_limit_rate=0.0, seed=42):
+        self.cassette = cassette
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.misses = 0
+        self.rate_limited = 0
+
+    def _delay(self, entry):
+        if self.latency == "recorded":
+            return (entry.get("latency_ms") or 0) / 1000
+        return float(self.latency or 0)
+
+    def _entry(self, prompt):
+        with self._lock:
+            self.calls += 1
+            inject = self.rate_limit_rate and self.rng.random() < self.rate_limit_rate
+            if inject:
+                self.rate_limited += 1
+        if inject:
+            raise SimulatedRateLimitError("429 Resource has been exhausted (simulated)")
+
+        entry = self.cassette.lookup(prompt)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            raise CassetteMiss(f"Không có trong cassette {self.cassette.path}: {prompt[-120:]!r}")
+        return entry
+
+    def complete(self, prompt):
+        entry = self._entry(prompt)
+        delay = self._delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return {
+            "text": entry["text"],
+            "prompt_tokens": entry.get("prompt_tokens"),
+            "completion_tokens": entry.get("completion_tokens"),
+            "latency_ms": delay * 1000,
+        }
+
+    def stream(self, prompt):
+        """Chia câu trả lời đã ghi thành từng từ; độ trễ: ttft đã ghi rồi rải đều phần còn lại."""
+        entry = self._entry(prompt)
+        delay = self._delay(entry)
+        chunks = STREAM_CHUNK.findall(entry["text"]) or [entry["text"]]
+        first = delay / len(chunks)
+        if self.latency == "recorded" and entry.get("ttft_ms") is not None:
+            first = min(entry["ttft_ms"] / 1000, delay)
+        rest = (delay - first) / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            pause = first if i == 0 else rest
+            if pause > 0:
+                time.sleep(pause)
+            yield chunk
+        return {
+            "text": entry["text"],
+            "prompt_tokens": entry.get("prompt_tokens"),
+            "completion_tokens": entry.get("completion_tokens"),
+            "latency_ms": delay * 1000,
+            "ttft_ms": first * 1000,
+        }
+
+
+def consume_stream(stream, on_chunk):
+    """Chạy hết backend.stream(...), gọi on_chunk(text) cho từng đoạn; trả về dict phản hồi."""
+    while True:
+        try:
+            on_chunk(next(stream))
+        except StopIteration as done:
+            return done.value
+
+
+def make_backend(live_factory, kind=None, cassette_path=None):
+    """
+    Tạo backend theo LLM_BACKEND. live_factory() tạo backend gọi thật (chỉ gọi khi cần).
+    """
+    kind = kind or os.getenv("LLM_BACKEND", "gemini")
+    cassette_path = cassette_path or os.getenv("LLM_CASSETTE", DEFAULT_CASSETTE)
+    if kind == "gemini":
+        return live_factory()
+    if kind == "record":
+        return RecordingBackend(live_factory(), Cassette(cassette_path))
+    if kind == "replay":
+        latency = os.getenv("LLM_REPLAY_LATENCY") or None
+        if latency and latency != "recorded":
+            latency = float(latency)
+        return ReplayBackend(Cassette(cassette_path), latency=latency,
+                             rate_limit_rate=float(os.getenv("LLM_REPLAY_429_RATE", "0")),
+                             seed=int(os.getenv("LLM_REPLAY_SEED", "42")))
+    raise ValueError(f"LLM_BACKEND không hợp lệ: {kind} (gemini | record | replay)")
+
+
+def as_chat_model(backend):
+    """Bọc backend thành chat model langchain để cắm vào GraphCypherQAChain."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    class BackendChatModel(BaseChatModel):
+        backend: object
+
+        @property
+        def _llm_type(self):
+            return f"backend-{self.backend.name}"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = "\n".join(str(m.content) for m in messages)
+            response = self.backend.complete(prompt)
+            message = AIMessage(content=response["text"])
+            if response.get("prompt_tokens") is not None and response.get("completion_tokens") is not None:
+                message.usage_metadata = {
+                    "input_tokens": response["prompt_tokens"],
+                    "output_tokens": response["completion_tokens"],
+                    "total_tokens": response["prompt_tokens"] + response["completion_tokens"],
+                }
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = "\n".join(str(m.content) for m in messages)
+            stream = self.backend.stream(prompt)
+            while True:
+                try:
+                    text = next(stream)
+                except StopIteration as done:
+                    response = done.value
+                    break
+                yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if response.get("prompt_tokens") is not None and response.get("completion_tokens") is not None:
+                yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata={
+                    "input_tokens": response["prompt_tokens"],
+                    "output_tokens": response["completion_tokens"],
+                    "total_tokens": response["prompt_tokens"] + response["completion_tokens"],
+                }))
+
+    return BackendChatModel(backend=backend)
+
+
+# ------------------------------------------------------------------------------
+# Tạo cassette từ log có sẵn (logs/gemini_log.json, logs/gemini_zero_shot_*.json)
+# ------------------------------------------------------------------------------
+def entries_from_log(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        # Log RAG: chỉ lời gọi trả lời được giữ lại (logs/gemini_log.json không lưu Cypher đã sinh)
+        # -> cassette seed từ log không đủ cho replay RAG, cần ghi bằng LLM_BACKEND=record
+        for key in sorted(data):
+            for e in data[key]:
+                if e.get("cypher"):
+                    yield {"question_key": question_key("cypher", e["question"]), "text": e["cypher"],
+                           "source": os.path.basename(path)}
+                if e.get("answer_model") and not e.get("error"):
+                    yield {"question_key": question_key("qa", e["question"]), "text": e["answer_model"],
+                           "source": os.path.basename(path)}
+    else:
+        for e in data:
+            if e.get("model_answer"):
+                yield {"question_key": question_key("zero_shot", e["question"]), "text": e["model_answer"],
+                       "latency_ms": (e.get("time") or 0) * 1000, "source": os.path.basename(path)}
+
+
+def seed_cassette(log_paths, cassette_path=DEFAULT_CASSETTE):
+    cassette = Cassette(cassette_path)
+    added = 0
+    for path in log_paths:
+        for entry in entries_from_log(path):
+            if entry["question_key"] not in cassette.by_question:
+                cassette.append(entry)
+                added += 1
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quản lý cassette LLM (record / replay)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_seed = sub.add_parser("seed", help="Tạo cassette từ log cũ")
+    p_seed.add_argument("logs", nargs="*", help="Mặc định: logs/gemini_log.json, logs/gemini_zero_shot_*.json")
+    p_seed.add_argument("--out", default=DEFAULT_CASSETTE)
+    args = parser.parse_args(argv)
+
+    logs = args.logs or ([os.path.join(BASE_DIR, "logs", "gemini_log.json")] +
+                         sorted(glob.glob(os.path.join(BASE_DIR, "logs", "gemini_zero_shot_*.json"))))
+    logs = [p for p in logs if os.path.exists(p)]
+    if not logs:
+        print("❌ Không tìm thấy file log nào.")
+        return 1
+    added = seed_cassette(logs, args.out)
+    print(f"✅ Đã thêm {added} mục vào cassette {args.out} từ {len(logs)} file log.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# ==============================================================================
+# CHẠY PIPELINE THEO DAG, CHỈ LÀM LẠI CÁC BƯỚC BỊ ẢNH HƯỞNG
+# ==============================================================================
+# Mỗi bước khai báo lệnh, thư mục chạy, file đầu vào / đầu ra, mã nguồn liên quan và biến môi trường
+# ảnh hưởng tới kết quả. Thứ tự suy ra từ file: B phụ thuộc A nếu B đọc file A ghi (hoặc after=).
+# Một bước được bỏ qua khi so với lần chạy thành công trước (data/cache/pipeline_state.json):
+#   - nội dung đầu vào + mã nguồn + biến môi trường không đổi (băm sha256, cache theo size / mtime)
+#   - mọi bước phụ thuộc không chạy lại (vân tay của chúng không đổi)
+#   - đủ file đầu ra
+# Bước sửa file tại chỗ (create_multi_answer ghi đè 1hop.json / 2hop.json) so file đó với bản nó
+# đã ghi, nên không tự làm mình lỗi thời; bước sinh ra file gốc vẫn được coi là mới nhất.
+# Các bước độc lập (nạp KG và tạo triples, sinh câu hỏi 1-hop và 2-hop) chạy song song (--jobs).
+# Đầu ra của từng bước ghi vào data/cache/pipeline/<bước>.log.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join(BASE_DIR, "data", "cache", "pipeline_state.json")
+LOG_DIR = os.path.join(BASE_DIR, "data", "cache", "pipeline")
+
+KGRAPH = "preprocessing/kgraph"
+BENCH = "preprocessing/benchmark"
+KG_CODE = (f"{KGRAPH}/kg_records.py", f"{KGRAPH}/formula.py", f"{KGRAPH}/sections.py",
+           f"{KGRAPH}/numeric_props.py")
+LLM_CODE = ("preprocessing/llm.py", "preprocessing/llm_backend.py", f"{BENCH}/utils.py")
+LLM_ENV = ("LLM_BACKEND", "LLM_CASSETTE")
+EVAL_ENV = LLM_ENV + ("GRAPH_BACKEND", "KG_CSV", "KG_SNAPSHOT", "SCORING_PROFILE", "SAMPLING", "SAMPLE_SEED",
+                      "CONTEXT_TOKEN_BUDGET", "QUERY_PLAN_MODE", "PLAN_ENFORCE")
+
+
+class Stage:
+    def __init__(self, name, cmd, cwd=".", inputs=(), outputs=(), code=(), env=(), after=(), help=""):
+        self.name = name
+        self.cmd = cmd
+        self.cwd = cwd
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.code = tuple(code)
+        self.env = tuple(env)
+        self.after = tuple(after)
+        self.help = help
+
+
+STAGES = [
+    Stage("convert_docx", ["convert_docx_to_csv.py"], KGRAPH,
+          inputs=["data/data-1-200.docx", "data/data-201-615.docx", "data/data-616-815.docx"],
+          outputs=["data/data_midterm.csv"], code=[f"{KGRAPH}/convert_docx_to_csv.py"],
+          help="docx Dược điển -> data_midterm.csv"),
+    Stage("create_kg", ["create_KG.py"], KGRAPH,
+          inputs=["data/data_midterm.csv"], code=[f"{KGRAPH}/create_KG.py", *KG_CODE],
+          help="CSV -> Neo4j (không có file đầu ra, trạng thái lưu trong pipeline_state.json)"),
+    Stage("kg_snapshot", ["-m", "preprocessing.kgraph.kg_snapshot", "export"],
+          inputs=["data/data_midterm.csv"], outputs=["data/kg.snapshot"],
+          code=[f"{KGRAPH}/kg_snapshot.py", f"{KGRAPH}/memory_graph.py", *KG_CODE],
+          help="CSV -> snapshot nhị phân cho GRAPH_BACKEND=memory"),
+    Stage("create_triple", ["create_triple.py"], BENCH,
+          inputs=["data/data_midterm.csv"], outputs=["data/benchmark/triples.json"],
+          code=[f"{BENCH}/create_triple.py"], help="CSV -> triples.json"),
+    Stage("question_1hop", ["create_question_1hop.py"], BENCH,
+          inputs=["data/benchmark/triples.json"],
+          outputs=["data/benchmark/1hop_drug_to_X.json", "data/benchmark/1hop_X_to_drug.json",
+                   "data/benchmark/1hop.json"],
+          code=[f"{BENCH}/create_question_1hop.py", *LLM_CODE], env=LLM_ENV, help="Sinh câu hỏi 1-hop (LLM)"),
+    Stage("question_2hop", ["create_question_2hop.py"], BENCH,
+          inputs=["data/benchmark/triples.json"], outputs=["data/benchmark/2hop.json"],
+          code=[f"{BENCH}/create_question_2hop.py", *LLM_CODE], env=LLM_ENV, help="Sinh câu hỏi 2-hop (LLM)"),
+    Stage("multi_answer", ["create_multi_answer.py"], BENCH,
+          inputs=["data/benchmark/1hop.json", "data/benchmark/2hop.json"],
+          outputs=["data/benchmark/1hop.json", "data/benchmark/2hop.json", "data/benchmark/dedup_report.json"],
+          code=[f"{BENCH}/create_multi_answer.py", f"{BENCH}/near_duplicates.py", f"{BENCH}/utils.py"],
+          help="Bỏ trùng, gộp đáp án, gộp câu gần trùng 1-hop / 2-hop (tại chỗ)"),
+    Stage("eval_rag", ["-m", "experiments", "eval", "--mode", "rag"],
+          inputs=["data/benchmark/1hop.json", "data/benchmark/2hop.json"],
+          outputs=["logs/gemini_log.json", "results/gemini_results.txt"],
+          code=["experiments/*.py", *LLM_CODE, *KG_CODE, f"{KGRAPH}/memory_graph.py", f"{KGRAPH}/kg_snapshot.py"],
+          env=EVAL_ENV, after=["create_kg", "kg_snapshot"], help="Thực nghiệm RAG (KG + Gemini)"),
+    Stage("eval_zero_shot", ["-m", "experiments", "eval", "--mode", "zero-shot"],
+          inputs=["data/benchmark/1hop.json", "data/benchmark/2hop.json"],
+          outputs=["logs/gemini_zero_shot_1-hop.json", "logs/gemini_zero_shot_2-hop.json"],
+          code=["experiments/*.py", *LLM_CODE], env=EVAL_ENV, help="Thực nghiệm Zero-shot"),
+]
+
+
+# ------------------------------------------------------------------------------
+# DAG
+# ------------------------------------------------------------------------------
+def dependencies(stages):
+    """{tên: tập bước phải xong trước}; B phụ thuộc A nếu B đọc file A ghi hoặc after=A."""
+    writers = {}
+    for stage in stages:
+        for path in stage.outputs:
+            writers.setdefault(path, []).append(stage.name)
+    names = {stage.name for stage in stages}
+    deps = {}
+    for stage in stages:
+        found = {name for name in stage.after if name in names}
+        for path in stage.inputs:
+            found.update(w for w in writers.get(path, ()) if w != stage.name)
+        deps[stage.name] = found
+    topological_order(stages, deps)  # báo lỗi sớm nếu có vòng
+    return deps
+
+
+def topological_order(stages, deps):
+    order, state = [], {}
+
+    def visit(name, trail):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Pipeline có vòng phụ thuộc: {' -> '.join(trail + [name])}")
+        state[name] = "visiting"
+        for dep in sorted(deps[name]):
+            visit(dep, trail + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for stage in stages:
+        visit(stage.name, [])
+    return order
+
+
+def _closure(start, edges):
+    seen, todo = set(), [start]
+    while todo:
+        name = todo.pop()
+        if name not in seen:
+            seen.add(name)
+            todo.extend(edges.get(name, ()))
+    return seen
+
+
+def select(stages, deps, start=None, end=None, only=None):
+    """--from: bước đó + mọi bước phía sau; --to: bước đó + mọi bước phía trước; --only: đúng các bước."""
+    names = [stage.name for stage in stages]
+    for name in [start, end, *(only or [])]:
+        if name and name not in names:
+            raise ValueError(f"Không có bước '{name}' (có: {', '.join(names)})")
+    selected = set(names)
+    if only:
+        selected = set(only)
+    if start:
+        dependents = {}
+        for name, found in deps.items():
+            for dep in found:
+                dependents.setdefault(dep, set()).add(name)
+        selected &= _closure(start, dependents)
+    if end:
+        selected &= _closure(end, deps)
+    return [name for name in topological_order(stages, deps) if name in selected]
+
+
+# ------------------------------------------------------------------------------
+# Vân tay
+# ------------------------------------------------------------------------------
+class Fingerprints:
+    """sha256 nội dung file, cache theo (size, mtime_ns) để không băm lại docx / JSON lớn."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+        self.lock = threading.Lock()
+
+    def file(self, rel):
+        path = os.path.join(BASE_DIR, rel)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            cached = self.cache.get(rel)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self.lock:
+            self.cache[rel] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def code(self, patterns):
+        """Băm chung các file mã nguồn (chấp nhận glob như experiments/*.py)."""
+        digest = hashlib.sha256()
+        for pattern in patterns:
+            matches = sorted(glob.glob(os.path.join(BASE_DIR, pattern))) or [os.path.join(BASE_DIR, pattern)]
+            for path in matches:
+                rel = os.path.relpath(path, BASE_DIR)
+                digest.update(f"{rel}={self.file(rel)}\n".encode())
+        return digest.hexdigest()
+
+
+def _env_values(names):
+    return {name: os.getenv(name) for name in names}
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": {}, "files": {}}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def stale_reason(stage, record, fingerprints, dep_records):
+    """None nếu bước đã mới nhất, ngược lại là lý do phải chạy lại."""
+    if record is None:
+        return "chưa chạy lần nào"
+    if record["cmd"] != stage.cmd:
+        return "lệnh thay đổi"
+    missing = [p for p in stage.outputs if not os.path.exists(os.path.join(BASE_DIR, p))]
+    if missing:
+        return f"thiếu đầu ra {missing[0]}"
+    for path in stage.inputs:
+        # File bước này tự sửa tại chỗ: so với bản nó đã ghi, không phải bản nó đã đọc
+        expected = record["outputs"][path] if path in stage.outputs else record["inputs"].get(path)
+        if fingerprints.file(path) != expected:
+            return f"{path} thay đổi"
+    if fingerprints.code(stage.code) != record["code"]:
+        return "mã nguồn thay đổi"
+    if _env_values(stage.env) != record["env"]:
+        changed = [k for k, v in _env_values(stage.env).items() if record["env"].get(k) != v]
+        return f"biến môi trường thay đổi ({', '.join(changed)})"
+    for name, dep in dep_records.items():
+        if dep is None:
+            return f"bước trước '{name}' chưa chạy"
+        if dep["fingerprint"] != record["deps"].get(name):
+            return f"bước trước '{name}' đã chạy lại"
+    return None
+
+
+def _stage_fingerprint(inputs, outputs, code, env, deps):
+    """Bước sau chỉ cần chạy lại khi đầu ra đổi; bước không có file đầu ra (nạp Neo4j) dùng mọi thứ nó đã đọc."""
+    payload = json.dumps(outputs if outputs else [inputs, code, env, deps], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ------------------------------------------------------------------------------
+# Chạy
+# ------------------------------------------------------------------------------
+def _execute(stage, env):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        # -u: log ghi ngay, xem được tiến độ bằng tail -f khi đang chạy
+        process = subprocess.run([sys.executable, "-u", *stage.cmd], cwd=os.path.join(BASE_DIR, stage.cwd),
+                                 env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process.returncode, time.perf_counter() - start, log_path
+
+
+def run_pipeline(stages=None, start=None, end=None, only=None, force=False, jobs=2, dry_run=False,
+                 profile=False, state_path=STATE_PATH):
+    """Chạy các bước được chọn theo DAG; trả về {tên: "ok" | "mới nhất" | "lỗi" | "bỏ qua"}."""
+    stages = stages or STAGES
+    by_name = {stage.name: stage for stage in stages}
+    deps = dependencies(stages)
+    selected = select(stages, deps, start, end, only)
+    forced = set(selected) if force else ({start} if start else set())
+
+    state = load_state(state_path)
+    fingerprints = Fingerprints(state.setdefault("files", {}))
+    records = state.setdefault("stages", {})
+    env = dict(os.environ)
+    if profile:
+        env["PROFILE_STAGES"] = "1"
+
+    results, ran = {}, set()
+    lock = threading.Lock()
+
+    def decide(name):
+        """Lý do chạy (None = bỏ qua). Gọi khi mọi bước phụ thuộc đã xong."""
+        if name in forced:
+            return "chạy lại theo yêu cầu"
+        stage = by_name[name]
+        return stale_reason(stage, records.get(name), fingerprints, {d: records.get(d) for d in deps[name]})
+
+    if dry_run:
+        for name in selected:
+            reason = decide(name)
+            if reason:
+                ran.add(name)
+                print(f"▶️ {name:<16} sẽ chạy: {reason}")
+                continue
+            upstream = sorted(d for d in deps[name] if d in ran)
+            print(f"✅ {name:<16} mới nhất" + (f" (trừ khi '{upstream[0]}' đổi đầu ra)" if upstream else ""))
+        return {}
+
+    def finish(name):
+        stage = by_name[name]
+        inputs = {p: fingerprints.file(p) for p in stage.inputs}
+        outputs = {p: fingerprints.file(p) for p in stage.outputs}
+        code, env_values = fingerprints.code(stage.code), _env_values(stage.env)
+        dep_prints = {d: records[d]["fingerprint"] for d in deps[name] if d in records}
+        with lock:
+            records[name] = {"cmd": stage.cmd, "inputs": inputs, "outputs": outputs, "code": code,
+                             "env": env_values, "deps": dep_prints,
+                             "fingerprint": _stage_fingerprint(inputs, outputs, code, env_values, dep_prints),
+                             "finished": time.strftime("%Y-%m-%d %H:%M:%S")}
+            save_state(state, state_path)
+
+    pending = list(selected)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while pending or running:
+            for name in list(pending):
+                if any(d in pending or d in running.values() for d in deps[name] if d in selected):
+                    continue
+                pending.remove(name)
+                failed = [d for d in deps[name] if results.get(d) in ("lỗi", "bỏ qua")]
+                if failed:
+                    results[name] = "bỏ qua"
+                    print(f"⏭️ {name:<16} bỏ qua: bước trước '{failed[0]}' lỗi")
+                    continue
+                reason = decide(name)
+                if reason is None:
+                    results[name] = "mới nhất"
+                    print(f"✅ {name:<16} mới nhất")
+                    continue
+                # Đầu vào gốc (docx) không do pipeline tạo: thiếu mà đầu ra đã có (CSV tải sẵn) thì dùng luôn
+                stage = by_name[name]
+                missing = [p for p in stage.inputs if not os.path.exists(os.path.join(BASE_DIR, p))]
+                if missing and stage.outputs and all(os.path.exists(os.path.join(BASE_DIR, p))
+                                                     for p in stage.outputs):
+                    finish(name)
+                    results[name] = "mới nhất"
+                    print(f"⚠️ {name:<16} thiếu {missing[0]}, dùng đầu ra có sẵn")
+                    continue
+                if missing:
+                    results[name] = "lỗi"
+                    print(f"❌ {name:<16} thiếu đầu vào {missing[0]}")
+                    continue
+                print(f"▶️ {name:<16} chạy: {reason}")
+                running[executor.submit(_execute, by_name[name], env)] = name
+            if not running:
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                code, elapsed, log_path = future.result()
+                if code == 0:
+                    finish(name)
+                    ran.add(name)
+                    results[name] = "ok"
+                    print(f"🎉 {name:<16} xong sau {elapsed:.1f}s")
+                else:
+                    results[name] = "lỗi"
+                    print(f"❌ {name:<16} lỗi (mã {code}) sau {elapsed:.1f}s, xem {os.path.relpath(log_path)}")
+    save_state(state, state_path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chạy pipeline tiền xử lý + thực nghiệm, bỏ qua bước đã mới nhất")
+    parser.add_argument("--from", dest="start", help="Chạy lại từ bước này (bắt buộc) và các bước phía sau")
+    parser.add_argument("--to", dest="end", help="Dừng ở bước này (chỉ chạy nó và các bước phía trước)")
+    parser.add_argument("--only", nargs="+", help="Chỉ xét các bước này")
+    parser.add_argument("--force", action="store_true", help="Chạy lại mọi bước được chọn")
+    parser.add_argument("--jobs", "-j", type=int, default=2, help="Số bước độc lập chạy song song")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ in bước nào sẽ chạy và lý do")
+    parser.add_argument("--profile", action="store_true", help="Bật PROFILE_STAGES=1 cho các bước")
+    parser.add_argument("--list", action="store_true", help="In các bước và phụ thuộc")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        deps = dependencies(STAGES)
+        for stage in STAGES:
+            print(f"{stage.name:<16} {stage.help}")
+            if deps[stage.name]:
+                print(f"{'':<16} sau: {', '.join(sorted(deps[stage.name]))}")
+        return 0
+    try:
+        results = run_pipeline(start=args.start, end=args.end, only=args.only, force=args.force, jobs=args.jobs,
+                               dry_run=args.dry_run, profile=args.profile)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    return 1 if "lỗi" in results.values() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
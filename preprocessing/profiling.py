@@ -0,0 +1,320 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import atexit
+import pstats
+import cProfile
+import argparse
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+
+# ==============================================================================
+# ĐO HIỆU NĂNG TỪNG GIAI ĐOẠN PIPELINE (wall / CPU / cProfile / tracemalloc)
+# ==============================================================================
+# Mỗi bước (convert_docx_to_csv, create_KG, create_triple, sinh câu hỏi, create_multi_answer,
+# experiments) bọc phần chính trong `with stage("tên"):` hoặc `@profiled("tên")`. Mặc định tắt,
+# chi phí gần như bằng 0; bật bằng biến môi trường hoặc `enable()` (cờ --profile-stages của CLI):
+#   PROFILE_STAGES=1 | all  : wall + CPU + cProfile + đỉnh bộ nhớ tracemalloc
+#   PROFILE_STAGES=time     : không bật tracemalloc (tracemalloc làm chậm 2-3 lần, lệch thời gian)
+#   PROFILE_DIR=<thư mục>   : mặc định results/profiles
+#
+# Mỗi giai đoạn ghi vào PROFILE_DIR:
+#   <giai đoạn>.json       : wall_s, cpu_s, cpu_children_s, peak_bytes, top hàm theo cumtime
+#   <giai đoạn>.prof       : pstats (snakeviz / gprof2dot / `python -m pstats`)
+#   <giai đoạn>.collapsed  : stack gộp "a;b;c <µs>" cho flamegraph.pl / speedscope / inferno
+# và dựng lại report.json + pipeline.collapsed từ mọi giai đoạn đã có trong thư mục, nên chạy lần
+# lượt các script của pipeline (mỗi script một tiến trình) vẫn ra một báo cáo chung; chạy lại một
+# bước chỉ thay bản ghi của bước đó.
+#
+# Giai đoạn lồng nhau có tên dạng "cha/con"; wall / CPU / bộ nhớ của cha tính cả con, còn
+# cProfile của cha tạm dừng trong lúc con chạy (mỗi hàm chỉ thuộc một giai đoạn trong flamegraph).
+# Luồng con tạo trong giai đoạn (ThreadPoolExecutor của create_KG / sinh câu hỏi) được cProfile
+# theo từng luồng rồi gộp vào; CPU của tiến trình con (ProcessPool chấm điểm) nằm ở cpu_children_s.
+# Stack trong .collapsed là xấp xỉ: cProfile chỉ lưu cặp caller -> callee, mỗi hàm được gắn vào
+# chuỗi caller chiếm nhiều thời gian nhất.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = os.path.join(BASE_DIR, "results", "profiles")
+MODES = ("all", "time")
+TOP_FUNCTIONS = 25
+MAX_STACK_DEPTH = 48
+
+# Python < 3.12: cProfile gắn theo từng luồng -> cần hook cho luồng mới.
+# Python >= 3.12: cProfile dùng sys.monitoring, một profiler đã thấy mọi luồng.
+_PER_THREAD = sys.version_info < (3, 12)
+
+_mode = None          # None: chưa đọc biến môi trường; "": tắt
+_out_dir = None
+_stack = []
+_records = []
+_names = {}
+_lock = threading.Lock()
+_atexit_registered = False
+
+
+def enable(mode="all", out_dir=None):
+    """Bật đo cho tiến trình hiện tại (dùng thay PROFILE_STAGES, ví dụ từ cờ dòng lệnh)."""
+    global _mode, _out_dir
+    if mode not in MODES:
+        raise ValueError(f"Chế độ profile không hợp lệ: {mode} ({' | '.join(MODES)})")
+    _mode, _out_dir = mode, out_dir or _out_dir
+
+
+def enabled():
+    global _mode
+    if _mode is None:
+        value = os.getenv("PROFILE_STAGES", "").strip().lower()
+        _mode = "all" if value in ("1", "true", "yes", "all") else ("time" if value == "time" else "")
+    return bool(_mode)
+
+
+def out_dir():
+    return _out_dir or os.getenv("PROFILE_DIR") or DEFAULT_DIR
+
+
+class _Stage:
+    def __init__(self, name, parent):
+        self.path = f"{parent.path}/{name}" if parent else name
+        self.profiler = cProfile.Profile()
+        self.thread_profilers = []
+        self.peak = 0
+
+
+def _thread_hook(frame, event, arg):
+    """Chạy một lần ở lời gọi đầu tiên của luồng mới: gắn profiler riêng cho luồng đó."""
+    sys.setprofile(None)
+    current = _stack[-1] if _stack else None
+    if current is None:
+        return
+    profiler = cProfile.Profile()
+    with _lock:
+        current.thread_profilers.append(profiler)
+    profiler.enable()
+
+
+@contextmanager
+def stage(name):
+    """Đo một giai đoạn; tắt hoặc gọi từ luồng phụ thì chỉ chạy khối lệnh."""
+    if not enabled() or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    parent = _stack[-1] if _stack else None
+    current = _Stage(name, parent)
+    memory = _mode == "all"
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if memory:
+        mem_start, peak = tracemalloc.get_traced_memory()
+        if parent:
+            parent.peak = max(parent.peak, peak)
+        tracemalloc.reset_peak()
+    if parent:
+        parent.profiler.disable()
+    _stack.append(current)
+    if _PER_THREAD:
+        threading.setprofile(_thread_hook)
+
+    started = time.time()
+    children_start = _children_cpu()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    current.profiler.enable()
+    try:
+        yield
+    finally:
+        current.profiler.disable()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        children = _children_cpu() - children_start
+        _stack.pop()
+        if _PER_THREAD:
+            threading.setprofile(_thread_hook if _stack else None)
+        record = {"stage": _unique(current.path), "script": os.path.basename(sys.argv[0] or "-"),
+                  "pid": os.getpid(), "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started)),
+                  "wall_s": wall, "cpu_s": cpu, "cpu_children_s": children,
+                  "threads_profiled": len(current.thread_profilers)}
+        if memory:
+            mem_end, peak = tracemalloc.get_traced_memory()
+            current.peak = max(current.peak, peak)
+            record.update(peak_bytes=current.peak, peak_above_start_bytes=current.peak - mem_start,
+                          retained_bytes=mem_end - mem_start)
+            if parent:
+                parent.peak = max(parent.peak, current.peak)
+        # Dựng pstats trước khi bật lại profiler của cha: create_stats() tắt profile của luồng gọi
+        stats = pstats.Stats(current.profiler)
+        for profiler in current.thread_profilers:
+            stats.add(profiler)
+        _records.append((record, stats))
+        _register_atexit()
+        if parent:
+            parent.profiler.enable()
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def profiled(name=None):
+    """@profiled("create_triple") — bọc cả hàm trong một giai đoạn (mặc định tên hàm)."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _children_cpu():
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def _unique(path):
+    """Cùng giai đoạn chạy nhiều lần trong một tiến trình -> "tên#2", "tên#3"..."""
+    count = _names.get(path, 0) + 1
+    _names[path] = count
+    return path if count == 1 else f"{path}#{count}"
+
+
+def _slug(path):
+    return re.sub(r"[^\w.#-]+", "_", path.replace("/", "__"), flags=re.UNICODE)
+
+
+# ------------------------------------------------------------------------------
+# Từ pstats sang top hàm / stack gộp
+# ------------------------------------------------------------------------------
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name  # hàm built-in: "<built-in method time.sleep>"
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{"function": _label(func), "ncalls": nc, "tottime_s": tt, "cumtime_s": ct}
+            for func, (cc, nc, tt, ct, callers) in rows]
+
+
+def collapsed_stacks(stats, prefix):
+    """{"giai_đoạn;caller;...;hàm": µs tự thân}; caller chính = caller có cumtime lớn nhất."""
+    primary = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        if callers:
+            primary[func] = max(callers.items(), key=lambda item: item[1][3])[0]
+
+    stacks = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        micros = int(round(tt * 1e6))
+        if micros <= 0:
+            continue
+        chain, seen = [func], {func}
+        while chain[-1] in primary and len(chain) < MAX_STACK_DEPTH:
+            caller = primary[chain[-1]]
+            if caller in seen:
+                break
+            chain.append(caller)
+            seen.add(caller)
+        key = ";".join([*prefix.split("/"), *(_label(f).replace(";", ",") for f in reversed(chain))])
+        stacks[key] = stacks.get(key, 0) + micros
+    return stacks
+
+
+# ------------------------------------------------------------------------------
+# Ghi báo cáo
+# ------------------------------------------------------------------------------
+def _register_atexit():
+    global _atexit_registered
+    if not _atexit_registered:
+        atexit.register(write_report)
+        _atexit_registered = True
+
+
+def write_report(directory=None, quiet=False):
+    """Ghi các giai đoạn đã đo của tiến trình rồi dựng lại report.json / pipeline.collapsed."""
+    directory = directory or out_dir()
+    if not _records:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    while _records:
+        record, stats = _records.pop(0)
+        slug = _slug(record["stage"])
+        stats.dump_stats(os.path.join(directory, slug + ".prof"))
+        with open(os.path.join(directory, slug + ".collapsed"), "w", encoding="utf-8") as f:
+            for key, micros in sorted(collapsed_stacks(stats, record["stage"]).items()):
+                f.write(f"{key} {micros}\n")
+        record.update(total_calls=stats.total_calls, top=top_functions(stats),
+                      pstats=slug + ".prof", collapsed=slug + ".collapsed")
+        _write_json(os.path.join(directory, slug + ".json"), record)
+
+    report = build_report(directory)
+    if not quiet:
+        print(f"📈 Profile {len(report['stages'])} giai đoạn: {os.path.join(directory, 'report.json')}")
+        print(format_report(report))
+    return report
+
+
+def _write_json(path, data):
+    # Ghi qua file tạm + os.replace: các script chạy song song không đọc phải file ghi dở
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def build_report(directory=None):
+    directory = directory or out_dir()
+    stages = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        if os.path.basename(path) == "report.json":
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            stages.append(json.load(f))
+    stages.sort(key=lambda record: (record["started"], record["stage"]))
+
+    tmp = os.path.join(directory, f"pipeline.collapsed.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        for record in stages:
+            collapsed = os.path.join(directory, record["collapsed"])
+            if os.path.exists(collapsed):
+                with open(collapsed, "r", encoding="utf-8") as f:
+                    out.write(f.read())
+    os.replace(tmp, os.path.join(directory, "pipeline.collapsed"))
+
+    report = {"generated": time.strftime("%Y-%m-%d %H:%M:%S"), "python": sys.version.split()[0],
+              "collapsed": "pipeline.collapsed", "stages": stages}
+    _write_json(os.path.join(directory, "report.json"), report)
+    return report
+
+
+def format_report(report, top=3):
+    lines = [f"{'giai đoạn':<44} {'wall':>9} {'CPU':>9} {'CPU con':>8} {'đỉnh bộ nhớ':>12}"]
+    for record in report["stages"]:
+        peak = f"{record['peak_bytes'] / 2**20:.1f} MB" if "peak_bytes" in record else "-"
+        lines.append(f"{record['stage']:<44} {record['wall_s']:>8.2f}s {record['cpu_s']:>8.2f}s "
+                     f"{record['cpu_children_s']:>7.2f}s {peak:>12}")
+        for row in record.get("top", [])[:top]:
+            lines.append(f"    {row['cumtime_s']:>8.3f}s  {row['function']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In báo cáo profile của các giai đoạn pipeline")
+    parser.add_argument("--dir", default=out_dir(), help="Mặc định PROFILE_DIR hoặc results/profiles")
+    parser.add_argument("--top", type=int, default=5, help="Số hàm tốn nhất in cho mỗi giai đoạn")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.dir):
+        print(f"❌ Chưa có profile trong {args.dir} (chạy pipeline với PROFILE_STAGES=1)")
+        return 1
+    print(format_report(build_report(args.dir), top=args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+from experiments.cypher_lint import ensure_limit, lint_cypher
+
+UNCLOSED = "Chuỗi ký tự chưa đóng dấu nháy"
+
+
+def test_quote_inside_closed_literal_is_not_unclosed():
+    query = "MATCH (h:HOẠT_CHẤT) WHERE h.tên_hoạt_chất CONTAINS \"4,4'-diamino\" RETURN h.tên_latin LIMIT 5"
+    assert UNCLOSED not in lint_cypher(query)["errors"]
+
+
+def test_unclosed_literal_is_reported():
+    query = "MATCH (h:HOẠT_CHẤT) WHERE h.tên_hoạt_chất CONTAINS 'aspirin RETURN h.tên_latin"
+    assert UNCLOSED in lint_cypher(query)["errors"]
+
+
+def test_ensure_limit_after_trailing_comment():
+    query = "MATCH (h:HOẠT_CHẤT)\nRETURN h.tên_latin // tên latin"
+    assert ensure_limit(query, 10) == "MATCH (h:HOẠT_CHẤT)\nRETURN h.tên_latin LIMIT 10"
+
+
+def test_ensure_limit_keeps_slashes_in_strings():
+    query = "MATCH (h:HOẠT_CHẤT) WHERE h.mô_tả CONTAINS 'http://x' RETURN h;"
+    assert ensure_limit(query, 10) == "MATCH (h:HOẠT_CHẤT) WHERE h.mô_tả CONTAINS 'http://x' RETURN h LIMIT 10"
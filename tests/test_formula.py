@@ -0,0 +1,62 @@
+import pytest
+
+from preprocessing.kgraph.formula import (annotate_formula_question, formula_properties, full_hill_key, hill_key,
+                                          parent_formula)
+
+
+@pytest.mark.parametrize("formula, key", [
+    ("C9H8O4", "C9H8O4"),
+    # hydrat: khóa của hoạt chất gốc, không phụ thuộc lượng nước kết tinh
+    ("C14H18N6O2.1/2H2O", "C14H18N6O2"),
+    ("C16H19N3O4S.3H2O", "C16H19N3O4S"),
+    ("C14H18N6O2·½H₂O", "C14H18N6O2"),
+    # muối
+    ("C14H18N6O.1/2H2SO4", "C14H18N6O"),
+    ("(C14H18N6O)2.H2SO4", "C14H18N6O"),
+    ("C17H19ClN2S.HCl", "C17H19ClN2S"),
+    ("C15H26N2.H2SO4.5H2O", "C15H26N2"),
+    # công thức bị cắt cụt trong câu hỏi benchmark
+    ("C14H18N6O2.1", "C14H18N6O2"),
+    ("C18H21NO3.H3PO4.1", "C18H21NO3"),
+    ("C13H21NO3)2.H2SO4", "C13H21NO3"),
+    ("C20H24N2O2)2.H2SO4.2H2O", "C20H24N2O2"),
+    ("(C16H9N4Na3O9S2", "C16H9N4Na3O9S2"),
+])
+def test_hill_key_uses_parent_formula(formula, key):
+    assert hill_key(formula) == key
+
+
+def test_full_key_and_components_kept_separately():
+    props = formula_properties("C14H18N6O2.1/2H2O")
+    assert props == {"công_thức_hill": "C14H18N6O2", "nguyên_tố": ["C", "H", "N", "O"],
+                     "công_thức_hill_đầy_đủ": "C28H38N12O5", "thành_phần_phụ": ["1/2H2O"]}
+    assert full_hill_key("(C14H18N6O)2.H2SO4") == full_hill_key("C14H18N6O.1/2H2SO4") == "C28H38N12O6S"
+    assert "thành_phần_phụ" not in formula_properties("C9H8O4")
+
+
+def test_truncated_question_matches_stored_key():
+    stored = formula_properties("C14H18N6O2.1/2H2O")["công_thức_hill"]
+    question = annotate_formula_question("Chất nào có công thức [C14H18N6O2.1]?")
+    assert question.endswith(f"(Khóa Hill của công thức C14H18N6O2.1: {stored}; công thức gốc: C14H18N6O2)")
+    assert parent_formula("C13H21NO3)2.H2SO4") == "C13H21NO3"
+
+
+def test_invalid_formula():
+    assert hill_key("Magnesi hydroxyd") is None
+    assert formula_properties("") == {}
+
+
+def test_prompt_filter_finds_hydrate_from_truncated_question(tmp_path):
+    from benchmarks import fixtures
+    from preprocessing.kgraph.memory_graph import MemoryGraph
+
+    rows = fixtures.drug_rows(scale=0.01)
+    rows[0]["Cong_Thuc_Hoa_Hoc"] = "C14H18N6O2.1/2H2O"
+    graph = MemoryGraph.from_csv(fixtures.write_csv(rows, str(tmp_path)))
+
+    # Bộ lọc mà prompt / ngân hàng ví dụ sinh ra cho câu hỏi có "[C14H18N6O2.1]"
+    query = ("MATCH (n:HOẠT_CHẤT) WHERE (n.công_thức_hill = $key OR n.công_thức_hóa_học CONTAINS $parent) "
+             "RETURN n.tên_hoạt_chất AS name")
+    params = {"key": hill_key("C14H18N6O2.1"), "parent": parent_formula("C14H18N6O2.1")}
+    assert graph.query(query, params) == [{"name": rows[0]["Ten_Hoat_Chat"]}]
+    assert graph.query(query, {"key": "KHÔNG_CÓ", "parent": "C14H18N6O2"}) == [{"name": rows[0]["Ten_Hoat_Chat"]}]
@@ -0,0 +1,69 @@
+import pytest
+
+from benchmarks import fixtures
+from preprocessing.kgraph.kg_snapshot import KGSnapshot, bulk_load_neo4j, write_snapshot
+from preprocessing.kgraph.memory_graph import MemoryGraph
+
+
+@pytest.fixture(scope="module")
+def snapshot_pair(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("kg")
+    rows = fixtures.drug_rows(scale=0.05)
+    graph = MemoryGraph.from_csv(fixtures.write_csv(rows, str(directory)))
+    path = str(directory / "kg.snapshot")
+    meta = write_snapshot(graph, path, source="test")
+    return graph, path, meta, rows
+
+
+def test_round_trip_preserves_graph(snapshot_pair):
+    graph, path, meta, _ = snapshot_pair
+    loaded = MemoryGraph.from_snapshot(path)
+
+    assert loaded.props == graph.props
+    assert loaded.labels == graph.labels
+    assert loaded.rel_count == graph.rel_count == meta["relationships"]
+    assert loaded.schema == graph.schema
+    assert loaded.structured_schema == graph.structured_schema
+    assert {k: dict(v) for k, v in loaded.out_edges.items()} == {k: dict(v) for k, v in graph.out_edges.items()}
+
+
+def test_derived_index_lookup(snapshot_pair):
+    graph, path, _, rows = snapshot_pair
+    name = rows[3]["Ten_Hoat_Chat"]
+    with KGSnapshot(path) as snapshot:
+        found = snapshot.lookup("HOẠT_CHẤT.tên_hoạt_chất", "  " + name.upper() + " ")
+        assert len(found) == 1
+        label, props = snapshot.node(found[0])
+        assert label == "HOẠT_CHẤT" and props["tên_hoạt_chất"] == name
+        assert found == graph.by_label["HOẠT_CHẤT"][3:4]
+        assert snapshot.lookup("HOẠT_CHẤT.tên_hoạt_chất", "không có hoạt chất này") == []
+
+
+class RecordingNeo4j:
+    """Giả lập py2neo.Graph: ghi lại câu lệnh, trả elementId giả cho các node được nạp."""
+
+    def __init__(self):
+        self.statements = []
+
+    def run(self, query, **params):
+        self.statements.append(query)
+        rows = params.get("rows") or []
+        data = [{"sid": r["sid"], "eid": f"e{r['sid']}"} for r in rows if "sid" in r]
+        return type("Cursor", (), {"data": lambda self: data})()
+
+
+@pytest.mark.parametrize("clear", [True, False])
+def test_bulk_load_merges_when_keeping_data(snapshot_pair, clear):
+    graph, path, _, _ = snapshot_pair
+    neo4j = RecordingNeo4j()
+    with KGSnapshot(path) as snapshot:
+        nodes, rels = bulk_load_neo4j(snapshot, neo4j, batch_size=50, clear=clear)
+    assert (nodes, rels) == (len(graph.props), graph.rel_count)
+
+    loads = [q for q in neo4j.statements if q.startswith("UNWIND")]
+    assert any("DETACH DELETE" in q for q in neo4j.statements) == clear
+    if clear:
+        assert all("MERGE" not in q for q in loads)
+    else:
+        assert all("CREATE" not in q for q in loads)
+        assert any("MERGE (n:`HOẠT_CHẤT` {`tên_hoạt_chất`: r.key})" in q for q in loads)
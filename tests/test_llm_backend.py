@@ -0,0 +1,26 @@
+import sys
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from preprocessing import llm
+from preprocessing.llm_backend import Cassette, CassetteMiss, ReplayBackend
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "_backend", ReplayBackend(Cassette(str(tmp_path / "cassette.jsonl"))))
+
+
+def test_single_llm_backend_module():
+    # Import qua package: không có bản thứ hai "llm_backend" với các lớp khác kiểu
+    assert "llm_backend" not in sys.modules
+    assert llm.CassetteMiss is CassetteMiss
+
+
+def test_cassette_miss_propagates(replay):
+    with pytest.raises(CassetteMiss):
+        llm.get_gemini("Prompt chưa được ghi")
+    with pytest.raises(CassetteMiss):
+        list(llm.stream_gemini("Prompt chưa được ghi"))
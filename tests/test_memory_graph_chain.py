@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from langchain_community.graphs.graph_store import GraphStore
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from benchmarks import fixtures
+
+
+@pytest.fixture(scope="module")
+def graph(tmp_path_factory):
+    from experiments.rag import memory_graph_store
+    rows = fixtures.drug_rows(scale=0.05)
+    path = fixtures.write_csv(rows, str(tmp_path_factory.mktemp("kg")))
+    return memory_graph_store().from_csv(path), rows
+
+
+def test_memory_graph_is_graph_store(graph):
+    g, _ = graph
+    assert isinstance(g, GraphStore)
+    assert "HOẠT_CHẤT" in g.get_schema
+
+
+def test_chain_builds_and_answers_from_memory_graph(graph):
+    from experiments.kg_chain import KGCypherQAChain
+    from experiments.cypher_lint import load_schema
+
+    g, rows = graph
+    name = rows[0]["Ten_Hoat_Chat"]
+    cypher = f"MATCH (h:HOẠT_CHẤT) WHERE h.tên_hoạt_chất = '{name}' RETURN h.tên_latin"
+    llm = FakeListChatModel(responses=[cypher, "Tên Latin như trong cơ sở dữ liệu."])
+    chain = KGCypherQAChain.from_llm(llm, graph=g, allow_dangerous_requests=True,
+                                     cypher_schema=load_schema(g), return_intermediate_steps=True)
+    result = chain.invoke({"query": f"Tên Latin của {name} là gì?"})
+
+    assert result["result"] == "Tên Latin như trong cơ sở dữ liệu."
+    steps = result["intermediate_steps"]
+    assert rows[0]["Ten_Latin"] in str(steps)
+
+
+def test_bare_return_for_health_check(graph):
+    g, _ = graph
+    assert g.query("RETURN 1 AS ok") == [{"ok": 1}]
@@ -0,0 +1,97 @@
+import glob
+import os
+import warnings
+
+import pytest
+
+from experiments.metrics import lcs_length, meteor, rouge_l
+from experiments.scoring import iter_log_samples, tokenize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGS = sorted(glob.glob(os.path.join(ROOT, "logs", "*.json")))
+SAMPLES_PER_LOG = 60
+# "zero_shot" cần nltk punkt -> đối chiếu trên hai cách tách từ không cần tải dữ liệu
+PROFILES = ("shared", "rag")
+
+
+def log_samples():
+    """Lấy rải đều SAMPLES_PER_LOG cặp (đáp án chuẩn, câu trả lời) từ mỗi file logs/*.json."""
+    samples = []
+    for path in LOGS:
+        pairs = [(s["reference"], s["candidate"]) for s in iter_log_samples(path)
+                 if s["reference"] and s["candidate"]]
+        step = max(1, len(pairs) // SAMPLES_PER_LOG)
+        samples += [(os.path.basename(path), i, *pair) for i, pair in enumerate(pairs[::step][:SAMPLES_PER_LOG])]
+    return samples
+
+
+SAMPLES = log_samples() if LOGS else []
+
+
+def long_pair():
+    """Cặp văn bản vài KB ghép từ các câu trả lời trong log (như câu trả lời dài của Gemini)."""
+    references = [s[2] for s in SAMPLES]
+    candidates = [s[3] for s in SAMPLES]
+    reference, candidate = " ".join(references), " ".join(candidates[::-1])
+    return reference[:6000], candidate[:6000]
+
+
+@pytest.fixture(scope="module")
+def nltk_meteor():
+    pytest.importorskip("nltk")
+    from nltk.translate.meteor_score import meteor_score
+    try:
+        from nltk.corpus import wordnet
+        wordnet.ensure_loaded()
+    except LookupError:
+        pytest.skip("Chưa có dữ liệu WordNet của nltk")
+    warnings.filterwarnings("ignore", module="nltk")
+    return meteor_score
+
+
+@pytest.fixture(scope="module")
+def reference_lcs():
+    pytest.importorskip("rouge_score")
+    from rouge_score.rouge_scorer import _lcs_table
+    return lambda a, b: _lcs_table(a, b)[-1][-1]
+
+
+pytestmark = pytest.mark.skipif(not SAMPLES, reason="Không có logs/*.json")
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+def test_lcs_matches_rouge_score_on_logs(reference_lcs, profile):
+    mismatches = []
+    for log, i, reference, candidate in SAMPLES:
+        ref, cand = tokenize(reference, profile), tokenize(candidate, profile)
+        if lcs_length(ref, cand) != reference_lcs(ref, cand):
+            mismatches.append((log, i))
+    assert not mismatches
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+def test_meteor_matches_nltk_on_logs(nltk_meteor, profile):
+    mismatches = []
+    for log, i, reference, candidate in SAMPLES:
+        ref, cand = tokenize(reference, profile), tokenize(candidate, profile)
+        ours, theirs = meteor(ref, cand), nltk_meteor([ref], cand)
+        if abs(ours - theirs) > 1e-9:
+            mismatches.append((log, i, ours, theirs))
+    assert not mismatches
+
+
+def test_multi_kilobyte_input(reference_lcs, nltk_meteor):
+    reference, candidate = long_pair()
+    assert len(reference.encode("utf-8")) > 4096 and len(candidate.encode("utf-8")) > 4096
+    ref, cand = tokenize(reference, "shared"), tokenize(candidate, "shared")
+
+    lcs = lcs_length(ref, cand)
+    assert lcs == reference_lcs(ref, cand)
+    assert rouge_l(ref, cand) == pytest.approx(2 * lcs / (len(ref) + len(cand)))
+    assert meteor(ref, cand) == pytest.approx(nltk_meteor([ref], cand), abs=1e-9)
+
+
+def test_lcs_edge_cases():
+    assert lcs_length([], ["a"]) == 0
+    assert lcs_length(["a", "b", "c"], ["a", "b", "c"]) == 3
+    assert lcs_length(list("ABCBDAB"), list("BDCABA")) == 4
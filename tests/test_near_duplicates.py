@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "preprocessing", "benchmark"))
+
+from near_duplicates import find_near_duplicates, jaccard, answer_tokens  # noqa: E402
+
+QUESTION = "Hoạt chất [Paracetamol] có tên Latin là gì?"
+# A≈C và B≈C (J = 5/6) nhưng A≉B (J = 5/7 < 0,8)
+CHAIN = [{"question": QUESTION, "answer": "a b c d e p"},
+         {"question": QUESTION, "answer": "a b c d e q"},
+         {"question": QUESTION, "answer": "a b c d e"}]
+
+
+def test_chain_is_not_merged_transitively():
+    groups, stats = find_near_duplicates(CHAIN)
+    assert groups == [(0, [(2, 1.0, pytest.approx(5 / 6))])]
+    assert stats["merged"] == 1
+
+
+def test_merged_items_pass_both_thresholds_against_kept():
+    items = CHAIN + [{"question": QUESTION.replace("?", " ?"), "answer": "a b c d e p"},
+                     {"question": "Hoạt chất [Paracetamol natri] có tên Latin là gì?", "answer": "x y z"}]
+    groups, _ = find_near_duplicates(items, threshold=0.8, answer_threshold=0.8)
+    for kept, merged in groups:
+        for index, q_sim, a_sim in merged:
+            assert q_sim is not None and q_sim >= 0.8 and a_sim >= 0.8
+            assert jaccard(answer_tokens(items[kept]["answer"]), answer_tokens(items[index]["answer"])) == a_sim
+
+
+def test_merge_report(tmp_path):
+    import create_multi_answer
+
+    one_hop, two_hop, report_path = (str(tmp_path / name) for name in ("1hop.json", "2hop.json", "report.json"))
+    with open(one_hop, "w", encoding="utf-8") as f:
+        json.dump(CHAIN[:2], f, ensure_ascii=False)
+    with open(two_hop, "w", encoding="utf-8") as f:
+        json.dump(CHAIN[2:], f, ensure_ascii=False)
+
+    report = create_multi_answer.merge_near_duplicates([one_hop, two_hop], report_filename=report_path)
+
+    assert report["files"] == {"1hop.json": {"before": 2, "after": 2}, "2hop.json": {"before": 1, "after": 0}}
+    (group,) = report["groups"]
+    assert group["kept"]["answer"] == "a b c d e p"
+    (merged,) = group["merged"]
+    assert merged["file"] == "2hop.json" and merged["answer_similarity"] == round(5 / 6, 4)
+    with open(report_path, encoding="utf-8") as f:
+        assert json.load(f)["merged"] == 1
+    with open(two_hop, encoding="utf-8") as f:
+        assert json.load(f) == []
@@ -0,0 +1,20 @@
+import pytest
+
+from preprocessing.kgraph.numeric_props import find_value
+
+
+@pytest.mark.parametrize("window, unit, expected", [
+    (" 5,0 - 7,0.", "", (5.0, 7.0)),
+    (" từ -58,0° đến -54,0°", "°", (-58.0, -54.0)),
+    (": -58,0 - -54,0", "°", (-58.0, -54.0)),
+    (" 2,0 – 2,8", "", (2.0, 2.8)),
+    (": khoảng -58,0°", "°", (-58.0, -58.0)),
+    (" 143 °C", "°C", (143.0, 143.0)),
+])
+def test_find_value(window, unit, expected):
+    assert find_value(window, unit) == expected
+
+
+def test_unspaced_hyphen_is_a_sign_not_a_range():
+    # "5,0 -7,0" không có khoảng trắng sau gạch nối -> không đọc thành khoảng
+    assert find_value(" 5,0 -7,0", "") != (5.0, 7.0)
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from preprocessing import pipeline
+from preprocessing.pipeline import Stage, run_pipeline
+
+# Mỗi script nối thêm tên bước vào runs.log rồi ghi đầu ra từ đầu vào
+SCRIPT = """import sys
+name, source, target = sys.argv[1:4]
+with open("runs.log", "a") as f:
+    f.write(name + "\\n")
+if name == "fail":
+    sys.exit(1)
+with open(source) as f:
+    text = f.read()
+with open(target, "w") as f:
+    f.write(text + name)
+"""
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline, "LOG_DIR", str(tmp_path / "logs"))
+    (tmp_path / "step.py").write_text(SCRIPT)
+    (tmp_path / "raw.txt").write_text("raw")
+    return tmp_path
+
+
+def stage(name, source, target):
+    return Stage(name, ["step.py", name, source, target], inputs=[source], outputs=[target], code=["step.py"])
+
+
+STAGES = [stage("a", "raw.txt", "a.txt"), stage("b", "a.txt", "b.txt"), stage("c", "b.txt", "c.txt")]
+
+
+def run(tree, **kwargs):
+    return run_pipeline(STAGES, jobs=1, state_path=str(tree / "state.json"), **kwargs)
+
+
+def runs(tree):
+    path = tree / "runs.log"
+    lines = path.read_text().split() if path.exists() else []
+    path.unlink(missing_ok=True)
+    return lines
+
+
+def test_first_run_then_skip(tree):
+    assert run(tree) == {"a": "ok", "b": "ok", "c": "ok"}
+    assert runs(tree) == ["a", "b", "c"]
+    assert (tree / "c.txt").read_text() == "rawabc"
+
+    assert run(tree) == {"a": "mới nhất", "b": "mới nhất", "c": "mới nhất"}
+    assert runs(tree) == []
+
+
+def test_rerun_on_input_change(tree):
+    run(tree)
+    runs(tree)
+    (tree / "raw.txt").write_text("raw v2")
+    assert run(tree) == {"a": "ok", "b": "ok", "c": "ok"}
+    assert runs(tree) == ["a", "b", "c"]
+
+    # Sửa tay file giữa chừng: chỉ bước đọc file đó chạy lại
+    (tree / "b.txt").write_text("edited")
+    assert run(tree) == {"a": "mới nhất", "b": "mới nhất", "c": "ok"}
+    assert runs(tree) == ["c"]
+    assert (tree / "c.txt").read_text() == "editedc"
+
+
+def test_from_and_to(tree):
+    assert run(tree, end="b") == {"a": "ok", "b": "ok"}
+    assert runs(tree) == ["a", "b"]
+    assert not (tree / "c.txt").exists()
+
+    # --from bắt buộc chạy lại bước đó, bước sau chạy vì chưa chạy lần nào
+    assert run(tree, start="b") == {"b": "ok", "c": "ok"}
+    assert runs(tree) == ["b", "c"]
+    assert run(tree, start="b", end="b") == {"b": "ok"}
+    assert runs(tree) == ["b"]
+
+
+def test_failed_stage_is_not_recorded(tree):
+    stages = [stage("a", "raw.txt", "a.txt"), stage("fail", "a.txt", "f.txt"), stage("c", "f.txt", "c.txt")]
+    state = str(tree / "state.json")
+    assert run_pipeline(stages, jobs=1, state_path=state) == {"a": "ok", "fail": "lỗi", "c": "bỏ qua"}
+    assert "fail" not in pipeline.load_state(state)["stages"]
+    runs(tree)
+    assert run_pipeline(stages, jobs=1, state_path=state)["fail"] == "lỗi"
+    assert runs(tree) == ["fail"]
@@ -0,0 +1,87 @@
+from experiments.query_plan import QueryPlanProfiler, summarize_plan
+
+# summary.plan của neo4j driver 5 cho EXPLAIN MATCH (h:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(t) RETURN h, t
+EXPLAIN_PLAN = {
+    "operatorType": "ProduceResults@neo4j",
+    "identifiers": ["h", "t", "anon_0"],
+    "args": {"EstimatedRows": 1630.0, "Details": "h, t", "planner": "COST", "runtime": "PIPELINED"},
+    "children": [{
+        "operatorType": "Expand(All)@neo4j",
+        "identifiers": ["h", "t", "anon_0"],
+        "args": {"EstimatedRows": 1630.0, "Details": "(h)-[anon_0:CÓ_TIÊU_CHUẨN]->(t)"},
+        "children": [{
+            "operatorType": "NodeByLabelScan@neo4j",
+            "identifiers": ["h"],
+            "args": {"EstimatedRows": 815.0, "Details": "h:HOẠT_CHẤT"},
+            "children": [],
+        }],
+    }],
+}
+
+PROFILE_PLAN = {
+    "operatorType": "ProduceResults@neo4j", "identifiers": ["h"], "dbHits": 0, "rows": 1,
+    "args": {"EstimatedRows": 1.0, "Details": "h"},
+    "children": [{
+        "operatorType": "NodeIndexSeek@neo4j", "identifiers": ["h"], "dbHits": 2, "rows": 1,
+        "args": {"EstimatedRows": 1.0, "Details": "RANGE INDEX h:HOẠT_CHẤT(tên_hoạt_chất)"},
+        "children": [],
+    }],
+}
+
+
+class Summary:
+    def __init__(self, plan):
+        self.plan = self.profile = plan
+
+
+class Session:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params):
+        self.log.append(query)
+        result = type("Result", (), {})()
+        result.consume = lambda: Summary(EXPLAIN_PLAN)
+        return result
+
+
+class FakeGraph:
+    def __init__(self):
+        self.explained, self.executed = [], []
+        self._driver = type("Driver", (), {"session": lambda _, database=None: Session(self.explained)})()
+
+    def query(self, query, params=None):
+        self.executed.append(query)
+        return [{"ok": 1}]
+
+
+def test_summarize_explain_plan_reads_args():
+    plan = summarize_plan(EXPLAIN_PLAN)
+    assert plan["estimated_rows"] == 1630.0
+    assert plan["estimated_cost"] == 1630.0 + 1630.0 + 815.0
+    assert plan["db_hits"] is None
+    assert plan["label_scan"] == ["NodeByLabelScan"] and not plan["index_used"]
+    assert plan["operators"][2]["details"] == "h:HOẠT_CHẤT"
+
+
+def test_summarize_profile_plan():
+    plan = summarize_plan(PROFILE_PLAN)
+    assert plan["db_hits"] == 2 and plan["index_used"] and plan["estimated_rows"] == 1.0
+
+
+def test_over_budget_rejects_before_execution():
+    graph = FakeGraph()
+    profiler = QueryPlanProfiler(graph, profile_sample=0, db_hit_budget=1000, enforce="reject")
+    plan = summarize_plan(EXPLAIN_PLAN)
+    assert profiler.over_budget(plan)
+    assert not QueryPlanProfiler(graph, db_hit_budget=10000).over_budget(plan)
+
+    records, plan = profiler.run("MATCH (h:HOẠT_CHẤT)-[:CÓ_TIÊU_CHUẨN]->(t) RETURN h, t")
+    assert records == [] and plan["rejected"]
+    assert graph.explained and not graph.executed
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from experiments.report import build_report, compare_reports, failure_kind, format_report
+
+# (câu trả lời, điểm, độ trễ ms, question_type)
+ROWS = [
+    ("Aspirin là acid acetylsalicylic.", 0.6, 100, "định_tính"),
+    ("Paracetamol tan trong ethanol.", 0.8, 200, "định_tính"),
+    ("Không tìm thấy trong DB.", 0.0, 300, "định_lượng"),
+    ("Lỗi: hết thời gian chờ Neo4j", 0.0, 400, "định_lượng"),
+    ("Tôi không biết.", 0.0, 500, "bảo_quản"),
+]
+
+
+def write_log(directory, name, rows, hop="1-hop"):
+    entries = [{
+        "type": hop, "question": f"câu hỏi {i}", "question_type": question_type, "relation": "unknown",
+        "answer_ground_truth": "đáp án", "answer_model": answer,
+        "scores": {"bleu": score, "rouge": score, "meteor": score},
+        "spans": [{"stage": "total", "latency_ms": latency}],
+    } for i, (answer, score, latency, question_type) in enumerate(rows)]
+    path = directory / name
+    path.write_text(json.dumps({"1_hop_data": entries}, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_failure_kinds():
+    assert failure_kind({}, "Aspirin là acid.") is None
+    assert failure_kind({}, "  ") == "not_found"
+    assert failure_kind({}, "Không tìm thấy trong DB") == "not_found"
+    assert failure_kind({}, "❌ Lỗi Gemini") == "error"
+    assert failure_kind({"error": "TimeoutError"}, "Aspirin là acid.") == "error"
+    assert failure_kind({}, "I don't know") == "refusal"
+
+
+def test_report_on_tiny_log(tmp_path):
+    report = build_report([write_log(tmp_path, "run.json", ROWS)], resamples=200)
+    hop = report["hops"]["1-hop"]
+
+    assert hop["count"] == 5 and hop["profile"] == "rag"
+    assert hop["failure_rate"] == pytest.approx(0.6)
+    assert hop["failures"] == {"not_found": 1, "error": 1, "refusal": 1}
+    # Nội suy tuyến tính trên 100..500
+    assert hop["latency_ms"] == pytest.approx({"p50": 300, "p95": 480, "p99": 496})
+    assert hop["rouge"]["mean"] == pytest.approx(0.28)
+    assert hop["rouge"]["lo"] <= 0.28 <= hop["rouge"]["hi"]
+
+    types = hop["question_type"]
+    assert list(types) == ["định_tính", "định_lượng", "bảo_quản"]
+    assert types["định_tính"]["failure_rate"] == 0 and types["định_tính"]["rouge"]["mean"] == pytest.approx(0.7)
+    assert types["định_lượng"]["failure_rate"] == 1
+    assert list(hop["relation"]) == ["unknown"]
+
+    text = format_report(report)
+    assert "Thất bại      : 60.0% (error 1, not_found 1, refusal 1)" in text
+    assert "p50 300 | p95 480 | p99 496" in text
+
+
+def test_compare_reports_flags_significant_changes(tmp_path):
+    before = [(answer, 0.1, latency, qt) for answer, _, latency, qt in ROWS]
+    after = [(answer, 0.9 if qt == "định_tính" else 0.1, latency * 2, qt) for answer, _, latency, qt in ROWS]
+    baseline = build_report([write_log(tmp_path, "before.json", before)], resamples=200)
+    current = build_report([write_log(tmp_path, "after.json", after)], resamples=200)
+
+    diff = compare_reports(current, baseline)["1-hop"]
+    rouge = diff["metrics"]["rouge"]
+    assert rouge["before"] == pytest.approx(0.1) and rouge["after"] == pytest.approx(0.42)
+    assert rouge["delta"] == pytest.approx(0.32)
+    assert diff["failure_rate"] == (pytest.approx(0.6), pytest.approx(0.6))
+    assert diff["latency_ms"][1]["p50"] == 2 * diff["latency_ms"][0]["p50"]
+
+    by_type = {name: (n, delta, significant) for name, n, _, _, delta, significant in diff["question_type"]}
+    assert by_type["định_tính"] == (2, pytest.approx(0.8), True)
+    assert by_type["định_lượng"] == (2, pytest.approx(0.0), False)
+    # Sắp theo delta tăng dần: nhóm tụt điểm nhiều nhất lên đầu
+    assert diff["question_type"][-1][0] == "định_tính"
+
+    assert compare_reports(current, {"hops": {"2-hop": baseline["hops"]["1-hop"]}}) == {}
+    assert "SO VỚI BASELINE" in format_report(current, baseline)
@@ -0,0 +1,72 @@
+import json
+import sqlite3
+
+import pytest
+
+from experiments import run_store
+
+
+def make_db(tmp_path):
+    db = run_store.connect(str(tmp_path / "runs.sqlite"))
+    rows = [
+        # (run_id, question_hash, question, rouge): q2 thiếu điểm ở lần chạy sau, q3 ở lần chạy trước
+        ("a", "q1", "Câu 1", 0.5), ("b", "q1", "Câu 1", 0.25),
+        ("a", "q2", "Câu 2", 0.5), ("b", "q2", "Câu 2", None),
+        ("a", "q3", "Câu 3", None), ("b", "q3", "Câu 3", None),
+    ]
+    with db:
+        db.executemany("INSERT INTO records (run_id, question_hash, hop, question_type, question, rouge) "
+                       "VALUES (?, ?, '1-hop', 'tên_latin', ?, ?)", rows)
+    return db
+
+
+def test_comparison_skips_missing_scores(tmp_path):
+    db = make_db(tmp_path)
+    deltas = run_store.question_deltas("a", "b", db=db)
+    assert [(r["question"], r["delta"]) for r in deltas] == [("Câu 1", -0.25)]
+    (group,) = run_store.type_regressions("a", "b", db=db)
+    assert group["n"] == 1 and group["delta"] == -0.25
+
+    text = run_store.format_comparison("a", "b", db=db)
+    assert "-0.2500" in text and "Câu 2" not in text
+
+
+def write_log(path, rouges):
+    # Log zero-shot: câu "Câu lặp" xuất hiện hai lần trong cùng một lần chạy
+    questions = ["Câu lặp", "Câu khác", "Câu lặp"]
+    entries = [{"question": q, "ground_truth": "a", "model_answer": "b", "hop_type": "1-hop",
+                "question_type": "tên_latin", "BLEU": 0, "ROUGE": r, "METEOR": 0, "time": 1.0}
+               for q, r in zip(questions, rouges)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False)
+    return str(path)
+
+
+def test_duplicated_questions_are_kept(tmp_path):
+    db = run_store.connect(str(tmp_path / "runs.sqlite"))
+    run_store.ingest_logs([write_log(tmp_path / "a.json", [0.2, 0.5, 0.4])], run_id="a", db=db)
+    run_store.ingest_logs([write_log(tmp_path / "b.json", [0.3, 0.5, 0.1])], run_id="b", db=db)
+
+    assert [r["samples"] for r in run_store.list_runs(db)] == [3, 3]
+    deltas = {(r["question"], round(r["delta"], 4)) for r in run_store.question_deltas("a", "b", db=db)}
+    # Lần xuất hiện thứ k so với lần thứ k, không ghi đè / nhân chéo
+    assert deltas == {("Câu lặp", -0.3), ("Câu khác", 0.0), ("Câu lặp", 0.1)}
+    (group,) = run_store.type_regressions("a", "b", db=db)
+    assert group["n"] == 3
+    assert group["before"] == pytest.approx((0.2 + 0.5 + 0.4) / 3)
+
+
+def test_migrates_old_primary_key(tmp_path):
+    path = str(tmp_path / "runs.sqlite")
+    old = sqlite3.connect(path)
+    old.executescript(run_store.SCHEMA.replace("    occurrence INTEGER NOT NULL DEFAULT 0,\n", "")
+                      .replace("question_hash, hop, occurrence)", "question_hash, hop)"))
+    old.execute("INSERT INTO records (run_id, question_hash, hop, question, rouge) "
+                "VALUES ('a', 'q', '1-hop', 'Câu', 0.5)")
+    old.commit()
+    old.close()
+
+    db = run_store.connect(path)
+    assert [tuple(r) for r in db.execute("SELECT run_id, occurrence, rouge FROM records")] == [("a", 0, 0.5)]
+    run_store.ingest_logs([write_log(tmp_path / "b.json", [0.3, 0.5, 0.1])], run_id="b", db=db)
+    assert db.execute("SELECT COUNT(*) FROM records WHERE run_id = 'b'").fetchone()[0] == 3
@@ -0,0 +1,99 @@
+import random
+from collections import Counter
+
+import pytest
+
+from experiments.sampling import EarlyStopper, bootstrap_ci, sample, stratified_order, stratum
+
+SIZES = {"định_tính": 60, "định_lượng": 30, "bảo_quản": 10}
+
+
+def questions():
+    # Xếp theo loại câu hỏi như 1hop.json -> data[:n] lệch hẳn về một tầng
+    return [{"question": f"{qt} {i}", "question_type": qt} for qt, n in SIZES.items() for i in range(n)]
+
+
+def test_stratified_order_is_a_seeded_permutation():
+    data = questions()
+    order = stratified_order(data, seed=7)
+    assert sorted(x["question"] for x in order) == sorted(x["question"] for x in data)
+    assert order == stratified_order(questions(), seed=7)
+    assert order != stratified_order(questions(), seed=8)
+
+
+@pytest.mark.parametrize("n", [10, 20, 35, 50, 80])
+def test_every_prefix_keeps_stratum_proportions(n):
+    counts = Counter(stratum(x) for x in stratified_order(questions(), seed=3)[:n])
+    total = sum(SIZES.values())
+    for name, size in SIZES.items():
+        assert abs(counts[name] - n * size / total) <= 2
+
+
+def test_head_sampling_keeps_old_behaviour():
+    data = questions()
+    assert sample(data, 20, method="head") == data[:20]
+    assert Counter(stratum(x) for x in sample(data, 20)) != Counter({"định_tính": 20})
+    with pytest.raises(ValueError):
+        sample(data, 20, method="random")
+
+
+def test_bootstrap_ci_width_on_known_distribution():
+    rng = random.Random(1)
+    values = [rng.gauss(0.5, 0.1) for _ in range(400)]
+    mean, lo, hi = bootstrap_ci(values, resamples=1000, seed=0)
+    assert lo < 0.5 < hi
+    # Sai số chuẩn của trung bình = 0.1 / sqrt(400) -> khoảng 95% rộng ~ 2 * 1.96 * 0.005
+    assert hi - lo == pytest.approx(2 * 1.96 * 0.005, rel=0.2)
+    assert mean == pytest.approx(sum(values) / len(values))
+
+
+def test_bootstrap_ci_coverage():
+    rng = random.Random(2)
+    covered = 0
+    for trial in range(100):
+        values = [rng.random() for _ in range(50)]  # U(0, 1), trung bình thật 0.5
+        _, lo, hi = bootstrap_ci(values, resamples=300, seed=trial)
+        covered += lo <= 0.5 <= hi
+    assert covered >= 88
+
+
+def test_stratified_bootstrap_resamples_within_strata():
+    # Mỗi tầng chỉ có một giá trị -> lấy mẫu lại trong tầng không làm đổi trung bình
+    values = [0.2] * 30 + [0.8] * 10
+    strata = ["a"] * 30 + ["b"] * 10
+    mean, lo, hi = bootstrap_ci(values, strata, resamples=200)
+    assert mean == pytest.approx(0.35)
+    assert lo == pytest.approx(0.35) and hi == pytest.approx(0.35)
+    assert bootstrap_ci(values, resamples=200)[2] - bootstrap_ci(values, resamples=200)[1] > 0.1
+    assert bootstrap_ci([]) == (0.0, 0.0, 0.0)
+
+
+def scored(values):
+    return {i: {"bleu": v, "rouge": v, "meteor": v} for i, v in enumerate(values)}
+
+
+def test_early_stopper_triggers_once_interval_is_narrow():
+    stopper = EarlyStopper("rouge", target_width=0.05, min_samples=30, check_every=10, resamples=200)
+    rng = random.Random(4)
+    values = [0.6 + rng.uniform(-0.02, 0.02) for _ in range(60)]
+    strata = ["a"] * 60
+
+    assert not stopper.should_stop(20, scored(values[:20]), strata)  # chưa đủ min_samples
+    assert not stopper.should_stop(35, scored(values[:35]), strata)  # không trùng check_every
+    assert stopper.last is None
+    assert stopper.should_stop(30, scored(values[:30]), strata)
+    n, mean, lo, hi = stopper.last
+    assert n == 30 and hi - lo <= 0.05 and lo <= mean <= hi
+    assert stopper.settings()["stopped"] and "30 câu" in stopper.describe()
+
+
+def test_early_stopper_keeps_going_on_noisy_scores():
+    stopper = EarlyStopper("bleu", target_width=0.05, min_samples=30, check_every=10, resamples=200)
+    rng = random.Random(5)
+    values = [rng.random() for _ in range(40)]
+    assert not stopper.should_stop(40, scored(values), ["a"] * 40)
+    assert stopper.last[3] - stopper.last[2] > 0.05
+    # Điểm chấm nền còn chậm: đã gửi 40 câu nhưng mới chấm 20 -> chưa kiểm tra
+    assert not EarlyStopper(min_samples=30).should_stop(40, scored(values[:20]), ["a"] * 40)
+    with pytest.raises(ValueError):
+        EarlyStopper("f1")
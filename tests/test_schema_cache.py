@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from experiments.schema_cache import load_cached_schema, read_snapshot
+
+
+def structured_schema():
+    return {
+        "node_props": {
+            "HOAT_CHAT": [{"property": "tên", "type": "STRING"}],
+            "KG_META": [{"property": "phiên_bản_nạp", "type": "STRING"},
+                        {"property": "nguồn", "type": "STRING"}],
+        },
+        "rel_props": {},
+        "relationships": [{"start": "HOAT_CHAT", "type": "TƯƠNG_TÁC_VỚI", "end": "HOAT_CHAT"}],
+        "metadata": {"constraint": [{"labelsOrTypes": ["KG_META"], "properties": ["id"]}],
+                     "index": [{"label": "KG_META", "properties": ["id"]}]},
+    }
+
+
+class FakeGraph:
+    """Giả lập Neo4jGraph: refresh_schema() trả về schema có cả node KG_META."""
+
+    _enhanced_schema = False
+
+    def __init__(self):
+        self.schema = ""
+        self.structured_schema = {}
+        self.refreshes = 0
+
+    def query(self, cypher, params=None):
+        return [{"nodes": 3, "rels": 1, "version": "v1"}]
+
+    def refresh_schema(self):
+        self.refreshes += 1
+        self.structured_schema = structured_schema()
+        self.schema = "Node properties:\n" + json.dumps(self.structured_schema["node_props"])
+
+
+def test_refresh_excludes_kg_meta(tmp_path):
+    path = str(tmp_path / "schema.json")
+    graph = FakeGraph()
+
+    assert load_cached_schema(graph, path=path) == "refreshed"
+    assert "KG_META" not in graph.schema
+    assert "HOAT_CHAT" in graph.schema
+    assert set(graph.structured_schema["node_props"]) == {"HOAT_CHAT"}
+    assert graph.structured_schema["metadata"] == {"constraint": [], "index": []}
+
+    snapshot = read_snapshot(path)
+    assert "KG_META" not in json.dumps(snapshot, ensure_ascii=False)
+
+
+def test_old_snapshot_with_kg_meta_is_cleaned(tmp_path):
+    path = str(tmp_path / "schema.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": "3:1:v1", "schema": "KG_META ...",
+                   "structured_schema": structured_schema()}, f)
+    graph = FakeGraph()
+
+    assert load_cached_schema(graph, path=path) == "cached"
+    assert graph.refreshes == 0
+    assert "KG_META" not in graph.schema
+    assert "KG_META" not in graph.structured_schema["node_props"]
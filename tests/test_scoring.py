@@ -0,0 +1,22 @@
+import pytest
+
+from experiments import scoring
+
+
+def test_nltk_resources_per_profile():
+    assert scoring.nltk_resources(["shared"]) == ("wordnet",)
+    assert scoring.nltk_resources(["rag"], metrics=("bleu", "rouge")) == ()
+    assert scoring.nltk_resources(["shared", "zero_shot"]) == ("wordnet", "punkt")
+
+
+def test_shared_profile_does_not_fetch_punkt(monkeypatch):
+    nltk = pytest.importorskip("nltk")
+    requested = []
+    monkeypatch.setattr(nltk, "download", lambda name, *a, **k: requested.append(name))
+    scoring.ensure_nltk_data.cache_clear()
+
+    scoring._init_worker(("shared",), ("bleu", "rouge"))
+    scores = scoring.score_batch([("Paracetamol hạ sốt", "Paracetamol hạ sốt nhanh")], workers=1,
+                                 metrics=("bleu", "rouge"))
+    assert scores[0]["rouge"] > 0.8
+    assert "punkt" not in requested
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer
+
+from experiments.service import QAService, create_app
+
+
+class StubService(QAService):
+    """QAService không dựng chain thật: _answer chờ `release` rồi trả lời giả."""
+
+    def __init__(self, warm_up_error=None, **kwargs):
+        super().__init__(**kwargs)
+        self.warm_up_error = warm_up_error
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _warm_up(self):
+        if self.warm_up_error:
+            raise self.warm_up_error
+
+    def _answer(self, question, mode, on_token=None):
+        self.calls.append(question)
+        self.started.set()
+        self.release.wait(5)
+        return {"answer": f"trả lời: {question}"}
+
+
+def run(service, scenario):
+    """Chạy scenario(client, service) với app aiohttp thật trên cổng ngẫu nhiên."""
+    async def main():
+        client = TestClient(TestServer(create_app(service)))
+        await client.start_server()
+        try:
+            await client.app["warm_up"]
+            return await scenario(client, service)
+        finally:
+            service.release.set()
+            await client.close()
+
+    return asyncio.run(main())
+
+
+async def wait_started(service):
+    await asyncio.get_running_loop().run_in_executor(None, service.started.wait, 5)
+
+
+def test_identical_questions_are_coalesced():
+    async def scenario(client, service):
+        first = asyncio.ensure_future(client.post("/ask", json={"question": "Aspirin là gì?"}))
+        await wait_started(service)
+        second = asyncio.ensure_future(client.post("/ask", json={"question": "  aspirin là gì? "}))
+        await asyncio.sleep(0.1)
+        service.release.set()
+        responses = await asyncio.gather(first, second)
+        return [r.status for r in responses], [await r.json() for r in responses]
+
+    service = StubService(workers=2)
+    statuses, bodies = run(service, scenario)
+    assert statuses == [200, 200]
+    assert bodies[0]["answer"] == bodies[1]["answer"] == "trả lời: Aspirin là gì?"
+    assert service.calls == ["Aspirin là gì?"]
+    assert service.counters["coalesced"] == 1
+
+
+def test_full_queue_returns_503():
+    async def scenario(client, service):
+        busy = asyncio.ensure_future(client.post("/ask", json={"question": "câu 1"}))
+        await wait_started(service)  # worker duy nhất đang bận
+        queued = asyncio.ensure_future(client.post("/ask", json={"question": "câu 2"}))
+        await asyncio.sleep(0.1)  # câu 2 nằm trong hàng đợi (sức chứa 1)
+        rejected = await client.post("/ask", json={"question": "câu 3"})
+        service.release.set()
+        done = await asyncio.gather(busy, queued)
+        return rejected, [r.status for r in done]
+
+    service = StubService(workers=1, queue_size=1)
+    rejected, statuses = run(service, scenario)
+    assert rejected.status == 503 and rejected.headers["Retry-After"] == "1"
+    assert statuses == [200, 200]
+    assert service.counters["rejected"] == 1
+
+
+def test_slow_answer_returns_504():
+    async def scenario(client, service):
+        response = await client.post("/ask", json={"question": "câu chậm"})
+        return response.status
+
+    service = StubService(workers=1, timeout=0.2)
+    assert run(service, scenario) == 504
+    assert service.counters["timeouts"] == 1
+
+
+def test_non_object_json_returns_400():
+    async def scenario(client, service):
+        return [(await client.post("/ask", json=body)).status for body in ([1], "câu hỏi", None)]
+
+    assert run(StubService(), scenario) == [400, 400, 400]
+
+
+def test_failed_warm_up_is_reported():
+    async def scenario(client, service):
+        health = await client.get("/health")
+        ask = await client.post("/ask", json={"question": "Aspirin là gì?"})
+        return health.status, await health.json(), ask.status
+
+    service = StubService(warm_up_error=RuntimeError("Neo4j không kết nối được"))
+    status, body, ask_status = run(service, scenario)
+    assert status == 503
+    assert body["status"] == "failed" and "Neo4j không kết nối được" in body["error"]
+    assert ask_status == 503
+    assert not service.ready
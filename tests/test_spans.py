@@ -0,0 +1,26 @@
+from experiments.spans import aggregate_spans, format_span_report
+
+
+def test_context_tokens_reported_apart_from_llm_tokens():
+    logs = [
+        {"type": "1-hop", "spans": [
+            {"stage": "context", "latency_ms": 2.0, "context_tokens": 900},
+            {"stage": "answer_generation", "latency_ms": 40.0, "prompt_tokens": 1200, "completion_tokens": 80},
+        ]},
+        {"type": "1-hop", "spans": [
+            {"stage": "context", "latency_ms": 4.0, "context_tokens": 500},
+            {"stage": "answer_generation", "latency_ms": 60.0, "prompt_tokens": 800, "completion_tokens": 40},
+        ]},
+    ]
+    report = aggregate_spans(logs)
+
+    context = report["1-hop"]["context"]
+    assert context["context_tokens"] == 700
+    assert "prompt_tokens" not in context
+    answer = report["1-hop"]["answer_generation"]
+    assert answer["prompt_tokens"] == 1000 and answer["completion_tokens"] == 60
+    assert "context_tokens" not in answer
+
+    text = format_span_report(report)
+    context_line = next(line for line in text.splitlines() if "- context" in line)
+    assert "context_tokens=700" in context_line and "tokens=0/0" not in context_line
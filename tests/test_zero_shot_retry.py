@@ -0,0 +1,43 @@
+import types
+
+import pytest
+
+from experiments import zero_shot
+
+
+class FlakyStream:
+    """Stream vài token rồi lỗi ở lần gọi đầu; các lần sau trả lời đầy đủ."""
+
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def stream(self, messages):
+        self.calls += 1
+        for i, text in enumerate(["Para", "cetamol"]):
+            if self.calls == 1 and i == self.fail_after:
+                raise RuntimeError("429 Resource exhausted")
+            yield types.SimpleNamespace(content=text, usage_metadata=None)
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    def install(fail_after):
+        llm = FlakyStream(fail_after)
+        monkeypatch.setattr(zero_shot, "get_llm", lambda: llm)
+        monkeypatch.setattr(zero_shot.time, "sleep", lambda s: None)
+        return llm
+    return install
+
+
+def test_no_retry_after_first_token(flaky):
+    llm, tokens = flaky(fail_after=1), []
+    with pytest.raises(RuntimeError):
+        zero_shot.ask("Paracetamol là gì?", on_token=tokens.append)
+    assert llm.calls == 1 and tokens == ["Para"]
+
+
+def test_retry_before_first_token(flaky):
+    llm, tokens = flaky(fail_after=0), []
+    assert zero_shot.ask("Paracetamol là gì?", on_token=tokens.append) == "Paracetamol"
+    assert llm.calls == 2 and tokens == ["Para", "cetamol"]